@@ -164,6 +164,50 @@ class MonitorConfigFactory(factory.django.DjangoModelFactory):
     path = "api/notifications"
 
 
+@pytest.fixture(autouse=True)
+def _reset_device_session_pool():
+    # Tokens de login ficam em cache por catraca; nao podem vazar entre testes.
+    from src.core.__seedwork__.infra.device_session_pool import device_session_pool
+
+    device_session_pool.clear()
+    yield
+    device_session_pool.clear()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # Heartbeats, travas de coalescencia etc. ficam no cache local do worker.
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_access_policy_index():
+    # O indice de politicas vive na memoria do processo; cada teste tem seu banco.
+    from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+        reset_access_policy_index,
+    )
+
+    reset_access_policy_index()
+    yield
+    reset_access_policy_index()
+
+
+@pytest.fixture(autouse=True)
+def _reset_monitor_reference_cache():
+    # Devices/portais/regras ficam numa fotografia em memoria do processo.
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.reference_cache import (
+        reset_reference_cache,
+    )
+
+    reset_reference_cache()
+    yield
+    reset_reference_cache()
+
+
 def _authenticated_client(user: User) -> APIClient:
     client = APIClient()
     client.force_authenticate(user=user)
@@ -230,6 +274,36 @@ def device_factory(db):
     return DeviceFactory
 
 
+@pytest.fixture
+def simulated_devices(device_factory):
+    """
+    Sobe catracas simuladas em localhost (``tests/controlid_simulator.py``).
+
+    ``simulated_devices(count, **opcoes)`` devolve pares ``(Device, simulador)``;
+    os servidores são derrubados no teardown.
+    """
+    from tests.controlid_simulator import ControlIDSimulator
+
+    running = []
+
+    def start(count=1, **options):
+        pairs = []
+        for _ in range(count):
+            simulator = ControlIDSimulator(**options).start()
+            running.append(simulator)
+            device = device_factory(
+                ip=simulator.url,
+                username=simulator.device.login,
+                password=simulator.device.password,
+            )
+            pairs.append((device, simulator))
+        return pairs
+
+    yield start
+    for simulator in running:
+        simulator.stop()
+
+
 @pytest.fixture
 def control_id(device_factory):
     return device_factory()
@@ -1,5 +1,5 @@
 from .catraca_sync import ControlIDSyncMixin
 from .mixins import TimeZoneSyncMixin, TimeSpanSyncMixin, AccessRuleSyncMixin, UserAccessRuleSyncMixin, AccessRuleTimeZoneSyncMixin, PortalAccessRuleSyncMixin, TemplateSyncMixin, PortalSyncMixin, CardSyncMixin
-from .pagination import CustomPageNumberPagination
+from .pagination import CustomPageNumberPagination, KeysetPagination
 
-__all__ = ['CustomPageNumberPagination']
\ No newline at end of file
+__all__ = ['CustomPageNumberPagination', 'KeysetPagination']
\ No newline at end of file
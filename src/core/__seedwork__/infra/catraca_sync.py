@@ -4,14 +4,30 @@
 # by: oPeraza
 from __future__ import annotations
 
+import copy
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Any, Dict, List, Literal, Mapping, Optional, Union, overload
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Union,
+    overload,
+)
 
 import requests
 from django.conf import settings
 from rest_framework import status
 from rest_framework.response import Response
 
+from src.core.__seedwork__.infra.device_session_pool import device_session_pool
 from src.core.__seedwork__.infra.types.catraca_sync import (
     RemoteEnrollBioResponse,
     RemoteEnrollCardResponse,
@@ -61,6 +77,14 @@ REQUIRED_FIELDS_BY_OBJECT: Dict[str, List[str]] = {
     "access_rule_time_zones": ["access_rule_id", "time_zone_id"],
 }
 
+# Tabelas sem ``id`` de uma linha por usuário: o ``create_or_modify_objects``
+# só casa pelo ``id`` e duplicaria a linha a cada envio, então elas são
+# atualizadas com ``modify_objects`` pela chave e só criadas se não existirem.
+MODIFY_BY_KEY_OBJECTS: Dict[str, tuple] = {
+    "pins": ("user_id",),
+    "user_roles": ("user_id",),
+}
+
 # Seções de nível raiz reconhecidas pela API de configuração da catraca.
 _CONFIG_TOP_LEVEL_KEYS = frozenset(
     {"general", "monitor", "catra", "online_client", "push_server"}
@@ -112,11 +136,59 @@ class DeviceClass:
     password: str
 
 
+@dataclass
+class DeviceCallResult:
+    """Resultado de uma operação executada em um device durante o fan-out."""
+
+    device: Device
+    response: Optional[requests.Response] = None
+    error: Optional[CatracaSyncError] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+DeviceOperation = Callable[["ControlIDSyncMixin", Device], requests.Response]
+
+
 # ---------------------------------------------------------------------------
 # Helpers internos (funções puras, fora da classe)
 # ---------------------------------------------------------------------------
 
 
+def _fanout_max_workers() -> int:
+    """Paralelismo máximo do fan-out (``CATRACA_SYNC_MAX_WORKERS``)."""
+    value = getattr(settings, "CATRACA_SYNC_MAX_WORKERS", 8)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _fanout_device_deadline() -> float:
+    """Tempo máximo por device no fan-out (``CATRACA_SYNC_DEVICE_DEADLINE_SECONDS``)."""
+    value = getattr(settings, "CATRACA_SYNC_DEVICE_DEADLINE_SECONDS", 45)
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return 45.0
+
+
+def _raise_first_failure(results: List[DeviceCallResult]) -> None:
+    """
+    Levanta o erro do primeiro device (na ordem original) que falhou.
+
+    Mantém o contrato dos métodos ``*_in_all_devices``: qualquer falha vira
+    ``CatracaSyncError`` para que o ``transaction.atomic()`` do chamador faça
+    rollback.
+    """
+    for result in results:
+        if result.error is not None:
+            raise result.error
+
+
 def _normalize_config_value(value: Any) -> Any:
     """
     Normaliza recursivamente um valor para o formato esperado pela API da
@@ -173,6 +245,9 @@ class ControlIDSyncMixin:
     como tratar (ex: rollback via ``transaction.atomic()`` no ViewSet).
     """
 
+    # Sinalizado pelo fan-out quando desiste do device (prazo estourado).
+    _abandoned: Optional[threading.Event] = None
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.session: Optional[str] = None
@@ -217,6 +292,10 @@ class ControlIDSyncMixin:
         """
         Realiza login na API da catraca com gerenciamento inteligente de sessão.
 
+        O token é compartilhado via :data:`device_session_pool`: instâncias
+        diferentes apontando para a mesma catraca reaproveitam o mesmo token
+        até o TTL expirar ou a catraca responder 401.
+
         Args:
             force_new: Força um novo login mesmo se já houver sessão ativa.
 
@@ -226,29 +305,52 @@ class ControlIDSyncMixin:
         Raises:
             CatracaSyncError: Se o login falhar.
         """
+        self._ensure_not_abandoned()
         if self.session and not force_new:
             return self.session
 
-        try:
-            response = requests.post(
-                self.get_url("login.fcgi"),
-                json={"login": self.device.username, "password": self.device.password},
-                timeout=request_timeout,
-            )
-            response.raise_for_status()
-            self.session = response.json().get("session")
-            if not self.session:
+        key = device_session_pool.key_for(self.device)
+        stale = self.session
+
+        if not force_new:
+            cached = device_session_pool.get_token(key)
+            if cached:
+                self.session = cached
+                return cached
+
+        with device_session_pool.login_lock(key):
+            # Enquanto esperava o lock, outra thread pode já ter renovado o
+            # token que expirou para nós — nesse caso não loga de novo.
+            cached = device_session_pool.get_token(key)
+            if cached and (not force_new or (stale and cached != stale)):
+                self.session = cached
+                return cached
+
+            try:
+                response = device_session_pool.http(key).post(
+                    self.get_url("login.fcgi"),
+                    json={
+                        "login": self.device.username,
+                        "password": self.device.password,
+                    },
+                    timeout=request_timeout,
+                )
+                response.raise_for_status()
+                self.session = response.json().get("session")
+                if not self.session:
+                    raise CatracaSyncError(
+                        "Falha no login: resposta sem sessao",
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                    )
+                device_session_pool.store_token(key, self.session)
+                return self.session  # type: ignore[return-value]
+            except requests.RequestException as exc:
+                self.session = None
+                device_session_pool.invalidate_token(key)
                 raise CatracaSyncError(
-                    "Falha no login: resposta sem sessao",
+                    f"Falha no login: {exc}",
                     status_code=status.HTTP_502_BAD_GATEWAY,
-                )
-            return self.session  # type: ignore[return-value]
-        except requests.RequestException as exc:
-            self.session = None
-            raise CatracaSyncError(
-                f"Falha no login: {exc}",
-                status_code=status.HTTP_502_BAD_GATEWAY,
-            ) from exc
+                ) from exc
 
     def _make_request(
         self,
@@ -261,6 +363,9 @@ class ControlIDSyncMixin:
         """
         Executa um request HTTP com retry automático em caso de sessão expirada.
 
+        Usa a conexão keep-alive da catraca mantida pelo
+        :data:`device_session_pool`.
+
         Args:
             endpoint: Endpoint da API (ex: ``"set_configuration.fcgi"``).
             method: Método HTTP.
@@ -275,6 +380,7 @@ class ControlIDSyncMixin:
             CatracaSyncError: Se a requisição falhar por erro de rede.
         """
         sess = self.login()
+        http = device_session_pool.http(device_session_pool.key_for(self.device))
         request_kwargs: JsonDict = {
             "method": method,
             "url": self.get_url(f"{endpoint}?session={sess}"),
@@ -284,12 +390,12 @@ class ControlIDSyncMixin:
         }
 
         try:
-            response = requests.request(**request_kwargs)
+            response = http.request(**request_kwargs)
 
             if response.status_code == 401 and retry_on_auth_fail:
                 sess = self.login(force_new=True)
                 request_kwargs["url"] = self.get_url(f"{endpoint}?session={sess}")
-                response = requests.request(**request_kwargs)
+                response = http.request(**request_kwargs)
 
             return response
 
@@ -437,6 +543,155 @@ class ControlIDSyncMixin:
             return list(Device.objects.filter(id__in=device_ids, is_active=True))
         return list(Device.objects.filter(is_active=True))
 
+    # ------------------------------------------------------------------
+    # Fan-out concorrente entre devices
+    # ------------------------------------------------------------------
+
+    def _worker_for_device(self, device: Device) -> "ControlIDSyncMixin":
+        """
+        Retorna uma instância isolada para operar em *device*.
+
+        Cada thread do fan-out precisa do próprio ``_device``/``session``; uma
+        cópia rasa evita que as threads sobrescrevam o estado umas das outras.
+        Se *device* já é o device atual, reaproveita ``self`` (e a sessão).
+        """
+        if device is self._device:
+            return self
+        worker = copy.copy(self)
+        worker.set_device(device)
+        return worker
+
+    def _ensure_not_abandoned(self) -> None:
+        """
+        Impede novos requests de um worker cujo device já foi dado como falho.
+
+        Uma thread travada não pode ser interrompida, mas quando ela volta os
+        requests seguintes da operação não chegam à catraca.
+        """
+        if self._abandoned is not None and self._abandoned.is_set():
+            raise CatracaSyncError(
+                f"Operação abandonada no device '{self.device.name}' após o prazo",
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            )
+
+    @staticmethod
+    def _call_device(
+        worker: "ControlIDSyncMixin", device: Device, operation: DeviceOperation
+    ) -> DeviceCallResult:
+        started = time.monotonic()
+        try:
+            response = operation(worker, device)
+            return DeviceCallResult(
+                device=device, response=response, elapsed=time.monotonic() - started
+            )
+        except CatracaSyncError as exc:
+            return DeviceCallResult(
+                device=device, error=exc, elapsed=time.monotonic() - started
+            )
+
+    def _run_in_devices(
+        self, devices: List[Device], operation: DeviceOperation
+    ) -> List[DeviceCallResult]:
+        """
+        Executa *operation* em todos os *devices* concorrentemente.
+
+        O paralelismo é limitado por ``CATRACA_SYNC_MAX_WORKERS``. Cada device
+        tem até ``CATRACA_SYNC_DEVICE_DEADLINE_SECONDS`` contados de quando a
+        sua operação começa; a chamada inteira tem um único prazo total
+        (o prazo por device vezes o número de levas do pool), de modo que um
+        device travado não atrasa os da fila além disso. Quem estourar é
+        reportado como falha (504), marcado como abandonado e o que ele ainda
+        fizer é descartado. Os resultados voltam na mesma ordem de *devices*,
+        independente da ordem de conclusão.
+
+        Não levanta exceção: use :func:`_raise_first_failure` para manter o
+        contrato de rollback.
+        """
+        if not devices:
+            return []
+
+        if len(devices) == 1:
+            device = devices[0]
+            return [
+                self._call_device(self._worker_for_device(device), device, operation)
+            ]
+
+        max_workers = min(_fanout_max_workers(), len(devices))
+        deadline = _fanout_device_deadline()
+        waves = math.ceil(len(devices) / max_workers)
+        overall_deadline = time.monotonic() + deadline * waves
+
+        workers = []
+        for device in devices:
+            worker = self._worker_for_device(device)
+            if worker is self:
+                worker = copy.copy(self)
+            worker._abandoned = threading.Event()
+            workers.append(worker)
+        started_at: Dict[int, float] = {}
+
+        def run(index: int) -> DeviceCallResult:
+            started_at[index] = time.monotonic()
+            return self._call_device(workers[index], devices[index], operation)
+
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="catraca-sync"
+        )
+        try:
+            futures = [executor.submit(run, index) for index in range(len(devices))]
+            pending = set(range(len(devices)))
+            expired: set[int] = set()
+
+            while pending:
+                now = time.monotonic()
+                for index in [i for i in pending if futures[i].done()]:
+                    pending.discard(index)
+                for index in [
+                    i
+                    for i in pending
+                    if i in started_at and now - started_at[i] >= deadline
+                ]:
+                    pending.discard(index)
+                    expired.add(index)
+                if not pending:
+                    break
+                if now >= overall_deadline:
+                    expired |= pending
+                    break
+
+                next_expiry = min(
+                    [started_at[i] + deadline for i in pending if i in started_at]
+                    + [overall_deadline]
+                )
+                wait(
+                    [futures[i] for i in pending],
+                    timeout=max(0.0, next_expiry - now),
+                    return_when=FIRST_COMPLETED,
+                )
+
+            results: List[DeviceCallResult] = []
+            for index, (device, future) in enumerate(zip(devices, futures)):
+                if index not in expired:
+                    results.append(future.result())
+                    continue
+                # Descarta o resultado tardio e bloqueia os próximos requests.
+                workers[index]._abandoned.set()
+                future.cancel()
+                results.append(
+                    DeviceCallResult(
+                        device=device,
+                        error=CatracaSyncError(
+                            f"Tempo limite excedido no device '{device.name}'",
+                            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                        ),
+                        elapsed=deadline,
+                    )
+                )
+            return results
+        finally:
+            # Não bloqueia esperando devices travados: o prazo já foi reportado.
+            executor.shutdown(wait=False, cancel_futures=True)
+
     # ------------------------------------------------------------------
     # CRUD de objetos na API da catraca
     # ------------------------------------------------------------------
@@ -489,6 +744,9 @@ class ControlIDSyncMixin:
         """
         Cria objetos em todas as catracas ativas (ou apenas nas indicadas por *device_ids*).
 
+        Os devices são chamados em paralelo (ver :meth:`_run_in_devices`); se
+        algum falhar, o erro do primeiro device da lista é propagado.
+
         Raises:
             CatracaSyncError: Propagada para a camada superior em caso de falha,
                 permitindo rollback de transação Django via ``transaction.atomic()``.
@@ -502,11 +760,8 @@ class ControlIDSyncMixin:
 
         _validate_object_fields(object_name, values)
 
-        first_response_data: Optional[JsonDict] = None
-
-        for idx, device in enumerate(devices):
-            self.set_device(device)
-            response = self._make_request(
+        def send(worker: ControlIDSyncMixin, device: Device) -> requests.Response:
+            response = worker._make_request(
                 "create_objects.fcgi",
                 json_data={"object": object_name, "values": values},
                 request_timeout=30,
@@ -517,11 +772,16 @@ class ControlIDSyncMixin:
                     f"{self._extract_response_data(response)}",
                     status_code=response.status_code,
                 )
-            if idx == 0:
-                try:
-                    first_response_data = response.json()
-                except Exception:
-                    first_response_data = {"success": True}
+            return response
+
+        results = self._run_in_devices(devices, send)
+        _raise_first_failure(results)
+
+        first_response_data: Optional[JsonDict] = None
+        try:
+            first_response_data = results[0].response.json()  # type: ignore[union-attr]
+        except Exception:
+            first_response_data = {"success": True}
 
         return Response(
             first_response_data or {"success": True},
@@ -548,9 +808,8 @@ class ControlIDSyncMixin:
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        for device in devices:
-            self.set_device(device)
-            response = self._make_request(
+        def send(worker: ControlIDSyncMixin, device: Device) -> requests.Response:
+            response = worker._make_request(
                 "create_or_modify_objects.fcgi",
                 json_data={"object": object_name, "values": values},
                 request_timeout=30,
@@ -561,6 +820,9 @@ class ControlIDSyncMixin:
                     f"{self._extract_response_data(response)}",
                     status_code=response.status_code,
                 )
+            return response
+
+        _raise_first_failure(self._run_in_devices(devices, send))
 
         return Response({"success": True}, status=status.HTTP_200_OK)
 
@@ -585,9 +847,8 @@ class ControlIDSyncMixin:
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        for device in devices:
-            self.set_device(device)
-            response = self._make_request(
+        def send(worker: ControlIDSyncMixin, device: Device) -> requests.Response:
+            response = worker._make_request(
                 "modify_objects.fcgi",
                 json_data={"object": object_name, "values": values, "where": where},
                 request_timeout=30,
@@ -598,6 +859,9 @@ class ControlIDSyncMixin:
                     f"{self._extract_response_data(response)}",
                     status_code=response.status_code,
                 )
+            return response
+
+        _raise_first_failure(self._run_in_devices(devices, send))
 
         return Response({"success": True})
 
@@ -621,9 +885,8 @@ class ControlIDSyncMixin:
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        for device in devices:
-            self.set_device(device)
-            response = self._make_request(
+        def send(worker: ControlIDSyncMixin, device: Device) -> requests.Response:
+            response = worker._make_request(
                 "destroy_objects.fcgi",
                 json_data={"object": object_name, "where": where},
                 request_timeout=30,
@@ -635,6 +898,63 @@ class ControlIDSyncMixin:
                     f"{self._extract_response_data(response) or response.text}",
                     status_code=response.status_code,
                 )
+            return response
+
+        _raise_first_failure(self._run_in_devices(devices, send))
+
+        return Response({"success": True}, status=status.HTTP_204_NO_CONTENT)
+
+    def modify_or_create_objects_in_all_devices(
+        self,
+        object_name: str,
+        values: ObjectValues,
+        device_ids: Optional[List[int]] = None,
+        **kwargs: Any,
+    ) -> Response:
+        """
+        Upsert pela chave de :data:`MODIFY_BY_KEY_OBJECTS` (``pins``, ``user_roles``).
+
+        Cada valor vai num ``modify_objects`` com ``where`` na chave; se nenhuma
+        linha mudou, num ``create_objects``. Reenviar o mesmo usuário não
+        duplica a linha na catraca.
+
+        Raises:
+            CatracaSyncError: Propagada para a camada superior em caso de falha.
+        """
+        devices = self._get_target_devices(device_ids)
+        if not devices:
+            return Response(
+                {"error": "Nenhuma catraca ativa encontrada"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        key_fields = MODIFY_BY_KEY_OBJECTS[object_name]
+
+        def send(worker: ControlIDSyncMixin, device: Device) -> None:
+            for row in values:
+                where = {object_name: {name: row[name] for name in key_fields}}
+                response = worker._make_request(
+                    "modify_objects.fcgi",
+                    json_data={"object": object_name, "values": row, "where": where},
+                    request_timeout=30,
+                )
+                data = self._extract_response_data(response)
+                changed = isinstance(data, dict) and data.get("changes")
+                if response.status_code == 200 and changed:
+                    continue
+                response = worker._make_request(
+                    "create_objects.fcgi",
+                    json_data={"object": object_name, "values": [row]},
+                    request_timeout=30,
+                )
+                if response.status_code != 200:
+                    raise CatracaSyncError(
+                        f"Falha ao criar/atualizar '{object_name}' no device '{device.name}': "
+                        f"{self._extract_response_data(response)}",
+                        status_code=response.status_code,
+                    )
+
+        _raise_first_failure(self._run_in_devices(devices, send))
 
         return Response({"success": True}, status=status.HTTP_204_NO_CONTENT)
 
@@ -810,9 +1130,8 @@ class ControlIDSyncMixin:
             else {"general": normalized}
         )
 
-        for device in devices:
-            self.set_device(device)
-            response = self._make_request(
+        def send(worker: ControlIDSyncMixin, device: Device) -> requests.Response:
+            response = worker._make_request(
                 "set_configuration.fcgi",
                 json_data=final_payload,
                 request_timeout=30,
@@ -823,5 +1142,8 @@ class ControlIDSyncMixin:
                     f"{self._extract_response_data(response)}",
                     status_code=response.status_code,
                 )
+            return response
+
+        _raise_first_failure(self._run_in_devices(devices, send))
 
         return Response({"success": True})
@@ -0,0 +1,131 @@
+"""
+Pool de conexões HTTP e tokens de sessão por catraca.
+
+Cada catraca é identificada por ``(ip, username)``. O pool guarda:
+
+- um ``requests.Session`` keep-alive por catraca (reaproveita a conexão TCP
+  entre requests do mesmo processo);
+- o token devolvido pelo ``login.fcgi``, no cache do Django com TTL, para que
+  as threads do processo não façam login de novo (entre processos só com o
+  cache compartilhado de ``REDIS_CACHE_URL``);
+- um lock por catraca, para que só uma thread faça login por vez.
+
+As sessões HTTP não sobrevivem a ``fork`` (prefork do Celery): quando o PID
+muda, o pool é recriado no processo filho.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+PoolKey = Tuple[str, str]
+
+_CACHE_PREFIX = "catraca_session"
+
+
+def _token_ttl() -> int:
+    """TTL do token em cache (``CATRACA_SESSION_TTL_SECONDS``)."""
+    value = getattr(settings, "CATRACA_SESSION_TTL_SECONDS", 600)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 600
+
+
+class DeviceSessionPool:
+    """Pool process-wide de ``requests.Session`` e tokens por catraca."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._http: Dict[PoolKey, requests.Session] = {}
+        self._login_locks: Dict[PoolKey, threading.Lock] = {}
+        self._token_keys: Set[str] = set()
+
+    @staticmethod
+    def key_for(device: Any) -> PoolKey:
+        return (str(device.ip), str(device.username))
+
+    @staticmethod
+    def _cache_key(key: PoolKey) -> str:
+        digest = hashlib.sha1("|".join(key).encode()).hexdigest()
+        return f"{_CACHE_PREFIX}:{digest}"
+
+    def _reset_after_fork(self) -> None:
+        # Chamado com self._lock adquirido. Sockets herdados do processo pai
+        # não podem ser reaproveitados; apenas descarta as referências.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._http = {}
+            self._login_locks = {}
+
+    # ------------------------------------------------------------------
+    # Conexões HTTP
+    # ------------------------------------------------------------------
+
+    def http(self, key: PoolKey) -> requests.Session:
+        """Retorna o ``requests.Session`` keep-alive da catraca."""
+        with self._lock:
+            self._reset_after_fork()
+            session = self._http.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._http[key] = session
+            return session
+
+    def login_lock(self, key: PoolKey) -> threading.Lock:
+        """Lock que serializa o login de uma mesma catraca."""
+        with self._lock:
+            self._reset_after_fork()
+            return self._login_locks.setdefault(key, threading.Lock())
+
+    # ------------------------------------------------------------------
+    # Tokens de sessão da catraca
+    # ------------------------------------------------------------------
+
+    def get_token(self, key: PoolKey) -> Optional[str]:
+        return cache.get(self._cache_key(key))
+
+    def store_token(self, key: PoolKey, token: str) -> None:
+        cache_key = self._cache_key(key)
+        cache.set(cache_key, token, timeout=_token_ttl())
+        with self._lock:
+            self._token_keys.add(cache_key)
+
+    def invalidate_token(self, key: PoolKey, token: Optional[str] = None) -> None:
+        """
+        Remove o token da catraca.
+
+        Se *token* for informado, só remove quando o token em cache ainda for
+        ele — evita apagar um token novo que outra thread acabou de obter.
+        """
+        cache_key = self._cache_key(key)
+        if token is not None and cache.get(cache_key) != token:
+            return
+        cache.delete(cache_key)
+
+    def clear(self) -> None:
+        """Fecha as conexões e descarta os tokens conhecidos por este processo."""
+        with self._lock:
+            sessions = list(self._http.values())
+            token_keys = list(self._token_keys)
+            self._http = {}
+            self._login_locks = {}
+            self._token_keys = set()
+        for session in sessions:
+            session.close()
+        cache.delete_many(token_keys)
+
+
+device_session_pool = DeviceSessionPool()
@@ -1,5 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -21,3 +28,153 @@ class CustomPageNumberPagination(PageNumberPagination):
             'current_page': self.page.number,
             'total_pages': self.page.paginator.num_pages,
         })
+
+
+def _page_size_from(value, cutoff=None):
+    """Inteiro positivo limitado a *cutoff*; ``ValueError`` se inválido."""
+    size = int(value)
+    if size <= 0:
+        raise ValueError(value)
+    return min(size, cutoff) if cutoff else size
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por chave (keyset/cursor) em ``(key_field, pk)`` decrescentes.
+
+    Em vez de ``OFFSET``, cada página continua a partir da última linha da
+    anterior (``key < x OR (key = x AND pk < y)``), o que usa o índice de
+    ``key_field`` e custa o mesmo na página 1 e na 1000. O ``COUNT(*)`` é
+    opcional: ``?count=exact`` conta tudo e ``?count=estimate`` usa a
+    estimativa do planner do PostgreSQL.
+    A ordem é sempre ``-key_field, -pk``; ``?ordering=`` com outra ordem é
+    recusado com 400 em vez de ser ignorado.
+    Exemplo: ?cursor=<token>&page_size=200&count=estimate
+    """
+
+    key_field = "time"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering_query_param = "ordering"
+    invalid_cursor_message = "Cursor inválido"
+
+    def get_page_size(self, request):
+        try:
+            return _page_size_from(
+                request.query_params[self.page_size_query_param],
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def check_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering and ordering.replace(" ", "") not in (
+            f"-{self.key_field}",
+            f"-{self.key_field},-id",
+        ):
+            raise ValidationError(
+                {
+                    self.ordering_query_param: (
+                        f"A paginação por cursor só ordena por -{self.key_field}; "
+                        "remova o parâmetro ou use a paginação por página."
+                    )
+                }
+            )
+
+    def encode_cursor(self, key, pk):
+        # isoformat direto: o DjangoJSONEncoder corta microssegundos, e o
+        # cursor precisa da chave exata para não pular nem repetir linhas.
+        if hasattr(key, "isoformat"):
+            key = key.isoformat()
+        raw = json.dumps([key, pk], separators=(",", ":"))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            key, pk = json.loads(urlsafe_b64decode(padded.encode()))
+            key = model._meta.get_field(self.key_field).to_python(key)
+            pk = model._meta.pk.to_python(pk)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        if key is None or pk is None:
+            raise NotFound(self.invalid_cursor_message)
+        return key, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.check_ordering(request)
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        self.count_is_estimate = False
+
+        queryset = queryset.order_by(f"-{self.key_field}", "-pk")
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == "exact":
+            self.count = queryset.count()
+        elif count_mode == "estimate":
+            self.count, self.count_is_estimate = estimate_count(queryset)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            key, pk = position
+            queryset = queryset.filter(
+                Q(**{f"{self.key_field}__lt": key})
+                | Q(**{self.key_field: key, "pk__lt": pk})
+            )
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.next_cursor = (
+            self.encode_cursor(getattr(rows[-1], self.key_field), rows[-1].pk)
+            if self.has_next
+            else None
+        )
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "cursor": self.next_cursor,
+            "page_size": self.page_size,
+            "results": data,
+        }
+        if self.count is not None:
+            payload["count"] = self.count
+            payload["count_is_estimate"] = self.count_is_estimate
+        return Response(payload)
+
+
+def estimate_count(queryset):
+    """
+    Retorna ``(total, is_estimate)``.
+
+    No PostgreSQL lê a estimativa de linhas do ``EXPLAIN`` (sem varrer a
+    tabela); nos demais bancos faz o ``COUNT(*)`` normal.
+    """
+    db = queryset.db
+    connection = connections[db]
+    if connection.vendor != "postgresql":
+        return queryset.count(), False
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]), True
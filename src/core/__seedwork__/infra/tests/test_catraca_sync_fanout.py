@@ -0,0 +1,188 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_fanout_calls_all_devices_concurrently_in_isolated_workers(
+    mocker, make_response, device_factory, settings
+):
+    # Testa que cada device roda em paralelo e com seu proprio _device.
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    settings.CATRACA_SYNC_MAX_WORKERS = 4
+    devices = [device_factory() for _ in range(4)]
+    barrier = threading.Barrier(4, timeout=5)
+    seen = []
+
+    def fake_request(self, endpoint, **kwargs):
+        seen.append(self.device.pk)
+        barrier.wait()  # so libera se os 4 devices estiverem em voo ao mesmo tempo
+        return make_response(json_data={"ids": [1]})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+    mixin = ControlIDSyncMixin()
+
+    response = mixin.create_objects("groups", [{"id": 1, "name": "G"}])
+
+    assert response.status_code == 201
+    assert response.data == {"ids": [1]}
+    assert sorted(seen) == sorted(device.pk for device in devices)
+    assert mixin._device is None
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_fanout_raises_first_failure_in_device_order(
+    mocker, make_response, device_factory
+):
+    # Testa que o erro propagado e o do primeiro device da lista, nao o mais rapido.
+    from src.core.__seedwork__.infra.catraca_sync import (
+        CatracaSyncError,
+        ControlIDSyncMixin,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    first = device_factory(name="Lenta")
+    second = device_factory(name="Rapida")
+
+    def fake_request(self, endpoint, **kwargs):
+        if self.device.pk == first.pk:
+            time.sleep(0.05)
+            return make_response(status_code=500, json_data={"error": "lenta"})
+        return make_response(status_code=409, json_data={"error": "rapida"})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+
+    with pytest.raises(CatracaSyncError) as exc:
+        ControlIDSyncMixin().update_objects(
+            "groups", {"name": "G"}, {"id": 1}, device_ids=[first.id, second.id]
+        )
+
+    assert exc.value.status_code == 500
+    assert "Lenta" in str(exc.value)
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_fanout_reports_deadline_exceeded_as_gateway_timeout(
+    mocker, make_response, device_factory, settings
+):
+    # Testa o prazo por device: quem nao responde a tempo vira 504.
+    from src.core.__seedwork__.infra.catraca_sync import (
+        CatracaSyncError,
+        ControlIDSyncMixin,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    settings.CATRACA_SYNC_DEVICE_DEADLINE_SECONDS = 1
+    fast = device_factory()
+    stuck = device_factory(name="Travada")
+    release = threading.Event()
+
+    def fake_request(self, endpoint, **kwargs):
+        if self.device.pk == stuck.pk:
+            release.wait(5)
+        return make_response(json_data={})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+    mixin = ControlIDSyncMixin()
+
+    try:
+        results = mixin._run_in_devices(
+            [fast, stuck], lambda worker, device: worker._make_request("x.fcgi")
+        )
+    finally:
+        release.set()
+
+    assert [result.ok for result in results] == [True, False]
+    assert results[1].error.status_code == 504
+    assert "Travada" in str(results[1].error)
+
+    def offline(worker, device):
+        raise CatracaSyncError("offline", status_code=502)
+
+    [single] = mixin._run_in_devices([fast], offline)
+    assert single.ok is False
+    assert single.error.status_code == 502
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_fanout_reuses_current_device_and_handles_bad_settings(
+    mocker, make_response, device_factory, settings
+):
+    # Testa reaproveitamento do self quando ja ha device e fallback de settings invalidos.
+    from src.core.__seedwork__.infra.catraca_sync import (
+        ControlIDSyncMixin,
+        _fanout_device_deadline,
+        _fanout_max_workers,
+    )
+
+    device = device_factory()
+    mixin = ControlIDSyncMixin()
+    mixin.set_device(device)
+    mixin.session = "sess-existente"
+
+    assert mixin._worker_for_device(device) is mixin
+    assert mixin._run_in_devices([], lambda worker, device: None) == []
+
+    settings.CATRACA_SYNC_MAX_WORKERS = "abc"
+    settings.CATRACA_SYNC_DEVICE_DEADLINE_SECONDS = None
+    assert _fanout_max_workers() == 1
+    assert _fanout_device_deadline() == 45.0
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_fanout_abandons_stuck_device_without_delaying_the_queue(
+    device_factory, settings
+):
+    # Testa que o device travado expira no proprio prazo e nao envia mais nada depois.
+    from src.core.__seedwork__.infra.catraca_sync import (
+        CatracaSyncError,
+        ControlIDSyncMixin,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    settings.CATRACA_SYNC_MAX_WORKERS = 2
+    settings.CATRACA_SYNC_DEVICE_DEADLINE_SECONDS = 1
+    stuck = device_factory(name="Travada")
+    queued = [device_factory() for _ in range(3)]
+    release = threading.Event()
+    late = {}
+
+    def operation(worker, device):
+        if device.pk == stuck.pk:
+            release.wait(5)
+            try:
+                worker.login()
+            except CatracaSyncError as exc:
+                late["error"] = exc
+            return None
+        return "ok"
+
+    started = time.monotonic()
+    try:
+        results = ControlIDSyncMixin()._run_in_devices([stuck, *queued], operation)
+    finally:
+        elapsed = time.monotonic() - started
+        release.set()
+
+    assert elapsed < 1.8  # duas levas, mas so o travado gasta o prazo
+    assert [result.ok for result in results] == [False, True, True, True]
+    assert results[0].error.status_code == 504
+
+    for _ in range(50):
+        if "error" in late:
+            break
+        time.sleep(0.05)
+    assert late["error"].status_code == 504
+    assert "abandonada" in str(late["error"])
@@ -64,7 +64,7 @@ def test_login_uses_cached_session_and_resets_on_failure(
     mixin = ControlIDSyncMixin()
     mixin.set_device(device_factory(ip="192.0.2.111"))
     post = mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.post",
+        "requests.Session.post",
         return_value=make_response(json_data={"session": "sess-1"}),
     )
 
@@ -91,7 +91,7 @@ def test_login_accepts_custom_timeout(mocker, make_response, device_factory):
     mixin = ControlIDSyncMixin()
     mixin.set_device(device_factory(ip="192.0.2.113"))
     post = mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.post",
+        "requests.Session.post",
         return_value=make_response(json_data={"session": "sess-timeout"}),
     )
 
@@ -111,7 +111,7 @@ def test_make_request_retries_once_when_session_expires(
     mixin.set_device(device_factory(ip="192.0.2.112"))
     mocker.patch.object(mixin, "login", side_effect=["old", "new"])
     request = mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.request",
+        "requests.Session.request",
         side_effect=[
             make_response(status_code=401, json_data={"error": "expired"}),
             make_response(status_code=200, json_data={"ok": True}),
@@ -136,7 +136,7 @@ def test_make_request_wraps_transport_errors(mocker, device_factory):
     mixin.set_device(device_factory())
     mocker.patch.object(mixin, "login", return_value="sess")
     mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.request",
+        "requests.Session.request",
         side_effect=requests.RequestException("boom"),
     )
 
@@ -180,3 +180,91 @@ def test_execute_remote_endpoint_delegates_to_make_request(mocker):
         json_data={"a": 1},
         request_timeout=10,
     )
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_login_token_is_shared_between_instances_of_same_device(
+    mocker, make_response, device_factory
+):
+    # Testa o pool: varios mixins na mesma catraca fazem um unico login.
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+
+    device = device_factory(ip="192.0.2.114")
+    post = mocker.patch(
+        "requests.Session.post",
+        return_value=make_response(json_data={"session": "shared"}),
+    )
+
+    first = ControlIDSyncMixin().set_device(device)
+    second = ControlIDSyncMixin().set_device(device)
+
+    assert first.login() == "shared"
+    assert second.login() == "shared"
+    assert post.call_count == 1
+
+    other = ControlIDSyncMixin().set_device(device_factory(ip="192.0.2.115"))
+    assert other.login() == "shared"
+    assert post.call_count == 2
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_force_new_login_reuses_token_already_refreshed_by_another_instance(
+    mocker, make_response, device_factory
+):
+    # Testa que um 401 concorrente nao dispara dois logins seguidos.
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+
+    device = device_factory(ip="192.0.2.116")
+    post = mocker.patch(
+        "requests.Session.post",
+        side_effect=[
+            make_response(json_data={"session": "old"}),
+            make_response(json_data={"session": "new"}),
+        ],
+    )
+    first = ControlIDSyncMixin().set_device(device)
+    second = ControlIDSyncMixin().set_device(device)
+    assert first.login() == "old"
+    assert second.login() == "old"
+
+    assert first.login(force_new=True) == "new"
+    assert second.login(force_new=True) == "new"
+    assert post.call_count == 2
+
+    # Sem sessao anterior, force_new sempre vai na catraca (ex: apos reset).
+    post.side_effect = None
+    post.return_value = make_response(json_data={"session": "fresh"})
+    assert ControlIDSyncMixin().set_device(device).login(force_new=True) == "fresh"
+
+
+@pytest.mark.integration
+def test_device_session_pool_keeps_one_http_session_per_device_and_resets_on_fork(
+    mocker,
+):
+    # Testa keep-alive por catraca, invalidacao condicional e recriacao apos fork.
+    from src.core.__seedwork__.infra.device_session_pool import DeviceSessionPool
+
+    pool = DeviceSessionPool()
+    key = ("192.0.2.117", "admin")
+    http = pool.http(key)
+    assert pool.http(key) is http
+    assert pool.http(("192.0.2.118", "admin")) is not http
+    assert pool.login_lock(key) is pool.login_lock(key)
+
+    pool.store_token(key, "tok")
+    pool.invalidate_token(key, token="outro")
+    assert pool.get_token(key) == "tok"
+    pool.invalidate_token(key, token="tok")
+    assert pool.get_token(key) is None
+
+    mocker.patch(
+        "src.core.__seedwork__.infra.device_session_pool.os.getpid",
+        return_value=pool._pid + 1,
+    )
+    assert pool.http(key) is not http
+
+    pool.store_token(key, "tok")
+    pool.clear()
+    assert pool.get_token(key) is None
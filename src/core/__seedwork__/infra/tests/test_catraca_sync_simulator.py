@@ -0,0 +1,79 @@
+import pytest
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_fanout_writes_reach_simulated_devices_over_http(simulated_devices):
+    # Testa o caminho HTTP real (pool de sessoes + fan-out) contra duas catracas simuladas.
+    from src.core.__seedwork__.infra.catraca_sync import (
+        CatracaSyncError,
+        ControlIDSyncMixin,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    (first, first_sim), (second, second_sim) = simulated_devices(2)
+    mixin = ControlIDSyncMixin()
+
+    response = mixin.create_objects("groups", [{"id": 1, "name": "1INFO1"}])
+    assert response.status_code == 201
+    mixin.create_or_update_objects_in_all_devices(
+        "groups", [{"id": 1, "name": "1INFO2"}, {"id": 2, "name": "2INFO1"}]
+    )
+    for simulator in (first_sim, second_sim):
+        assert simulator.rows("groups") == [
+            {"id": 1, "name": "1INFO2"},
+            {"id": 2, "name": "2INFO1"},
+        ]
+
+    # Chave duplicada: o firmware recusa e o erro chega como CatracaSyncError.
+    with pytest.raises(CatracaSyncError, match="UNIQUE constraint failed: groups.id"):
+        mixin.create_objects("groups", [{"id": 2, "name": "Repetido"}])
+
+    # Sessao expirada: 401, novo login e o request e refeito.
+    second_sim.expire_sessions()
+    mixin.set_device(second)
+    assert [row["id"] for row in mixin.load_objects("groups", order_by=["id"])] == [1, 2]
+    assert second_sim.endpoint_counts()["login.fcgi"] == 2
+    assert first_sim.endpoint_counts()["login.fcgi"] == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_simulated_device_injects_errors_and_rejects_duplicate_batches(
+    simulated_devices,
+):
+    # Testa erro injetado, conexao derrubada e os modos de UNIQUE do create_objects.
+    from src.core.__seedwork__.infra.catraca_sync import (
+        CatracaSyncError,
+        ControlIDSyncMixin,
+    )
+
+    ((device, simulator),) = simulated_devices()
+    ((partial_device, partial),) = simulated_devices(unique_violation="partial")
+    mixin = ControlIDSyncMixin().set_device(device)
+
+    simulator.inject_error("load_objects.fcgi", status_code=503, error="ocupada")
+    with pytest.raises(CatracaSyncError) as exc:
+        mixin.load_objects("users")
+    assert exc.value.status_code == 503
+    assert mixin.load_objects("users") == []
+
+    simulator.inject_error("load_objects.fcgi", drop_connection=True)
+    with pytest.raises(CatracaSyncError) as exc:
+        mixin.load_objects("users")
+    assert exc.value.status_code == 502
+
+    batch = [
+        {"id": 1, "user_id": 1, "value": 100},
+        {"id": 2, "user_id": 2, "value": 100},
+    ]
+    for target, expected in ((device, []), (partial_device, [1])):
+        mixin.set_device(target)
+        response = mixin.execute_remote_endpoint(
+            "create_objects.fcgi", {"object": "cards", "values": batch}
+        )
+        assert response.status_code == 400
+        assert response.json()["error"] == "UNIQUE constraint failed: cards.value"
+        assert [row["id"] for row in mixin.load_objects("cards")] == expected
+    assert partial.rows("cards") == [batch[0]]
@@ -0,0 +1,411 @@
+"""
+Índice em memória das políticas de acesso.
+
+Compila o grafo de regras do banco em estruturas imutáveis:
+
+- portal → regras vinculadas (``PortalAccessRule``);
+- usuário → regras diretas (``UserAccessRule``) e grupos (``UserGroup``);
+- grupo → regras (``GroupAccessRule``);
+- regra → zonas de tempo → intervalos (``AccessRuleTimeZone``/``TimeSpan``),
+  com os dias da semana de cada intervalo em bitmask.
+
+Com o índice montado, responder "este usuário passaria neste portal neste
+horário?" é uma verificação O(regras do portal) sem nenhuma query.
+
+Invalidação: qualquer save/delete dos models acima descarta o índice local e,
+após o commit, troca a versão guardada no cache do Django. Com o cache
+compartilhado (``REDIS_CACHE_URL``) os outros processos (web e workers
+Celery) percebem a troca e recompilam na próxima consulta; sem ele só o
+processo que escreveu percebe, e os demais dependem do TTL.
+``ACCESS_POLICY_INDEX_TTL_SECONDS`` (padrão 60s) limita a idade do índice
+em qualquer caso, cobrindo também escritas em massa que não disparam
+signals (``bulk_create``, ``QuerySet.update``).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+_VERSION_CACHE_KEY = "access_policy_index:version"
+
+DAY_NAMES = ("Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom")
+
+RULE_TYPE_BLOCK = 0
+RULE_TYPE_LIBERATION = 1
+
+
+def _index_ttl() -> float:
+    value = getattr(settings, "ACCESS_POLICY_INDEX_TTL_SECONDS", 60)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 60.0
+
+
+def local_clock(at: datetime) -> Tuple[int, int]:
+    """Retorna ``(dia_da_semana, segundos_desde_meia_noite)`` no fuso local."""
+    if timezone.is_aware(at):
+        at = timezone.localtime(at)
+    return at.weekday(), at.hour * 3600 + at.minute * 60 + at.second
+
+
+# ----------------------------------------------------------------------
+# Estruturas compiladas
+# ----------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class CompiledSpan:
+    start: int
+    end: int
+    day_mask: int  # bit 0 = segunda ... bit 6 = domingo
+
+    def covers(self, weekday: int, seconds: int) -> bool:
+        return bool(self.day_mask >> weekday & 1) and self.start <= seconds <= self.end
+
+    @property
+    def day_names(self) -> List[str]:
+        return [DAY_NAMES[i] for i in range(7) if self.day_mask >> i & 1]
+
+
+@dataclass(frozen=True)
+class CompiledTimeZone:
+    id: int
+    name: str
+    spans: Tuple[CompiledSpan, ...]
+    day_mask: int  # união dos dias de todos os intervalos
+
+    def covers(self, weekday: int, seconds: int) -> bool:
+        if not self.day_mask >> weekday & 1:
+            return False
+        return any(span.covers(weekday, seconds) for span in self.spans)
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    id: int
+    name: str
+    type: int
+    priority: int
+    time_zones: Tuple[CompiledTimeZone, ...]
+
+    @property
+    def is_liberation(self) -> bool:
+        return self.type == RULE_TYPE_LIBERATION
+
+    @property
+    def unrestricted(self) -> bool:
+        """Regra sem zona de tempo vinculada vale a qualquer hora."""
+        return not self.time_zones
+
+    def is_active(self, weekday: int, seconds: int) -> bool:
+        if self.unrestricted:
+            return True
+        return any(tz.covers(weekday, seconds) for tz in self.time_zones)
+
+
+@dataclass(frozen=True)
+class PolicyDecision:
+    """Resultado da avaliação de um usuário em um portal num instante."""
+
+    user_id: int
+    portal_id: int
+    at: datetime
+    allowed: bool
+    reason: str
+    active_liberations: Tuple[CompiledRule, ...] = ()
+    active_blocks: Tuple[CompiledRule, ...] = ()
+    inactive_liberations: Tuple[CompiledRule, ...] = ()
+
+
+# Códigos de ``PolicyDecision.reason``
+REASON_ALLOWED = "allowed"
+REASON_NO_PORTAL_RULES = "portal_without_rules"
+REASON_NO_USER_RULES = "user_without_rules"
+REASON_NO_MATCHING_RULE = "no_matching_rule"
+REASON_BLOCKED = "blocked"
+REASON_OUTSIDE_SCHEDULE = "outside_schedule"
+
+
+@dataclass
+class AccessPolicyIndex:
+    """Fotografia compilada das políticas de acesso. Somente leitura após montada."""
+
+    rules: Dict[int, CompiledRule] = field(default_factory=dict)
+    portal_rules: Dict[int, Tuple[int, ...]] = field(default_factory=dict)
+    user_direct_rules: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    user_groups: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    group_rules: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls) -> "AccessPolicyIndex":
+        """Compila o índice a partir do banco (uma query por tabela)."""
+        from src.core.control_id.infra.control_id_django_app.models import (
+            AccessRule,
+            AccessRuleTimeZone,
+            GroupAccessRule,
+            PortalAccessRule,
+            TimeSpan,
+            TimeZone,
+            UserAccessRule,
+            UserGroup,
+        )
+
+        spans_by_tz: Dict[int, List[CompiledSpan]] = {}
+        for tz_id, start, end, *days in TimeSpan.objects.order_by("id").values_list(
+            "time_zone_id", "start", "end",
+            "mon", "tue", "wed", "thu", "fri", "sat", "sun",
+        ):
+            mask = sum(1 << i for i, flag in enumerate(days) if flag)
+            spans_by_tz.setdefault(tz_id, []).append(CompiledSpan(start, end, mask))
+
+        time_zones: Dict[int, CompiledTimeZone] = {}
+        for tz_id, name in TimeZone.objects.values_list("id", "name"):
+            spans = tuple(spans_by_tz.get(tz_id, ()))
+            mask = 0
+            for span in spans:
+                mask |= span.day_mask
+            time_zones[tz_id] = CompiledTimeZone(tz_id, name, spans, mask)
+
+        tzs_by_rule: Dict[int, List[CompiledTimeZone]] = {}
+        for rule_id, tz_id in AccessRuleTimeZone.objects.order_by("id").values_list(
+            "access_rule_id", "time_zone_id"
+        ):
+            # Zona removida continua restringindo a regra, mas sem intervalos:
+            # nunca fica ativa (mesmo resultado da verificação pelo banco).
+            time_zone = time_zones.get(tz_id) or CompiledTimeZone(
+                tz_id, f"#{tz_id} (removida)", (), 0
+            )
+            tzs_by_rule.setdefault(rule_id, []).append(time_zone)
+
+        rules = {
+            rule_id: CompiledRule(
+                rule_id, name, rule_type, priority, tuple(tzs_by_rule.get(rule_id, ()))
+            )
+            for rule_id, name, rule_type, priority in AccessRule.objects.values_list(
+                "id", "name", "type", "priority"
+            )
+        }
+
+        portal_rules: Dict[int, List[int]] = {}
+        for portal_id, rule_id in PortalAccessRule.objects.order_by("id").values_list(
+            "portal_id", "access_rule_id"
+        ):
+            if rule_id in rules:
+                portal_rules.setdefault(portal_id, []).append(rule_id)
+
+        def grouped(queryset) -> Dict[int, FrozenSet[int]]:
+            acc: Dict[int, set] = {}
+            for key, value in queryset:
+                acc.setdefault(key, set()).add(value)
+            return {key: frozenset(values) for key, values in acc.items()}
+
+        return cls(
+            rules=rules,
+            portal_rules={k: tuple(v) for k, v in portal_rules.items()},
+            user_direct_rules=grouped(
+                UserAccessRule.objects.values_list("user_id", "access_rule_id")
+            ),
+            user_groups=grouped(UserGroup.objects.values_list("user_id", "group_id")),
+            group_rules=grouped(
+                GroupAccessRule.objects.values_list("group_id", "access_rule_id")
+            ),
+        )
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def rules_for_portal(self, portal_id: Optional[int]) -> List[CompiledRule]:
+        return [self.rules[rule_id] for rule_id in self.portal_rules.get(portal_id, ())]
+
+    def user_rule_ids(self, user_id: Optional[int]) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+        """Retorna ``(regras_diretas, regras_via_grupo)`` do usuário."""
+        direct = self.user_direct_rules.get(user_id, frozenset())
+        via_group: set = set()
+        for group_id in self.user_groups.get(user_id, ()):
+            via_group |= self.group_rules.get(group_id, frozenset())
+        return direct, frozenset(via_group)
+
+    def evaluate(self, user_id: int, portal_id: int, at: datetime) -> PolicyDecision:
+        """
+        Avalia se o usuário passaria no portal no instante *at*.
+
+        Segue a mesma precedência usada no diagnóstico da verificação de
+        acesso: bloqueio ativo com prioridade maior ou igual à melhor
+        liberação ativa nega o acesso.
+        """
+        portal_rules = self.rules_for_portal(portal_id)
+        if not portal_rules:
+            return PolicyDecision(user_id, portal_id, at, False, REASON_NO_PORTAL_RULES)
+
+        direct, via_group = self.user_rule_ids(user_id)
+        user_rules = direct | via_group
+        if not user_rules:
+            return PolicyDecision(user_id, portal_id, at, False, REASON_NO_USER_RULES)
+
+        weekday, seconds = local_clock(at)
+        matched = False
+        active_liberations: List[CompiledRule] = []
+        active_blocks: List[CompiledRule] = []
+        inactive_liberations: List[CompiledRule] = []
+        for rule in portal_rules:
+            if rule.id not in user_rules:
+                continue
+            matched = True
+            active = rule.is_active(weekday, seconds)
+            if rule.is_liberation:
+                (active_liberations if active else inactive_liberations).append(rule)
+            elif active:
+                active_blocks.append(rule)
+
+        if not matched:
+            return PolicyDecision(user_id, portal_id, at, False, REASON_NO_MATCHING_RULE)
+
+        allowed = bool(active_liberations)
+        reason = REASON_ALLOWED if allowed else REASON_OUTSIDE_SCHEDULE
+        if active_blocks:
+            best_block = max(rule.priority for rule in active_blocks)
+            best_lib = max((rule.priority for rule in active_liberations), default=None)
+            if best_lib is None or best_block >= best_lib:
+                allowed, reason = False, REASON_BLOCKED
+
+        return PolicyDecision(
+            user_id,
+            portal_id,
+            at,
+            allowed,
+            reason,
+            tuple(active_liberations),
+            tuple(active_blocks),
+            tuple(inactive_liberations),
+        )
+
+    def evaluate_many(
+        self, requests: Iterable[Tuple[int, int, datetime]]
+    ) -> List[PolicyDecision]:
+        """Avalia vários ``(user_id, portal_id, instante)`` sobre a mesma fotografia."""
+        return [self.evaluate(user_id, portal_id, at) for user_id, portal_id, at in requests]
+
+
+# ----------------------------------------------------------------------
+# Índice compartilhado pelo processo
+# ----------------------------------------------------------------------
+
+
+class _AccessPolicyIndexHolder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index: Optional[AccessPolicyIndex] = None
+        self._version: Optional[str] = None
+        self._built_at = 0.0
+
+    def _is_fresh(self, version: Optional[str]) -> bool:
+        return (
+            self._index is not None
+            and self._version == version
+            and time.monotonic() - self._built_at < _index_ttl()
+        )
+
+    def get(self) -> AccessPolicyIndex:
+        version = cache.get(_VERSION_CACHE_KEY)
+        if self._is_fresh(version):
+            return self._index  # type: ignore[return-value]
+        with self._lock:
+            if not self._is_fresh(version):
+                # A versão é lida antes da compilação: se mudar durante o
+                # build, a próxima consulta recompila.
+                self._index = AccessPolicyIndex.build()
+                self._version = version
+                self._built_at = time.monotonic()
+            return self._index  # type: ignore[return-value]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._index = None
+            self._version = None
+
+    def invalidate(self) -> None:
+        self.reset()
+        transaction.on_commit(
+            lambda: cache.set(_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        )
+
+
+_holder = _AccessPolicyIndexHolder()
+
+
+def get_access_policy_index() -> AccessPolicyIndex:
+    """Índice atual do processo, recompilado se alguma política mudou."""
+    return _holder.get()
+
+
+def invalidate_access_policy_index(*args, **kwargs) -> None:
+    """Descarta o índice; usado como receiver dos signals dos models de política."""
+    _holder.invalidate()
+
+
+def reset_access_policy_index() -> None:
+    """Descarta só o índice deste processo, sem trocar a versão compartilhada."""
+    _holder.reset()
+
+
+def evaluate_access(user_id: int, portal_id: int, at: datetime) -> PolicyDecision:
+    return get_access_policy_index().evaluate(user_id, portal_id, at)
+
+
+def evaluate_access_many(
+    requests: Iterable[Tuple[int, int, datetime]],
+) -> List[PolicyDecision]:
+    """API em lote para relatórios e reconciliação (uma fotografia para todos)."""
+    return get_access_policy_index().evaluate_many(requests)
+
+
+def connect_signals() -> None:
+    """Liga a invalidação aos signals dos models de política (chamado no ``ready``)."""
+    from django.db.models.signals import post_delete, post_save
+    from safedelete.signals import post_softdelete, post_undelete
+
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        AccessRuleTimeZone,
+        GroupAccessRule,
+        PortalAccessRule,
+        TimeSpan,
+        TimeZone,
+        UserAccessRule,
+        UserGroup,
+    )
+
+    signals = {
+        "post_save": post_save,
+        "post_delete": post_delete,
+        "post_softdelete": post_softdelete,
+        "post_undelete": post_undelete,
+    }
+    for model in (
+        AccessRule,
+        AccessRuleTimeZone,
+        GroupAccessRule,
+        PortalAccessRule,
+        TimeSpan,
+        TimeZone,
+        UserAccessRule,
+        UserGroup,
+    ):
+        for name, signal in signals.items():
+            signal.connect(
+                invalidate_access_policy_index,
+                sender=model,
+                dispatch_uid=f"access_policy_index:{name}:{model.__name__}",
+            )
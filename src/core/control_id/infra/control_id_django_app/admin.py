@@ -21,6 +21,8 @@ from src.core.control_id.infra.control_id_django_app.models import (
     ReleaseAudit,
     TemporaryUserRelease,
     TemporaryGroupRelease,
+    UserImportJob,
+    ReplicationOutbox,
 )
 from src.core.control_id.infra.control_id_django_app.models.device import Device
 
@@ -231,4 +233,54 @@ class ReleaseAuditAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(UserImportJob)
+class UserImportJobAdmin(admin.ModelAdmin):
+    @admin.display(description="Started at (UTC)")
+    def started_at_utc(self, obj):
+        return format_datetime_utc(obj.started_at)
+
+    @admin.display(description="Finished at (UTC)")
+    def finished_at_utc(self, obj):
+        return format_datetime_utc(obj.finished_at)
+
+    list_display = (
+        "id",
+        "kind",
+        "status",
+        "phase",
+        "filename",
+        "attempts",
+        "requested_by",
+        "started_at_utc",
+        "finished_at_utc",
+    )
+    list_filter = ("kind", "status", "phase")
+    search_fields = ("filename", "requested_by__name")
+    exclude = ("file_content",)
+    readonly_fields = ("counters", "errors", "state", "task_id", "created_at", "updated_at")
+    raw_id_fields = ("requested_by",)
+
+
+@admin.register(ReplicationOutbox)
+class ReplicationOutboxAdmin(admin.ModelAdmin):
+    @admin.display(description="Next attempt at (UTC)")
+    def next_attempt_at_utc(self, obj):
+        return format_datetime_utc(obj.next_attempt_at)
+
+    list_display = (
+        "id",
+        "device",
+        "operation",
+        "object_name",
+        "object_key",
+        "status",
+        "attempts",
+        "next_attempt_at_utc",
+    )
+    list_filter = ("status", "operation", "object_name")
+    search_fields = ("device__name", "object_key", "last_error")
+    readonly_fields = ("created_at", "next_attempt_at_utc")
+    raw_id_fields = ("device",)
+
+
 # Register your models here.
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ControlIdConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "src.core.control_id.infra.control_id_django_app"
+
+    def ready(self):
+        from .access_policy_index import connect_signals
+
+        connect_signals()
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_access_logs(apps, schema_editor):
+    """Mantém apenas o log mais antigo de cada (device, identifier_id, time)."""
+    AccessLogs = apps.get_model("control_id_django_app", "AccessLogs")
+
+    duplicates = (
+        AccessLogs.objects.values("device_id", "identifier_id", "time")
+        .annotate(total=Count("id"), keep_id=Min("id"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates.iterator():
+        AccessLogs.objects.filter(
+            device_id=row["device_id"],
+            identifier_id=row["identifier_id"],
+            time=row["time"],
+        ).exclude(id=row["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_django_app", "0044_temporary_release_notification_emails"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_access_logs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="accesslogs",
+            constraint=models.UniqueConstraint(
+                fields=("device", "identifier_id", "time"),
+                name="unique_access_log_device_identifier_time",
+            ),
+        ),
+    ]
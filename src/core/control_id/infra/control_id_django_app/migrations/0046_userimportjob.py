@@ -0,0 +1,91 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_django_app", "0045_accesslogs_unique_device_identifier_time"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserImportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("deleted_at", models.DateTimeField(db_index=True, editable=False, null=True)),
+                ("deleted_by_cascade", models.BooleanField(default=False, editable=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("users", "Importação de usuários"),
+                            ("group_members", "Usuários em grupo"),
+                        ],
+                        default="users",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Na fila"),
+                            ("running", "Em execução"),
+                            ("completed", "Concluída"),
+                            ("partial", "Concluída com pendências"),
+                            ("failed", "Falhou"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "phase",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Na fila"),
+                            ("parse", "Leitura do arquivo"),
+                            ("database", "Gravação no banco"),
+                            ("devices", "Envio de usuários às catracas"),
+                            ("relations", "Envio de relações às catracas"),
+                            ("done", "Finalizada"),
+                        ],
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("filename", models.CharField(max_length=255)),
+                ("file_content", models.BinaryField()),
+                ("options", models.JSONField(blank=True, default=dict)),
+                ("counters", models.JSONField(blank=True, default=dict)),
+                ("errors", models.JSONField(blank=True, default=list)),
+                ("state", models.JSONField(blank=True, default=dict)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("task_id", models.CharField(blank=True, default="", max_length=255)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "requested_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="user_import_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Importação de Usuários",
+                "verbose_name_plural": "Importações de Usuários",
+                "db_table": "user_import_jobs",
+                "ordering": ["-id"],
+                "abstract": False,
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_django_app", "0046_userimportjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReplicationOutbox",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("object_name", models.CharField(max_length=64)),
+                ("object_key", models.CharField(max_length=128)),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[("upsert", "Criar/atualizar"), ("destroy", "Remover")],
+                        max_length=16,
+                    ),
+                ),
+                ("payload", models.JSONField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pendente"),
+                            ("in_flight", "Enviando"),
+                            ("failed", "Falhou"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "device",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="replication_outbox",
+                        to="control_id_django_app.device",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Replicação pendente",
+                "verbose_name_plural": "Replicações pendentes",
+                "db_table": "control_id_replication_outbox",
+                "indexes": [
+                    models.Index(
+                        fields=["device", "status", "id"],
+                        name="control_id__device__dd9100_idx",
+                    )
+                ],
+            },
+        ),
+    ]
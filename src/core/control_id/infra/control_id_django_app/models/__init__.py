@@ -19,6 +19,8 @@ from .temporary_group_release import TemporaryGroupRelease
 from .biometric_capture_session import BiometricCaptureSession
 from .portal_group import PortalGroup
 from .portal_device import PortalDevice
+from .user_import_job import UserImportJob
+from .replication_outbox import ReplicationOutbox
 
 __all__ = [
     'Template',
@@ -42,4 +44,6 @@ __all__ = [
     'BiometricCaptureSession',
     'PortalGroup',
     'PortalDevice',
+    'UserImportJob',
+    'ReplicationOutbox',
 ]
@@ -59,6 +59,13 @@ class AccessLogs(BaseModel):
             models.Index(fields=["access_rule"]),
             models.Index(fields=["device", "identifier_id", "time"]),
         ]
+        constraints = [
+            # Chave natural de um log vindo da catraca; permite upsert em lote.
+            models.UniqueConstraint(
+                fields=["device", "identifier_id", "time"],
+                name="unique_access_log_device_identifier_time",
+            )
+        ]
 
     def __str__(self):
         return f"{self.time} - {self.event_type} - {self.device} - {self.identifier_id} - {self.user} - {self.portal} - {self.access_rule} - {self.qr_code} - {self.uhf_value} - {self.pin_value} - {self.card_value} - {self.confidence} - {self.mask}"
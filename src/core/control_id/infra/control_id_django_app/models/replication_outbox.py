@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+from .device import Device
+
+
+class ReplicationOutbox(models.Model):
+    """
+    Operação pendente de replicação para uma catraca (outbox transacional).
+
+    Gravada na mesma transação da mudança no banco; o drain de
+    ``replication_outbox`` envia as linhas de cada device em ordem de ``id``
+    e apaga as que foram entregues. Enquanto um worker fala com a catraca as
+    linhas ficam ``in_flight`` e ``next_attempt_at`` marca o fim da posse.
+    """
+
+    class Operation(models.TextChoices):
+        UPSERT = "upsert", "Criar/atualizar"
+        DESTROY = "destroy", "Remover"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pendente"
+        IN_FLIGHT = "in_flight", "Enviando"
+        FAILED = "failed", "Falhou"
+
+    device = models.ForeignKey(
+        Device, on_delete=models.CASCADE, related_name="replication_outbox"
+    )
+    object_name = models.CharField(max_length=64)
+    object_key = models.CharField(max_length=128)
+    operation = models.CharField(max_length=16, choices=Operation.choices)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Replicação pendente"
+        verbose_name_plural = "Replicações pendentes"
+        db_table = "control_id_replication_outbox"
+        indexes = [models.Index(fields=["device", "status", "id"])]
+
+    def __str__(self):
+        return f"{self.operation} {self.object_name}[{self.object_key}] -> {self.device_id}: {self.status}"
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from src.core.__seedwork__.domain import BaseModel
+
+
+class UserImportJob(BaseModel):
+    """
+    Importação de planilha executada pela task ``run_user_import_job``.
+
+    ``state`` guarda o andamento de cada lote (aba/CSV): usuários gravados,
+    confirmados na catraca e relações pendentes. Uma nova execução do mesmo
+    job continua dali em vez de refazer tudo.
+
+    O runner grava o job a cada etapa e, nas fases de catraca, renova o
+    ``updated_at`` a cada bloco enviado; um job ``running`` sem gravação há
+    mais de ``USER_IMPORT_STALE_AFTER_SECONDS`` é dado como abandonado (o
+    worker caiu) e pode ser retomado.
+    """
+
+    class Kind(models.TextChoices):
+        USERS = "users", "Importação de usuários"
+        GROUP_MEMBERS = "group_members", "Usuários em grupo"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Na fila"
+        RUNNING = "running", "Em execução"
+        COMPLETED = "completed", "Concluída"
+        PARTIAL = "partial", "Concluída com pendências"
+        FAILED = "failed", "Falhou"
+
+    class Phase(models.TextChoices):
+        QUEUED = "queued", "Na fila"
+        PARSE = "parse", "Leitura do arquivo"
+        DATABASE = "database", "Gravação no banco"
+        DEVICES = "devices", "Envio de usuários às catracas"
+        RELATIONS = "relations", "Envio de relações às catracas"
+        DONE = "done", "Finalizada"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.USERS)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    phase = models.CharField(max_length=20, choices=Phase.choices, default=Phase.QUEUED)
+    filename = models.CharField(max_length=255)
+    file_content = models.BinaryField()
+    options = models.JSONField(default=dict, blank=True)
+    counters = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    state = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    task_id = models.CharField(max_length=255, blank=True, default="")
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="user_import_jobs",
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(BaseModel.Meta):
+        db_table = "user_import_jobs"
+        verbose_name = "Importação de Usuários"
+        verbose_name_plural = "Importações de Usuários"
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"Importação #{self.pk} ({self.filename}) - {self.status}"
+
+    @staticmethod
+    def stale_before():
+        """Jobs ``running`` sem progresso desde antes deste instante estão abandonados."""
+        seconds = getattr(settings, "USER_IMPORT_STALE_AFTER_SECONDS", 1800)
+        return timezone.now() - timedelta(seconds=seconds)
+
+    @property
+    def is_stale(self) -> bool:
+        return (
+            self.status == self.Status.RUNNING
+            and self.updated_at is not None
+            and self.updated_at < self.stale_before()
+        )
+
+    @property
+    def is_resumable(self) -> bool:
+        return self.status in (self.Status.PARTIAL, self.Status.FAILED) or self.is_stale
@@ -0,0 +1,611 @@
+"""
+Outbox transacional da replicação para as catracas.
+
+Com ``CATRACA_REPLICATION_OUTBOX`` ligado, as ViewSets de escrita não chamam a
+API da catraca dentro do request: gravam a mudança no banco e, na mesma
+transação, uma linha em ``ReplicationOutbox`` por device alvo. Depois do
+commit a task ``drain_replication_outbox`` consome a fila de cada device:
+
+- em ordem de ``id`` (a ordem em que as mudanças foram confirmadas);
+- operações consecutivas sobre o mesmo objeto (mesmo ``object_key``) viram
+  uma só — vale a última;
+- upserts consecutivos do mesmo tipo de objeto vão num único
+  ``create_or_modify_objects.fcgi``; remoções saem uma a uma;
+- as linhas do lote são reservadas numa transação curta (``in_flight``, com
+  posse até ``next_attempt_at``), a catraca é chamada fora de transação e o
+  resultado é gravado numa segunda transação curta; a posse é renovada a
+  cada operação enviada e, se o worker morrer no meio, ela expira e outro
+  drain retoma o lote;
+- na primeira falha o drain do device para (para não passar na frente de
+  uma operação anterior) e a cabeça da fila espera um backoff exponencial;
+  depois de ``CATRACA_OUTBOX_MAX_ATTEMPTS`` ela vira ``failed`` e a fila anda.
+
+Quem precisa da confirmação síncrona pede ``wait_for_replication=true``: a
+view drena os devices envolvidos no próprio request e responde 202 com o que
+ficou pendente se não houver confirmação dentro do prazo.
+
+Configuração:
+- ``CATRACA_REPLICATION_OUTBOX``: liga o modo outbox (padrão: desligado)
+- ``CATRACA_OUTBOX_BATCH_SIZE``: linhas lidas por lote de cada device (padrão: 200)
+- ``CATRACA_OUTBOX_MAX_ATTEMPTS``: tentativas antes de ``failed`` (padrão: 8)
+- ``CATRACA_OUTBOX_RETRY_BASE_SECONDS``: primeiro backoff (padrão: 5)
+- ``CATRACA_OUTBOX_RETRY_MAX_SECONDS``: teto do backoff (padrão: 300)
+- ``CATRACA_OUTBOX_WAIT_TIMEOUT_SECONDS``: prazo do ``wait_for_replication`` (padrão: 10)
+- ``CATRACA_OUTBOX_CLAIM_SECONDS``: posse de um lote ``in_flight``, renovada a
+  cada operação (padrão: 120)
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from src.core.__seedwork__.infra.catraca_sync import (
+    MODIFY_BY_KEY_OBJECTS,
+    ControlIDSyncMixin,
+)
+
+from .models import Device, ReplicationOutbox
+
+logger = logging.getLogger(__name__)
+
+_DRAIN_SCHEDULED_KEY = "replication_outbox:drain_scheduled:{device_id}"
+_LAST_DRAIN_KEY = "replication_outbox:last_drain"
+_DRAIN_SCHEDULE_TTL_SECONDS = 30
+_WAIT_POLL_SECONDS = 0.2
+
+# Campos que identificam um objeto na catraca; o padrão é ``id``.
+_OBJECT_KEY_FIELDS: dict[str, tuple[str, ...]] = {
+    "user_groups": ("user_id", "group_id"),
+    "pins": ("user_id",),
+    "user_roles": ("user_id",),
+    "user_access_rules": ("user_id", "access_rule_id"),
+    "group_access_rules": ("group_id", "access_rule_id"),
+}
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+# Linhas ainda na fila do device (reservadas ou não).
+_QUEUED = (ReplicationOutbox.Status.PENDING, ReplicationOutbox.Status.IN_FLIGHT)
+
+
+def _int_setting(name: str, default: int, minimum: int = 1) -> int:
+    value = getattr(settings, name, default)
+    try:
+        return max(minimum, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def outbox_enabled() -> bool:
+    return bool(getattr(settings, "CATRACA_REPLICATION_OUTBOX", False))
+
+
+def active_devices() -> list[Device]:
+    return list(Device.objects.filter(is_active=True))
+
+
+def object_key(object_name: str, values: Mapping[str, Any]) -> str:
+    fields = _OBJECT_KEY_FIELDS.get(object_name, ("id",))
+    return ",".join(f"{name}={values.get(name)}" for name in fields)
+
+
+# ---------------------------------------------------------------------------
+# Enfileiramento (dentro da transação da view)
+# ---------------------------------------------------------------------------
+
+
+def enqueue_upsert(
+    devices: Iterable[Device], object_name: str, values: Mapping | list[Mapping]
+) -> list[ReplicationOutbox]:
+    """Enfileira um ``create_or_modify_objects`` de *values* em cada device."""
+    rows = values if isinstance(values, list) else [values]
+    return _enqueue(
+        devices,
+        object_name,
+        ReplicationOutbox.Operation.UPSERT,
+        [(object_key(object_name, row), dict(row)) for row in rows],
+    )
+
+
+def enqueue_destroy(
+    devices: Iterable[Device], object_name: str, match: Mapping[str, Any]
+) -> list[ReplicationOutbox]:
+    """Enfileira um ``destroy_objects`` com ``where={object_name: match}``."""
+    return _enqueue(
+        devices,
+        object_name,
+        ReplicationOutbox.Operation.DESTROY,
+        [(object_key(object_name, match), {object_name: dict(match)})],
+    )
+
+
+def _enqueue(devices, object_name, operation, entries) -> list[ReplicationOutbox]:
+    devices = list(devices)
+    if not devices or not entries:
+        return []
+    now = timezone.now()
+    rows = ReplicationOutbox.objects.bulk_create(
+        [
+            ReplicationOutbox(
+                device=device,
+                object_name=object_name,
+                object_key=key,
+                operation=operation,
+                payload=payload,
+                next_attempt_at=now,
+                created_at=now,
+            )
+            for device in devices
+            for key, payload in entries
+        ]
+    )
+    _schedule_drain({device.id for device in devices})
+    return rows
+
+
+def _schedule_drain(device_ids: Iterable[int], countdown: float | None = None) -> None:
+    for device_id in device_ids:
+        key = _DRAIN_SCHEDULED_KEY.format(device_id=device_id)
+        # Uma rajada de escritas no mesmo device agenda um único drain.
+        if countdown is None and not cache.add(
+            key, 1, timeout=_DRAIN_SCHEDULE_TTL_SECONDS
+        ):
+            continue
+        transaction.on_commit(
+            lambda device_id=device_id, key=key: _enqueue_drain_task(
+                device_id, key, countdown
+            )
+        )
+
+
+def _enqueue_drain_task(device_id: int, key: str, countdown: float | None) -> None:
+    from .tasks import drain_replication_outbox
+
+    try:
+        drain_replication_outbox.apply_async(
+            kwargs={"device_id": device_id}, countdown=countdown
+        )
+    except Exception as exc:
+        cache.delete(key)
+        logger.warning(
+            "[REPLICATION] Não foi possível agendar o drain do device %s: %s",
+            device_id,
+            exc,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Drain (worker)
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _Operation:
+    """Uma chamada à catraca montada a partir de uma ou mais linhas."""
+
+    object_name: str
+    operation: str
+    rows: list[ReplicationOutbox] = field(default_factory=list)
+    payloads: dict[str, dict] = field(default_factory=dict)
+
+    def add(self, rows: list[ReplicationOutbox]) -> None:
+        last = rows[-1]
+        self.rows.extend(rows)
+        # Reinsere para a chave ir para o fim, na posição da última escrita.
+        self.payloads.pop(last.object_key, None)
+        self.payloads[last.object_key] = last.payload
+
+
+def coalesce(rows: list[ReplicationOutbox]) -> list[_Operation]:
+    """
+    Agrupa as linhas (já em ordem de ``id``) nas chamadas que serão feitas.
+
+    Linhas adjacentes do mesmo objeto colapsam na última; upserts seguidos do
+    mesmo tipo de objeto entram na mesma chamada. Nada troca de lugar com uma
+    operação de outro tipo de objeto, então dependências como "usuário antes
+    do cartão" continuam valendo.
+    """
+    runs: list[list[ReplicationOutbox]] = []
+    for row in rows:
+        if runs and (runs[-1][-1].object_name, runs[-1][-1].object_key) == (
+            row.object_name,
+            row.object_key,
+        ):
+            runs[-1].append(row)
+        else:
+            runs.append([row])
+
+    operations: list[_Operation] = []
+    for run in runs:
+        last = run[-1]
+        current = operations[-1] if operations else None
+        if (
+            current is None
+            or last.operation != ReplicationOutbox.Operation.UPSERT
+            or current.operation != ReplicationOutbox.Operation.UPSERT
+            or current.object_name != last.object_name
+        ):
+            current = _Operation(object_name=last.object_name, operation=last.operation)
+            operations.append(current)
+        current.add(run)
+    return operations
+
+
+def _send(client: ControlIDSyncMixin, operation: _Operation) -> int:
+    """Executa *operation* no device do *client*; devolve o número de chamadas."""
+    if operation.operation == ReplicationOutbox.Operation.UPSERT:
+        values = list(operation.payloads.values())
+        if operation.object_name in MODIFY_BY_KEY_OBJECTS:
+            # Sem ``id``: modify pela chave (e create se faltar), sem duplicar.
+            client.modify_or_create_objects_in_all_devices(
+                operation.object_name, values
+            )
+            return len(values)
+        client.create_or_update_objects_in_all_devices(operation.object_name, values)
+        return 1
+    for where in operation.payloads.values():
+        client.destroy_objects_in_all_devices(operation.object_name, where)
+    return len(operation.payloads)
+
+
+def _retry_delay(attempts: int) -> int:
+    base = _int_setting("CATRACA_OUTBOX_RETRY_BASE_SECONDS", 5)
+    ceiling = _int_setting("CATRACA_OUTBOX_RETRY_MAX_SECONDS", 300)
+    return min(ceiling, base * 2 ** max(0, attempts - 1))
+
+
+def _record_failure(device: Device, rows: list[ReplicationOutbox], error: str) -> int:
+    """Marca a tentativa nas linhas da operação que falhou; devolve o backoff."""
+    attempts = max(row.attempts for row in rows) + 1
+    delay = _retry_delay(attempts)
+    ids = [row.id for row in rows]
+    ReplicationOutbox.objects.filter(id__in=ids).update(
+        status=ReplicationOutbox.Status.PENDING,
+        attempts=F("attempts") + 1,
+        last_error=error[:2000],
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if attempts >= _int_setting("CATRACA_OUTBOX_MAX_ATTEMPTS", 8):
+        ReplicationOutbox.objects.filter(id__in=ids).update(
+            status=ReplicationOutbox.Status.FAILED
+        )
+        logger.error(
+            "[REPLICATION] %s '%s' desistiu no device '%s' após %s tentativas: %s",
+            rows[-1].operation,
+            rows[-1].object_name,
+            device.name,
+            attempts,
+            error,
+        )
+        return 0
+    logger.warning(
+        "[REPLICATION] %s '%s' falhou no device '%s' (tentativa %s, nova em %ss): %s",
+        rows[-1].operation,
+        rows[-1].object_name,
+        device.name,
+        attempts,
+        delay,
+        error,
+    )
+    return delay
+
+
+def _lease_until() -> datetime:
+    return timezone.now() + timedelta(
+        seconds=_int_setting("CATRACA_OUTBOX_CLAIM_SECONDS", 120)
+    )
+
+
+def _claim_batch(
+    device_id: int, batch_size: int
+) -> tuple[list[ReplicationOutbox], datetime | None]:
+    """
+    Reserva o próximo lote do device numa transação curta.
+
+    Só um worker por device: a cabeça da fila precisa estar vencida (fora do
+    backoff e sem posse ativa) e travável (``select_for_update(skip_locked=True)``);
+    senão devolve ``([], None)``. As linhas reservadas viram ``in_flight`` com
+    posse por ``CATRACA_OUTBOX_CLAIM_SECONDS``; devolve as linhas e o fim da
+    posse.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queued = ReplicationOutbox.objects.filter(
+            device_id=device_id, status__in=_QUEUED
+        )
+        head = queued.order_by("id").values("id", "next_attempt_at").first()
+        if head is None or head["next_attempt_at"] > now:
+            return [], None
+        rows = list(
+            queued.select_for_update(skip_locked=True).order_by("id")[:batch_size]
+        )
+        if not rows or rows[0].id != head["id"]:
+            # Outro worker está com a cabeça da fila deste device.
+            return [], None
+        lease = _lease_until()
+        ReplicationOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+            status=ReplicationOutbox.Status.IN_FLIGHT, next_attempt_at=lease
+        )
+    return rows, lease
+
+
+def _renew_claim(ids: list[int], lease: datetime) -> datetime | None:
+    """
+    Estende a posse das linhas ainda não enviadas.
+
+    Só renova se a posse ainda é a nossa (mesmo ``next_attempt_at``); devolve
+    o novo fim da posse, ou ``None`` se ela venceu e outro worker reservou as
+    linhas — aí este worker para de enviar.
+    """
+    if not ids:
+        return lease
+    renewed = _lease_until()
+    updated = ReplicationOutbox.objects.filter(
+        id__in=ids, status=ReplicationOutbox.Status.IN_FLIGHT, next_attempt_at=lease
+    ).update(next_attempt_at=renewed)
+    return renewed if updated == len(ids) else None
+
+
+def _finish_batch(
+    device: Device,
+    rows: list[ReplicationOutbox],
+    delivered: list[int],
+    failure: tuple[list[ReplicationOutbox], str] | None,
+    lease: datetime | None,
+) -> int | None:
+    """
+    Grava o resultado do lote numa transação curta; devolve o backoff.
+
+    Com ``lease`` ``None`` (posse perdida) só apaga o que foi entregue: o
+    resto já pertence a outro worker.
+    """
+    retry_in = None
+    with transaction.atomic():
+        ReplicationOutbox.objects.filter(id__in=delivered).delete()
+        if lease is None:
+            return None
+        settled = set(delivered)
+        if failure:
+            settled.update(row.id for row in failure[0])
+            retry_in = _record_failure(device, *failure)
+        # O que não chegou a ser enviado volta para a fila, atrás da cabeça.
+        ReplicationOutbox.objects.filter(
+            id__in=[row.id for row in rows if row.id not in settled],
+            next_attempt_at=lease,
+        ).update(status=ReplicationOutbox.Status.PENDING, next_attempt_at=timezone.now())
+    return retry_in
+
+
+def drain_device(device_id: int, batch_size: int | None = None) -> dict:
+    """
+    Envia a fila de um device em ordem até esvaziá-la ou falhar.
+
+    Nenhuma transação fica aberta durante a chamada à catraca: o lote é
+    reservado (``_claim_batch``), enviado e o resultado gravado à parte
+    (``_finish_batch``). A posse é renovada após cada operação
+    (``_renew_claim``), então um lote lento não é retomado por outro worker
+    no meio. Quem não conseguir reservar a cabeça da fila sai sem fazer nada.
+    """
+    cache.delete(_DRAIN_SCHEDULED_KEY.format(device_id=device_id))
+    batch_size = batch_size or _int_setting("CATRACA_OUTBOX_BATCH_SIZE", 200)
+    totals = {
+        "device_id": device_id,
+        "batches": 0,
+        "delivered": 0,
+        "calls": 0,
+        "coalesced": 0,
+        "failed": 0,
+    }
+
+    device = Device.objects.filter(id=device_id, is_active=True).first()
+    if device is None:
+        return totals
+    client = ControlIDSyncMixin().set_device(device)
+
+    retry_in = None
+    while True:
+        rows, lease = _claim_batch(device_id, batch_size)
+        if not rows:
+            break
+
+        delivered: list[int] = []
+        failure = None
+        for operation in coalesce(rows):
+            try:
+                totals["calls"] += _send(client, operation)
+            except Exception as exc:
+                failure = (operation.rows, str(exc))
+                break
+            delivered.extend(row.id for row in operation.rows)
+            totals["coalesced"] += len(operation.rows) - len(operation.payloads)
+            sent = set(delivered)
+            lease = _renew_claim([row.id for row in rows if row.id not in sent], lease)
+            if lease is None:
+                logger.warning(
+                    "[REPLICATION] Posse do lote do device '%s' venceu no meio do envio; "
+                    "o restante fica com o outro worker",
+                    device.name,
+                )
+                break
+
+        retry_in = _finish_batch(device, rows, delivered, failure, lease)
+
+        totals["batches"] += 1
+        totals["delivered"] += len(delivered)
+        if failure:
+            totals["failed"] += len(failure[0])
+            break
+        if lease is None or len(rows) < batch_size:
+            break
+
+    if retry_in:
+        _schedule_drain([device_id], countdown=retry_in)
+    return totals
+
+
+def drain_outbox(batch_size: int | None = None) -> dict:
+    """Drena todos os devices com linhas vencidas (safety net do beat)."""
+    started = time.monotonic()
+    device_ids = (
+        ReplicationOutbox.objects.filter(
+            status__in=_QUEUED, next_attempt_at__lte=timezone.now()
+        )
+        .values_list("device_id", flat=True)
+        .distinct()
+    )
+    totals = {"devices": 0, "delivered": 0, "calls": 0, "coalesced": 0, "failed": 0}
+    for device_id in list(device_ids):
+        result = drain_device(device_id, batch_size=batch_size)
+        totals["devices"] += 1
+        for name in ("delivered", "calls", "coalesced", "failed"):
+            totals[name] += result[name]
+
+    totals["duration_seconds"] = round(time.monotonic() - started, 3)
+    totals["finished_at"] = timezone.now().isoformat()
+    cache.set(_LAST_DRAIN_KEY, totals, timeout=None)
+    return totals
+
+
+# ---------------------------------------------------------------------------
+# Espera síncrona e métricas
+# ---------------------------------------------------------------------------
+
+
+def wait_requested(request) -> bool:
+    value = request.query_params.get("wait_for_replication")
+    if value is None and hasattr(request.data, "get"):
+        value = request.data.get("wait_for_replication")
+    return value is not None and str(value).strip().lower() in _TRUTHY
+
+
+def wait_for_replication(
+    rows: list[ReplicationOutbox], timeout: float | None = None
+) -> dict:
+    """
+    Drena os devices de *rows* até as linhas saírem da fila ou o prazo acabar.
+
+    Para antes do prazo quando tudo o que sobrou já falhou ao menos uma vez
+    (device fora do ar): não adianta segurar o request esperando o backoff.
+    """
+    if timeout is None:
+        timeout = _int_setting("CATRACA_OUTBOX_WAIT_TIMEOUT_SECONDS", 10, minimum=0)
+    ids = [row.id for row in rows]
+    deadline = time.monotonic() + timeout
+
+    while True:
+        fresh_devices = (
+            ReplicationOutbox.objects.filter(
+                id__in=ids, status=ReplicationOutbox.Status.PENDING, attempts=0
+            )
+            .values_list("device_id", flat=True)
+            .distinct()
+        )
+        for device_id in sorted(fresh_devices):
+            drain_device(device_id)
+        remaining = list(
+            ReplicationOutbox.objects.filter(id__in=ids)
+            .select_related("device")
+            .order_by("id")
+        )
+        stalled = all(
+            row.attempts > 0 or row.status == ReplicationOutbox.Status.FAILED
+            for row in remaining
+        )
+        if stalled or time.monotonic() >= deadline:
+            break
+        time.sleep(_WAIT_POLL_SECONDS)
+
+    return {
+        "replicated": not remaining,
+        "pending": [
+            {
+                "device_id": row.device_id,
+                "device_name": row.device.name,
+                "object": row.object_name,
+                "key": row.object_key,
+                "operation": row.operation,
+                "status": row.status,
+                "attempts": row.attempts,
+                "last_error": row.last_error,
+            }
+            for row in remaining
+        ],
+    }
+
+
+def replication_response(
+    request,
+    rows: list[ReplicationOutbox],
+    data: Any = None,
+    status_code: int = status.HTTP_200_OK,
+) -> Response:
+    """
+    Resposta da view no modo outbox.
+
+    Sem ``wait_for_replication`` responde na hora com *status_code*. Com ele,
+    inclui ``replication`` no corpo; se a catraca não confirmou, responde 202
+    (a mudança já está no banco e segue na fila).
+    """
+    if not rows or not wait_requested(request):
+        return Response(data, status=status_code)
+
+    result = wait_for_replication(rows)
+    body = dict(data or {})
+    body["replication"] = result
+    if not result["replicated"]:
+        return Response(body, status=status.HTTP_202_ACCEPTED)
+    if data is None:
+        return Response(status=status_code)
+    return Response(body, status=status_code)
+
+
+def replication_metrics() -> dict:
+    """Profundidade e atraso da fila por device."""
+    pending = Q(status__in=_QUEUED)
+    per_device = (
+        ReplicationOutbox.objects.values("device_id", "device__name")
+        .annotate(
+            depth=Count("id", filter=pending),
+            failed=Count("id", filter=Q(status=ReplicationOutbox.Status.FAILED)),
+            retrying=Count("id", filter=pending & Q(attempts__gt=0)),
+            oldest=Min("created_at", filter=pending),
+            max_attempts=Max("attempts", filter=pending),
+        )
+        .order_by("device_id")
+    )
+    now = timezone.now()
+    devices = [
+        {
+            "device_id": row["device_id"],
+            "device_name": row["device__name"],
+            "depth": row["depth"],
+            "failed": row["failed"],
+            "retrying": row["retrying"],
+            "max_attempts": row["max_attempts"] or 0,
+            "oldest_pending_at": row["oldest"].isoformat() if row["oldest"] else None,
+            "lag_seconds": (
+                round((now - row["oldest"]).total_seconds(), 3) if row["oldest"] else 0.0
+            ),
+        }
+        for row in per_device
+    ]
+    return {
+        "enabled": outbox_enabled(),
+        "depth": sum(row["depth"] for row in devices),
+        "failed": sum(row["failed"] for row in devices),
+        "lag_seconds": max((row["lag_seconds"] for row in devices), default=0.0),
+        "devices": devices,
+        "last_drain": cache.get(_LAST_DRAIN_KEY),
+    }
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.utils import timezone
 from rest_framework import serializers
 
+from src.core.uploader.media_urls import archive_url
 from src.core.control_id.infra.control_id_django_app.models import (
     AccessLogs,
     AccessRule,
@@ -41,9 +42,7 @@ class TemporaryReleaseUserSerializer(serializers.ModelSerializer):
         ]
 
     def get_picture_url(self, obj):
-        if obj.picture and obj.picture.arquivo:
-            return obj.picture.arquivo.url
-        return None
+        return archive_url(obj.picture)
 
 
 class TemporaryReleaseAccessRuleSerializer(serializers.ModelSerializer):
@@ -0,0 +1,32 @@
+from rest_framework import serializers
+
+from src.core.control_id.infra.control_id_django_app.models import UserImportJob
+
+
+class UserImportJobSerializer(serializers.ModelSerializer):
+    requested_by_name = serializers.CharField(
+        source="requested_by.name", read_only=True, default=None
+    )
+    is_resumable = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = UserImportJob
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "phase",
+            "filename",
+            "options",
+            "counters",
+            "errors",
+            "attempts",
+            "is_resumable",
+            "requested_by",
+            "requested_by_name",
+            "started_at",
+            "finished_at",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
@@ -1,6 +1,7 @@
 import logging
 
 from celery import shared_task
+from django.db.models import Q
 from django.utils import timezone
 
 from src.core.control_id_monitor.infra.control_id_monitor_django_app.monitoring import (
@@ -12,6 +13,7 @@ from src.core.control_id.infra.control_id_django_app.models import (
     Device,
     TemporaryUserRelease,
     TemporaryGroupRelease,
+    UserImportJob,
 )
 from src.core.control_id.infra.control_id_django_app.temporary_release_service import (
     TemporaryUserReleaseService,
@@ -748,3 +750,52 @@ def process_temporary_group_releases(self) -> dict:
             stats["failed"] += 1
 
     return {"success": True, "stats": stats}
+
+
+@shared_task(bind=True)
+def run_user_import_job(self, job_id: int) -> dict:
+    """Executa (ou continua) uma importação de planilha enfileirada pela view."""
+    from src.core.control_id.infra.control_id_django_app.utils.import_jobs import (
+        UserImportJobRunner,
+    )
+
+    # Reivindica o job: duas entregas da mesma mensagem não rodam juntas. Um
+    # job "running" parado há muito tempo é de um worker que caiu.
+    claimed = (
+        UserImportJob.objects.filter(pk=job_id)
+        .filter(
+            ~Q(status=UserImportJob.Status.RUNNING)
+            | Q(updated_at__lt=UserImportJob.stale_before())
+        )
+        .update(status=UserImportJob.Status.RUNNING, updated_at=timezone.now())
+    )
+    if not claimed:
+        logger.warning("[IMPORT_JOB] Job %s inexistente ou já em execução.", job_id)
+        return {"success": False, "error": "Job not found or already running"}
+
+    job = UserImportJobRunner(UserImportJob.objects.get(pk=job_id)).run()
+    return {
+        "success": job.status == UserImportJob.Status.COMPLETED,
+        "status": job.status,
+        "counters": job.counters,
+    }
+
+
+@shared_task(bind=True, ignore_result=True)
+def drain_replication_outbox(self, device_id: int | None = None) -> dict:
+    """Envia a outbox de replicação de um device (ou de todos, pelo beat)."""
+    from src.core.control_id.infra.control_id_django_app.replication_outbox import (
+        drain_device,
+        drain_outbox,
+    )
+
+    totals = drain_device(device_id) if device_id else drain_outbox()
+    if totals["delivered"] or totals["failed"]:
+        logger.info(
+            "[REPLICATION] %s operações entregues em %s chamadas (%s agrupadas, %s falhas)",
+            totals["delivered"],
+            totals["calls"],
+            totals["coalesced"],
+            totals["failed"],
+        )
+    return totals
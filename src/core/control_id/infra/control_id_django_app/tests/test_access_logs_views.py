@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+
+def _create_logs(device, count, *, same_time_every=1):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+
+    base = timezone.now() - timedelta(hours=1)
+    return AccessLogs.objects.bulk_create(
+        [
+            AccessLogs(
+                device=device,
+                identifier_id=str(index),
+                event_type=7,
+                time=base + timedelta(seconds=index // same_time_every),
+                confidence=0,
+            )
+            for index in range(count)
+        ]
+    )
+
+
+def _identifiers(rows):
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+
+    by_id = dict(AccessLogs.objects.values_list("id", "identifier_id"))
+    return [by_id[row["id"]] for row in rows]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_logs_cursor_pagination_walks_ties_without_gaps(
+    api_client_admin, device_factory
+):
+    # Testa keyset em (time, id): empates de time nao repetem nem pulam linhas e outra ordenacao e recusada.
+    device = device_factory()
+    _create_logs(device, 7, same_time_every=3)
+
+    seen = []
+    url = "/api/control_id/access_logs/?pagination=cursor&page_size=2&count=estimate"
+    while url:
+        response = api_client_admin.get(url)
+        assert response.status_code == 200
+        assert "previous" not in response.data
+        seen.extend(_identifiers(response.data["results"]))
+        url = response.data["next"]
+
+    assert seen == ["6", "5", "4", "3", "2", "1", "0"]
+
+    first = api_client_admin.get(
+        "/api/control_id/access_logs/?pagination=cursor&page_size=2&count=estimate"
+    )
+    # SQLite nao tem estimativa do planner: cai no COUNT exato.
+    assert first.data["count"] == 7
+    assert first.data["count_is_estimate"] is False
+
+    invalid = api_client_admin.get("/api/control_id/access_logs/?cursor=invalido")
+    assert invalid.status_code == 404
+
+    base = "/api/control_id/access_logs/?pagination=cursor"
+    reordered = api_client_admin.get(f"{base}&ordering=id")
+    assert reordered.status_code == 400
+    assert "ordering" in reordered.data
+    assert api_client_admin.get(f"{base}&ordering=-time").status_code == 200
+    assert api_client_admin.get(f"{base}&page_size=0").data["page_size"] == 50
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_logs_by_days_keeps_list_and_paginates_on_cursor_mode(
+    api_client_admin, device_factory
+):
+    # Testa que logs_by_days so pagina quando o modo cursor e pedido.
+    device = device_factory()
+    _create_logs(device, 5)
+
+    plain = api_client_admin.get("/api/control_id/access_logs/logs_by_days/?days=1")
+    paged = api_client_admin.get(
+        "/api/control_id/access_logs/logs_by_days/?days=1&pagination=cursor&page_size=3"
+    )
+
+    assert len(plain.data) == 5
+    assert _identifiers(paged.data["results"]) == ["4", "3", "2"]
+    assert paged.data["cursor"]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_logs_export_streams_json_and_ndjson(
+    mocker, api_client_admin, device_factory
+):
+    # Testa o export em streaming nos dois formatos, lendo o banco em lotes.
+    from src.core.control_id.infra.control_id_django_app.views import access_logs
+
+    mocker.patch.object(access_logs, "_EXPORT_CHUNK_SIZE", 2)
+    device = device_factory(name="Portaria")
+    other = device_factory(name="Ginasio")
+    _create_logs(device, 5)
+    _create_logs(other, 1)
+
+    response = api_client_admin.get(
+        f"/api/control_id/access_logs/export/?days=1&device={device.id}"
+    )
+    assert response.status_code == 200
+    assert response.streaming
+    rows = json.loads(b"".join(response.streaming_content))
+    assert _identifiers(rows) == ["4", "3", "2", "1", "0"]
+    assert rows[0]["device_name"] == "Portaria"
+
+    response = api_client_admin.get(
+        "/api/control_id/access_logs/export/?days=1&stream_format=ndjson"
+    )
+    assert response["Content-Type"] == "application/x-ndjson"
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 6
+    assert json.loads(lines[0])["event_type"] == 7
+
+    bad = api_client_admin.get(
+        "/api/control_id/access_logs/export/?stream_format=csv"
+    )
+    assert bad.status_code == 400
@@ -0,0 +1,178 @@
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+
+
+@pytest.fixture
+def policy_graph(db, user_factory):
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        AccessRuleTimeZone,
+        Area,
+        CustomGroup,
+        GroupAccessRule,
+        Portal,
+        PortalAccessRule,
+        TimeSpan,
+        TimeZone,
+        UserAccessRule,
+        UserGroup,
+    )
+
+    area_from = Area.objects.create(name="Fora")
+    area_to = Area.objects.create(name="Dentro")
+    portal = Portal.objects.create(name="Entrada", area_from=area_from, area_to=area_to)
+
+    manha = TimeZone.objects.create(name="Manha util")
+    TimeSpan.objects.create(time_zone=manha, start=8 * 3600, end=12 * 3600, mon=True, fri=True)
+    terca = TimeZone.objects.create(name="Terca")
+    TimeSpan.objects.create(time_zone=terca, start=0, end=86399, tue=True)
+
+    liberacao = AccessRule.objects.create(name="Alunos", type=1, priority=1)
+    AccessRuleTimeZone.objects.create(access_rule=liberacao, time_zone=manha)
+    bloqueio = AccessRule.objects.create(name="Bloqueio terca", type=0, priority=5)
+    AccessRuleTimeZone.objects.create(access_rule=bloqueio, time_zone=terca)
+    livre = AccessRule.objects.create(name="Livre", type=1, priority=0)
+    PortalAccessRule.objects.create(portal=portal, access_rule=liberacao)
+    PortalAccessRule.objects.create(portal=portal, access_rule=bloqueio)
+
+    group = CustomGroup.objects.create(name="Turma A")
+    GroupAccessRule.objects.create(group=group, access_rule=liberacao)
+    aluno = user_factory()
+    UserGroup.objects.create(user=aluno, group=group)
+    UserAccessRule.objects.create(user=aluno, access_rule=bloqueio)
+    outro = user_factory()
+    UserAccessRule.objects.create(user=outro, access_rule=livre)
+    return portal, aluno, outro
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_policy_index_evaluates_without_queries(policy_graph, django_assert_num_queries):
+    # Testa a avaliacao em memoria: horario, bloqueio por prioridade e vinculos.
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+        evaluate_access,
+        evaluate_access_many,
+        get_access_policy_index,
+    )
+
+    portal, aluno, outro = policy_graph
+    segunda_9h = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+    segunda_13h = timezone.make_aware(datetime(2026, 3, 2, 13, 0))
+    terca_9h = timezone.make_aware(datetime(2026, 3, 3, 9, 0))
+    get_access_policy_index()
+
+    with django_assert_num_queries(0):
+        permitido = evaluate_access(aluno.id, portal.id, segunda_9h)
+        decisions = evaluate_access_many(
+            [
+                (aluno.id, portal.id, segunda_13h),
+                (aluno.id, portal.id, terca_9h),
+                (outro.id, portal.id, segunda_9h),
+                (aluno.id, 999_999, segunda_9h),
+            ]
+        )
+
+    assert permitido.allowed is True
+    assert [rule.name for rule in permitido.active_liberations] == ["Alunos"]
+    assert [(d.allowed, d.reason) for d in decisions] == [
+        (False, "outside_schedule"),
+        (False, "blocked"),
+        (False, "no_matching_rule"),
+        (False, "portal_without_rules"),
+    ]
+    # Instantes em UTC sao avaliados no horario local (segunda 09:00 = 12:00 UTC).
+    utc = segunda_9h.astimezone(dt_timezone.utc)
+    assert evaluate_access(aluno.id, portal.id, utc).allowed is True
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_policy_index_is_invalidated_by_model_signals(
+    policy_graph, django_capture_on_commit_callbacks
+):
+    # Testa que save/delete das regras descarta o indice e troca a versao no cache.
+    from django.core.cache import cache
+
+    from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+        _VERSION_CACHE_KEY,
+        get_access_policy_index,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        PortalAccessRule,
+    )
+
+    portal, _, outro = policy_graph
+    before = get_access_policy_index()
+    assert get_access_policy_index() is before
+    version = cache.get(_VERSION_CACHE_KEY)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        link = PortalAccessRule.objects.create(
+            portal=portal, access_rule=AccessRule.objects.get(name="Livre")
+        )
+
+    after = get_access_policy_index()
+    assert after is not before
+    assert cache.get(_VERSION_CACHE_KEY) != version
+    assert "Livre" in [rule.name for rule in after.rules_for_portal(portal.id)]
+
+    link.delete()
+    assert "Livre" not in [
+        rule.name for rule in get_access_policy_index().rules_for_portal(portal.id)
+    ]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_verifier_uses_policy_index(policy_graph, mocker):
+    # Testa que o diagnostico continua o mesmo, agora lendo as regras do indice.
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+        AccessPolicyIndex,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.access_verification import (
+        AccessVerificationService,
+    )
+
+    portal, aluno, _ = policy_graph
+    build = mocker.spy(AccessPolicyIndex, "build")
+    service = AccessVerificationService()
+    segunda_9h = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+
+    granted = service.verify_access(aluno.id, portal.id, 7, access_time=segunda_9h)
+    outside = service.verify_access(
+        aluno.id, portal.id, 6, access_time=segunda_9h.replace(hour=13)
+    )
+
+    assert build.call_count == 1
+    assert granted.precise_reason.startswith('PERMITIDO: Regra "Alunos"')
+    assert "DENTRO deste intervalo (Seg)" in granted.diagnosis
+    assert "(via grupo)" in granted.diagnosis
+    assert "FORA DO HORÁRIO" in outside.precise_reason
+    assert "08:00 - 12:00 [Seg, Sex]" in outside.precise_reason
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_rule_linked_to_deleted_time_zone_denies(policy_graph):
+    # Testa que zona de tempo removida (vinculo ainda ativo) nega em vez de liberar a qualquer hora.
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+        AccessPolicyIndex,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import TimeZone
+
+    portal, aluno, _ = policy_graph
+    segunda_9h = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+    TimeZone.objects.filter(name="Manha util").update(deleted_at=timezone.now())
+
+    decision = AccessPolicyIndex.build().evaluate(aluno.id, portal.id, segunda_9h)
+
+    assert (decision.allowed, decision.reason) == (False, "outside_schedule")
+    assert [rule.name for rule in decision.inactive_liberations] == ["Alunos"]
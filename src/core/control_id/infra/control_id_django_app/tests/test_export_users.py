@@ -0,0 +1,92 @@
+import csv
+import io
+
+import pytest
+from openpyxl import load_workbook
+
+
+def _memberships(user_factory):
+    from src.core.control_id.infra.control_id_django_app.models import (
+        CustomGroup,
+        UserGroup,
+    )
+
+    info = CustomGroup.objects.create(name="1INFO1")
+    quimi = CustomGroup.objects.create(name="2QUIMI")
+    maria = user_factory(name="Maria", registration="2026001")
+    joao = user_factory(name="Joao", registration=None)
+    removed = user_factory(name="Removido", registration="2026009")
+    UserGroup.objects.bulk_create(
+        [
+            UserGroup(user=maria, group=info),
+            UserGroup(user=joao, group=info),
+            UserGroup(user=maria, group=quimi),
+            UserGroup(user=removed, group=quimi),
+        ]
+    )
+    removed.delete()
+    return info, quimi, maria, joao
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_export_users_streams_every_format_from_one_ordered_query(
+    mocker, api_client_admin, user_factory, django_assert_max_num_queries
+):
+    # Testa o export em streaming: uma aba por grupo no XLSX, CSV/TXT em lotes e usuários apagados de fora.
+    from src.core.control_id.infra.control_id_django_app.utils import export_users
+
+    mocker.patch.object(export_users, "_EXPORT_CHUNK_SIZE", 1)
+    info, quimi, maria, joao = _memberships(user_factory)
+
+    response = api_client_admin.get("/api/control_id/export_users/?file_type=csv")
+    assert response.status_code == 200
+    assert response.streaming
+    assert "attachment" in response["Content-Disposition"]
+    with django_assert_max_num_queries(2):
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+    assert list(csv.reader(io.StringIO(content))) == [
+        ["ID", "Nome", "Matrícula", "Grupo"],
+        [str(maria.id), "Maria", "2026001", "1INFO1"],
+        [str(joao.id), "Joao", "", "1INFO1"],
+        [str(maria.id), "Maria", "2026001", "2QUIMI"],
+    ]
+
+    response = api_client_admin.get("/api/control_id/export_users/")
+    assert response.status_code == 200
+    workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+    assert workbook.sheetnames == ["1INFO1", "2QUIMI"]
+    assert [list(row) for row in workbook["1INFO1"].iter_rows(values_only=True)] == [
+        ["ID", "Nome", "Matrícula"],
+        [maria.id, "Maria", "2026001"],
+        [joao.id, "Joao", None],
+    ]
+
+    response = api_client_admin.get(
+        f"/api/control_id/export_users/?file_type=txt&group_id={quimi.id}"
+    )
+    lines = b"".join(response.streaming_content).decode().split("\n")
+    assert lines[:3] == ["Exportação de Usuários por Grupo", "=" * 50, ""]
+    assert lines[3].split() == ["ID", "Nome", "Matrícula", "Grupo"]
+    assert lines[5].split() == [str(maria.id), "Maria", "2026001", "2QUIMI"]
+    assert len(lines) == 6
+    assert len({len(line) for line in lines[3:]}) == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_export_users_validates_group_and_empty_result(api_client_admin):
+    # Testa as respostas de erro antes de abrir o stream.
+    from src.core.control_id.infra.control_id_django_app.models import CustomGroup
+
+    empty = CustomGroup.objects.create(name="Vazio")
+
+    assert api_client_admin.get(
+        "/api/control_id/export_users/?file_type=pdf"
+    ).status_code == 400
+    assert api_client_admin.get(
+        "/api/control_id/export_users/?group_id=999999"
+    ).status_code == 404
+    response = api_client_admin.get(f"/api/control_id/export_users/?group_id={empty.id}")
+    assert response.status_code == 404
+    assert "Nenhum usuário" in response.data["message"]
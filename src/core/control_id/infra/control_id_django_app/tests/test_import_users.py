@@ -293,3 +293,149 @@ def test_import_users_excel_accepts_technical_workbook_layout(api_client_admin,
         "1INFO1",
         "2QUIMI",
     ]
+
+
+def test_parse_discente_csv_reports_invalid_rows_and_reads_columns(tmp_path, caplog):
+    # Testa o parsing por colunas: linhas invalidas com o numero da planilha e datas dia-primeiro.
+    from src.core.control_id.infra.control_id_django_app.utils.excel_parser import (
+        parse_discente_csv,
+    )
+
+    csv_path = tmp_path / "discentes.csv"
+    csv_path.write_text(
+        "matricula;discente;data_nascimento;celular;telefone;email\n"
+        "2026001; Maria ;03/01/2009;;47 3333-0000;MARIA@escola.test\n"
+        ";Sem Matricula;;;;\n"
+        "2026003;Joao;;47 99999-0000;;\n"
+        "2026004;;;;;\n",
+        encoding="utf-8",
+    )
+
+    with caplog.at_level("WARNING"):
+        parsed, error = parse_discente_csv(str(csv_path))
+
+    assert error is None
+    assert [row.registration for row in parsed.rows] == ["2026001", "2026003"]
+    maria, joao = parsed.rows
+    assert maria.name == "Maria"
+    assert maria.birth_date == date(2009, 1, 3)
+    assert maria.phone == maria.phone_landline == "47 3333-0000"
+    assert maria.email == "MARIA@escola.test"
+    assert joao.phone == "47 99999-0000"
+    assert joao.birth_date is None and joao.email is None
+    assert "CSV, linha 3: matricula ou discente vazio" in caplog.text
+    assert "CSV, linha 5: matricula ou discente vazio" in caplog.text
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_upsert_users_is_set_based_and_keeps_row_semantics(django_assert_max_num_queries):
+    # Testa o upsert em lote: queries fixas, e-mails em conflito e PINs unicos.
+    from src.core.control_id.infra.control_id_django_app.utils.excel_parser import (
+        ParsedRow,
+    )
+    from src.core.user.infra.user_django_app.models import User
+
+    User.objects.create(
+        id=2026000, name="Antigo", registration="2026000", email="ocupado@escola.test"
+    )
+    User.objects.create(
+        id=2026001, name="Nome Velho", registration="2026001", is_active=False
+    )
+    rows = [
+        ParsedRow(name="Nome Novo", registration="2026001", email="novo@escola.test"),
+        ParsedRow(name="Conflito", registration="2026002", email="OCUPADO@escola.test"),
+        ParsedRow(name="Repetido", registration="2026003", email="novo@escola.test"),
+    ] + [
+        ParsedRow(name=f"Aluno {i}", registration=str(2027000 + i)) for i in range(300)
+    ]
+
+    # SQLite quebra o INSERT em lotes pelo limite de parametros; o que importa
+    # e nao haver query por linha.
+    with django_assert_max_num_queries(20):
+        users_new, users_existing, created, updated = ImportUsersService().upsert_users(
+            rows, app_role="aluno"
+        )
+
+    assert (created, updated) == (302, 1)
+    assert [user.registration for user in users_existing] == ["2026001"]
+    updated_user = User.objects.get(pk=2026001)
+    assert updated_user.name == "Nome Novo"
+    assert updated_user.is_active is True
+    assert updated_user.email == "novo@escola.test"
+    assert User.objects.get(pk=2026002).email is None
+    assert User.objects.get(pk=2026003).email is None
+    pins = list(User.objects.values_list("pin", flat=True))
+    assert len(set(pins)) == len(pins) == 304
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_create_local_relations_bulk_inserts_only_missing(user_factory):
+    # Testa as relacoes em lote: existentes ignoradas, apagadas restauradas.
+    from src.core.control_id.infra.control_id_django_app.models import (
+        CustomGroup,
+        UserGroup,
+    )
+
+    group = CustomGroup.objects.create(name="1INFO1")
+    kept, removed, fresh = user_factory(), user_factory(), user_factory()
+    UserGroup.objects.create(user=kept, group=group)
+    UserGroup.objects.create(user=removed, group=group).delete()
+
+    new_relation_users = ImportUsersService().create_local_relations(
+        [kept, removed, fresh, fresh], group
+    )
+
+    assert [user.pk for user in new_relation_users] == [removed.pk, fresh.pk]
+    assert set(
+        UserGroup.objects.filter(group=group).values_list("user_id", flat=True)
+    ) == {kept.pk, removed.pk, fresh.pk}
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_imported_user_access_is_visible_right_after_import(
+    django_capture_on_commit_callbacks,
+):
+    # Testa que o import em lote (sem signals) descarta o indice de acesso.
+    from datetime import datetime
+
+    from django.db import transaction
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+        evaluate_access,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        Area,
+        CustomGroup,
+        GroupAccessRule,
+        Portal,
+        PortalAccessRule,
+    )
+    from src.core.control_id.infra.control_id_django_app.utils.excel_parser import (
+        ParsedRow,
+    )
+
+    area = Area.objects.create(name="Hall")
+    portal = Portal.objects.create(name="Entrada", area_from=area, area_to=area)
+    livre = AccessRule.objects.create(name="Livre", type=1, priority=0)
+    PortalAccessRule.objects.create(portal=portal, access_rule=livre)
+    group = CustomGroup.objects.create(name="1INFO1")
+    GroupAccessRule.objects.create(group=group, access_rule=livre)
+    now = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+
+    # Aquece o indice antes do import.
+    assert evaluate_access(2028001, portal.id, now).allowed is False
+
+    service = ImportUsersService()
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            users_new, _, _, _ = service.upsert_users(
+                [ParsedRow(name="Nova Aluna", registration="2028001")]
+            )
+            service.create_local_relations(users_new, group)
+
+    assert evaluate_access(2028001, portal.id, now).allowed is True
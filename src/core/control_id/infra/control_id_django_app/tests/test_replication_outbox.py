@@ -0,0 +1,263 @@
+from datetime import timedelta
+
+import pytest
+
+
+def _record_requests(mocker, make_response, fail_on=None):
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+
+    calls = []
+
+    def fake_request(self, endpoint, **kwargs):
+        payload = kwargs.get("json_data") or {}
+        calls.append((self.device.pk, endpoint, payload))
+        if fail_on and fail_on(endpoint, payload):
+            return make_response(status_code=500, json_data={"error": "offline"})
+        return make_response(json_data={})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+    return calls
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drain_coalesces_and_batches_each_device_in_order(
+    mocker, make_response, device_factory
+):
+    # Testa a fila de um device: escritas seguidas no mesmo objeto viram uma, upserts do mesmo tipo vão juntos.
+    from src.core.control_id.infra.control_id_django_app import replication_outbox
+    from src.core.control_id.infra.control_id_django_app.models import (
+        ReplicationOutbox,
+    )
+
+    first, second = device_factory(), device_factory()
+    calls = _record_requests(mocker, make_response)
+
+    replication_outbox.enqueue_upsert([first, second], "groups", {"id": 1, "name": "A"})
+    replication_outbox.enqueue_upsert([first], "groups", {"id": 1, "name": "B"})
+    replication_outbox.enqueue_upsert([first], "groups", {"id": 2, "name": "C"})
+    replication_outbox.enqueue_upsert([first], "users", {"id": 5, "name": "Ana"})
+    replication_outbox.enqueue_upsert([first], "cards", {"id": 9, "user_id": 5, "value": 7})
+    replication_outbox.enqueue_destroy([first], "cards", {"id": 8})
+
+    totals = replication_outbox.drain_device(first.id)
+
+    assert calls == [
+        (
+            first.pk,
+            "create_or_modify_objects.fcgi",
+            {"object": "groups", "values": [{"id": 1, "name": "B"}, {"id": 2, "name": "C"}]},
+        ),
+        (first.pk, "create_or_modify_objects.fcgi", {"object": "users", "values": [{"id": 5, "name": "Ana"}]}),
+        (
+            first.pk,
+            "create_or_modify_objects.fcgi",
+            {"object": "cards", "values": [{"id": 9, "user_id": 5, "value": 7}]},
+        ),
+        (first.pk, "destroy_objects.fcgi", {"object": "cards", "where": {"cards": {"id": 8}}}),
+    ]
+    assert totals["delivered"] == 6 and totals["coalesced"] == 1
+    assert not ReplicationOutbox.objects.filter(device=first).exists()
+    assert ReplicationOutbox.objects.filter(device=second).count() == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_failure_blocks_the_device_queue_with_backoff_until_it_gives_up(
+    mocker, make_response, device_factory, settings
+):
+    # Testa que a falha segura as operações seguintes, espera o backoff e vira "failed" no limite.
+    from src.core.control_id.infra.control_id_django_app import replication_outbox
+    from src.core.control_id.infra.control_id_django_app.models import (
+        ReplicationOutbox,
+    )
+
+    settings.CATRACA_OUTBOX_MAX_ATTEMPTS = 2
+    device = device_factory()
+    calls = _record_requests(
+        mocker, make_response, fail_on=lambda endpoint, payload: payload["object"] == "users"
+    )
+    replication_outbox.enqueue_upsert([device], "groups", {"id": 1, "name": "A"})
+    replication_outbox.enqueue_upsert([device], "users", {"id": 5, "name": "Ana"})
+    replication_outbox.enqueue_upsert([device], "cards", {"id": 9, "user_id": 5, "value": 7})
+
+    totals = replication_outbox.drain_device(device.id)
+
+    assert [payload["object"] for _, _, payload in calls] == ["groups", "users"]
+    assert totals["delivered"] == 1 and totals["failed"] == 1
+    head = ReplicationOutbox.objects.get(object_name="users")
+    assert head.attempts == 1 and "offline" in head.last_error
+    assert ReplicationOutbox.objects.filter(object_name="cards", attempts=0).exists()
+
+    metrics = replication_outbox.replication_metrics()
+    assert metrics["devices"][0]["depth"] == 2
+    assert metrics["devices"][0]["retrying"] == 1
+
+    # Dentro do backoff o device não é chamado.
+    replication_outbox.drain_device(device.id)
+    assert len(calls) == 2
+
+    ReplicationOutbox.objects.filter(pk=head.pk).update(
+        next_attempt_at=head.next_attempt_at - timedelta(hours=1)
+    )
+    replication_outbox.drain_device(device.id)
+    head.refresh_from_db()
+    assert head.status == ReplicationOutbox.Status.FAILED
+
+    # Com a cabeça descartada, a fila volta a andar.
+    replication_outbox.drain_outbox()
+    assert [payload["object"] for _, _, payload in calls][-1] == "cards"
+    assert list(ReplicationOutbox.objects.values_list("object_name", flat=True)) == ["users"]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_group_viewset_commits_through_outbox_and_can_wait_for_replication(
+    mocker, make_response, device_factory, api_client_admin, settings
+):
+    # Testa a ViewSet no modo outbox: resposta sem chamar a catraca e, com wait, confirmação ou 202.
+    from src.core.control_id.infra.control_id_django_app.models import (
+        CustomGroup,
+        Device,
+        ReplicationOutbox,
+    )
+
+    settings.CATRACA_REPLICATION_OUTBOX = True
+    settings.CATRACA_OUTBOX_WAIT_TIMEOUT_SECONDS = 0
+    Device.objects.all().delete()
+    device = device_factory()
+    offline = {"value": False}
+    calls = _record_requests(
+        mocker, make_response, fail_on=lambda endpoint, payload: offline["value"]
+    )
+
+    response = api_client_admin.post(
+        "/api/control_id/groups/", {"name": "1INFO1"}, format="json"
+    )
+    assert response.status_code == 201
+    assert calls == []
+    group = CustomGroup.objects.get(name="1INFO1")
+
+    response = api_client_admin.patch(
+        f"/api/control_id/groups/{group.id}/?wait_for_replication=true",
+        {"name": "1INFO2"},
+        format="json",
+    )
+    assert response.status_code == 200
+    assert response.data["replication"] == {"replicated": True, "pending": []}
+    assert calls == [
+        (
+            device.pk,
+            "create_or_modify_objects.fcgi",
+            {"object": "groups", "values": [{"id": group.id, "name": "1INFO2"}]},
+        )
+    ]
+
+    offline["value"] = True
+    response = api_client_admin.delete(
+        f"/api/control_id/groups/{group.id}/?wait_for_replication=true"
+    )
+    assert response.status_code == 202
+    (pending,) = response.data["replication"]["pending"]
+    assert pending["operation"] == "destroy" and pending["attempts"] == 1
+    assert not CustomGroup.objects.filter(id=group.id).exists()
+    assert ReplicationOutbox.objects.filter(device=device).count() == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drain_claims_the_batch_before_calling_and_retakes_an_expired_claim(
+    mocker, make_response, device_factory
+):
+    # Testa que o lote fica in_flight durante a chamada (outro drain não reenvia) e que uma posse vencida é retomada.
+    from django.utils import timezone
+
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+    from src.core.control_id.infra.control_id_django_app import replication_outbox
+    from src.core.control_id.infra.control_id_django_app.models import (
+        ReplicationOutbox,
+    )
+
+    device = device_factory()
+    seen = []
+
+    def fake_request(self, endpoint, **kwargs):
+        seen.append(list(ReplicationOutbox.objects.values_list("status", flat=True)))
+        # Um segundo worker chegando no meio da chamada não encontra nada livre.
+        if len(seen) == 1:
+            assert replication_outbox.drain_device(device.id)["calls"] == 0
+        return make_response(json_data={})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+    replication_outbox.enqueue_upsert([device], "groups", {"id": 1, "name": "A"})
+
+    totals = replication_outbox.drain_device(device.id)
+
+    assert seen == [[ReplicationOutbox.Status.IN_FLIGHT]]
+    assert totals["delivered"] == 1
+    assert not ReplicationOutbox.objects.exists()
+
+    # Worker que morreu com o lote reservado: ao fim da posse ele volta a sair.
+    (row,) = replication_outbox.enqueue_upsert([device], "groups", {"id": 2, "name": "B"})
+    ReplicationOutbox.objects.filter(pk=row.pk).update(
+        status=ReplicationOutbox.Status.IN_FLIGHT,
+        next_attempt_at=timezone.now() + timedelta(minutes=1),
+    )
+    assert replication_outbox.drain_outbox()["calls"] == 0
+    ReplicationOutbox.objects.filter(pk=row.pk).update(
+        next_attempt_at=timezone.now() - timedelta(seconds=1)
+    )
+    assert replication_outbox.drain_outbox()["delivered"] == 1
+    assert not ReplicationOutbox.objects.exists()
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drain_renews_the_claim_per_operation_and_stops_when_it_is_lost(
+    mocker, make_response, device_factory
+):
+    # Testa que a posse é estendida a cada operação e que, tomada por outro worker, o drain para sem reenviar.
+    from django.utils import timezone
+
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+    from src.core.control_id.infra.control_id_django_app import replication_outbox
+    from src.core.control_id.infra.control_id_django_app.models import (
+        ReplicationOutbox,
+    )
+
+    device = device_factory()
+    leases = []
+    steal = {"enabled": False}
+    other_worker_lease = timezone.now() + timedelta(minutes=5)
+
+    def fake_request(self, endpoint, **kwargs):
+        users = ReplicationOutbox.objects.filter(object_name="users")
+        leases.append(users.values_list("next_attempt_at", flat=True).first())
+        if steal["enabled"]:
+            users.update(next_attempt_at=other_worker_lease)
+        return make_response(json_data={})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+    start = timezone.now()
+    mocker.patch.object(
+        replication_outbox,
+        "_lease_until",
+        side_effect=(start + timedelta(seconds=120 + n) for n in range(100)),
+    )
+    replication_outbox.enqueue_upsert([device], "groups", {"id": 1, "name": "A"})
+    replication_outbox.enqueue_upsert([device], "users", {"id": 5, "name": "Ana"})
+
+    assert replication_outbox.drain_device(device.id)["delivered"] == 2
+    assert leases[1] > leases[0]
+
+    leases.clear()
+    steal["enabled"] = True
+    replication_outbox.enqueue_upsert([device], "groups", {"id": 2, "name": "B"})
+    (row,) = replication_outbox.enqueue_upsert([device], "users", {"id": 6, "name": "Bia"})
+
+    totals = replication_outbox.drain_device(device.id)
+
+    assert (totals["calls"], totals["delivered"]) == (1, 1)
+    row.refresh_from_db()
+    assert row.status == ReplicationOutbox.Status.IN_FLIGHT
+    assert row.next_attempt_at == other_worker_lease
@@ -1,6 +1,11 @@
+import logging
+import os
+
 import pytest
 from rest_framework import status
 
+logger = logging.getLogger(__name__)
+
 
 @pytest.mark.integration
 @pytest.mark.django_db
@@ -23,20 +28,21 @@ def test_template_upload_raw_capture_handles_incomplete_and_completed_session(
         sensor_identifier="local-default",
     )
 
-    mock_post = mocker.patch("requests.post")
+    # Login pelo pool de sessoes (token reaproveitado entre tentativas);
+    # a extracao do template continua em requests.post.
     mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.request",
+        "requests.Session.post",
+        return_value=make_response(json_data={"session": "sess-1"}),
+    )
+    mocker.patch(
+        "requests.Session.request",
         return_value=make_response(json_data={"ids": [1]}),
     )
+    mock_post = mocker.patch("requests.post")
     mock_post.side_effect = [
-        make_response(json_data={"session": "sess-1"}),
         make_response(json_data={"quality": 40, "template": "tpl-40"}),
-        make_response(json_data={"session": "sess-2"}),
         make_response(json_data={"quality": 82, "template": "tpl-82"}),
-        make_response(json_data={"session": "sess-3"}),
         make_response(json_data={"quality": 61, "template": "tpl-61"}),
-        make_response(json_data={"session": "sess-a"}),
-        make_response(json_data={"session": "sess-b"}),
     ]
 
     attempt1 = api_client_admin.post(
@@ -74,3 +80,68 @@ def test_template_upload_raw_capture_handles_incomplete_and_completed_session(
     assert session.status == "completed"
     assert session.selected_quality == 82
     assert session.template_id == saved.id
+
+
+def _expand_packed_fingerprint_reference(packed_image):
+    raw_image = bytearray(len(packed_image) * 2)
+    for index, packed_byte in enumerate(packed_image):
+        raw_image[2 * index] = ((packed_byte >> 4) & 0x0F) * 17
+        raw_image[2 * index + 1] = (packed_byte & 0x0F) * 17
+    return bytes(raw_image)
+
+
+@pytest.mark.unit
+def test_packed_fingerprint_expansion_matches_per_byte_reference():
+    # Testa a expansao vetorizada contra o laco byte a byte, com bytes e memoryview.
+    from src.core.control_id.infra.control_id_django_app.views.template import (
+        TemplateViewSet,
+    )
+
+    packed = bytes(range(256)) * 3
+    expected = _expand_packed_fingerprint_reference(packed)
+    viewset = TemplateViewSet()
+
+    assert viewset._expand_packed_fingerprint_image(packed) == expected
+    assert viewset._expand_packed_fingerprint_image(memoryview(packed)) == expected
+    assert viewset._expand_packed_fingerprint_image(b"\xf0")[:2] == b"\xff\x00"
+    with pytest.raises(ValueError):
+        viewset._expand_packed_fingerprint_image(memoryview(b""))
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(
+    os.getenv("CATRACA_BENCHMARK", "").lower() not in ("1", "true", "yes", "on"),
+    reason="Benchmark desligado. Defina CATRACA_BENCHMARK=1 para rodar.",
+)
+def test_packed_fingerprint_expansion_benchmark():
+    # Micro-benchmark: imagem 256x288 (4 bits/pixel), melhor de 5 rodadas.
+    import timeit
+
+    from src.core.control_id.infra.control_id_django_app.views.template import (
+        TemplateViewSet,
+    )
+
+    packed = memoryview(os.urandom(256 * 288 // 2))
+    viewset = TemplateViewSet()
+
+    vectorized = min(
+        timeit.repeat(
+            lambda: viewset._expand_packed_fingerprint_image(packed),
+            number=20,
+            repeat=5,
+        )
+    )
+    reference = min(
+        timeit.repeat(
+            lambda: _expand_packed_fingerprint_reference(packed),
+            number=20,
+            repeat=5,
+        )
+    )
+
+    logger.info(
+        "[BENCHMARK] expansao 256x288: vetorizada %.3f ms, laco %.3f ms",
+        vectorized / 20 * 1e3,
+        reference / 20 * 1e3,
+    )
+    assert vectorized * 5 < reference
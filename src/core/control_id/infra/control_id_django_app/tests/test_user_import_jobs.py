@@ -0,0 +1,274 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _fake_devices(failing_registrations: set[str]):
+    def create_or_update(self, object_name, values):
+        if object_name == "users" and any(
+            value.get("registration") in failing_registrations for value in values
+        ):
+            return Response({"error": "catraca recusou"}, status=400)
+        return Response({}, status=200)
+
+    return create_or_update
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_background_csv_import_reports_progress_and_resumes_pending_users(
+    api_client_admin, device_factory, django_capture_on_commit_callbacks, mocker
+):
+    # Testa o job em segundo plano: 202 na hora, parcial com a catraca recusando um usuário e retomada só do pendente.
+    from src.core.control_id.infra.control_id_django_app.models import (
+        UserGroup,
+        UserImportJob,
+    )
+    from src.core.control_id.infra.control_id_django_app.utils.import_users_service import (
+        ImportUsersService,
+    )
+
+    device_factory(is_active=True)
+    failing = {"2026002"}
+    sync = mocker.patch.object(
+        ImportUsersService,
+        "create_or_update_objects_in_all_devices",
+        autospec=True,
+        side_effect=_fake_devices(failing),
+    )
+    uploaded_file = SimpleUploadedFile(
+        "discentes.csv",
+        (
+            "matricula;discente;data_nascimento\n"
+            "2026001;Maria;03/01/2009\n"
+            "2026002;Joao;\n"
+            ";Sem Matricula;\n"
+            "2026003;Ana;\n"
+        ).encode("utf-8"),
+        content_type="text/csv",
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client_admin.post(
+            "/api/control_id/import_users/",
+            {"file": uploaded_file, "import_profile": "graduacao", "background": "true"},
+            format="multipart",
+        )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = UserImportJob.objects.get(pk=response.data["job_id"])
+    assert response.data["progress_url"].endswith(f"/import_jobs/{job.pk}/")
+    assert job.status == UserImportJob.Status.PARTIAL
+    assert job.counters["rows_total"] == 3
+    assert job.counters["rows_invalid"] == 1
+    assert job.counters["users_created"] == 3
+    assert job.counters["users_synced"] == 2
+    assert job.counters["users_pending_sync"] == 1
+    assert job.counters["relations_synced"] == 2
+    assert {error["phase"] for error in job.errors} >= {"parse", "devices"}
+
+    progress = api_client_admin.get(response.data["progress_url"])
+    assert progress.status_code == status.HTTP_200_OK
+    assert progress.data["status"] == "partial"
+    assert progress.data["is_resumable"] is True
+    assert "file_content" not in progress.data
+
+    failing.clear()
+    sync.reset_mock()
+    with django_capture_on_commit_callbacks(execute=True):
+        resumed = api_client_admin.post(f"/api/control_id/import_jobs/{job.pk}/resume/")
+
+    assert resumed.status_code == status.HTTP_202_ACCEPTED
+    job.refresh_from_db()
+    assert job.status == UserImportJob.Status.COMPLETED
+    assert job.attempts == 2
+    assert [error["phase"] for error in job.errors] == ["parse"]
+    assert job.counters["users_synced"] == 3
+    assert job.counters["users_pending_sync"] == 0
+    assert job.counters["relations_pending_sync"] == 0
+    # Só o usuário pendente e a relação dele voltam à catraca.
+    sent = [(call.args[1], len(call.args[2])) for call in sync.call_args_list]
+    assert sent == [("users", 1), ("user_groups", 1)]
+    assert UserGroup.objects.filter(group__name="Graduacao").count() == 3
+
+    again = api_client_admin.post(f"/api/control_id/import_jobs/{job.pk}/resume/")
+    assert again.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_background_group_import_links_existing_users_and_reports_missing(
+    api_client_admin, device_factory, user_factory, django_capture_on_commit_callbacks, mocker
+):
+    # Testa a importação de membros de grupo em segundo plano, com matrícula inexistente como erro do job.
+    from src.core.control_id.infra.control_id_django_app.models import (
+        CustomGroup,
+        UserGroup,
+        UserImportJob,
+    )
+    from src.core.control_id.infra.control_id_django_app.utils.import_users_service import (
+        ImportUsersService,
+    )
+
+    device_factory(is_active=True)
+    mocker.patch.object(
+        ImportUsersService,
+        "create_or_update_objects_in_all_devices",
+        autospec=True,
+        side_effect=_fake_devices(set()),
+    )
+    group = CustomGroup.objects.create(name="Laboratorio")
+    user = user_factory(registration="2026100")
+    output = BytesIO()
+    pd.DataFrame({"Matrícula": ["2026100", "2026999"], "Nome": ["Maria", "Fulano"]}).to_excel(
+        output, index=False
+    )
+    uploaded_file = SimpleUploadedFile("membros.xlsx", output.getvalue())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client_admin.post(
+            "/api/control_id/user_groups/import_users/",
+            {"file": uploaded_file, "group_id": group.pk, "background": "true"},
+            format="multipart",
+        )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = UserImportJob.objects.get(pk=response.data["job_id"])
+    assert job.kind == UserImportJob.Kind.GROUP_MEMBERS
+    assert job.status == UserImportJob.Status.COMPLETED
+    assert job.counters["relations_synced"] == 1
+    assert [error["message"] for error in job.errors] == [
+        "Usuário não encontrado: 2026999 - Fulano"
+    ]
+    assert UserGroup.objects.filter(group=group, user=user).exists()
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_job_left_running_by_a_crashed_worker_can_be_resumed(
+    api_client_admin, device_factory, django_capture_on_commit_callbacks, mocker, settings
+):
+    # Testa que um job "running" sem progresso alem do prazo vira retomavel e e reivindicado de novo.
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.models import UserImportJob
+    from src.core.control_id.infra.control_id_django_app.tasks import run_user_import_job
+    from src.core.control_id.infra.control_id_django_app.utils.import_users_service import (
+        ImportUsersService,
+    )
+
+    settings.USER_IMPORT_STALE_AFTER_SECONDS = 600
+    device_factory(is_active=True)
+    mocker.patch.object(
+        ImportUsersService,
+        "create_or_update_objects_in_all_devices",
+        autospec=True,
+        side_effect=_fake_devices(set()),
+    )
+    runner = mocker.patch(
+        "src.core.control_id.infra.control_id_django_app.utils.import_jobs."
+        "UserImportJobRunner.run",
+        autospec=True,
+        side_effect=RuntimeError("worker morreu"),
+    )
+    uploaded_file = SimpleUploadedFile(
+        "discentes.csv",
+        "matricula;discente;data_nascimento\n2026001;Maria;03/01/2009\n".encode("utf-8"),
+        content_type="text/csv",
+    )
+
+    # O worker "cai" depois de reivindicar o job: ele fica running.
+    with pytest.raises(RuntimeError):
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client_admin.post(
+                "/api/control_id/import_users/",
+                {"file": uploaded_file, "import_profile": "graduacao", "background": "true"},
+                format="multipart",
+            )
+    job = UserImportJob.objects.get()
+    assert job.status == UserImportJob.Status.RUNNING
+    assert job.is_resumable is False
+    assert run_user_import_job.run(job.pk)["success"] is False  # ainda "em execução"
+    assert api_client_admin.post(
+        f"/api/control_id/import_jobs/{job.pk}/resume/"
+    ).status_code == status.HTTP_409_CONFLICT
+
+    UserImportJob.objects.filter(pk=job.pk).update(
+        updated_at=timezone.now() - timedelta(minutes=11)
+    )
+    job.refresh_from_db()
+    assert job.is_stale and job.is_resumable
+    mocker.stop(runner)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        resumed = api_client_admin.post(f"/api/control_id/import_jobs/{job.pk}/resume/")
+
+    assert resumed.status_code == status.HTTP_202_ACCEPTED
+    job.refresh_from_db()
+    assert job.status == UserImportJob.Status.COMPLETED
+    assert job.counters["users_synced"] == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_device_phase_renews_the_job_lease_after_each_chunk(
+    api_client_admin, device_factory, django_capture_on_commit_callbacks, mocker, settings
+):
+    # Testa que cada bloco enviado as catracas renova o updated_at e o job nao vira "abandonado".
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.models import UserImportJob
+    from src.core.control_id.infra.control_id_django_app.utils.import_users_service import (
+        ImportUsersService,
+    )
+
+    settings.USER_IMPORT_STALE_AFTER_SECONDS = 600
+    device_factory(is_active=True)
+    stale_seen = []
+
+    def slow_devices(self, object_name, values):
+        job = UserImportJob.objects.get()
+        stale_seen.append(job.is_stale)
+        # Cada chamada "demora" mais que o prazo de abandono.
+        UserImportJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(minutes=11)
+        )
+        if object_name == "users" and len(values) > 1:
+            return Response({"error": "lote grande demais"}, status=400)
+        return Response({}, status=200)
+
+    mocker.patch.object(
+        ImportUsersService,
+        "create_or_update_objects_in_all_devices",
+        autospec=True,
+        side_effect=slow_devices,
+    )
+    uploaded_file = SimpleUploadedFile(
+        "discentes.csv",
+        (
+            "matricula;discente;data_nascimento\n"
+            "2026001;Maria;03/01/2009\n"
+            "2026002;Joao;04/01/2009\n"
+        ).encode("utf-8"),
+        content_type="text/csv",
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        api_client_admin.post(
+            "/api/control_id/import_users/",
+            {"file": uploaded_file, "import_profile": "graduacao", "background": "true"},
+            format="multipart",
+        )
+
+    job = UserImportJob.objects.get()
+    assert job.status == UserImportJob.Status.COMPLETED
+    assert len(stale_seen) > 2
+    assert not any(stale_seen)
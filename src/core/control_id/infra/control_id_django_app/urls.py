@@ -32,7 +32,8 @@ from .views import (
 from .views.portal_group import PortalGroupViewSet
 from .views.portal_device import PortalDeviceViewSet
 from .views.device import DeviceViewSet
-from .views.sync import sync_all, sync_status
+from .views.user_import_job import UserImportJobViewSet
+from .views.sync import replication_status, sync_all, sync_status
 from .utils import ExportUsersView, ImportUsersView
 
 router = DefaultRouter()
@@ -56,6 +57,7 @@ router.register(r"temporary_group_releases", TemporaryGroupReleaseViewSet)
 router.register(r"release_audits", ReleaseAuditViewSet, basename="releaseaudit")
 router.register(r"portal_groups", PortalGroupViewSet)
 router.register(r"portal_devices", PortalDeviceViewSet, basename="portaldevice")
+router.register(r"import_jobs", UserImportJobViewSet)
 
 
 @api_view(["GET"])
@@ -82,6 +84,9 @@ def control_id_root(request, format=None):
             "groups": reverse("customgroup-list", request=request, format=format),
             "sync": reverse("sync-all", request=request, format=format),
             "sync_status": reverse("sync-status", request=request, format=format),
+            "replication_status": reverse(
+                "replication-status", request=request, format=format
+            ),
             "user_groups": reverse("usergroup-list", request=request, format=format),
             "group_access_rules": reverse(
                 "groupaccessrule-list", request=request, format=format
@@ -95,6 +100,9 @@ def control_id_root(request, format=None):
             ),
             "export_users": reverse("export-users", request=request, format=format),
             "import_users": reverse("import-users", request=request, format=format),
+            "import_jobs": reverse(
+                "userimportjob-list", request=request, format=format
+            ),
         }
     )
 
@@ -118,6 +126,7 @@ urlpatterns = [
     ),
     path("sync/", sync_all, name="sync-all"),
     path("sync/status/", sync_status, name="sync-status"),
+    path("sync/replication/", replication_status, name="replication-status"),
     path("export_users/", ExportUsersView.as_view(), name="export-users"),
     path("import_users/", ImportUsersView.as_view(), name="import-users"),
     path("", include(router.urls)),
@@ -1,7 +1,7 @@
 import logging
 import re
 import unicodedata
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 
 import pandas as pd
@@ -31,6 +31,7 @@ class ParsedSheet:
     sheet_name: str
     group_name: str
     rows: list[ParsedRow]
+    row_errors: list[str] = field(default_factory=list)
 
 
 def is_valid_excel(filename: str) -> bool:
@@ -131,33 +132,19 @@ def parse_sheet(
                 ),
             )
 
-    rows = []
-    row_errors = []
-
-    for row_number, (_, row) in enumerate(working_df.iterrows(), start=2):
-        registration = _blank_to_none(row.get(registration_column))
-        name = _blank_to_none(row.get(name_column))
-
-        if not registration or not name:
-            row_errors.append(
-                f"Sheet '{sheet_name}', linha {row_number}: matricula ou nome vazio"
-            )
-            continue
-
-        phone = _blank_to_none(row.get(mobile_phone_column)) or _blank_to_none(
-            row.get(landline_phone_column)
-        )
-
-        rows.append(
-            ParsedRow(
-                name=name,
-                registration=registration,
-                birth_date=_parse_birth_date(row.get(birth_date_column)),
-                phone=phone,
-                phone_landline=_blank_to_none(row.get(landline_phone_column)),
-                email=_blank_to_none(row.get(email_column)),
-            )
-        )
+    rows, invalid_row_numbers = _rows_from_frame(
+        working_df,
+        registration_column=registration_column,
+        name_column=name_column,
+        birth_date_column=birth_date_column,
+        mobile_phone_column=mobile_phone_column,
+        landline_phone_column=landline_phone_column,
+        email_column=email_column,
+    )
+    row_errors = [
+        f"Sheet '{sheet_name}', linha {row_number}: matricula ou nome vazio"
+        for row_number in invalid_row_numbers
+    ]
 
     if row_errors:
         for err in row_errors:
@@ -173,24 +160,75 @@ def parse_sheet(
         sheet_name=sheet_name,
         group_name=group_name,
         rows=rows,
+        row_errors=row_errors,
     )
     return parsed, None
 
 
-def _blank_to_none(value) -> str | None:
-    if pd.isna(value):
-        return None
-    value = str(value).strip()
-    return value or None
-
+def _text_column(df: pd.DataFrame, column: str | None) -> pd.Series:
+    """Texto da coluna sem espaços nas pontas; vazio ou ausente vira ``None``."""
+    if column is None:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    values = df[column]
+    text = values.astype(str).str.strip()
+    return text.where(values.notna() & (text != ""), None).astype(object)
+
+
+def _birth_date_column(df: pd.DataFrame, column: str | None) -> pd.Series:
+    """Datas dia-primeiro, cada célula no seu formato; inválidas viram ``None``."""
+    if column is None:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    values = df[column]
+    values = values.where(values.notna() & (values.astype(str).str.strip() != ""))
+    parsed = pd.to_datetime(values, dayfirst=True, errors="coerce", format="mixed")
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def _rows_from_frame(
+    df: pd.DataFrame,
+    *,
+    registration_column: str,
+    name_column: str,
+    birth_date_column: str | None,
+    mobile_phone_column: str | None,
+    landline_phone_column: str | None,
+    email_column: str | None,
+) -> tuple[list[ParsedRow], list[int]]:
+    """
+    Converte o DataFrame em ``ParsedRow`` com operações de coluna.
 
-def _parse_birth_date(value) -> date | None:
-    if pd.isna(value) or value in ("", None):
-        return None
-    parsed = pd.to_datetime(value, dayfirst=True, errors="coerce")
-    if pd.isna(parsed):
-        return None
-    return parsed.date()
+    Retorna as linhas válidas e os números (como no Excel, cabeçalho = 1) das
+    linhas sem matrícula ou nome.
+    """
+    registration = _text_column(df, registration_column)
+    name = _text_column(df, name_column)
+    landline = _text_column(df, landline_phone_column)
+    phone = _text_column(df, mobile_phone_column).combine_first(landline)
+    email = _text_column(df, email_column)
+    birth_date = _birth_date_column(df, birth_date_column)
+
+    valid = (registration.notna() & name.notna()).to_numpy()
+    invalid_row_numbers = [int(position) + 2 for position in (~valid).nonzero()[0]]
+
+    rows = [
+        ParsedRow(
+            name=row_name,
+            registration=row_registration,
+            birth_date=row_birth_date,
+            phone=row_phone,
+            phone_landline=row_landline,
+            email=row_email,
+        )
+        for row_registration, row_name, row_birth_date, row_phone, row_landline, row_email in zip(
+            registration[valid],
+            name[valid],
+            birth_date[valid],
+            phone[valid],
+            landline[valid],
+            email[valid],
+        )
+    ]
+    return rows, invalid_row_numbers
 
 
 def _find_column(columns: list[str], aliases: list[str]) -> str | None:
@@ -246,33 +284,19 @@ def parse_discente_csv(tmp_path: str) -> tuple[ParsedSheet | None, str | None]:
             f"{', '.join(missing_columns)}"
         )
 
-    rows = []
-    row_errors = []
-
-    for row_number, (_, row) in enumerate(df.iterrows(), start=2):
-        registration = _blank_to_none(row.get(registration_column))
-        name = _blank_to_none(row.get(name_column))
-
-        if not registration or not name:
-            row_errors.append(
-                f"CSV, linha {row_number}: matricula ou discente vazio"
-            )
-            continue
-
-        phone = _blank_to_none(row.get(mobile_phone_column)) or _blank_to_none(
-            row.get(landline_phone_column)
-        )
-
-        rows.append(
-            ParsedRow(
-                name=name,
-                registration=registration,
-                birth_date=_parse_birth_date(row.get(birth_date_column)),
-                phone=phone,
-                phone_landline=_blank_to_none(row.get(landline_phone_column)),
-                email=_blank_to_none(row.get(email_column)),
-            )
-        )
+    rows, invalid_row_numbers = _rows_from_frame(
+        df,
+        registration_column=registration_column,
+        name_column=name_column,
+        birth_date_column=birth_date_column,
+        mobile_phone_column=mobile_phone_column,
+        landline_phone_column=landline_phone_column,
+        email_column=email_column,
+    )
+    row_errors = [
+        f"CSV, linha {row_number}: matricula ou discente vazio"
+        for row_number in invalid_row_numbers
+    ]
 
     if row_errors:
         for err in row_errors:
@@ -285,4 +309,5 @@ def parse_discente_csv(tmp_path: str) -> tuple[ParsedSheet | None, str | None]:
         sheet_name="CSV",
         group_name="",
         rows=rows,
+        row_errors=row_errors,
     ), None
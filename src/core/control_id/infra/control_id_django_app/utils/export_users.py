@@ -1,23 +1,49 @@
-from src.core.user.infra.user_django_app.models import User
+import csv
+import io
+import logging
+import tempfile
+from itertools import groupby
+
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from openpyxl import Workbook
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from safedelete.config import FIELD_NAME
+
 from src.core.control_id.infra.control_id_django_app.models import (
     CustomGroup,
     UserGroup,
 )
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from django.http import HttpResponse
-from rest_framework import status
-from rest_framework.decorators import action
-from drf_spectacular.utils import extend_schema, OpenApiParameter
-import pandas as pd
-import tempfile
-import os
-import io
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas do banco por vez; também é o tamanho de cada pedaço do CSV/TXT.
+_EXPORT_CHUNK_SIZE = 2000
+
+_XLSX_COLUMNS = ("ID", "Nome", "Matrícula")
+_TEXT_COLUMNS = ("ID", "Nome", "Matrícula", "Grupo")
+# Write-only não permite ajustar a largura depois de escrever as linhas.
+_XLSX_COLUMN_WIDTHS = {"A": 10, "B": 45, "C": 18}
+
+_CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "txt": "text/plain; charset=utf-8",
+}
 
 
 class ExportUsersView(APIView):
     """
     View to export users to a file (xlsx, csv, txt), filtered by group.
+
+    Os usuários vêm de uma única query ordenada por grupo, lida em lotes:
+    o XLSX é escrito num workbook write-only (as linhas vão para disco, não
+    para a memória) e o CSV/TXT sai por um gerador em ``StreamingHttpResponse``.
     """
 
     @extend_schema(
@@ -43,139 +69,27 @@ class ExportUsersView(APIView):
             file_type = request.query_params.get("file_type", "xlsx").lower()
 
             # Valida o tipo de arquivo
-            if file_type not in ["xlsx", "csv", "txt"]:
+            if file_type not in _CONTENT_TYPES:
                 return Response(
                     {"error": "Formato de arquivo inválido. Use xlsx, csv ou txt."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            memberships = UserGroup.objects.filter(
+                **{f"user__{FIELD_NAME}__isnull": True}
+            )
             # Se fornecido group_id, filtra por grupo específico
             if group_id:
                 try:
                     group = CustomGroup.objects.get(id=group_id)
-                    groups = [group]
                 except CustomGroup.DoesNotExist:
                     return Response(
                         {"error": f"Grupo com ID {group_id} não encontrado"},
                         status=status.HTTP_404_NOT_FOUND,
                     )
-            else:
-                # Se não fornecido, pega todos os grupos
-                groups = CustomGroup.objects.all()
-
-            # Cria um buffer em memória
-            output = io.BytesIO()
-            timestamp = pd.Timestamp.now().strftime("%Y%m%d_%H%M%S")
+                memberships = memberships.filter(group=group)
 
-            # Define nome do arquivo e content type baseado no formato
-            if file_type == "xlsx":
-                content_type = (
-                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-                file_extension = "xlsx"
-            elif file_type == "csv":
-                content_type = "text/csv; charset=utf-8"
-                file_extension = "csv"
-            else:  # txt
-                content_type = "text/plain; charset=utf-8"
-                file_extension = "txt"
-
-            # Flag para verificar se há dados
-            has_data = False
-            all_users_data = []  # Para CSV e TXT
-
-            # Processa os dados
-            if file_type == "xlsx":
-                # Cria Excel com múltiplas abas
-                with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                    for group in groups:
-                        users = User.objects.filter(
-                            id__in=UserGroup.objects.filter(group=group).values("user")
-                        ).distinct()
-
-                        users_data = [
-                            {
-                                "ID": user.id,
-                                "Nome": user.name,
-                                "Matrícula": user.registration or "",
-                            }
-                            for user in users
-                        ]
-
-                        if users_data:
-                            has_data = True
-                            df = pd.DataFrame(users_data)
-                            sheet_name = str(group.name)[:31]
-                            df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-                            # Ajusta largura das colunas
-                            worksheet = writer.sheets[sheet_name]
-                            for idx, col in enumerate(df.columns):
-                                max_length = max(
-                                    df[col]
-                                    .astype(str)
-                                    .apply(lambda x: len(str(x)))
-                                    .max(),
-                                    len(str(col)),
-                                )
-                                worksheet.column_dimensions[chr(65 + idx)].width = (
-                                    max_length + 2
-                                )
-            else:
-                # Para CSV e TXT, junta todos os usuários em um único DataFrame
-                for group in groups:
-                    users = User.objects.filter(
-                        id__in=UserGroup.objects.filter(group=group).values("user")
-                    ).distinct()
-
-                    for user in users:
-                        all_users_data.append(
-                            {
-                                "ID": user.id,
-                                "Nome": user.name,
-                                "Matrícula": user.registration or "",
-                                "Grupo": group.name,  # Adiciona coluna de grupo para CSV/TXT
-                            }
-                        )
-
-                if all_users_data:
-                    has_data = True
-                    df = pd.DataFrame(all_users_data)
-                    if file_type == "csv":
-                        df.to_csv(
-                            output, index=False, encoding="utf-8-sig"
-                        )  # utf-8-sig para Excel abrir corretamente
-                    else:  # txt
-                        # Cria o conteúdo do texto formatado
-                        text_lines = ["Exportação de Usuários por Grupo", "=" * 50, ""]
-
-                        # Formata o cabeçalho das colunas
-                        headers = list(df.columns)
-                        col_widths = {
-                            col: max(df[col].astype(str).str.len().max(), len(col))
-                            for col in headers
-                        }
-                        header_line = "  ".join(
-                            col.ljust(col_widths[col]) for col in headers
-                        )
-                        text_lines.append(header_line)
-                        text_lines.append("-" * len(header_line))
-
-                        # Formata os dados
-                        for _, row in df.iterrows():
-                            line = "  ".join(
-                                str(row[col]).ljust(col_widths[col]) for col in headers
-                            )
-                            text_lines.append(line)
-
-                        # Junta tudo com quebras de linha
-                        return HttpResponse(
-                            "\n".join(text_lines),
-                            content_type="text/plain; charset=utf-8",
-                        )
-
-            # Se nenhum dado foi encontrado
-            if not has_data:
+            if not memberships.exists():
                 return Response(
                     {
                         "message": "Nenhum usuário encontrado no(s) grupo(s) especificado(s)"
@@ -183,21 +97,127 @@ class ExportUsersView(APIView):
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            # Prepara o nome do arquivo
+            timestamp = timezone.localtime().strftime("%Y%m%d_%H%M%S")
             if group_id:
-                filename = f"usuarios_{groups[0].name}_{timestamp}.{file_extension}"
+                filename = f"usuarios_{group.name}_{timestamp}.{file_type}"
             else:
-                filename = f"usuarios_por_grupo_{timestamp}.{file_extension}"
+                filename = f"usuarios_por_grupo_{timestamp}.{file_type}"
 
-            # Para Excel e CSV, prepara o arquivo para download
-            if file_type in ["xlsx", "csv"]:
-                output.seek(0)
-                response = HttpResponse(output.getvalue(), content_type=content_type)
+            if file_type == "xlsx":
+                return FileResponse(
+                    self._write_xlsx(memberships),
+                    as_attachment=True,
+                    filename=filename,
+                    content_type=_CONTENT_TYPES["xlsx"],
+                )
+
+            if file_type == "csv":
+                response = StreamingHttpResponse(
+                    self._stream_csv(memberships), content_type=_CONTENT_TYPES["csv"]
+                )
                 response["Content-Disposition"] = f'attachment; filename="{filename}"'
                 return response
 
+            return StreamingHttpResponse(
+                self._stream_txt(memberships), content_type=_CONTENT_TYPES["txt"]
+            )
+
         except Exception as e:
+            logger.exception("[EXPORT] Falha ao exportar usuários")
             return Response(
                 {"error": f"Erro ao exportar usuários: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    @staticmethod
+    def _rows(memberships):
+        """(group_id, grupo, id, nome, matrícula) em ordem de grupo, lidos em lotes."""
+        return (
+            memberships.order_by("group_id", "user_id")
+            .values_list(
+                "group_id", "group__name", "user_id", "user__name", "user__registration"
+            )
+            .iterator(chunk_size=_EXPORT_CHUNK_SIZE)
+        )
+
+    @staticmethod
+    def _chunks(rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= _EXPORT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _write_xlsx(self, memberships):
+        """Uma aba por grupo; o arquivo é montado em disco e enviado em pedaços."""
+        workbook = Workbook(write_only=True)
+        for (_, group_name), rows in groupby(
+            self._rows(memberships), key=lambda row: (row[0], row[1])
+        ):
+            worksheet = workbook.create_sheet(title=str(group_name)[:31])
+            for column, width in _XLSX_COLUMN_WIDTHS.items():
+                worksheet.column_dimensions[column].width = width
+            worksheet.append(_XLSX_COLUMNS)
+            for _, _, user_id, name, registration in rows:
+                worksheet.append((user_id, name, registration or ""))
+
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return output
+
+    def _stream_csv(self, memberships):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        # BOM (utf-8-sig) para o Excel abrir com acentuação correta.
+        buffer.write("\ufeff")
+        writer.writerow(_TEXT_COLUMNS)
+        for chunk in self._chunks(self._rows(memberships)):
+            writer.writerows(
+                (user_id, name, registration or "", group_name)
+                for _, group_name, user_id, name, registration in chunk
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def _stream_txt(self, memberships):
+        # As larguras das colunas vêm de um aggregate, sem ler os dados duas vezes.
+        widths = memberships.aggregate(
+            max_id=Max("user_id"),
+            name=Max(Length("user__name")),
+            registration=Max(Length("user__registration")),
+            group=Max(Length("group__name")),
+        )
+        col_widths = [
+            max(len(str(widths["max_id"] or "")), len(_TEXT_COLUMNS[0])),
+            max(widths["name"] or 0, len(_TEXT_COLUMNS[1])),
+            max(widths["registration"] or 0, len(_TEXT_COLUMNS[2])),
+            max(widths["group"] or 0, len(_TEXT_COLUMNS[3])),
+        ]
+
+        def format_line(values):
+            return "  ".join(
+                str(value).ljust(width) for value, width in zip(values, col_widths)
+            )
+
+        header_line = format_line(_TEXT_COLUMNS)
+        yield "\n".join(
+            [
+                "Exportação de Usuários por Grupo",
+                "=" * 50,
+                "",
+                header_line,
+                "-" * len(header_line),
+            ]
+        )
+        for chunk in self._chunks(self._rows(memberships)):
+            yield "".join(
+                "\n" + format_line((user_id, name, registration or "", group_name))
+                for _, group_name, user_id, name, registration in chunk
+            )
@@ -0,0 +1,445 @@
+"""
+Importação de planilhas em segundo plano.
+
+Com ``background=true`` no upload (ou ``USER_IMPORT_BACKGROUND`` ligado), a
+view só guarda o arquivo num ``UserImportJob`` e responde 202; a task
+``run_user_import_job`` faz o resto em fases, registrando contadores e erros
+por linha no job:
+
+1. ``parse``: lê o arquivo guardado e monta os lotes (uma aba por turma, ou um
+   lote único para CSV/perfis genéricos/usuários em grupo);
+2. ``database``: grupo + upsert dos usuários, uma transação curta por lote;
+3. ``devices``: envia os usuários às catracas com o fallback dinâmico de
+   ``ImportUsersService._sync_items_with_dynamic_chunks``;
+4. ``relations``: cria as relações locais e envia as novas às catracas.
+
+O andamento de cada lote fica em ``job.state``. Se uma catraca falhar no meio,
+o job termina como ``partial`` e ``POST import_jobs/<id>/resume/`` continua só
+o que ficou pendente, sem regravar o banco nem reenviar o que já foi aceito.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from src.core.control_id.infra.control_id_django_app.models import (
+    CustomGroup,
+    UserImportJob,
+)
+from src.core.user.infra.user_django_app.models import User
+
+from .excel_parser import ParsedRow, ParsedSheet, parse_discente_csv, parse_sheet
+from .import_users import (
+    IMPORT_PROFILE_APP_ROLES,
+    IMPORT_PROFILE_GROUPS,
+    TURMA_PROFILE,
+)
+from .import_users_service import ImportSyncItem, ImportUsersService
+
+logger = logging.getLogger(__name__)
+
+GROUP_MEMBER_COLUMNS = ("Matrícula", "Nome")
+MAX_JOB_ERRORS = 1000
+
+Phase = UserImportJob.Phase
+
+
+@dataclass
+class ImportBatch:
+    source: str
+    rows: list[ParsedRow]
+    group_name: str | None = None
+    app_role: str | None = None
+
+
+def background_import_requested(value=None) -> bool:
+    if value is not None and str(value).strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return bool(getattr(settings, "USER_IMPORT_BACKGROUND", False))
+
+
+def create_import_job(
+    *,
+    kind: str,
+    filename: str,
+    content: bytes,
+    options: dict,
+    requested_by=None,
+) -> UserImportJob:
+    """Guarda o arquivo e agenda a task após o commit."""
+    job = UserImportJob.objects.create(
+        kind=kind,
+        filename=(filename or "")[:255],
+        file_content=content,
+        options=options,
+        requested_by=requested_by if getattr(requested_by, "pk", None) else None,
+    )
+    enqueue_import_job(job)
+    return job
+
+
+def enqueue_import_job(job: UserImportJob) -> None:
+    def enqueue():
+        from ..tasks import run_user_import_job
+
+        result = run_user_import_job.delay(job.pk)
+        UserImportJob.objects.filter(pk=job.pk).update(task_id=result.id or "")
+
+    transaction.on_commit(enqueue)
+
+
+def _unique_ids(users) -> list[int]:
+    return list(dict.fromkeys(int(user.pk) for user in users))
+
+
+def _users_in_order(user_ids: list[int]) -> list[User]:
+    users = User.objects.in_bulk(user_ids)
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+
+class UserImportJobRunner:
+    """Executa (ou continua) um ``UserImportJob``."""
+
+    def __init__(self, job: UserImportJob):
+        self.job = job
+        self.service = ImportUsersService(heartbeat=self._heartbeat)
+
+    # ── Execução ──
+
+    def run(self) -> UserImportJob:
+        job = self.job
+        job.status = UserImportJob.Status.RUNNING
+        job.attempts += 1
+        job.started_at = job.started_at or timezone.now()
+        job.finished_at = None
+        # Cada execução relata o próprio resultado; o que já foi feito fica em state.
+        job.errors = []
+        job.state.setdefault("batches", {})
+        self._save("status", "attempts", "started_at", "finished_at", "errors", "state")
+
+        try:
+            batches = self._parse()
+            job.counters["batches_total"] = len(batches)
+            for index, batch in enumerate(batches):
+                self._run_batch(index, batch)
+        except Exception as exc:
+            logger.exception("[IMPORT_JOB] Job #%s falhou na fase %s", job.pk, job.phase)
+            self._error(str(exc))
+            job.status = UserImportJob.Status.FAILED
+        else:
+            job.phase = Phase.DONE
+            # Linhas inválidas ficam em ``errors`` mas não mudam reprocessando;
+            # ``partial`` é só para o que ainda pode ser retomado.
+            if not batches:
+                job.status = UserImportJob.Status.FAILED
+            elif self._has_pending():
+                job.status = UserImportJob.Status.PARTIAL
+            else:
+                job.status = UserImportJob.Status.COMPLETED
+
+        self._refresh_counters()
+        job.finished_at = timezone.now()
+        self._save("status", "phase", "counters", "errors", "state", "finished_at")
+        logger.info(
+            "[IMPORT_JOB] Job #%s finalizado: %s %s", job.pk, job.status, job.counters
+        )
+        return job
+
+    def _run_batch(self, index: int, batch: ImportBatch) -> None:
+        entry = self.job.state["batches"].setdefault(str(index), {"source": batch.source})
+        if entry.get("done"):
+            return
+
+        if "user_ids" not in entry:
+            self._set_phase(Phase.DATABASE)
+            if not self._store_batch(entry, batch):
+                return
+            self._save("state", "counters")
+
+        self._set_phase(Phase.DEVICES)
+        self._sync_users(entry, batch)
+        self._set_phase(Phase.RELATIONS)
+        self._sync_relations(entry, batch)
+
+        entry["done"] = not (self._pending_users(entry) or entry["relation_pending_ids"])
+        self._refresh_counters()
+        self._save("state", "counters", "errors")
+
+    # ── Fase 1: arquivo ──
+
+    def _parse(self) -> list[ImportBatch]:
+        self._set_phase(Phase.PARSE)
+        self.job.counters["rows_invalid"] = 0
+        options = self.job.options
+        suffix = ".csv" if options.get("file_kind") == "csv" else ".xlsx"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            tmp.write(bytes(self.job.file_content))
+            tmp_path = tmp.name
+
+        try:
+            if self.job.kind == UserImportJob.Kind.GROUP_MEMBERS:
+                batches = self._parse_group_members(tmp_path)
+            else:
+                batches = self._parse_users(tmp_path)
+        finally:
+            os.unlink(tmp_path)
+
+        self.job.counters["rows_total"] = sum(len(batch.rows) for batch in batches)
+        if not batches and not self.job.errors:
+            self._error("Nenhuma linha valida encontrada.")
+        return batches
+
+    def _parse_users(self, path: str) -> list[ImportBatch]:
+        profile = self.job.options.get("import_profile", TURMA_PROFILE)
+        if self.job.options.get("file_kind") == "csv":
+            parsed, parse_error = parse_discente_csv(path)
+            if parse_error:
+                self._error(parse_error)
+            if parsed is None:
+                return []
+            self._record_row_errors(parsed)
+            return [
+                ImportBatch(
+                    source="CSV",
+                    rows=parsed.rows,
+                    group_name=IMPORT_PROFILE_GROUPS[profile],
+                    app_role=IMPORT_PROFILE_APP_ROLES[profile],
+                )
+            ]
+
+        with pd.ExcelFile(path) as excel_file:
+            sheet_names = [str(name).strip() for name in excel_file.sheet_names]
+        self.job.counters["sheets_total"] = len(sheet_names)
+
+        batches: list[ImportBatch] = []
+        generic_rows: list[ParsedRow] = []
+        for sheet_name in sheet_names:
+            parsed, parse_error = parse_sheet(path, sheet_name)
+            if parse_error:
+                self._error(parse_error, source=sheet_name)
+                continue
+            if parsed is None:
+                continue
+            self._record_row_errors(parsed)
+            if profile == TURMA_PROFILE:
+                batches.append(
+                    ImportBatch(source=sheet_name, rows=parsed.rows, group_name=parsed.group_name)
+                )
+            else:
+                generic_rows.extend(parsed.rows)
+
+        if generic_rows:
+            batches.append(
+                ImportBatch(
+                    source="Excel",
+                    rows=generic_rows,
+                    group_name=IMPORT_PROFILE_GROUPS[profile],
+                    app_role=IMPORT_PROFILE_APP_ROLES[profile],
+                )
+            )
+        return batches
+
+    def _parse_group_members(self, path: str) -> list[ImportBatch]:
+        df = pd.read_excel(path)
+        if not set(GROUP_MEMBER_COLUMNS).issubset(df.columns):
+            raise ValueError(
+                f"Colunas obrigatórias ausentes. Esperado: {set(GROUP_MEMBER_COLUMNS)}"
+            )
+        registrations = df["Matrícula"].astype(str).str.strip()
+        names = df["Nome"].astype(str).str.strip()
+        rows = [
+            ParsedRow(name=name, registration=registration)
+            for registration, name in zip(registrations, names)
+        ]
+        return [ImportBatch(source="Grupo", rows=rows)] if rows else []
+
+    def _record_row_errors(self, parsed: ParsedSheet) -> None:
+        for message in parsed.row_errors:
+            self._error(message, source=parsed.sheet_name)
+        self.job.counters["rows_invalid"] = self.job.counters.get(
+            "rows_invalid", 0
+        ) + len(parsed.row_errors)
+
+    # ── Fase 2: banco ──
+
+    def _store_batch(self, entry: dict, batch: ImportBatch) -> bool:
+        counters = self.job.counters
+        with transaction.atomic():
+            if batch.group_name is None:
+                grupo = CustomGroup.objects.filter(
+                    pk=self.job.options.get("group_id")
+                ).first()
+                if grupo is None:
+                    self._error("Grupo não encontrado", source=batch.source)
+                    return False
+                users = self._match_group_members(batch)
+                # Usuários já existentes: já estão nas catracas.
+                synced_user_ids = _unique_ids(users)
+            else:
+                grupo, err = self.service.ensure_group(batch.group_name)
+                if err:
+                    self._error(f"Grupo {batch.group_name}: {err}", source=batch.source)
+                    return False
+                users_new, users_existing, created, updated = self.service.upsert_users(
+                    batch.rows, app_role=batch.app_role
+                )
+                users = users_new + users_existing
+                synced_user_ids = []
+                counters["users_created"] = counters.get("users_created", 0) + created
+                counters["users_updated"] = counters.get("users_updated", 0) + updated
+
+        entry.update(
+            group_id=grupo.pk,
+            user_ids=_unique_ids(users),
+            synced_user_ids=synced_user_ids,
+            linked_user_ids=[],
+            relation_pending_ids=[],
+        )
+        return True
+
+    def _match_group_members(self, batch: ImportBatch) -> list[User]:
+        by_registration = {
+            user.registration: user
+            for user in User.objects.filter(
+                registration__in={row.registration for row in batch.rows}
+            )
+        }
+        users = []
+        for row in batch.rows:
+            user = by_registration.get(row.registration)
+            if user is None:
+                self._error(
+                    f"Usuário não encontrado: {row.registration} - {row.name}",
+                    source=batch.source,
+                )
+                continue
+            users.append(user)
+        return users
+
+    # ── Fase 3: usuários nas catracas ──
+
+    @staticmethod
+    def _pending_users(entry: dict) -> list[int]:
+        synced = set(entry.get("synced_user_ids", []))
+        return [user_id for user_id in entry.get("user_ids", []) if user_id not in synced]
+
+    def _sync_users(self, entry: dict, batch: ImportBatch) -> None:
+        pending = self._pending_users(entry)
+        if not pending:
+            return
+
+        synced = self.service.sync_users_to_devices(_users_in_order(pending), batch.source)
+        entry["synced_user_ids"].extend(_unique_ids(synced))
+        self._record_sync_failures(batch.source)
+        if not synced:
+            self._error(
+                f"{batch.source}: falha ao sincronizar usuários na catraca — "
+                "relações não serão criadas",
+                source=batch.source,
+            )
+
+    # ── Fase 4: relações ──
+
+    def _sync_relations(self, entry: dict, batch: ImportBatch) -> None:
+        linked = set(entry["linked_user_ids"])
+        to_link = [user_id for user_id in entry["synced_user_ids"] if user_id not in linked]
+        grupo = None
+
+        if to_link:
+            grupo = CustomGroup.objects.get(pk=entry["group_id"])
+            new_relation_users = self.service.create_local_relations(
+                _users_in_order(to_link), grupo
+            )
+            entry["linked_user_ids"].extend(to_link)
+            entry["relation_pending_ids"].extend(_unique_ids(new_relation_users))
+            self.job.counters["relations_created"] = self.job.counters.get(
+                "relations_created", 0
+            ) + len(new_relation_users)
+            self._save("state", "counters")
+
+        pending = entry["relation_pending_ids"]
+        if not pending:
+            return
+
+        grupo = grupo or CustomGroup.objects.get(pk=entry["group_id"])
+        items = [
+            ImportSyncItem(
+                source=user,
+                payload={"user_id": user.pk, "group_id": grupo.pk},
+                label=(
+                    f"relacao user_id={user.pk} group_id={grupo.pk} "
+                    f"group='{grupo.name}'"
+                ),
+            )
+            for user in _users_in_order(pending)
+        ]
+        self.service._device = None
+        result = self.service._sync_items_with_dynamic_chunks(
+            "user_groups", items, batch.source
+        )
+        confirmed = set(_unique_ids(result.successful_items))
+        entry["relation_pending_ids"] = [
+            user_id for user_id in pending if user_id not in confirmed
+        ]
+        self.job.counters["relations_synced"] = self.job.counters.get(
+            "relations_synced", 0
+        ) + len(confirmed)
+        self._record_sync_failures(batch.source)
+
+    # ── Auxiliares ──
+
+    def _record_sync_failures(self, source: str) -> None:
+        for failure in self.service.last_sync_failures:
+            self._error(failure.to_message(), source=source)
+
+    def _has_pending(self) -> bool:
+        return any(
+            not entry.get("done") for entry in self.job.state.get("batches", {}).values()
+        )
+
+    def _refresh_counters(self) -> None:
+        entries = [
+            entry
+            for entry in self.job.state.get("batches", {}).values()
+            if "user_ids" in entry
+        ]
+        counters = self.job.counters
+        counters["batches_done"] = sum(1 for entry in entries if entry.get("done"))
+        counters["users_total"] = sum(len(entry["user_ids"]) for entry in entries)
+        counters["users_synced"] = sum(len(entry["synced_user_ids"]) for entry in entries)
+        counters["users_pending_sync"] = counters["users_total"] - counters["users_synced"]
+        counters["relations_pending_sync"] = sum(
+            len(entry["relation_pending_ids"]) for entry in entries
+        )
+        counters["errors"] = len(self.job.errors)
+
+    def _set_phase(self, phase: str) -> None:
+        if self.job.phase != phase:
+            self.job.phase = phase
+            self._save("phase")
+
+    def _error(self, message: str, source: str | None = None) -> None:
+        if len(self.job.errors) >= MAX_JOB_ERRORS:
+            return
+        self.job.errors.append(
+            {"phase": self.job.phase, "source": source, "message": message}
+        )
+
+    def _save(self, *fields: str) -> None:
+        self.job.save(update_fields=[*fields, "updated_at"])
+
+    def _heartbeat(self) -> None:
+        # As fases de catraca podem levar vários blocos sem gravar o job:
+        # renova só o updated_at para o job não parecer abandonado.
+        self.job.updated_at = timezone.now()
+        UserImportJob.objects.filter(pk=self.job.pk).update(
+            updated_at=self.job.updated_at
+        )
@@ -110,6 +110,14 @@ class ImportUsersView(APIView):
             if isinstance(import_profile, Response):
                 return self._finalize_response(import_profile, start_time)
 
+            from .import_jobs import background_import_requested
+
+            if background_import_requested(request.data.get("background")):
+                return self._finalize_response(
+                    self._enqueue_job(request, tmp_path, file_kind, import_profile),
+                    start_time,
+                )
+
             if file_kind == "csv":
                 return self._finalize_response(
                     self._process_csv(tmp_path, import_profile), start_time
@@ -172,6 +180,36 @@ class ImportUsersView(APIView):
             tmp.flush()
             return tmp.name, file_kind
 
+    def _enqueue_job(
+        self, request, tmp_path: str, file_kind: str, import_profile: str
+    ) -> Response:
+        """Guarda o arquivo num UserImportJob e devolve onde acompanhar o andamento."""
+        from rest_framework.reverse import reverse
+
+        from ..models import UserImportJob
+        from .import_jobs import create_import_job
+
+        with open(tmp_path, "rb") as handle:
+            content = handle.read()
+
+        job = create_import_job(
+            kind=UserImportJob.Kind.USERS,
+            filename=request.FILES["file"].name,
+            content=content,
+            options={"file_kind": file_kind, "import_profile": import_profile},
+            requested_by=request.user,
+        )
+        return Response(
+            {
+                "job_id": job.pk,
+                "status": job.status,
+                "progress_url": reverse(
+                    "userimportjob-detail", args=[job.pk], request=request
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
     def _get_import_profile(self, request) -> str | Response:
         import_profile = request.data.get("import_profile", TURMA_PROFILE)
         if import_profile not in IMPORT_PROFILE_GROUPS:
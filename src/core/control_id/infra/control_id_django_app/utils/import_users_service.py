@@ -1,25 +1,34 @@
 import logging
 from dataclasses import dataclass
-from typing import Any, Generic, Iterable, TypeVar
+from typing import Any, Callable, Generic, Iterable, TypeVar
 
 from django.contrib.auth.models import Group as DjangoGroup
 from django.db import transaction
 from rest_framework import status
+from safedelete.config import FIELD_NAME
 
 from src.core.__seedwork__.infra import ControlIDSyncMixin
 from src.core.__seedwork__.infra.catraca_sync import CatracaSyncError
+from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+    invalidate_access_policy_index,
+)
 from src.core.control_id.infra.control_id_django_app.models import (
     CustomGroup as Group,
     UserGroup,
 )
 from src.core.control_id.infra.control_id_django_app.models.device import Device
-from src.core.user.infra.user_django_app.models import User
+from src.core.user.infra.user_django_app.models import User, generate_unique_pins
+from src.core.user.infra.user_django_app.pin_allocator import (
+    invalidate_pin_bitmap,
+    release_pins,
+)
 from src.core.user.infra.user_django_app.validate import normalize_phone
 from .excel_parser import ParsedRow
 
 logger = logging.getLogger(__name__)
 
 IMPORT_SYNC_CHUNK_LADDER = (100, 50, 10, 5, 1)
+IMPORT_BULK_BATCH_SIZE = 500
 MAX_IMPORT_SYNC_FAILURE_MESSAGES = 20
 
 T = TypeVar("T")
@@ -86,10 +95,12 @@ class ImportSyncResult(Generic[T]):
 class ImportUsersService(ControlIDSyncMixin):
     """Serviço de importação de usuários para o Django e catracas."""
 
-    def __init__(self):
+    def __init__(self, heartbeat: Callable[[], None] | None = None):
         super().__init__()
         self._device = None
         self.last_sync_failures: list[ImportSyncFailure] = []
+        # Chamado após cada bloco enviado às catracas (o job renova o lease).
+        self.heartbeat = heartbeat
 
     def _chunk_items(
         self, items: list[ImportSyncItem[T]], chunk_size: int
@@ -113,6 +124,9 @@ class ImportUsersService(ControlIDSyncMixin):
         except Exception as exc:
             logger.exception("[IMPORT_SYNC] Excecao ao sincronizar %s", object_name)
             return False, None, str(exc)
+        finally:
+            if self.heartbeat is not None:
+                self.heartbeat()
 
         if response.status_code == status.HTTP_200_OK:
             return True, response.status_code, None
@@ -260,20 +274,28 @@ class ImportUsersService(ControlIDSyncMixin):
             logger.warning("[USER] Telefone ignorado por formato invalido: %s", value)
             return None
 
-    def _get_available_email(
-        self, email: str | None, user: User | None = None
+    def _claim_email(
+        self, taken_emails: dict[str, Any], email: str | None, user: User
     ) -> str | None:
+        """
+        Reserva o e-mail para ``user`` se ninguém mais o usa.
+
+        ``taken_emails`` começa com os e-mails já gravados no banco e é
+        atualizado em memória a cada atribuição, como se cada linha tivesse
+        sido salva antes da próxima.
+        """
         if not email:
             return None
 
         email = email.strip().lower()
-        queryset = User.objects.filter(email=email)
-        if user and user.pk:
-            queryset = queryset.exclude(pk=user.pk)
-
-        if queryset.exists():
+        owner = taken_emails.get(email)
+        if owner is not None and owner is not user:
             logger.warning("[USER] E-mail '%s' ignorado porque ja esta em uso", email)
             return None
+
+        if user.email and taken_emails.get(user.email) is user:
+            del taken_emails[user.email]
+        taken_emails[email] = user
         return email
 
     # ── Grupo ──
@@ -352,73 +374,121 @@ class ImportUsersService(ControlIDSyncMixin):
         """
         Cria ou atualiza usuários no Django.
         Retorna (novos, existentes, qtd_criados, qtd_atualizados).
+
+        Em lote: uma query carrega os usuários pelas matrículas, outra os
+        e-mails em uso; as linhas são aplicadas em memória (na ordem da
+        planilha) e gravadas com ``bulk_create``/``bulk_update``.
         """
         users_new: list[User] = []
         users_existing: list[User] = []
 
+        by_registration: dict[str, User] = {
+            user.registration: user
+            for user in User.objects.filter(
+                registration__in={row.registration for row in rows}
+            )
+        }
+        emails = {row.email.strip().lower() for row in rows if row.email}
+        loaded_by_pk = {user.pk: user for user in by_registration.values()}
+        taken_emails: dict[str, Any] = {
+            email: loaded_by_pk.get(pk, pk)
+            for email, pk in (
+                User.objects.filter(email__in=emails).values_list("email", "pk")
+                if emails
+                else []
+            )
+        }
+
+        pending_new: set[int] = set()
+        changed_users: dict[int, User] = {}
+        changed_fields: set[str] = set()
+
         for row in rows:
-            user = User.objects.filter(registration=row.registration).first()
+            user = by_registration.get(row.registration)
             phone = self._normalize_phone_or_none(row.phone)
             phone_landline = self._normalize_phone_or_none(row.phone_landline)
 
             if not user:
-                email = self._get_available_email(row.email)
-                user = User.objects.create(
+                user = User(
                     id=row.registration,
                     name=row.name,
                     registration=row.registration,
-                    email=email,
                     birth_date=row.birth_date,
                     phone=phone,
                     phone_landline=phone_landline,
                     app_role=app_role or User.AppRole.ALUNO,
                     is_active=True,
                 )
-                logger.info(
-                    f"[USER] Criado: id={user.pk} "
-                    f"name='{user.name}' registration={user.registration}"
-                )
+                user.email = self._claim_email(taken_emails, row.email, user)
+                by_registration[row.registration] = user
+                pending_new.add(id(user))
                 users_new.append(user)
-            else:
-                update_fields = []
-
-                if user.name != row.name:
-                    user.name = row.name
-                    update_fields.append("name")
-                if user.registration != row.registration:
-                    user.registration = row.registration
-                    update_fields.append("registration")
-                if not user.is_active:
-                    user.is_active = True
-                    update_fields.append("is_active")
-                if app_role and user.app_role != app_role:
-                    user.app_role = app_role
-                    update_fields.append("app_role")
-                if row.birth_date and user.birth_date != row.birth_date:
-                    user.birth_date = row.birth_date
-                    update_fields.append("birth_date")
-                if phone and user.phone != phone:
-                    user.phone = phone
-                    update_fields.append("phone")
-                if phone_landline and user.phone_landline != phone_landline:
-                    user.phone_landline = phone_landline
-                    update_fields.append("phone_landline")
-
-                email = self._get_available_email(row.email, user)
-                if email and user.email != email:
-                    user.email = email
-                    update_fields.append("email")
-                if update_fields:
-                    logger.info(
-                        f"[USER] Atualizado: id={user.pk} '{user.name}' → '{row.name}'"
-                    )
-                    user.save(update_fields=update_fields)
-                else:
-                    logger.info(
-                        f"[USER] Sem alterações: id={user.pk} name='{user.name}'"
-                    )
-                users_existing.append(user)
+                continue
+
+            update_fields = []
+
+            if user.name != row.name:
+                user.name = row.name
+                update_fields.append("name")
+            if user.registration != row.registration:
+                user.registration = row.registration
+                update_fields.append("registration")
+            if not user.is_active:
+                user.is_active = True
+                update_fields.append("is_active")
+            if app_role and user.app_role != app_role:
+                user.app_role = app_role
+                update_fields.append("app_role")
+            if row.birth_date and user.birth_date != row.birth_date:
+                user.birth_date = row.birth_date
+                update_fields.append("birth_date")
+            if phone and user.phone != phone:
+                user.phone = phone
+                update_fields.append("phone")
+            if phone_landline and user.phone_landline != phone_landline:
+                user.phone_landline = phone_landline
+                update_fields.append("phone_landline")
+
+            email = self._claim_email(taken_emails, row.email, user)
+            if email and user.email != email:
+                user.email = email
+                update_fields.append("email")
+
+            if update_fields and id(user) not in pending_new:
+                changed_users[id(user)] = user
+                changed_fields.update(update_fields)
+            logger.debug(
+                "[USER] %s: id=%s name='%s'",
+                "Atualizado" if update_fields else "Sem alterações",
+                user.pk,
+                user.name,
+            )
+            users_existing.append(user)
+
+        if users_new:
+            for user, pin in zip(users_new, generate_unique_pins(len(users_new))):
+                user.pin = pin
+            User.objects.bulk_create(users_new, batch_size=IMPORT_BULK_BATCH_SIZE)
+            release_pins(user.pin for user in users_new)
+        if changed_users:
+            User.objects.bulk_update(
+                list(changed_users.values()),
+                sorted(changed_fields),
+                batch_size=IMPORT_BULK_BATCH_SIZE,
+            )
+        # bulk_create/bulk_update não disparam signals: descarta aqui o índice
+        # de acesso e o bitmap de PINs (a troca de versão sai no commit).
+        if users_new or changed_users:
+            invalidate_access_policy_index()
+        if users_new:
+            invalidate_pin_bitmap()
 
+        logger.info(
+            "[USER] %s criado(s), %s existente(s) (%s alterado(s))",
+            len(users_new),
+            len(users_existing),
+            len(changed_users),
+        )
         return users_new, users_existing, len(users_new), len(users_existing)
 
     def sync_users_to_devices(self, users: list[User], sheet_name: str) -> list[User]:
@@ -456,11 +526,40 @@ class ImportUsersService(ControlIDSyncMixin):
         self, users: list[User], grupo: DjangoGroup
     ) -> list[User]:
         """Cria relações UserGroup locais. Retorna apenas os users com relação nova."""
-        new_relation_users = []
+        users_by_id: dict[str, User] = {}
         for user in users:
-            _, created = UserGroup.objects.get_or_create(user=user, group=grupo)
-            if created:
-                new_relation_users.append(user)
+            users_by_id.setdefault(str(user.pk), user)
+
+        existing = {
+            str(user_id): deleted
+            for user_id, deleted in UserGroup.all_objects.filter(
+                group_id=grupo.pk, user_id__in=list(users_by_id)
+            ).values_list("user_id", FIELD_NAME)
+        }
+        # Relação apagada (soft delete) volta a valer em vez de duplicar.
+        restored_ids = [user_id for user_id, deleted in existing.items() if deleted]
+        if restored_ids:
+            UserGroup.all_objects.filter(
+                group_id=grupo.pk, user_id__in=restored_ids
+            ).update(**{FIELD_NAME: None})
+
+        UserGroup.objects.bulk_create(
+            [
+                UserGroup(user=user, group_id=grupo.pk)
+                for user_id, user in users_by_id.items()
+                if user_id not in existing
+            ],
+            batch_size=IMPORT_BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        new_relation_users = [
+            user
+            for user_id, user in users_by_id.items()
+            if user_id not in existing or existing[user_id]
+        ]
+        if new_relation_users:
+            # Sem signals no bulk: o grupo novo precisa valer já na verificação.
+            invalidate_access_policy_index()
 
         logger.info(
             f"[RELACAO] {len(new_relation_users)} nova(s) relação(ões) "
@@ -1,9 +1,16 @@
+import json
+from itertools import islice
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from drf_spectacular.utils import extend_schema
 from datetime import datetime, timedelta
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from src.core.__seedwork__.infra.pagination import KeysetPagination
 from src.core.control_id.infra.control_id_django_app.models import AccessLogs
 from src.core.control_id.infra.control_id_django_app.serializers import (
     AccessLogsSerializer,
@@ -11,6 +18,9 @@ from src.core.control_id.infra.control_id_django_app.serializers import (
 
 from rest_framework.pagination import PageNumberPagination
 
+# Linhas lidas do banco por vez no export em streaming.
+_EXPORT_CHUNK_SIZE = 2000
+
 
 class AccessLogsPagination(PageNumberPagination):
     page_size = 50
@@ -18,6 +28,14 @@ class AccessLogsPagination(PageNumberPagination):
     max_page_size = 1000
 
 
+class AccessLogsCursorPagination(KeysetPagination):
+    """Keyset em ``(time, id)``; ativada com ``?pagination=cursor``."""
+
+    key_field = "time"
+    page_size = 50
+    max_page_size = 1000
+
+
 @extend_schema(tags=["Access Logs"])
 class AccessLogsViewSet(viewsets.ModelViewSet):
     queryset = AccessLogs.objects.select_related(
@@ -39,6 +57,60 @@ class AccessLogsViewSet(viewsets.ModelViewSet):
     ordering_fields = ["id", "time", "event_type"]
     http_method_names = ["get"]
 
+    def _wants_cursor_pagination(self):
+        request = getattr(self, "request", None)
+        if request is None:
+            return False
+        params = request.query_params
+        return params.get("pagination") == "cursor" or "cursor" in params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self._wants_cursor_pagination():
+                self._paginator = AccessLogsCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def _logs_in_window(self, request, default_days=30):
+        """
+        Logs dos últimos N dias (``days``) com ``event_type`` opcional.
+
+        Retorna ``(queryset, None)`` ou ``(None, Response de erro)``.
+        """
+        try:
+            days = int(request.query_params.get("days", default_days))
+        except ValueError:
+            return None, Response(
+                {"error": "O parâmetro 'days' deve ser um número válido"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if days <= 0:
+            return None, Response(
+                {"error": "O parâmetro 'days' deve ser um número positivo"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Calcular a data de início (hoje - N dias)
+        end_date = timezone.now()
+        start_date = end_date - timedelta(days=days)
+
+        # Usa o queryset base que já tem select_related
+        logs = self.get_queryset().filter(time__gte=start_date, time__lte=end_date)
+
+        # Filtro opcional por tipo de evento
+        event_type = request.query_params.get("event_type", None)
+        if event_type is not None:
+            try:
+                logs = logs.filter(event_type=int(event_type))
+            except ValueError:
+                return None, Response(
+                    {"error": "O parâmetro 'event_type' deve ser um número válido"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return logs, None
+
     @action(detail=False, methods=["get"])
     def list_all_by_type(self, request):
         event_type = request.query_params.get("event_type", None)
@@ -84,42 +156,106 @@ class AccessLogsViewSet(viewsets.ModelViewSet):
         Exemplo: /api/access-logs/logs_by_days/?days=15
         """
         try:
-            days = int(request.query_params.get("days", 30))
-            if days <= 0:
-                return Response(
-                    {"error": "O parâmetro 'days' deve ser um número positivo"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            logs, error = self._logs_in_window(request)
+            if error is not None:
+                return error
 
-            # Calcular a data de início (hoje - N dias)
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=days)
-
-            # Usa o queryset base que já tem select_related
-            logs = self.get_queryset().filter(time__gte=start_date, time__lte=end_date)
-
-            # Filtro opcional por tipo de evento
-            event_type = request.query_params.get("event_type", None)
-            if event_type is not None:
-                try:
-                    event_type = int(event_type)
-                    logs = logs.filter(event_type=event_type)
-                except ValueError:
-                    return Response(
-                        {"error": "O parâmetro 'event_type' deve ser um número válido"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
+            # Com ?pagination=cursor a janela vem em páginas por (time, id);
+            # sem ela, mantém a lista completa de antes.
+            if self._wants_cursor_pagination():
+                page = self.paginate_queryset(logs)
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
 
             serializer = self.get_serializer(logs, many=True)
             return Response(serializer.data)
 
-        except ValueError:
-            return Response(
-                {"error": "O parâmetro 'days' deve ser um número válido"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except APIException:
+            raise
         except Exception as e:
             return Response(
                 {"error": f"Erro interno: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    @action(detail=False, methods=["get"])
+    @extend_schema(
+        parameters=[
+            {
+                "name": "days",
+                "in": "query",
+                "required": False,
+                "schema": {"type": "integer", "minimum": 1},
+                "description": "Número de dias exportados (padrão: 30)",
+            },
+            {
+                "name": "event_type",
+                "in": "query",
+                "required": False,
+                "schema": {"type": "integer"},
+                "description": "Tipo de evento opcional para filtrar",
+            },
+            {
+                "name": "stream_format",
+                "in": "query",
+                "required": False,
+                "schema": {"type": "string", "enum": ["json", "ndjson"]},
+                "description": "Array JSON (padrão) ou um objeto por linha (NDJSON)",
+            },
+        ],
+        responses={200: AccessLogsSerializer(many=True)},
+    )
+    def export(self, request):
+        """
+        Exporta os logs da janela em streaming, sem carregar tudo em memória.
+
+        Lê o banco em lotes de ``_EXPORT_CHUNK_SIZE`` com ``.iterator()`` e
+        escreve cada lote assim que é serializado. Aceita os mesmos filtros
+        da listagem (device, user, search...).
+        Exemplo: /api/access_logs/export/?days=60&stream_format=ndjson
+        """
+        stream_format = request.query_params.get("stream_format", "json")
+        if stream_format not in ("json", "ndjson"):
+            return Response(
+                {"error": "O parâmetro 'stream_format' deve ser 'json' ou 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        logs, error = self._logs_in_window(request)
+        if error is not None:
+            return error
+        logs = self.filter_queryset(logs).order_by("-time", "-id")
+
+        if stream_format == "ndjson":
+            content = self._stream_ndjson(logs)
+            content_type = "application/x-ndjson"
+        else:
+            content = self._stream_json_array(logs)
+            content_type = "application/json"
+        return StreamingHttpResponse(content, content_type=content_type)
+
+    def _serialized_chunks(self, logs):
+        rows = logs.iterator(chunk_size=_EXPORT_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(rows, _EXPORT_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield self.get_serializer(chunk, many=True).data
+
+    def _stream_ndjson(self, logs):
+        for data in self._serialized_chunks(logs):
+            yield "".join(
+                json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + "\n"
+                for row in data
+            )
+
+    def _stream_json_array(self, logs):
+        yield "["
+        first = True
+        for data in self._serialized_chunks(logs):
+            body = ",".join(
+                json.dumps(row, cls=JSONEncoder, ensure_ascii=False) for row in data
+            )
+            yield body if first else "," + body
+            first = False
+        yield "]"
@@ -6,6 +6,12 @@ from rest_framework.response import Response
 from src.core.__seedwork__.infra.mixins import CardSyncMixin
 from src.core.control_id.infra.control_id_django_app.models.cards import Card
 from src.core.control_id.infra.control_id_django_app.models.device import Device
+from src.core.control_id.infra.control_id_django_app.replication_outbox import (
+    enqueue_destroy,
+    enqueue_upsert,
+    outbox_enabled,
+    replication_response,
+)
 from src.core.control_id.infra.control_id_django_app.serializers.cards import (
     CardSerializer,
 )
@@ -70,6 +76,34 @@ class CardViewSet(CardSyncMixin, viewsets.ModelViewSet):
     def _get_target_devices_for_user(self, user: User):
         return list(user.get_target_devices(include_inactive=False))
 
+    def _enqueue_replication(self, instance: Card):
+        """Usuário e cartão nos devices do usuário (o cartão depende do usuário)."""
+        devices = self._get_target_devices_for_user(instance.user)
+        return enqueue_upsert(
+            devices, "users", self._user_payload(instance.user)
+        ) + enqueue_upsert(
+            devices,
+            "cards",
+            {
+                "id": instance.id,
+                "user_id": instance.user.id,
+                "value": self._card_value_as_int(instance.value),
+            },
+        )
+
+    def _create_with_outbox(self, request, serializer_data, captured_value):
+        with transaction.atomic():
+            serializer = self.get_serializer(data=serializer_data)
+            serializer.is_valid(raise_exception=True)
+            instance = serializer.save(value=str(captured_value))
+            rows = self._enqueue_replication(instance)
+        return replication_response(
+            request,
+            rows,
+            self.get_serializer(instance).data,
+            status.HTTP_201_CREATED,
+        )
+
     def create(self, request, *args, **kwargs):
         """
         Cria um cartao por captura remota na catraca.
@@ -161,6 +195,13 @@ class CardViewSet(CardSyncMixin, viewsets.ModelViewSet):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
 
+            if outbox_enabled():
+                return self._create_with_outbox(
+                    request,
+                    {"user_id": user_id, "enrollment_device_id": enrollment_device_id},
+                    captured_value,
+                )
+
             with transaction.atomic():
                 serializer = self.get_serializer(
                     data={
@@ -224,6 +265,12 @@ class CardViewSet(CardSyncMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
+        if outbox_enabled():
+            with transaction.atomic():
+                instance = serializer.save()
+                rows = self._enqueue_replication(instance)
+            return replication_response(request, rows, serializer.data)
+
         with transaction.atomic():
             instance = serializer.save()
 
@@ -266,6 +313,18 @@ class CardViewSet(CardSyncMixin, viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
 
+        if outbox_enabled():
+            with transaction.atomic():
+                rows = enqueue_destroy(
+                    self._get_target_devices_for_user(instance.user),
+                    "cards",
+                    {"id": instance.id},
+                )
+                instance.delete()
+            return replication_response(
+                request, rows, status_code=status.HTTP_204_NO_CONTENT
+            )
+
         with transaction.atomic():
             devices = self._get_target_devices_for_user(instance.user)
 
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -5,6 +6,13 @@ from src.core.control_id.infra.control_id_django_app.models import CustomGroup
 from src.core.control_id.infra.control_id_django_app.serializers import (
     CustomGroupSerializer,
 )
+from src.core.control_id.infra.control_id_django_app.replication_outbox import (
+    active_devices,
+    enqueue_destroy,
+    enqueue_upsert,
+    outbox_enabled,
+    replication_response,
+)
 from src.core.__seedwork__.infra.mixins import GroupSyncMixin
 from drf_spectacular.utils import extend_schema
 
@@ -21,6 +29,15 @@ class GroupViewSet(GroupSyncMixin, viewsets.ModelViewSet):
         # Local-first para garantir a autoridade de IDs do backend
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        if outbox_enabled():
+            with transaction.atomic():
+                instance = serializer.save()
+                rows = enqueue_upsert(
+                    active_devices(), "groups", {"id": instance.id, "name": instance.name}
+                )
+            return replication_response(
+                request, rows, serializer.data, status.HTTP_201_CREATED
+            )
         instance = serializer.save()
         response = self.create_in_catraca(instance)
         if response.status_code != status.HTTP_201_CREATED:
@@ -32,6 +49,13 @@ class GroupViewSet(GroupSyncMixin, viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
+        if outbox_enabled():
+            with transaction.atomic():
+                instance = serializer.save()
+                rows = enqueue_upsert(
+                    active_devices(), "groups", {"id": instance.id, "name": instance.name}
+                )
+            return replication_response(request, rows, serializer.data)
         instance = serializer.save()
 
         # Atualizar na catraca
@@ -49,6 +73,14 @@ class GroupViewSet(GroupSyncMixin, viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
 
+        if outbox_enabled():
+            with transaction.atomic():
+                rows = enqueue_destroy(active_devices(), "groups", {"id": instance.id})
+                instance.delete()
+            return replication_response(
+                request, rows, status_code=status.HTTP_204_NO_CONTENT
+            )
+
         # Deletar na catraca
         response = self.destroy_objects("groups", {"groups": {"id": instance.id}})
 
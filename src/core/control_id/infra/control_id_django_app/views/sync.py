@@ -267,3 +267,28 @@ def sync_status(request):
     elif result.failed():
         payload["error"] = str(result.result)
     return Response(payload)
+
+
+@extend_schema(
+    tags=["Config"],
+    summary="Métricas da outbox de replicação para as catracas",
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "enabled": {"type": "boolean"},
+                "depth": {"type": "integer"},
+                "failed": {"type": "integer"},
+                "lag_seconds": {"type": "number"},
+                "devices": {"type": "array", "items": {"type": "object"}},
+                "last_drain": {"type": "object", "nullable": True},
+            },
+        }
+    },
+)
+@api_view(["GET"])
+def replication_status(request):
+    """Fila, atraso e falhas da replicação por catraca."""
+    from ..replication_outbox import replication_metrics
+
+    return Response(replication_metrics())
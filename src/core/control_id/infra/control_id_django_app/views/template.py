@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import traceback
+import numpy as np
 import requests
 
 from typing import Any, cast
@@ -32,6 +33,18 @@ from src.core.__seedwork__.infra.types.catraca_sync import RemoteEnrollBioRespon
 CreateRemoteTemplatePayload = tuple[Template, dict[str, Any]]
 CompleteCaptureSessionPayload = tuple[Template, list[dict[str, Any]]]
 
+# Imagem do leitor local: 4 bits por pixel, dois pixels por byte. Para cada
+# valor de byte, os dois pixels de 8 bits ja expandidos (x * 17 leva 0..15
+# para 0..255), guardados como um uint16 para a expansao ser um unico gather.
+_PACKED_PIXEL_PAIRS = (
+    np.array(
+        [((value >> 4) * 17, (value & 0x0F) * 17) for value in range(256)],
+        dtype=np.uint8,
+    )
+    .view(np.uint16)
+    .ravel()
+)
+
 
 @extend_schema(tags=["Templates"])
 class TemplateViewSet(TemplateSyncMixin, viewsets.ModelViewSet):
@@ -179,20 +192,19 @@ class TemplateViewSet(TemplateSyncMixin, viewsets.ModelViewSet):
         expected_key = getattr(settings, "BIOMETRIC_DEVICE_API_KEY", "")
         return bool(expected_key) and sent_key == expected_key
 
-    def _expand_packed_fingerprint_image(self, packed_image: bytes) -> bytes:
+    def _expand_packed_fingerprint_image(
+        self, packed_image: bytes | memoryview
+    ) -> bytes:
         if not packed_image:
             raise ValueError("Imagem biometrica vazia.")
 
-        raw_image = bytearray(len(packed_image) * 2)
-        write_index = 0
-        for packed_byte in packed_image:
-            raw_image[write_index] = ((packed_byte >> 4) & 0x0F) * 17
-            raw_image[write_index + 1] = (packed_byte & 0x0F) * 17
-            write_index += 2
-        return bytes(raw_image)
+        # frombuffer le o corpo sem copiar; a tabela devolve os dois pixels
+        # de cada byte de uma vez, na ordem (nibble alto, nibble baixo).
+        packed = np.frombuffer(packed_image, dtype=np.uint8)
+        return _PACKED_PIXEL_PAIRS[packed].tobytes()
 
     def _extract_template_from_raw_capture(
-        self, session: BiometricCaptureSession, packed_image: bytes
+        self, session: BiometricCaptureSession, packed_image: bytes | memoryview
     ):
         extractor_device = (
             session.extractor_device or self._get_default_extractor_device()
@@ -233,7 +245,7 @@ class TemplateViewSet(TemplateSyncMixin, viewsets.ModelViewSet):
         *,
         attempt_number: int,
         total_attempts: int,
-        packed_image: bytes,
+        packed_image: bytes | memoryview,
     ):
         extracted = self._extract_template_from_raw_capture(session, packed_image)
         attempts = list(session.attempts or [])
@@ -609,7 +621,7 @@ class TemplateViewSet(TemplateSyncMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        packed_image = request.body or b""
+        packed_image = memoryview(request.body or b"")
         if not packed_image:
             return Response(
                 {"error": "Corpo binario com imagem bruta e obrigatorio"},
@@ -2,6 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.reverse import reverse
 from rest_framework import serializers
 from django.db import transaction, IntegrityError
 from drf_spectacular.utils import extend_schema
@@ -9,6 +10,7 @@ from drf_spectacular.utils import extend_schema
 from src.core.control_id.infra.control_id_django_app.models import (
     UserGroup,
     CustomGroup,
+    UserImportJob,
 )
 from src.core.user.infra.user_django_app.models import User
 from src.core.control_id.infra.control_id_django_app.serializers import (
@@ -16,6 +18,16 @@ from src.core.control_id.infra.control_id_django_app.serializers import (
 )
 from src.core.__seedwork__.infra.catraca_sync import CatracaSyncError
 from src.core.__seedwork__.infra.mixins import UserGroupsSyncMixin
+from src.core.control_id.infra.control_id_django_app.utils.import_jobs import (
+    background_import_requested,
+    create_import_job,
+)
+from src.core.control_id.infra.control_id_django_app.replication_outbox import (
+    enqueue_destroy,
+    enqueue_upsert,
+    outbox_enabled,
+    replication_response,
+)
 
 import pandas as pd
 
@@ -70,6 +82,36 @@ class UserGroupViewSet(UserGroupsSyncMixin, viewsets.ModelViewSet):
             status=exc.status_code or status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
 
+    def _enqueue_replication(self, instance: UserGroup):
+        """Grupo, usuário e vínculo nos devices do usuário, na ordem de dependência."""
+        devices = self._target_devices(instance)
+        return (
+            enqueue_upsert(devices, "groups", self._build_group_payload(instance))
+            + enqueue_upsert(devices, "users", self._build_user_payload(instance))
+            + enqueue_upsert(
+                devices,
+                "user_groups",
+                {"user_id": instance.user.id, "group_id": instance.group.id},
+            )
+        )
+
+    def _create_with_outbox(self, request, serializer, user, group):
+        with transaction.atomic():
+            soft_deleted_instance = UserGroup._base_manager.filter(
+                user=user, group=group
+            ).first()
+            if soft_deleted_instance:
+                soft_deleted_instance.undelete()
+                instance = soft_deleted_instance
+                status_code = status.HTTP_200_OK
+            else:
+                instance = serializer.save()
+                status_code = status.HTTP_201_CREATED
+            rows = self._enqueue_replication(instance)
+        return replication_response(
+            request, rows, self.get_serializer(instance).data, status_code
+        )
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -84,6 +126,9 @@ class UserGroupViewSet(UserGroupsSyncMixin, viewsets.ModelViewSet):
                 self.get_serializer(instance).data, status=status.HTTP_200_OK
             )
 
+        if outbox_enabled():
+            return self._create_with_outbox(request, serializer, user, group)
+
         # SafeDelete pode ocultar registros já apagados logicamente; recupera via _base_manager.
         soft_deleted_instance = UserGroup._base_manager.filter(
             user=user, group=group
@@ -144,6 +189,11 @@ class UserGroupViewSet(UserGroupsSyncMixin, viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
+        if outbox_enabled():
+            with transaction.atomic():
+                instance = serializer.save()
+                rows = self._enqueue_replication(instance)
+            return replication_response(request, rows, serializer.data)
         instance = serializer.save()
 
         try:
@@ -159,6 +209,18 @@ class UserGroupViewSet(UserGroupsSyncMixin, viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
 
+        if outbox_enabled():
+            with transaction.atomic():
+                rows = enqueue_destroy(
+                    self._target_devices(instance),
+                    "user_groups",
+                    {"user_id": instance.user.id, "group_id": instance.group.id},
+                )
+                instance.delete()
+            return replication_response(
+                request, rows, status_code=status.HTTP_204_NO_CONTENT
+            )
+
         try:
             response = self.delete_in_catraca(instance)
         except CatracaSyncError as exc:
@@ -282,6 +344,26 @@ class UserGroupViewSet(UserGroupsSyncMixin, viewsets.ModelViewSet):
 
         group = CustomGroup.objects.get(id=group_id)
 
+        if background_import_requested(request.data.get("background")):
+            file.seek(0)
+            job = create_import_job(
+                kind=UserImportJob.Kind.GROUP_MEMBERS,
+                filename=file.name,
+                content=file.read(),
+                options={"group_id": group.id, "file_kind": "excel"},
+                requested_by=request.user,
+            )
+            return Response(
+                {
+                    "job_id": job.pk,
+                    "status": job.status,
+                    "progress_url": reverse(
+                        "userimportjob-detail", args=[job.pk], request=request
+                    ),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
         # Lê o arquivo Excel
         try:
             df = pd.read_excel(file)
@@ -0,0 +1,59 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from src.core.control_id.infra.control_id_django_app.models import UserImportJob
+from src.core.control_id.infra.control_id_django_app.serializers.user_import_job import (
+    UserImportJobSerializer,
+)
+from src.core.control_id.infra.control_id_django_app.utils.import_jobs import (
+    enqueue_import_job,
+)
+
+
+@extend_schema(tags=["User Import Jobs"])
+class UserImportJobViewSet(
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Andamento das importações em segundo plano.
+
+    ``GET import_jobs/<id>/`` devolve fase, contadores e erros por linha;
+    ``POST import_jobs/<id>/resume/`` continua um job parcial ou que falhou.
+    """
+
+    queryset = UserImportJob.objects.select_related("requested_by").defer(
+        "file_content"
+    )
+    serializer_class = UserImportJobSerializer
+    filterset_fields = ["kind", "status", "phase"]
+    ordering = ["-id"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if getattr(user, "is_superuser", False) or getattr(
+            user, "is_admin_role", False
+        ):
+            return queryset
+        return queryset.filter(requested_by=user)
+
+    @action(detail=True, methods=["POST"])
+    def resume(self, request, pk=None):
+        job = self.get_object()
+        if not job.is_resumable:
+            return Response(
+                {"error": f"Importação com status '{job.status}' não pode ser retomada."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        job.status = UserImportJob.Status.PENDING
+        job.phase = UserImportJob.Phase.QUEUED
+        job.save(update_fields=["status", "phase", "updated_at"])
+        enqueue_import_job(job)
+        return Response(
+            self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
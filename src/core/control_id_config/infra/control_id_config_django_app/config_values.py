@@ -0,0 +1,117 @@
+"""
+Conversão das seções do ``get_configuration.fcgi`` nos valores de cada model.
+
+Fonte única das regras catraca → banco: quais campos de cada seção viram
+quais colunas, as conversões e os valores fixos dos campos que a IDBLOCK não
+expõe. Usada pelos ``sync_*_from_catraca`` dos mixins (uma seção por request)
+e por ``sync_config.build_config_values`` (todas as seções num request).
+"""
+
+from typing import Any, Dict, Mapping, Optional
+
+# Códigos curtos / variantes retornados pela catraca → valor canônico salvo no banco / enviado de volta.
+LANGUAGE_MAP = {
+    "pt": "pt_BR",
+    "en": "en_US",
+    "es": "spa_SPA",
+    "es_ES": "spa_SPA",
+}
+
+EXCEPTION_MODES = {"none", "emergency", "lock_down"}
+
+
+def to_bool(value, default=False):
+    """Converte o ``"0"``/``"1"`` da IDBLOCK (ou bool/número) para bool."""
+    if value is None:
+        return bool(default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip() in ("1", "true", "True")
+    if isinstance(value, (int, float)):
+        return value != 0
+    return bool(value)
+
+
+def _section(data: Optional[Mapping[str, Any]]) -> Mapping[str, Any]:
+    return data if isinstance(data, Mapping) else {}
+
+
+def system_config_values(general: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """``SystemConfig`` a partir da seção ``general``."""
+    general = _section(general)
+    language = str(general.get("language") or "pt_BR")
+    return {
+        "online": to_bool(general.get("online"), True),
+        "catra_timeout": int(general.get("catra_timeout") or 30000),
+        "local_identification": to_bool(general.get("local_identification"), True),
+        "language": LANGUAGE_MAP.get(language, language),
+        "daylight_savings_time_start": general.get("daylight_savings_time_start")
+        or None,
+        "daylight_savings_time_end": general.get("daylight_savings_time_end") or None,
+        # Campos NÃO DISPONÍVEIS na IDBLOCK (valores fixos padrão)
+        "auto_reboot_hour": 3,
+        "auto_reboot_minute": 0,
+        "clear_expired_users": False,
+        "url_reboot_enabled": True,
+        "keep_user_image": True,
+        "web_server_enabled": True,
+    }
+
+
+def hardware_config_values(general: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """``HardwareConfig`` a partir da seção ``general``."""
+    general = _section(general)
+    exception_mode = str(general.get("exception_mode") or "none")
+    if exception_mode not in EXCEPTION_MODES:
+        exception_mode = "none"
+    return {
+        "beep_enabled": to_bool(general.get("beep_enabled"), True),
+        "bell_enabled": to_bool(general.get("bell_enabled"), False),
+        "bell_relay": int(general.get("bell_relay") or 2),
+        "exception_mode": exception_mode,
+        # Campos NÃO DISPONÍVEIS na IDBLOCK (valores fixos padrão)
+        "ssh_enabled": False,
+        "relayN_enabled": False,
+        "relayN_timeout": 5,
+        "relayN_auto_close": True,
+        "door_sensorN_enabled": False,
+        "door_sensorN_idle": 10,
+        "doorN_interlock": False,
+        "doorN_exception_mode": False,
+    }
+
+
+def security_config_values(identifier: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """``SecurityConfig`` a partir da seção ``identifier``."""
+    identifier = _section(identifier)
+    return {
+        "verbose_logging_enabled": to_bool(identifier.get("verbose_logging"), True),
+        "log_type": to_bool(identifier.get("log_type"), False),
+        "multi_factor_authentication_enabled": to_bool(
+            identifier.get("multi_factor_authentication"), False
+        ),
+    }
+
+
+def catra_config_values(catra: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """``CatraConfig`` a partir da seção ``catra``."""
+    catra = _section(catra)
+    return {
+        "anti_passback": to_bool(catra.get("anti_passback"), False),
+        "daily_reset": to_bool(catra.get("daily_reset"), False),
+        "gateway": catra.get("gateway", "clockwise"),
+        "operation_mode": catra.get("operation_mode", "blocked"),
+    }
+
+
+def push_server_config_values(
+    push_server: Optional[Mapping[str, Any]],
+) -> Dict[str, Any]:
+    """``PushServerConfig`` a partir da seção ``push_server``."""
+    push_server = _section(push_server)
+    return {
+        "push_request_timeout": int(push_server.get("push_request_timeout") or 15000),
+        "push_request_period": int(push_server.get("push_request_period") or 60),
+        "push_remote_address": push_server.get("push_remote_address", ""),
+    }
@@ -0,0 +1,357 @@
+"""
+Detecção de divergência (drift) entre o banco e cada catraca.
+
+Para saber se uma catraca ainda espelha o banco não é preciso reenviar tudo
+(``sync_all``/Easy Setup). Por tabela de ``REQUIRED_FIELDS_BY_OBJECT``:
+
+1. o banco é fotografado uma vez por execução (``collect_db_data``) e a
+   catraca devolve só as colunas de identidade da tabela (``load_objects``
+   com ``fields``);
+2. os dois lados viram uma árvore de hashes estilo Merkle: linhas agrupadas
+   em baldes por faixa de id (``CATRACA_DRIFT_BUCKET_SIZE``), um ``sha256``
+   por balde e uma raiz por tabela;
+3. raízes iguais encerram a tabela; senão só os baldes com hash diferente
+   são comparados linha a linha, chegando às linhas exatas que divergem.
+
+No modo ``repair`` as linhas ausentes ou diferentes na catraca são enviadas
+com o mesmo push em lotes do Easy Setup. Linhas que existem só na catraca
+são apenas reportadas: como no ``push_data``, nada é destruído.
+
+Configuração:
+- ``CATRACA_DRIFT_BUCKET_SIZE``: largura da faixa de ids por balde (padrão 256)
+- ``CATRACA_DRIFT_AUTO_REPAIR``: a task agendada também corrige (padrão: não)
+- ``CATRACA_DRIFT_CHECK_INTERVAL_SECONDS``: intervalo da task no beat (padrão 1h)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping, Sequence
+
+from django.conf import settings
+
+from src.core.__seedwork__.infra.catraca_sync import (
+    REQUIRED_FIELDS_BY_OBJECT,
+    CatracaSyncError,
+)
+from src.core.control_id.infra.control_id_django_app.models import Device
+
+from .easy_setup_engine import (
+    DIFF_EXCLUDED_TABLES,
+    MAX_FAILED_ITEM_REPORTS,
+    PUSH_ORDER,
+    UPSERTABLE_TABLES,
+    EasySetupEngine,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tabelas verificadas, na ordem de push (pais antes das relações).
+DRIFT_TABLES = tuple(
+    table
+    for table in PUSH_ORDER
+    if table in REQUIRED_FIELDS_BY_OBJECT and table not in DIFF_EXCLUDED_TABLES
+)
+
+RowKey = tuple[str, ...]
+
+
+def _int_setting(name: str, default: int, minimum: int = 1) -> int:
+    value = getattr(settings, name, default)
+    try:
+        return max(minimum, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def drift_auto_repair_enabled() -> bool:
+    return bool(getattr(settings, "CATRACA_DRIFT_AUTO_REPAIR", False))
+
+
+def identity_fields(table: str) -> tuple[str, ...]:
+    """
+    Colunas lidas da catraca e comparadas para *table*.
+
+    Entidades usam ``id`` + campos obrigatórios; relações e cartões não têm
+    ``id`` no espelho do banco, então a linha inteira é a identidade.
+    """
+    fields = REQUIRED_FIELDS_BY_OBJECT[table]
+    if table in UPSERTABLE_TABLES:
+        return tuple(fields)
+    return tuple(name for name in fields if name != "id")
+
+
+def _bucket_of(value: str, bucket_size: int) -> int:
+    try:
+        return int(value) // bucket_size
+    except ValueError:
+        return -1
+
+
+def _bucket_digest(rows: Mapping[RowKey, RowKey]) -> str:
+    digest = hashlib.sha256()
+    for row in sorted(rows.values()):
+        digest.update("\x1f".join(row).encode())
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+@dataclass
+class TableTree:
+    """Árvore de hashes de uma tabela: linhas por balde, hash por balde e raiz."""
+
+    fields: tuple[str, ...]
+    key_size: int
+    bucket_size: int
+    buckets: dict[int, dict[RowKey, RowKey]] = field(default_factory=dict)
+    digests: dict[int, str] = field(default_factory=dict)
+    root: str = ""
+    rows: int = 0
+
+    def row_dict(self, key: RowKey) -> dict[str, str]:
+        bucket = self.buckets.get(_bucket_of(key[0], self.bucket_size), {})
+        return dict(zip(self.fields, bucket.get(key, key)))
+
+
+def build_table_tree(
+    table: str, rows: Iterable[Mapping[str, Any]], bucket_size: int
+) -> TableTree:
+    fields = identity_fields(table)
+    tree = TableTree(
+        fields=fields,
+        key_size=1 if table in UPSERTABLE_TABLES else len(fields),
+        bucket_size=bucket_size,
+    )
+    for row in rows:
+        values = tuple(EasySetupEngine._diff_value(row.get(name)) for name in fields)
+        bucket = tree.buckets.setdefault(_bucket_of(values[0], bucket_size), {})
+        bucket[values[: tree.key_size]] = values
+    tree.digests = {index: _bucket_digest(rows) for index, rows in tree.buckets.items()}
+    root = hashlib.sha256()
+    for index in sorted(tree.digests):
+        root.update(f"{index}:{tree.digests[index]}\n".encode())
+    tree.root = root.hexdigest()
+    tree.rows = sum(len(rows) for rows in tree.buckets.values())
+    return tree
+
+
+@dataclass
+class TableDrift:
+    """Linhas divergentes de uma tabela (chaves completas, não amostras)."""
+
+    missing_on_device: list[RowKey] = field(default_factory=list)
+    mismatched: list[RowKey] = field(default_factory=list)
+    device_only: list[RowKey] = field(default_factory=list)
+    buckets_compared: int = 0
+
+    @property
+    def to_push(self) -> list[RowKey]:
+        return self.missing_on_device + self.mismatched
+
+
+def compare_trees(db: TableTree, device: TableTree) -> TableDrift:
+    """Desce só pelos baldes cujo hash difere até as linhas divergentes."""
+    drift = TableDrift()
+    if db.root == device.root:
+        return drift
+    for index in sorted(set(db.digests) | set(device.digests)):
+        if db.digests.get(index) == device.digests.get(index):
+            continue
+        drift.buckets_compared += 1
+        expected = db.buckets.get(index, {})
+        found = device.buckets.get(index, {})
+        for key, row in expected.items():
+            current = found.get(key)
+            if current is None:
+                drift.missing_on_device.append(key)
+            elif current != row:
+                drift.mismatched.append(key)
+        drift.device_only.extend(key for key in found if key not in expected)
+    return drift
+
+
+def _sample(tree: TableTree, keys: Sequence[RowKey]) -> dict[str, Any]:
+    limited = keys[:MAX_FAILED_ITEM_REPORTS]
+    return {
+        "count": len(keys),
+        "rows": [tree.row_dict(key) for key in limited],
+        "truncated": len(keys) > len(limited),
+    }
+
+
+class DriftDetector(EasySetupEngine):
+    """Compara uma catraca com as árvores do banco e, se pedido, corrige o delta."""
+
+    def check_device(
+        self,
+        db_data: Mapping[str, Sequence[Mapping[str, Any]]],
+        db_trees: Mapping[str, TableTree],
+        repair: bool = False,
+    ) -> dict[str, Any]:
+        started = time.monotonic()
+        tables: dict[str, Any] = {}
+        errors: list[str] = []
+        failed: dict[str, str] = {}
+        to_push: dict[str, list[Mapping[str, Any]]] = {}
+
+        for table in DRIFT_TABLES:
+            db_tree = db_trees[table]
+            try:
+                device_rows = self.load_objects(table, fields=list(db_tree.fields))
+            except CatracaSyncError as exc:
+                # Catraca inacessível: não adianta tentar as outras tabelas.
+                if exc.status_code is None or exc.status_code >= 500:
+                    raise
+                tables[table] = {"in_sync": False, "error": str(exc)}
+                errors.append(f"{table}: {exc}")
+                failed[table] = str(exc)
+                continue
+
+            device_tree = build_table_tree(table, device_rows, db_tree.bucket_size)
+            drift = compare_trees(db_tree, device_tree)
+            tables[table] = {
+                "in_sync": db_tree.root == device_tree.root,
+                "db_rows": db_tree.rows,
+                "device_rows": device_tree.rows,
+                "db_digest": db_tree.root,
+                "device_digest": device_tree.root,
+                "buckets": len(db_tree.buckets),
+                "buckets_compared": drift.buckets_compared,
+                "missing_on_device": _sample(db_tree, drift.missing_on_device),
+                "mismatched": _sample(db_tree, drift.mismatched),
+                "device_only": _sample(device_tree, drift.device_only),
+            }
+            if repair and drift.to_push:
+                wanted = set(drift.to_push)
+                to_push[table] = [
+                    row
+                    for row in db_data.get(table, [])
+                    if tuple(
+                        self._diff_value(row.get(name))
+                        for name in db_tree.fields[: db_tree.key_size]
+                    )
+                    in wanted
+                ]
+
+        differing = sum(
+            report["missing_on_device"]["count"]
+            + report["mismatched"]["count"]
+            + report["device_only"]["count"]
+            for report in tables.values()
+            if "error" not in report
+        )
+        result: dict[str, Any] = {
+            "device_id": self.device.id,
+            "device_name": self.device.name,
+            "in_sync": not differing and not errors,
+            "differing_rows": differing,
+            "tables": tables,
+            "errors": errors,
+        }
+        if repair:
+            result["repair"] = self._repair(to_push, failed)
+        result["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        return result
+
+    def _repair(
+        self,
+        to_push: Mapping[str, list[Mapping[str, Any]]],
+        failed: Mapping[str, str],
+    ) -> dict[str, Any]:
+        """
+        Envia só as linhas divergentes, na ordem de push (sem destroy).
+
+        Tabelas que a catraca não deixou ler (*failed*) entram no resultado
+        como não reparadas: o delta delas é desconhecido.
+        """
+        repaired: dict[str, Any] = {}
+        for table in DRIFT_TABLES:
+            if table in failed:
+                repaired[table] = {
+                    "ok": False,
+                    "sent": 0,
+                    "applied": 0,
+                    "errors": 1,
+                    "error": failed[table],
+                }
+                continue
+            values = to_push.get(table)
+            if not values:
+                continue
+            report = self._create_objects_safe(table, values)
+            repaired[table] = {
+                "ok": report["ok"],
+                "sent": len(values),
+                # Entidades vão por create_or_modify e só informam "applied".
+                "applied": report.get("applied", report["created"] + report["modified"]),
+                "errors": report["errors"],
+            }
+            logger.info(
+                "[DRIFT] [%s] %s: %s linhas reenviadas (ok=%s)",
+                self.device.name,
+                table,
+                len(values),
+                report["ok"],
+            )
+        return repaired
+
+
+def detect_drift(
+    devices: Iterable[Device] | None = None, repair: bool = False
+) -> dict[str, Any]:
+    """
+    Gera o relatório de drift de cada catraca (padrão: todas as ativas).
+
+    O banco é lido e transformado em árvores uma única vez; as catracas são
+    verificadas em paralelo pelo fan-out do ``ControlIDSyncMixin``.
+    """
+    devices = list(Device.objects.filter(is_active=True) if devices is None else devices)
+    if not devices:
+        return {"success": False, "error": "Nenhuma catraca ativa encontrada"}
+
+    started = time.monotonic()
+    bucket_size = _int_setting("CATRACA_DRIFT_BUCKET_SIZE", 256)
+    try:
+        db_data = EasySetupEngine().collect_db_data()
+    except ValueError as exc:
+        return {"success": False, "error": str(exc)}
+    db_trees = {
+        table: build_table_tree(table, db_data.get(table, []), bucket_size)
+        for table in DRIFT_TABLES
+    }
+
+    results = DriftDetector()._run_in_devices(
+        devices,
+        lambda worker, device: worker.check_device(db_data, db_trees, repair),
+    )
+
+    reports = []
+    for result in results:
+        if result.ok:
+            report = result.response
+        else:
+            report = {
+                "device_id": result.device.id,
+                "device_name": result.device.name,
+                "in_sync": False,
+                "error": str(result.error),
+            }
+        if not report["in_sync"]:
+            logger.warning(
+                "[DRIFT] [%s] divergente: %s linhas %s",
+                report["device_name"],
+                report.get("differing_rows", "?"),
+                report.get("error") or "",
+            )
+        reports.append(report)
+
+    return {
+        "success": True,
+        "repair": repair,
+        "devices": reports,
+        "in_sync": all(report["in_sync"] for report in reports),
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
@@ -1,17 +1,21 @@
 """
 Easy Setup Engine — Motor de reset e reconfiguração de catracas.
 
-Contém a classe _EasySetupEngine (herda ControlIDSyncMixin) e
-constantes auxiliares usadas pelo setup completo.
+Contém a classe EasySetupEngine (herda ControlIDSyncMixin) e
+constantes auxiliares usadas pelo setup completo. Fica fora de ``views``
+porque as tasks, o snapshot e a detecção de drift também usam o motor.
 """
 
+import json
 import logging
 import time as _time
 from collections.abc import Iterable, Mapping, Sequence
+from contextlib import contextmanager
 from datetime import timedelta
 from typing import Any, Literal, NotRequired, TypedDict
 
 import requests
+from django.conf import settings
 from django.utils import timezone
 
 from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
@@ -38,10 +42,14 @@ from src.core.control_id_config.infra.control_id_config_django_app.models import
     SecurityConfig,
     SystemConfig,
 )
+from src.core.control_id_config.infra.control_id_config_django_app.easy_setup_snapshot import (
+    load_snapshot,
+)
 from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
     MonitorConfig,
 )
 from src.core.user.infra.user_django_app.models import User
+from src.core.user.infra.user_django_app.pin_allocator import PinBitmap, pin_to_index
 
 logger = logging.getLogger(__name__)
 
@@ -87,7 +95,7 @@ PUSH_ORDER = [
 # Quando já existe um registro com o mesmo ID na catraca (ex: defaults
 # criados pelo firmware após factory reset), usa modify_objects para
 # ATUALIZAR com os dados corretos do Django DB, em vez de apenas pular.
-_UPSERTABLE_TABLES = frozenset(
+UPSERTABLE_TABLES = frozenset(
     {
         "users",
         "time_zones",
@@ -99,6 +107,10 @@ _UPSERTABLE_TABLES = frozenset(
     }
 )
 
+# Tabelas que NÃO passam pelo diff antes do push. Para biometria, ler os
+# blobs da catraca custa tanto quanto reenviá-los.
+DIFF_EXCLUDED_TABLES = frozenset({"templates"})
+
 _DUPLICATE_ERROR_MARKERS = (
     "unique",
     "constraint",
@@ -111,12 +123,51 @@ _DUPLICATE_ERROR_MARKERS = (
 
 
 _CREATE_CHUNK_LADDER = (100, 50, 10, 5, 1)
-_MAX_FAILED_ITEM_REPORTS = 20
+_SNAPSHOT_CHUNK_SIZE = 2000
+_REBOOT_START_TIMEOUT_S = 15
+
+
+def _probe_interval() -> float:
+    """Intervalo entre sondas de prontidão (``EASY_SETUP_PROBE_INTERVAL_SECONDS``)."""
+    value = getattr(settings, "EASY_SETUP_PROBE_INTERVAL_SECONDS", 2)
+    try:
+        return max(0.05, float(value))
+    except (TypeError, ValueError):
+        return 2.0
+
+
+def _firmware_settle_seconds() -> float:
+    value = getattr(settings, "EASY_SETUP_FIRMWARE_SETTLE_SECONDS", 35)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 35.0
+
+
+def _diff_push_enabled() -> bool:
+    return bool(getattr(settings, "EASY_SETUP_DIFF_PUSH", True))
+
+
+@contextmanager
+def _timed_stage(report: dict[str, Any], name: str):
+    """Registra em ``report["timings"][name]`` quanto a etapa levou."""
+    started = _time.monotonic()
+    try:
+        yield
+    finally:
+        report.setdefault("timings", {})[name] = round(
+            _time.monotonic() - started, 3
+        )
+
+
+MAX_FAILED_ITEM_REPORTS = 20
 
 DevicePayload = dict[str, Any]
 PushOperation = Literal["create", "modify", "create_or_modify"]
 DuplicateMode = Literal["skip", "modify", "error"]
-PushStrategy = Literal["batch", "dynamic_chunks", "create_or_modify", "skipped"]
+PushStrategy = Literal[
+    "batch", "dynamic_chunks", "create_or_modify", "skipped", "diff"
+]
 
 
 class ChunkStageReport(TypedDict):
@@ -136,6 +187,14 @@ class FailedItemReport(TypedDict):
     detail: str
 
 
+class DiffReport(TypedDict):
+    on_device: int
+    to_create: int
+    to_modify: int
+    unchanged: int
+    device_only: int
+
+
 class PushReport(TypedDict):
     ok: bool
     count: int
@@ -156,19 +215,31 @@ class PushReport(TypedDict):
     initial_detail: NotRequired[str]
     detail: NotRequired[str]
     error: NotRequired[str]
+    diff: NotRequired[DiffReport]
+    rows_skipped: NotRequired[int]
+    bytes_sent: NotRequired[int]
+    requests_sent: NotRequired[int]
+    requests_saved: NotRequired[int]
 
 
-class _EasySetupEngine(ControlIDSyncMixin):
+class EasySetupEngine(ControlIDSyncMixin):
     """
     Herda ControlIDSyncMixin para reutilizar login, _make_request, etc.
     Opera em UM device por vez (set_device antes de cada uso).
     """
 
+    # Contadores do push da tabela corrente (zerados em _push_table).
+    _push_bytes_sent = 0
+    _push_requests_sent = 0
+    # Tempos por etapa do último run_full_setup, preenchidos durante a execução.
+    stage_timings: dict[str, float] | None = None
+
     def _wait_for_device_online(
         self,
         max_attempts=24,
         interval_s=5,
         credentials_to_try=None,
+        deadline_s=None,
     ):
         """
         Aguarda a catraca voltar a responder ao login apos reboot/reset.
@@ -183,7 +254,12 @@ class _EasySetupEngine(ControlIDSyncMixin):
                 (_FACTORY_LOGIN, _FACTORY_PASSWORD),
             ]
 
-        for attempt in range(1, max_attempts + 1):
+        deadline = _time.monotonic() + deadline_s if deadline_s else None
+        attempt = 0
+        while attempt < max_attempts or (
+            deadline is not None and _time.monotonic() < deadline
+        ):
+            attempt += 1
             for login_user, login_pass in credentials_to_try:
                 try:
                     resp = requests.post(
@@ -208,12 +284,15 @@ class _EasySetupEngine(ControlIDSyncMixin):
                 f"[EASY_SETUP] [{self.device.name}] "
                 f"Tentativa {attempt}/{max_attempts} - device ainda indisponivel..."
             )
+            if deadline is not None and _time.monotonic() >= deadline:
+                break
             _time.sleep(interval_s)
 
         return {
             "ok": False,
             "error": (
-                f"Device nao voltou a responder login apos {max_attempts * interval_s}s"
+                "Device nao voltou a responder login apos "
+                f"{deadline_s or max_attempts * interval_s}s"
             ),
         }
 
@@ -428,60 +507,66 @@ class _EasySetupEngine(ControlIDSyncMixin):
         except Exception as e:
             return {"ok": False, "error": f"Erro ao enviar factory reset: {e}"}
 
-        # Invalidar sessão e aguardar reboot
+        # Invalidar sessão e aguardar reboot: primeiro espera a API cair
+        # (o comando responde antes do reboot começar), depois sonda o login
+        # até voltar — sem sleeps fixos.
         self.session = None
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] "
-            "Factory reset enviado, aguardando reboot (~15s)..."
+            "Factory reset enviado, aguardando reboot..."
         )
-        _time.sleep(15)
+        result["reboot_started"] = self._wait_for_reboot_start()
 
-        # Polling até o device voltar online
-        credentials_to_try = [
-            (self.device.username, self.device.password),
-            (_FACTORY_LOGIN, _FACTORY_PASSWORD),
-        ]
-
-        for attempt in range(12):
-            for login_user, login_pass in credentials_to_try:
-                try:
-                    resp = requests.post(
-                        self.get_url("login.fcgi"),
-                        json={"login": login_user, "password": login_pass},
-                        timeout=5,
-                    )
-                    if resp.status_code == 200 and resp.json().get("session"):
-                        self.session = resp.json()["session"]
-                        used_defaults = (
-                            login_user != self.device.username
-                            or login_pass != self.device.password
-                        )
-                        result["ok"] = True
-                        result["reboot_attempts"] = attempt + 1
-                        if used_defaults:
-                            result["used_default_credentials"] = True
-                            result["warning"] = (
-                                "Factory reset resetou credenciais para admin/admin. "
-                                "Atualize username/password do device no Django."
-                            )
-                        logger.info(
-                            f"[EASY_SETUP] [{self.device.name}] "
-                            f"Online após reboot (tentativa {attempt + 1})"
-                        )
-                        return result
-                except Exception:
-                    pass
+        online = self._wait_for_device_online(
+            max_attempts=12,
+            interval_s=_probe_interval(),
+            deadline_s=75,
+        )
+        if not online["ok"]:
+            result["ok"] = False
+            result["error"] = "Device não voltou após factory reset (timeout ~75s)"
+            return result
 
-            logger.debug(
-                f"[EASY_SETUP] [{self.device.name}] "
-                f"Tentativa {attempt + 1}/12 — device ainda reiniciando..."
+        result["ok"] = True
+        result["reboot_attempts"] = online["attempts"]
+        if online["used_default_credentials"]:
+            result["used_default_credentials"] = True
+            result["warning"] = (
+                "Factory reset resetou credenciais para admin/admin. "
+                "Atualize username/password do device no Django."
             )
-            _time.sleep(5)
-
-        result["ok"] = False
-        result["error"] = "Device não voltou após factory reset (timeout ~75s)"
+        logger.info(
+            f"[EASY_SETUP] [{self.device.name}] "
+            f"Online após reboot (tentativa {online['attempts']})"
+        )
         return result
 
+    def _wait_for_reboot_start(self, timeout_s=_REBOOT_START_TIMEOUT_S):
+        """
+        Sonda a catraca até ela parar de responder (reboot em andamento).
+
+        Retorna False se ela continuar respondendo até *timeout_s* — mesmo
+        comportamento do antigo sleep fixo: segue para o polling de volta.
+        """
+        deadline = _time.monotonic() + timeout_s
+        interval = min(_probe_interval(), 1.0)
+        while _time.monotonic() < deadline:
+            try:
+                resp = requests.post(
+                    self.get_url("login.fcgi"),
+                    json={
+                        "login": self.device.username,
+                        "password": self.device.password,
+                    },
+                    timeout=2,
+                )
+                if resp.status_code != 200:
+                    return True
+            except requests.RequestException:
+                return True
+            _time.sleep(interval)
+        return False
+
     # ── 2. Desabilitar identifier (pin/card off) ───────────────────────────
     def disable_identifier(self):
         """
@@ -991,11 +1076,31 @@ class _EasySetupEngine(ControlIDSyncMixin):
     def _find_duplicate_pin_payloads(
         pins: Sequence[Mapping[str, Any]],
     ) -> list[dict[str, Any]]:
-        grouped: dict[str, list[dict[str, Any]]] = {}
+        # Primeira passada só com bitmaps (valores fora de 0000-9999 num set);
+        # a segunda agrupa apenas os PINs repetidos.
+        seen, repeated = PinBitmap(), PinBitmap()
+        seen_other: set[str] = set()
+        repeated_other: set[str] = set()
         for pin in pins:
             value = str(pin.get("value") or "").strip()
             if not value:
                 continue
+            if pin_to_index(value) is None:
+                if value in seen_other:
+                    repeated_other.add(value)
+                seen_other.add(value)
+            elif value in seen:
+                repeated.add(value)
+            else:
+                seen.add(value)
+        if not len(repeated) and not repeated_other:
+            return []
+
+        grouped: dict[str, list[dict[str, Any]]] = {}
+        for pin in pins:
+            value = str(pin.get("value") or "").strip()
+            if value not in repeated and value not in repeated_other:
+                continue
             grouped.setdefault(value, []).append(
                 {
                     "user_id": pin.get("user_id"),
@@ -1058,8 +1163,16 @@ class _EasySetupEngine(ControlIDSyncMixin):
         para esta catraca.
         """
         # O backend Django é a fonte de verdade. As catracas recebem um
-        # espelho do estado global salvo no banco.
-        users_qs = User.objects.all().order_by("id")
+        # espelho do estado global salvo no banco. Tudo é lido com
+        # values_list/iterator: nada de instâncias de model nem cache do
+        # queryset, mesmo com dezenas de milhares de usuários.
+        users_rows = (
+            User.objects.order_by("id")
+            .values_list(
+                "id", "name", "registration", "is_staff", "is_superuser", "pin"
+            )
+            .iterator(chunk_size=_SNAPSHOT_CHUNK_SIZE)
+        )
 
         data = {}
 
@@ -1069,32 +1182,32 @@ class _EasySetupEngine(ControlIDSyncMixin):
         pins_list = []
         eligible_user_ids = set()
         skipped_users = []
-        for u in users_qs:
-            name = (u.name or "").strip()
+        for user_id, raw_name, raw_registration, is_staff, is_superuser, pin in users_rows:
+            name = (raw_name or "").strip()
             if not name:
-                skipped_users.append({"user_id": u.id, "reason": "empty_name"})
+                skipped_users.append({"user_id": user_id, "reason": "empty_name"})
                 continue
 
-            payload = {"id": u.id, "name": name}
+            payload = {"id": user_id, "name": name}
 
-            registration = (u.registration or "").strip()
-            is_admin_user = bool(u.is_staff or u.is_superuser)
+            registration = (raw_registration or "").strip()
+            is_admin_user = bool(is_staff or is_superuser)
             if not registration and not is_admin_user:
                 skipped_users.append(
-                    {"user_id": u.id, "reason": "missing_registration"}
+                    {"user_id": user_id, "reason": "missing_registration"}
                 )
                 continue
             if registration:
                 payload["registration"] = registration
 
             users_list.append(payload)
-            eligible_user_ids.add(u.id)
+            eligible_user_ids.add(user_id)
 
             if is_admin_user:
-                user_roles_list.append({"user_id": u.id, "role": 1})
+                user_roles_list.append({"user_id": user_id, "role": 1})
 
-            if u.pin:
-                pins_list.append({"user_id": u.id, "name": u.name, "value": u.pin})
+            if pin:
+                pins_list.append({"user_id": user_id, "name": raw_name, "value": pin})
 
         duplicate_pins = self._find_duplicate_pin_payloads(pins_list)
         if duplicate_pins:
@@ -1162,18 +1275,24 @@ class _EasySetupEngine(ControlIDSyncMixin):
             Portal.objects.values("id", "name", "area_from_id", "area_to_id")
         )
 
-        # Relações (filtradas por users deste device onde aplicável)
-        data["user_groups"] = list(
-            UserGroup.objects.filter(user_id__in=eligible_user_ids).values(
+        # Relações (filtradas por users deste device onde aplicável).
+        # O filtro é feito em Python: um IN com todos os ids elegíveis
+        # ficaria enorme em campus com dezenas de milhares de usuários.
+        data["user_groups"] = [
+            {"user_id": user_id, "group_id": group_id}
+            for user_id, group_id in UserGroup.objects.values_list(
                 "user_id", "group_id"
-            )
-        )
+            ).iterator(chunk_size=_SNAPSHOT_CHUNK_SIZE)
+            if user_id in eligible_user_ids
+        ]
 
-        data["user_access_rules"] = list(
-            UserAccessRule.objects.filter(user_id__in=eligible_user_ids).values(
+        data["user_access_rules"] = [
+            {"user_id": user_id, "access_rule_id": rule_id}
+            for user_id, rule_id in UserAccessRule.objects.values_list(
                 "user_id", "access_rule_id"
-            )
-        )
+            ).iterator(chunk_size=_SNAPSHOT_CHUNK_SIZE)
+            if user_id in eligible_user_ids
+        ]
 
         data["group_access_rules"] = list(
             GroupAccessRule.objects.values("group_id", "access_rule_id")
@@ -1189,24 +1308,27 @@ class _EasySetupEngine(ControlIDSyncMixin):
 
         # Cards
         data["cards"] = []
-        for card in Card.objects.filter(user_id__in=eligible_user_ids).values(
-            "user_id", "value"
+        for user_id, value in Card.objects.values_list("user_id", "value").iterator(
+            chunk_size=_SNAPSHOT_CHUNK_SIZE
         ):
+            if user_id not in eligible_user_ids:
+                continue
             # A API da Control iD espera int64 em cards.value. O campo local e
             # texto para acomodar importacoes, entao normalizamos quando seguro.
-            normalized = dict(card)
             try:
-                normalized["value"] = int(str(normalized["value"]).strip())
+                value = int(str(value).strip())
             except (TypeError, ValueError):
                 pass
-            data["cards"].append(normalized)
+            data["cards"].append({"user_id": user_id, "value": value})
 
         # Templates (biometria)
-        data["templates"] = list(
-            Template.objects.filter(user_id__in=eligible_user_ids).values(
+        data["templates"] = [
+            {"user_id": user_id, "template": template}
+            for user_id, template in Template.objects.values_list(
                 "user_id", "template"
-            )
-        )
+            ).iterator(chunk_size=_SNAPSHOT_CHUNK_SIZE)
+            if user_id in eligible_user_ids
+        ]
 
         return data
 
@@ -1343,7 +1465,7 @@ class _EasySetupEngine(ControlIDSyncMixin):
 
             # Se batch falhou por constraint, estratégia depende do tipo
             if self._looks_like_duplicate_error(body) or "FOREIGN KEY" in body:
-                if table in _UPSERTABLE_TABLES:
+                if table in UPSERTABLE_TABLES:
                     # Entity table → upsert (modify existing + create new)
                     return self._upsert_entity_objects(table, values)
                 else:
@@ -1355,7 +1477,7 @@ class _EasySetupEngine(ControlIDSyncMixin):
                 f"[EASY_SETUP] create_objects({table}) falhou: "
                 f"HTTP {resp.status_code} — {body}"
             )
-            if table in _UPSERTABLE_TABLES:
+            if table in UPSERTABLE_TABLES:
                 logger.info(
                     f"[EASY_SETUP] create_objects({table}) "
                     "falhou em batch; tentando upsert item a item..."
@@ -1502,34 +1624,44 @@ class _EasySetupEngine(ControlIDSyncMixin):
         except Exception:
             return str(response)[:500]
 
-    def _post_create_objects(
-        self, table: str, values: Sequence[DevicePayload], *, timeout: int = 60
+    def _post_objects(
+        self,
+        endpoint: str,
+        table: str,
+        values: Sequence[DevicePayload],
+        *,
+        timeout: int = 60,
     ) -> requests.Response:
+        body = {"object": table, "values": values}
+        # Contabiliza o que realmente trafega, para o relatório do diff.
+        self._push_bytes_sent += len(json.dumps(body, separators=(",", ":")))
+        self._push_requests_sent += 1
         sess = self.login()
         return requests.post(
-            self.get_url(f"create_objects.fcgi?session={sess}"),
-            json={"object": table, "values": values},
+            self.get_url(f"{endpoint}?session={sess}"),
+            json=body,
             timeout=timeout,
         )
 
+    def _post_create_objects(
+        self, table: str, values: Sequence[DevicePayload], *, timeout: int = 60
+    ) -> requests.Response:
+        return self._post_objects(
+            "create_objects.fcgi", table, values, timeout=timeout
+        )
+
     def _post_create_or_modify_objects(
         self, table: str, values: Sequence[DevicePayload], *, timeout: int = 60
     ) -> requests.Response:
-        sess = self.login()
-        return requests.post(
-            self.get_url(f"create_or_modify_objects.fcgi?session={sess}"),
-            json={"object": table, "values": values},
-            timeout=timeout,
+        return self._post_objects(
+            "create_or_modify_objects.fcgi", table, values, timeout=timeout
         )
 
     def _post_modify_objects(
         self, table: str, values: Sequence[DevicePayload], *, timeout: int = 60
     ) -> requests.Response:
-        sess = self.login()
-        return requests.post(
-            self.get_url(f"modify_objects.fcgi?session={sess}"),
-            json={"object": table, "values": values},
-            timeout=timeout,
+        return self._post_objects(
+            "modify_objects.fcgi", table, values, timeout=timeout
         )
 
     def _item_identity(self, item: Any) -> DevicePayload:
@@ -1640,7 +1772,7 @@ class _EasySetupEngine(ControlIDSyncMixin):
         status: int | None,
         detail: str,
     ) -> None:
-        if len(report["failed_items"]) >= _MAX_FAILED_ITEM_REPORTS:
+        if len(report["failed_items"]) >= MAX_FAILED_ITEM_REPORTS:
             report["failed_items_truncated"] = True
             return
 
@@ -1839,6 +1971,7 @@ class _EasySetupEngine(ControlIDSyncMixin):
             result.get("created"),
             result.get("modified"),
             result.get("skipped_unique"),
+            result.get("rows_skipped"),
         )
         if any(isinstance(value, int) for value in counters):
             return sum(value for value in counters if isinstance(value, int))
@@ -1989,7 +2122,7 @@ class _EasySetupEngine(ControlIDSyncMixin):
         if not values:
             return self._new_skipped_push_report()
 
-        if table in _UPSERTABLE_TABLES:
+        if table in UPSERTABLE_TABLES:
             return self._create_or_modify_entity_objects(table, values)
 
         try:
@@ -2025,6 +2158,158 @@ class _EasySetupEngine(ControlIDSyncMixin):
             initial_detail=initial_detail,
         )
 
+    def _load_device_rows(
+        self, table: str, fields: Sequence[str]
+    ) -> list[DevicePayload] | None:
+        """
+        Lê da catraca só as colunas informadas de uma tabela.
+
+        Retorna ``None`` se a leitura falhar; quem chama trata isso como
+        "estado desconhecido" e volta para o push completo.
+        """
+        try:
+            sess = self.login()
+            self._push_requests_sent += 1
+            resp = requests.post(
+                self.get_url(f"load_objects.fcgi?session={sess}"),
+                json={"object": table, "fields": list(fields)},
+                timeout=30,
+            )
+            if resp.status_code != 200:
+                return None
+            rows = resp.json().get(table, [])
+            return rows if isinstance(rows, list) else None
+        except Exception as exc:
+            logger.debug(
+                "[EASY_SETUP] [%s] load_objects(%s) falhou no diff: %s",
+                self.device.name,
+                table,
+                exc,
+            )
+            return None
+
+    @staticmethod
+    def _diff_value(value: Any) -> str:
+        # O firmware devolve números ora como int, ora como string.
+        return "" if value is None else str(value)
+
+    def _diff_row_key(self, row: Mapping[str, Any], key_fields: Sequence[str]):
+        return tuple(self._diff_value(row.get(field)) for field in key_fields)
+
+    def _diff_table(
+        self, table: str, values: Sequence[DevicePayload]
+    ) -> tuple[list[DevicePayload], DiffReport] | None:
+        """
+        Compara o snapshot do banco com o que já está na catraca.
+
+        - entidades (``id``): ausente → criar; campos diferentes → atualizar;
+          idêntica → pular;
+        - relações, cartões e PINs: a linha inteira é a chave; ausente →
+          criar, presente → pular.
+
+        Retorna o delta na ordem original do snapshot. Linhas que existem só
+        na catraca são apenas contadas: o push nunca destrói nada.
+        """
+        fields = sorted({field for value in values for field in value})
+        rows = self._load_device_rows(table, fields)
+        if rows is None:
+            return None
+
+        is_entity = table in UPSERTABLE_TABLES
+        key_fields = ("id",) if is_entity else fields
+        on_device = {self._diff_row_key(row, key_fields): row for row in rows}
+
+        delta: list[DevicePayload] = []
+        to_create = to_modify = 0
+        seen = set()
+        for value in values:
+            key = self._diff_row_key(value, key_fields)
+            seen.add(key)
+            current = on_device.get(key)
+            if current is None:
+                to_create += 1
+                delta.append(value)
+            elif is_entity and any(
+                self._diff_value(current.get(field)) != self._diff_value(item)
+                for field, item in value.items()
+            ):
+                to_modify += 1
+                delta.append(value)
+
+        diff: DiffReport = {
+            "on_device": len(on_device),
+            "to_create": to_create,
+            "to_modify": to_modify,
+            "unchanged": len(values) - len(delta),
+            "device_only": len(set(on_device) - seen),
+        }
+        return delta, diff
+
+    def _push_table(self, table: str, values: Sequence[DevicePayload]) -> PushReport:
+        """
+        Envia uma tabela transmitindo apenas o delta em relação à catraca.
+
+        Sem diff (desligado, tabela excluída ou leitura falhou) o caminho é
+        o ``_create_objects_safe`` completo de sempre.
+        """
+        self._push_bytes_sent = 0
+        self._push_requests_sent = 0
+
+        diffed = None
+        if values and _diff_push_enabled() and table not in DIFF_EXCLUDED_TABLES:
+            diffed = self._diff_table(table, values)
+
+        if diffed is None:
+            report = self._create_objects_safe(table, values)
+            report["bytes_sent"] = self._push_bytes_sent
+            report["requests_sent"] = self._push_requests_sent
+            return report
+
+        delta, diff = diffed
+        if delta:
+            report = self._create_objects_safe(table, delta)
+        else:
+            report = self._new_success_push_report(
+                table, values, note="diff_unchanged", strategy="diff"
+            )
+        report["count"] = len(values)
+        report["diff"] = diff
+        report["rows_skipped"] = diff["unchanged"]
+        report["bytes_sent"] = self._push_bytes_sent
+        report["requests_sent"] = self._push_requests_sent
+        report["requests_saved"] = max(
+            0,
+            self._blind_push_request_estimate(table, len(values), diff["unchanged"])
+            - self._push_requests_sent,
+        )
+
+        logger.info(
+            "[EASY_SETUP] [%s] %s: diff %s criar, %s atualizar, %s iguais "
+            "(%s bytes enviados)",
+            self.device.name,
+            table,
+            diff["to_create"],
+            diff["to_modify"],
+            diff["unchanged"],
+            self._push_bytes_sent,
+        )
+        return report
+
+    @staticmethod
+    def _blind_push_request_estimate(table: str, count: int, existing: int) -> int:
+        """
+        Estimativa mínima de requisições do push "cria tudo por cima".
+
+        Entidades vão num único ``create_or_modify_objects``. Nas demais
+        tabelas cada linha já existente derruba o lote e só se resolve no
+        degrau de 1 registro da escada de chunks.
+        """
+        if not count:
+            return 0
+        if table in UPSERTABLE_TABLES:
+            return 1
+        return 1 + existing
+
     def push_data(self, data):
         """
         Envia os dados coletados para a catraca SEM DESTRUIR NADA.
@@ -2040,7 +2325,9 @@ class _EasySetupEngine(ControlIDSyncMixin):
 
         Estratégia COMPROVADA:
           1. Corrigir access_rules type=0 → type=1 (modify_objects)
-          2. Criar TUDO com create_objects (UNIQUE → skip, dado já existe)
+          2. Comparar cada tabela com a catraca (load_objects só com as
+             colunas do payload) e enviar apenas o delta; se a leitura
+             falhar, criar TUDO com create_objects (UNIQUE → skip)
           3. Nenhum destroy em nenhuma tabela
 
         Após factory reset, a catraca preserva dados estruturais
@@ -2063,16 +2350,16 @@ class _EasySetupEngine(ControlIDSyncMixin):
         # crasha se portal é vinculado a regra sem time_zone).
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] "
-            "Fase 2 — create por cima (sem destroy)..."
+            "Fase 2 — push do delta por cima (sem destroy)..."
         )
         for table in PUSH_ORDER:
             values = data.get(table, [])
-            results[table] = self._create_objects_safe(table, values)
+            results[table] = self._push_table(table, values)
 
         return results
 
     # ── Orquestrador completo ───────────────────────────────────────────────
-    def run_full_setup(self):
+    def run_full_setup(self, snapshot_digest=None):
         """
         Executa o setup completo num único device.
 
@@ -2080,109 +2367,141 @@ class _EasySetupEngine(ControlIDSyncMixin):
         estruturais (groups, rules, portals, etc.) e limpa users/pins.
         NUNCA destruir tabelas — apenas criar por cima (UNIQUE → skip).
 
-        Retorna dict com resultado de cada etapa.
+        ``snapshot_digest`` aponta para a fotografia do banco montada uma vez
+        pela task-mãe (ver ``easy_setup_snapshot``); sem ela, ou se o artefato
+        não estiver disponível, os dados são coletados aqui mesmo.
+
+        Retorna dict com resultado de cada etapa e ``timings`` (segundos por
+        etapa).
         """
-        report = {"device": self.device.name, "steps": {}}
+        report = {"device": self.device.name, "steps": {}, "timings": {}}
+        self.stage_timings = report["timings"]
         t0 = _time.monotonic()
 
-        report["steps"]["pause_offline_detection"] = (
-            self._pause_monitor_offline_detection()
-        )
-
-        # Etapa 1 — Login
-        try:
-            self.login(force_new=True)
-            report["steps"]["login"] = {"ok": True}
-        except Exception as e:
-            report["steps"]["login"] = {"ok": False, "error": str(e)}
+        def finish():
             report["elapsed_s"] = round(_time.monotonic() - t0, 2)
             return report
 
+        with _timed_stage(report, "pause_offline_detection"):
+            report["steps"]["pause_offline_detection"] = (
+                self._pause_monitor_offline_detection()
+            )
+
+        # Etapa 1 — Login
+        with _timed_stage(report, "login"):
+            try:
+                self.login(force_new=True)
+                report["steps"]["login"] = {"ok": True}
+            except Exception as e:
+                report["steps"]["login"] = {"ok": False, "error": str(e)}
+        if not report["steps"]["login"]["ok"]:
+            return finish()
+
         # Etapa 2 — Factory reset (mantém rede)
         # Limpa users/pins/cards/templates e reseta configs.
         # Preserva: groups, access_rules, portals, areas, time_zones,
         # time_spans, e todas as junções estruturais.
         # Etapa 1.5: validar dados locais antes de resetar a catraca.
-        report["steps"]["preflight"] = self.validate_data_integrity()
+        with _timed_stage(report, "preflight"):
+            report["steps"]["preflight"] = self.validate_data_integrity()
         if not report["steps"]["preflight"].get("ok"):
             logger.error(
                 "[EASY_SETUP] [%s] Preflight FALHOU: %s",
                 self.device.name,
                 report["steps"]["preflight"].get("error"),
             )
-            report["elapsed_s"] = round(_time.monotonic() - t0, 2)
-            return report
+            return finish()
 
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] Factory reset (keep_network)..."
         )
-        report["steps"]["factory_reset"] = self.factory_reset()
+        with _timed_stage(report, "factory_reset"):
+            report["steps"]["factory_reset"] = self.factory_reset()
         if not report["steps"]["factory_reset"].get("ok"):
             logger.error(
                 f"[EASY_SETUP] [{self.device.name}] Factory reset FALHOU — abortando"
             )
-            report["elapsed_s"] = round(_time.monotonic() - t0, 2)
-            return report
+            return finish()
 
         # Etapa 3 — Acertar data/hora
         logger.info(f"[EASY_SETUP] [{self.device.name}] Acertando relógio...")
-        report["steps"]["datetime"] = self.set_datetime()
+        with _timed_stage(report, "datetime"):
+            report["steps"]["datetime"] = self.set_datetime()
 
         # Etapa 4 — Configurar monitor
         logger.info(f"[EASY_SETUP] [{self.device.name}] Configurando monitor...")
-        report["steps"]["monitor"] = self.configure_monitor()
+        with _timed_stage(report, "monitor"):
+            report["steps"]["monitor"] = self.configure_monitor()
 
         # Etapa 5 — Aguardar firmware init completa (~35s)
         # O firmware V5.18.3 tem init atrasada que pode criar
         # access_rules type=0 e alterar configs. Esperamos antes de
-        # corrigir/criar dados para não ter race condition.
+        # corrigir/criar dados para não ter race condition. Espera fixa:
+        # a catraca não expõe um sinal confiável de fim da init (as regras
+        # type=0 só aparecem minutos depois do boot).
+        settle_s = _firmware_settle_seconds()
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] "
-            "Aguardando firmware completar init (~35s)..."
+            f"Aguardando firmware completar init (~{settle_s:g}s)..."
         )
-        _time.sleep(35)
+        with _timed_stage(report, "firmware_settle"):
+            _time.sleep(settle_s)
 
         # Etapa 6 — Corrigir access_rules type=0 e enviar dados
         # Primeiro corrige type=0 (modify_objects), depois cria
         # TUDO por cima (create_objects). UNIQUE → skip.
         # ⚠️ NENHUM destroy_objects é usado!
-        logger.info(f"[EASY_SETUP] [{self.device.name}] Coletando dados do DB...")
-        db_data = self.collect_db_data()
+        with _timed_stage(report, "collect"):
+            db_data = load_snapshot(snapshot_digest)
+            report["db_snapshot"] = {
+                "digest": snapshot_digest,
+                "reused": db_data is not None,
+            }
+            if db_data is None:
+                logger.info(
+                    f"[EASY_SETUP] [{self.device.name}] Coletando dados do DB..."
+                )
+                db_data = self.collect_db_data()
 
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] "
             "Enviando dados (create por cima, sem destroy)..."
         )
-        report["steps"]["push"] = self.push_data(db_data)
+        with _timed_stage(report, "push"):
+            report["steps"]["push"] = self.push_data(db_data)
 
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] "
             "Sincronizando tabela devices para intertravamento/rede..."
         )
-        report["steps"]["network_devices"] = self.sync_network_devices()
+        with _timed_stage(report, "network_devices"):
+            report["steps"]["network_devices"] = self.sync_network_devices()
 
         # Etapa 7 — Configurações do device
         # Envia todas as configs (identifier, catra, general, push_server).
         logger.info(f"[EASY_SETUP] [{self.device.name}] Enviando configurações...")
-        report["steps"]["device_settings"] = self.configure_device_settings()
+        with _timed_stage(report, "device_settings"):
+            report["steps"]["device_settings"] = self.configure_device_settings()
 
         logger.info(
             f"[EASY_SETUP] [{self.device.name}] "
             "Configurando intertravamento via rede..."
         )
-        report["steps"]["network_interlock"] = self.configure_network_interlock()
-
-        report["steps"]["persist_applied_configs"] = (
-            self._persist_applied_configs_to_database(
-                persist_monitor=report["steps"]["monitor"].get("ok", False),
-                persist_device_settings=(
-                    report["steps"]["device_settings"].get("ok", False)
-                    and report["steps"]["network_interlock"].get("ok", False)
-                ),
+        with _timed_stage(report, "network_interlock"):
+            report["steps"]["network_interlock"] = self.configure_network_interlock()
+
+        with _timed_stage(report, "persist_applied_configs"):
+            report["steps"]["persist_applied_configs"] = (
+                self._persist_applied_configs_to_database(
+                    persist_monitor=report["steps"]["monitor"].get("ok", False),
+                    persist_device_settings=(
+                        report["steps"]["device_settings"].get("ok", False)
+                        and report["steps"]["network_interlock"].get("ok", False)
+                    ),
+                )
             )
-        )
 
-        report["elapsed_s"] = round(_time.monotonic() - t0, 2)
+        finish()
 
         # Resumo rápido
         push = report["steps"]["push"]
@@ -0,0 +1,153 @@
+"""
+Fotografia compartilhada do banco para o Easy Setup.
+
+O payload enviado às catracas é o mesmo espelho global do banco para todos os
+devices. Em vez de cada subtask refazer as queries, a task-mãe coleta os dados
+uma vez e grava um artefato compactado em disco, endereçado pelo hash do
+conteúdo (``sha256`` do JSON canônico). As subtasks recebem só o hash e leem o
+artefato; se ele não existir naquele host (worker em outra máquina) ou o
+conteúdo não bater com o hash, a subtask coleta do banco como antes.
+
+Configuração:
+- ``EASY_SETUP_SNAPSHOT_DIR``: diretório dos artefatos (padrão: ``<tmp>/easy_setup_snapshots``)
+- ``EASY_SETUP_SNAPSHOT_TTL_SECONDS``: idade máxima de um artefato (padrão: 6h)
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_SUFFIX = ".json.gz"
+
+
+def _snapshot_dir() -> Path:
+    configured = getattr(settings, "EASY_SETUP_SNAPSHOT_DIR", "")
+    return Path(configured or os.path.join(tempfile.gettempdir(), "easy_setup_snapshots"))
+
+
+def _snapshot_ttl() -> float:
+    value = getattr(settings, "EASY_SETUP_SNAPSHOT_TTL_SECONDS", 6 * 3600)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 6 * 3600.0
+
+
+def _canonical_bytes(data: dict[str, Any]) -> bytes:
+    return json.dumps(
+        data, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def _path_for(digest: str) -> Path:
+    return _snapshot_dir() / f"{digest}{_SUFFIX}"
+
+
+def _prune_expired(directory: Path) -> None:
+    ttl = _snapshot_ttl()
+    now = time.time()
+    for path in directory.glob(f"*{_SUFFIX}"):
+        try:
+            if now - path.stat().st_mtime > ttl:
+                path.unlink()
+        except OSError:
+            continue
+
+
+def store_snapshot(data: dict[str, Any]) -> str:
+    """Grava o artefato e retorna o hash do conteúdo."""
+    payload = _canonical_bytes(data)
+    digest = hashlib.sha256(payload).hexdigest()
+    directory = _snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = _path_for(digest)
+
+    if path.exists():
+        # Mesmo conteúdo de uma execução anterior: só renova o mtime.
+        os.utime(path)
+    else:
+        fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(
+                fileobj=raw, mode="wb", compresslevel=6, mtime=0
+            ) as gz:
+                gz.write(payload)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    _prune_expired(directory)
+    logger.info(
+        "[EASY_SETUP_SNAPSHOT] Snapshot %s gravado (%d bytes JSON)",
+        digest[:12],
+        len(payload),
+    )
+    return digest
+
+
+def load_snapshot(digest: str | None) -> dict[str, Any] | None:
+    """
+    Lê o artefato do hash informado.
+
+    Retorna ``None`` se o hash for vazio, o arquivo não existir neste host ou
+    o conteúdo não corresponder ao hash.
+    """
+    if not digest:
+        return None
+    path = _path_for(digest)
+    try:
+        with gzip.open(path, "rb") as gz:
+            payload = gz.read()
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError) as exc:
+        logger.warning("[EASY_SETUP_SNAPSHOT] Snapshot %s ilegível: %s", digest[:12], exc)
+        return None
+
+    if hashlib.sha256(payload).hexdigest() != digest:
+        logger.warning("[EASY_SETUP_SNAPSHOT] Snapshot %s corrompido", digest[:12])
+        return None
+    return json.loads(payload)
+
+
+def build_snapshot() -> str | None:
+    """
+    Coleta os dados do banco uma vez e grava o artefato.
+
+    Retorna ``None`` se a coleta falhar (ex.: PINs duplicados): cada device
+    então coleta por conta própria e reporta o erro no seu preflight.
+    """
+    from .easy_setup_engine import EasySetupEngine
+
+    started = time.monotonic()
+    try:
+        data = EasySetupEngine().collect_db_data()
+        digest = store_snapshot(data)
+    except Exception as exc:
+        logger.warning(
+            "[EASY_SETUP_SNAPSHOT] Não foi possível montar o snapshot compartilhado: %s",
+            exc,
+        )
+        return None
+
+    logger.info(
+        "[EASY_SETUP_SNAPSHOT] Snapshot %s montado em %.2fs (%d users)",
+        digest[:12],
+        time.monotonic() - started,
+        len(data.get("users", [])),
+    )
+    return digest
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_config_django_app", "0010_alter_catraconfig_gateway_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="easysetuplog",
+            name="stage_timings",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Duracao em segundos de cada etapa do setup deste device",
+            ),
+        ),
+    ]
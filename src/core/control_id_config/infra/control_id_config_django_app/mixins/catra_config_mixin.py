@@ -2,6 +2,8 @@ from src.core.__seedwork__.infra import ControlIDSyncMixin
 from rest_framework.response import Response
 from rest_framework import status
 
+from ..config_values import catra_config_values
+
 
 class CatraConfigSyncMixin(ControlIDSyncMixin):
     """Mixin para sincronização de configurações da catraca (seção 'catra')"""
@@ -84,27 +86,10 @@ class CatraConfigSyncMixin(ControlIDSyncMixin):
             if not config_data:
                 logger.warning("[CATRA_CONFIG_SYNC] API retornou dados vazios - usando defaults")
 
-            def to_bool(v, default=False):
-                """Converte string '0'/'1' para bool."""
-                if v is None:
-                    return bool(default)
-                if isinstance(v, bool):
-                    return v
-                if isinstance(v, str):
-                    return v.strip() in ("1", "true", "True")
-                if isinstance(v, (int, float)):
-                    return v != 0
-                return bool(v)
-            
             # Atualiza ou cria configuração local com dados reais da catraca
             config, created = CatraConfig.objects.update_or_create(
                 device=self.device,
-                defaults={
-                    'anti_passback': to_bool(config_data.get('anti_passback'), False),
-                    'daily_reset': to_bool(config_data.get('daily_reset'), False),
-                    'gateway': config_data.get('gateway', 'clockwise'),
-                    'operation_mode': config_data.get('operation_mode', 'blocked')
-                }
+                defaults=catra_config_values(config_data),
             )
             
             logger.info(f"[CATRA_CONFIG_SYNC] Config {'criada' if created else 'atualizada'}: "
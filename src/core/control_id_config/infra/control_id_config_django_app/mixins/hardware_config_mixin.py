@@ -2,6 +2,8 @@ from src.core.__seedwork__.infra import ControlIDSyncMixin
 from rest_framework.response import Response
 from rest_framework import status
 
+from ..config_values import hardware_config_values
+
 
 class HardwareConfigSyncMixin(ControlIDSyncMixin):
     """Mixin para sincronização de configurações de hardware"""
@@ -114,31 +116,10 @@ class HardwareConfigSyncMixin(ControlIDSyncMixin):
             if not config_data:
                 logger.warning("[HARDWARE_CONFIG_SYNC] API retornou dados vazios - usando defaults")
 
-            def to_bool(v, default=False):
-                """Converte string '0'/'1' para bool."""
-                if v is None:
-                    return bool(default)
-                if isinstance(v, bool):
-                    return v
-                if isinstance(v, str):
-                    # Para IDBLOCK: "0" = False, "1" = True
-                    return v.strip() in ("1", "true", "True")
-                if isinstance(v, (int, float)):
-                    return v != 0
-                return bool(v)
-            
-            exception_mode_value = str(config_data.get('exception_mode', 'none') or 'none')
-            if exception_mode_value not in {'none', 'emergency', 'lock_down'}:
-                exception_mode_value = 'none'
-            
             config, created = HardwareConfig.objects.update_or_create(
                 device=self.device,
                 defaults={
-                    # Campos DISPONÍVEIS na IDBLOCK
-                    'beep_enabled': to_bool(config_data.get('beep_enabled'), True),
-                    'bell_enabled': to_bool(config_data.get('bell_enabled'), False),
-                    'bell_relay': int(config_data.get('bell_relay', 2) or 2),
-                    'exception_mode': exception_mode_value,
+                    **hardware_config_values(config_data),
                     'network_interlock_enabled': (
                         existing_config.network_interlock_enabled if existing_config else False
                     ),
@@ -148,15 +129,6 @@ class HardwareConfigSyncMixin(ControlIDSyncMixin):
                     'network_interlock_rex_bypass_enabled': (
                         existing_config.network_interlock_rex_bypass_enabled if existing_config else False
                     ),
-                    # Campos NÃO DISPONÍVEIS na IDBLOCK (valores fixos padrão)
-                    'ssh_enabled': False,           # Não existe na IDBLOCK
-                    'relayN_enabled': False,        # Não existe na IDBLOCK
-                    'relayN_timeout': 5,            # Não existe na IDBLOCK
-                    'relayN_auto_close': True,      # Não existe na IDBLOCK
-                    'door_sensorN_enabled': False,  # Não existe na IDBLOCK
-                    'door_sensorN_idle': 10,        # Não existe na IDBLOCK
-                    'doorN_interlock': False,       # Não existe na IDBLOCK
-                    'doorN_exception_mode': False   # Não existe na IDBLOCK
                 }
             )
             
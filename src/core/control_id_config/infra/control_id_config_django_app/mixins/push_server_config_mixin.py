@@ -2,6 +2,8 @@ from src.core.__seedwork__.infra import ControlIDSyncMixin
 from rest_framework.response import Response
 from rest_framework import status
 
+from ..config_values import push_server_config_values
+
 
 class PushServerConfigSyncMixin(ControlIDSyncMixin):
     """Mixin para sincronização de configurações do servidor Push"""
@@ -82,11 +84,7 @@ class PushServerConfigSyncMixin(ControlIDSyncMixin):
             # Atualiza ou cria configuração local com dados reais da catraca
             config, created = PushServerConfig.objects.update_or_create(
                 device=self.device,
-                defaults={
-                    'push_request_timeout': int(config_data.get('push_request_timeout', 15000) or 15000),
-                    'push_request_period': int(config_data.get('push_request_period', 60) or 60),
-                    'push_remote_address': config_data.get('push_remote_address', '')
-                }
+                defaults=push_server_config_values(config_data),
             )
             
             logger.info(f"[PUSH_SERVER_CONFIG_SYNC] Config {'criada' if created else 'atualizada'}: "
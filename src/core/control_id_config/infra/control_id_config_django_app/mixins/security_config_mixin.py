@@ -3,21 +3,13 @@ from rest_framework.response import Response
 
 from src.core.__seedwork__.infra import ControlIDSyncMixin
 
+from ..config_values import security_config_values, to_bool
+
 
 class SecurityConfigSyncMixin(ControlIDSyncMixin):
     """Mixin para sincronizacao de configuracoes de seguranca."""
 
-    @staticmethod
-    def _to_bool(value, default=False):
-        if value is None:
-            return bool(default)
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, str):
-            return value.strip() in ("1", "true", "True")
-        if isinstance(value, (int, float)):
-            return value != 0
-        return bool(value)
+    _to_bool = staticmethod(to_bool)
 
     def update_security_config_in_catraca(self, instance):
         """Atualiza o bloco `identifier` na catraca."""
@@ -94,15 +86,7 @@ class SecurityConfigSyncMixin(ControlIDSyncMixin):
 
             config, created = SecurityConfig.objects.update_or_create(
                 device=self.device,
-                defaults={
-                    "verbose_logging_enabled": self._to_bool(
-                        config_data.get("verbose_logging"), True
-                    ),
-                    "log_type": self._to_bool(config_data.get("log_type"), False),
-                    "multi_factor_authentication_enabled": self._to_bool(
-                        config_data.get("multi_factor_authentication"), False
-                    ),
-                },
+                defaults=security_config_values(config_data),
             )
 
             logger.info(
@@ -2,13 +2,7 @@ from src.core.__seedwork__.infra import ControlIDSyncMixin
 from rest_framework.response import Response
 from rest_framework import status
 
-# Códigos curtos / variantes retornados pela catraca → valor canônico salvo no banco / enviado de volta.
-LANGUAGE_MAP = {
-    "pt": "pt_BR",
-    "en": "en_US",
-    "es": "spa_SPA",
-    "es_ES": "spa_SPA",
-}
+from ..config_values import LANGUAGE_MAP, system_config_values
 
 
 class SystemConfigSyncMixin(ControlIDSyncMixin):
@@ -97,41 +91,10 @@ class SystemConfigSyncMixin(ControlIDSyncMixin):
             if not config_data:
                 logger.warning("[SYSTEM_CONFIG_SYNC] API retornou dados vazios - usando defaults")
             
-            def to_bool(v, default=False):
-                """Converte string '0'/'1' para bool."""
-                if v is None:
-                    return bool(default)
-                if isinstance(v, bool):
-                    return v
-                if isinstance(v, str):
-                    # Para IDBLOCK: "0" = False, "1" = True
-                    return v.strip() in ("1", "true", "True")
-                if isinstance(v, (int, float)):
-                    return v != 0
-                return bool(v)
-            
             # Atualiza ou cria configuração local com dados reais da catraca
             config, created = SystemConfig.objects.update_or_create(
                 device=self.device,
-                defaults={
-                    # Campos DISPONÍVEIS na IDBLOCK
-                    'online': to_bool(config_data.get('online'), True),
-                    'catra_timeout': int(str(config_data.get('catra_timeout', 30000)) or 30000),
-                    'local_identification': to_bool(config_data.get('local_identification'), True),
-                    'language': LANGUAGE_MAP.get(
-                        str(config_data.get("language", "pt_BR") or "pt_BR"),
-                        str(config_data.get("language", "pt_BR") or "pt_BR"),
-                    ),
-                    'daylight_savings_time_start': config_data.get('daylight_savings_time_start') or None,
-                    'daylight_savings_time_end': config_data.get('daylight_savings_time_end') or None,
-                    # Campos NÃO DISPONÍVEIS na IDBLOCK (valores fixos padrão)
-                    'auto_reboot_hour': 3,          # Não existe na IDBLOCK
-                    'auto_reboot_minute': 0,        # Não existe na IDBLOCK
-                    'clear_expired_users': False,   # Não existe na IDBLOCK
-                    'url_reboot_enabled': True,     # Não existe na IDBLOCK
-                    'keep_user_image': True,        # Não existe na IDBLOCK
-                    'web_server_enabled': True      # Não existe na IDBLOCK
-                }
+                defaults=system_config_values(config_data),
             )
             
             logger.info(f"[SYSTEM_CONFIG_SYNC] Config {'criada' if created else 'atualizada'}: "
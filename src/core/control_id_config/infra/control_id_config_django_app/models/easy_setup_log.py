@@ -27,6 +27,11 @@ class EasySetupLog(models.Model):
         default=Status.PENDING,
     )
     report = models.JSONField(default=dict, blank=True)
+    stage_timings = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Duracao em segundos de cada etapa do setup deste device",
+    )
     started_at = models.DateTimeField(default=timezone.now)
     finished_at = models.DateTimeField(null=True, blank=True)
 
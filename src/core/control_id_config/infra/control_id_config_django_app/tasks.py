@@ -1,4 +1,5 @@
-from celery import group, shared_task
+from celery import chain, group, shared_task
+from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,6 +11,20 @@ SCREEN_MESSAGES = {
 }
 
 
+def _max_parallel_devices() -> int:
+    value = getattr(settings, "EASY_SETUP_MAX_PARALLEL_DEVICES", 8)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _split_into_lanes(items: list, lanes: int) -> list[list]:
+    """Distribui os itens em round-robin por até *lanes* faixas não vazias."""
+    count = min(lanes, len(items))
+    return [items[i::count] for i in range(count)] if count else []
+
+
 def _is_step_ok(step: dict, treat_missing_as_failure: bool = True) -> bool:
     if not isinstance(step, dict):
         return not treat_missing_as_failure
@@ -103,12 +118,14 @@ def _notify_device_setup_result(engine, device, log_status: str) -> dict:
         return {"ok": False, "message": message, "error": str(exc)}
 
 
-def _run_easy_setup_for_device(device_id: int, task_id: str) -> dict:
+def _run_easy_setup_for_device(
+    device_id: int, task_id: str, snapshot_digest: str | None = None
+) -> dict:
     from django.utils import timezone as tz
 
     from src.core.control_id.infra.control_id_django_app.models import Device
     from .models import EasySetupLog
-    from .views.easy_setup_engine import _EasySetupEngine
+    from .easy_setup_engine import EasySetupEngine
 
     device = Device.objects.filter(id=device_id, is_active=True).first()
     if not device:
@@ -137,11 +154,12 @@ def _run_easy_setup_for_device(device_id: int, task_id: str) -> dict:
         f"[EASY_SETUP_TASK] === Iniciando setup: {device.name} ({device.ip}) ==="
     )
 
-    engine = _EasySetupEngine()
+    engine = EasySetupEngine()
     engine.set_device(device)
+    report = None
 
     try:
-        report = engine.run_full_setup()
+        report = engine.run_full_setup(snapshot_digest=snapshot_digest)
         log_status, _, _ = _evaluate_easy_setup_report(report)
         report.setdefault("summary", {})
         report["summary"]["screen_message"] = _notify_device_setup_result(
@@ -175,6 +193,12 @@ def _run_easy_setup_for_device(device_id: int, task_id: str) -> dict:
         log_entry.finished_at = tz.now()
         log_entry.save(update_fields=["status", "report", "finished_at"])
         return {"success": False, "device_id": device.id, "error": str(e)}
+    finally:
+        # Também quando o setup quebra no meio: mostra até onde chegou.
+        log_entry.stage_timings = (
+            report.get("timings", {}) if report else engine.stage_timings or {}
+        )
+        log_entry.save(update_fields=["stage_timings"])
 
 
 def _legacy_run_easy_setup_task_v1(self, device_ids: list[int], task_id: str) -> dict:
@@ -186,13 +210,13 @@ def _legacy_run_easy_setup_task_v1(self, device_ids: list[int], task_id: str) ->
 
     from src.core.control_id.infra.control_id_django_app.models import Device
     from .models import EasySetupLog
-    from .views.easy_setup_engine import _EasySetupEngine
+    from .easy_setup_engine import EasySetupEngine
 
     devices = Device.objects.filter(id__in=device_ids, is_active=True)
     if not devices.exists():
         return {"success": False, "error": "Nenhuma catraca ativa encontrada"}
 
-    engine = _EasySetupEngine()
+    engine = EasySetupEngine()
     results = []
 
     for device in devices:
@@ -269,10 +293,26 @@ def run_easy_setup_task(self, device_ids: list[int], task_id: str) -> dict:
     if not devices:
         return {"success": False, "error": "Nenhuma catraca ativa encontrada"}
 
+    from .easy_setup_snapshot import build_snapshot
+
+    # O payload é o mesmo espelho global para todas as catracas: coleta uma
+    # vez e as subtasks reaproveitam o artefato pelo hash.
+    snapshot_digest = build_snapshot()
+
+    # Pipelines em paralelo, no máximo EASY_SETUP_MAX_PARALLEL_DEVICES por vez:
+    # cada "faixa" é uma chain sequencial e as faixas rodam num group.
+    lanes = _split_into_lanes(devices, _max_parallel_devices())
     dispatched_ids = [device.id for device in devices]
     group(
-        run_easy_setup_for_device.s(device_id=device.id, task_id=task_id)
-        for device in devices
+        chain(
+            run_easy_setup_for_device.si(
+                device_id=device.id,
+                task_id=task_id,
+                snapshot_digest=snapshot_digest,
+            )
+            for device in lane
+        )
+        for lane in lanes
     ).apply_async()
 
     return {
@@ -281,185 +321,99 @@ def run_easy_setup_task(self, device_ids: list[int], task_id: str) -> dict:
         "devices_ok": 0,
         "devices_total": len(dispatched_ids),
         "dispatched_devices": dispatched_ids,
+        "snapshot_digest": snapshot_digest,
+        "parallel_lanes": len(lanes),
     }
 
 
 @shared_task(bind=True)
-def run_easy_setup_for_device(self, device_id: int, task_id: str) -> dict:
+def run_easy_setup_for_device(
+    self, device_id: int, task_id: str, snapshot_digest: str | None = None
+) -> dict:
     """
     Task Celery de execu??o do Easy Setup para um ?nico device.
+
+    Roda dentro da chain de uma faixa: se levantar, as catracas seguintes da
+    faixa nem começam. Por isso nunca propaga — registra a falha no
+    EasySetupLog do device e devolve o resultado.
     """
-    return _run_easy_setup_for_device(device_id=device_id, task_id=task_id)
+    try:
+        return _run_easy_setup_for_device(
+            device_id=device_id, task_id=task_id, snapshot_digest=snapshot_digest
+        )
+    except Exception as e:
+        logger.exception(
+            f"[EASY_SETUP_TASK] Falha inesperada no setup do device {device_id}: {e}"
+        )
+        _record_device_setup_failure(device_id, task_id, e)
+        return {"success": False, "device_id": device_id, "error": str(e)}
+
+
+def _record_device_setup_failure(device_id: int, task_id: str, error) -> None:
+    from django.utils import timezone as tz
+
+    from .models import EasySetupLog
+
+    try:
+        EasySetupLog.objects.update_or_create(
+            task_id=task_id,
+            device_id=device_id,
+            defaults={
+                "status": EasySetupLog.Status.FAILED,
+                "report": {"error": str(error), "summary": {}},
+                "finished_at": tz.now(),
+            },
+        )
+    except Exception:
+        logger.exception(
+            f"[EASY_SETUP_TASK] Nao foi possivel registrar a falha do device {device_id}"
+        )
 
 
 @shared_task(bind=True)
 def run_config_sync(self) -> dict:
     """
     Task Celery para sincronização de configurações das catracas.
-    Usa os métodos sync dos mixins que chamam get_configuration.fcgi corretamente.
+
+    Um ``get_configuration.fcgi`` por catraca, catracas em paralelo e uma
+    transação por catraca (ver :mod:`.sync_config`).
 
     Returns:
         dict: Resultado da sincronização com estatísticas
     """
     try:
-        from src.core.control_id.infra.control_id_django_app.models import Device
-        from .mixins.system_config_mixin import SystemConfigSyncMixin
-        from .mixins.hardware_config_mixin import HardwareConfigSyncMixin
-        from .mixins.security_config_mixin import SecurityConfigSyncMixin
-        from .mixins.ui_config_mixin import UIConfigSyncMixin
-        from src.core.control_id_monitor.infra.control_id_monitor_django_app.mixins import (
-            MonitorConfigSyncMixin,
-        )
-        from .mixins.catra_config_mixin import CatraConfigSyncMixin
-        from .mixins.push_server_config_mixin import PushServerConfigSyncMixin
-
-        devices = list(Device.objects.filter(is_active=True))
-
-        if not devices:
-            return {"success": False, "error": "Nenhuma catraca ativa encontrada"}
-
-        print("[CELERY_SYNC] Iniciando sincronização de configurações")
-        print(f"[CELERY_SYNC] Dispositivos ativos: {len(devices)}")
-
-        stats = {
-            "devices": len(devices),
-            "system_synced": 0,
-            "hardware_synced": 0,
-            "security_synced": 0,
-            "ui_synced": 0,
-            "monitor_synced": 0,
-            "catra_synced": 0,
-            "push_server_synced": 0,
-            "errors": [],
-        }
+        from .sync_config import sync_all_configs
 
-        for device in devices:
-            print(f"[CELERY_SYNC] Sincronizando device: {device.name}")
-
-            # System Config
-            try:
-                mixin = SystemConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_system_config_from_catraca()
-                if result.status_code == 200:
-                    stats["system_synced"] += 1
-                    print(f"[CELERY_SYNC] ✓ SystemConfig sincronizado")
-                else:
-                    stats["errors"].append(f"SystemConfig {device.name}: {result.data}")
-            except Exception as e:
-                stats["errors"].append(f"SystemConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro SystemConfig: {str(e)}")
-
-            # Hardware Config
-            try:
-                mixin = HardwareConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_hardware_config_from_catraca()
-                if result.status_code == 200:
-                    stats["hardware_synced"] += 1
-                    print(f"[CELERY_SYNC] ✓ HardwareConfig sincronizado")
-                else:
-                    stats["errors"].append(
-                        f"HardwareConfig {device.name}: {result.data}"
-                    )
-            except Exception as e:
-                stats["errors"].append(f"HardwareConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro HardwareConfig: {str(e)}")
-
-            # Security Config
-            try:
-                mixin = SecurityConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_security_config_from_catraca()
-                if result.status_code == 200:
-                    stats["security_synced"] += 1
-                    print(f"[CELERY_SYNC] ✓ SecurityConfig sincronizado")
-                else:
-                    stats["errors"].append(
-                        f"SecurityConfig {device.name}: {result.data}"
-                    )
-            except Exception as e:
-                stats["errors"].append(f"SecurityConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro SecurityConfig: {str(e)}")
-
-            # UI Config
-            try:
-                mixin = UIConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_ui_config_from_catraca()
-                if result.status_code == 200:
-                    stats["ui_synced"] += 1
-                    print(f"[CELERY_SYNC] ✓ UIConfig sincronizado")
-                else:
-                    stats["errors"].append(f"UIConfig {device.name}: {result.data}")
-            except Exception as e:
-                stats["errors"].append(f"UIConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro UIConfig: {str(e)}")
-
-            # Monitor Config (opcional - nem todos os dispositivos têm)
-            try:
-                mixin = MonitorConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_monitor_config_from_catraca()
-
-                # Verifica se é uma situação normal (não configurado) ou erro real
-                is_missing = (
-                    result.data.get("is_configuration_missing", False)
-                    if hasattr(result, "data") and isinstance(result.data, dict)
-                    else False
-                )
-
-                if result.status_code == 200:
-                    stats["monitor_synced"] += 1
-                    print("[CELERY_SYNC] ✓ MonitorConfig sincronizado")
-                elif result.status_code == 404 and is_missing:
-                    # 404 com flag is_configuration_missing = situação normal
-                    print(
-                        f"[CELERY_SYNC] ℹ️  MonitorConfig não configurado no device {device.name} (normal)"
-                    )
-                else:
-                    # Erro real
-                    stats["errors"].append(
-                        f"MonitorConfig {device.name}: {result.data}"
-                    )
-                    print(f"[CELERY_SYNC] ✗ Erro MonitorConfig: {result.data}")
-            except Exception as e:
-                stats["errors"].append(f"MonitorConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro MonitorConfig: {str(e)}")
-
-            # Catra Config
-            try:
-                mixin = CatraConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_catra_config_from_catraca()
-                if result.status_code == 200:
-                    stats["catra_synced"] += 1
-                    print(f"[CELERY_SYNC] ✓ CatraConfig sincronizado")
-                else:
-                    stats["errors"].append(f"CatraConfig {device.name}: {result.data}")
-            except Exception as e:
-                stats["errors"].append(f"CatraConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro CatraConfig: {str(e)}")
-
-            # Push Server Config
-            try:
-                mixin = PushServerConfigSyncMixin()
-                mixin.set_device(device)
-                result = mixin.sync_push_server_config_from_catraca()
-                if result.status_code == 200:
-                    stats["push_server_synced"] += 1
-                    print(f"[CELERY_SYNC] ✓ PushServerConfig sincronizado")
-                else:
-                    stats["errors"].append(
-                        f"PushServerConfig {device.name}: {result.data}"
-                    )
-            except Exception as e:
-                stats["errors"].append(f"PushServerConfig {device.name}: {str(e)}")
-                print(f"[CELERY_SYNC] ✗ Erro PushServerConfig: {str(e)}")
-
-        print("[CELERY_SYNC] Sincronização concluída")
-        print(f"[CELERY_SYNC] Stats: {stats}")
-
-        return {"success": True, "message": "Sincronização concluída", "stats": stats}
+        result = sync_all_configs()
+        if result.get("success"):
+            logger.info(f"[CELERY_SYNC] Stats: {result['stats']}")
+        return result
     except Exception as e:
         return {"success": False, "error": f"Erro na task de sincronização: {str(e)}"}
+
+
+@shared_task(bind=True)
+def run_drift_check(self, device_ids: list[int] | None = None, repair=None) -> dict:
+    """
+    Task Celery (agendada no beat) de detecção de drift banco × catracas.
+
+    Sem ``repair`` explícito, corrige só se ``CATRACA_DRIFT_AUTO_REPAIR``
+    estiver ligado (ver :mod:`.drift_detection`).
+    """
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from .drift_detection import detect_drift, drift_auto_repair_enabled
+
+    devices = Device.objects.filter(is_active=True)
+    if device_ids is not None:
+        devices = devices.filter(id__in=device_ids)
+    if repair is None:
+        repair = drift_auto_repair_enabled()
+
+    result = detect_drift(list(devices), repair=repair)
+    if result.get("success"):
+        logger.info(
+            "[DRIFT] Verificação concluída em %ss: %s",
+            result["elapsed_seconds"],
+            {report["device_name"]: report["in_sync"] for report in result["devices"]},
+        )
+    return result
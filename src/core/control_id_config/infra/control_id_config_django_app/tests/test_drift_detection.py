@@ -0,0 +1,127 @@
+import pytest
+
+DRIFT_URL = "/api/control_id_config/drift/"
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drift_report_pinpoints_rows_and_repair_pushes_only_the_delta(
+    api_client_admin, simulated_devices, user_factory
+):
+    # Testa o drift: relatório por tabela/balde, reparo só do delta e nada destruído na catraca.
+    from src.core.control_id.infra.control_id_django_app.models import (
+        Card,
+        CustomGroup,
+        Device,
+        UserGroup,
+    )
+
+    Device.objects.all().delete()
+    ((device, simulator),) = simulated_devices()
+    group = CustomGroup.objects.create(name="1INFO1")
+    users = [user_factory() for _ in range(3)]
+    for user in users:
+        UserGroup.objects.create(user=user, group=group)
+    Card.objects.create(user=users[0], value="123456")
+
+    report = api_client_admin.get(DRIFT_URL, {"device_id": device.id}).data
+    [device_report] = report["devices"]
+    assert device_report["in_sync"] is False
+    assert device_report["tables"]["users"]["missing_on_device"]["count"] == 4
+    assert device_report["tables"]["cards"]["missing_on_device"]["rows"] == [
+        {"user_id": str(users[0].id), "value": "123456"}
+    ]
+    assert device_report["tables"]["access_rules"]["in_sync"] is True
+
+    response = api_client_admin.post(
+        DRIFT_URL, {"device_ids": [device.id], "repair": True}, format="json"
+    )
+    assert response.data["devices"][0]["repair"]["user_groups"]["sent"] == 3
+    assert api_client_admin.get(DRIFT_URL).data["in_sync"] is True
+
+    # Drift na catraca: um nome alterado e um grupo que só existe lá.
+    simulator.seed_rows("users", [{"id": users[1].id, "name": "Outro nome"}])
+    simulator.seed_rows("groups", [{"id": 999, "name": "Legado"}])
+    loads_before = simulator.endpoint_counts()["load_objects.fcgi"]
+
+    response = api_client_admin.post(DRIFT_URL, {"repair": True}, format="json")
+
+    tables = response.data["devices"][0]["tables"]
+    assert tables["users"]["buckets_compared"] == 1
+    assert tables["users"]["mismatched"]["rows"] == [
+        {"id": str(users[1].id), "name": users[1].name}
+    ]
+    assert tables["groups"]["device_only"]["rows"] == [{"id": "999", "name": "Legado"}]
+    assert response.data["devices"][0]["repair"] == {
+        "users": {"ok": True, "sent": 1, "applied": 1, "errors": 0}
+    }
+    assert {row["id"]: row["name"] for row in simulator.rows("users")}[users[1].id] == (
+        users[1].name
+    )
+    assert 999 in {row["id"] for row in simulator.rows("groups")}
+    # Uma leitura por tabela verificada, só com as colunas de identidade.
+    assert simulator.endpoint_counts()["load_objects.fcgi"] - loads_before == 13
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drift_check_task_reports_unreachable_devices(simulated_devices, settings):
+    # Testa a task agendada: catraca fora do ar vira relatório com erro, sem reparo automático.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from ..tasks import run_drift_check
+
+    settings.CATRACA_DRIFT_AUTO_REPAIR = False
+    Device.objects.all().delete()
+    (healthy, _), (broken, broken_sim) = simulated_devices(2)
+    broken_sim.inject_error("load_objects.fcgi", drop_connection=True)
+
+    result = run_drift_check()
+
+    reports = {report["device_id"]: report for report in result["devices"]}
+    assert result["repair"] is False and result["in_sync"] is False
+    assert reports[healthy.id]["in_sync"] is True
+    assert "load_objects.fcgi" in reports[broken.id]["error"]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drift_repair_requires_admin_role(api_client_operator, simulated_devices):
+    # Testa que o relatório é aberto a quem está autenticado, mas o reparo exige admin.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    ((device, simulator),) = simulated_devices()
+
+    assert api_client_operator.get(DRIFT_URL).status_code == 200
+    response = api_client_operator.post(DRIFT_URL, {"repair": True}, format="json")
+    assert response.status_code == 403
+    assert "create_or_modify_objects.fcgi" not in simulator.endpoint_counts()
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drift_repair_reports_tables_the_device_refused_to_load(
+    api_client_admin, simulated_devices, user_factory
+):
+    # Testa que a tabela com 4xx na leitura aparece no reparo como não reparada.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    Device.objects.all().delete()
+    ((device, simulator),) = simulated_devices()
+    user_factory()
+    simulator.inject_error(
+        "load_objects.fcgi",
+        status_code=400,
+        error="Table not found",
+        when=lambda body: body.get("object") == "cards",
+    )
+
+    response = api_client_admin.post(DRIFT_URL, {"repair": True}, format="json")
+
+    [device_report] = response.data["devices"]
+    assert device_report["in_sync"] is False
+    assert "error" in device_report["tables"]["cards"]
+    repair = device_report["repair"]
+    assert repair["cards"]["ok"] is False and repair["cards"]["sent"] == 0
+    assert "Table not found" in repair["cards"]["error"]
+    assert repair["users"]["ok"] is True and repair["users"]["sent"] > 0
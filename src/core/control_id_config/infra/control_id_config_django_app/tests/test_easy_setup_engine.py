@@ -1,5 +1,5 @@
-from src.core.control_id_config.infra.control_id_config_django_app.views.easy_setup_engine import (
-    _EasySetupEngine,
+from src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine import (
+    EasySetupEngine,
 )
 from src.core.control_id_config.infra.control_id_config_django_app.tasks import (
     _evaluate_easy_setup_report,
@@ -7,7 +7,7 @@ from src.core.control_id_config.infra.control_id_config_django_app.tasks import
 
 
 def _engine_for_device(device):
-    engine = _EasySetupEngine()
+    engine = EasySetupEngine()
     engine.set_device(device)
     return engine
 
@@ -31,7 +31,7 @@ def test_create_objects_safe_isolates_bad_entity_item_with_create_or_modify(
         return make_response(200, text="{}")
 
     mocker.patch(
-        "src.core.control_id_config.infra.control_id_config_django_app.views.easy_setup_engine.requests.post",
+        "src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine.requests.post",
         side_effect=fake_post,
     )
 
@@ -52,7 +52,7 @@ def test_create_objects_safe_uses_create_or_modify_for_entity_tables(
     engine = _engine_for_device(device_factory(name="Catraca Teste"))
     mocker.patch.object(engine, "login", return_value="session")
     post = mocker.patch(
-        "src.core.control_id_config.infra.control_id_config_django_app.views.easy_setup_engine.requests.post",
+        "src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine.requests.post",
         return_value=make_response(200, text="{}"),
     )
 
@@ -90,7 +90,7 @@ def test_create_objects_safe_skips_existing_junction_item(
         return make_response(200, text="{}")
 
     post = mocker.patch(
-        "src.core.control_id_config.infra.control_id_config_django_app.views.easy_setup_engine.requests.post",
+        "src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine.requests.post",
         side_effect=fake_post,
     )
 
@@ -140,7 +140,7 @@ def test_create_or_modify_fallback_only_descends_failed_chunks(
         return make_response(200, text="{}")
 
     mocker.patch(
-        "src.core.control_id_config.infra.control_id_config_django_app.views.easy_setup_engine.requests.post",
+        "src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine.requests.post",
         side_effect=fake_post,
     )
 
@@ -295,3 +295,338 @@ def test_easy_setup_report_evaluation_keeps_legacy_steps_critical_when_present()
     assert status == "failed"
     assert failed_critical == ["disable_identifier"]
     assert warning_steps == []
+
+
+def test_easy_setup_snapshot_roundtrip_is_content_addressed(
+    settings, tmp_path, device_factory, user_factory
+):
+    from src.core.control_id_config.infra.control_id_config_django_app.easy_setup_snapshot import (
+        load_snapshot,
+        store_snapshot,
+    )
+
+    settings.EASY_SETUP_SNAPSHOT_DIR = str(tmp_path)
+    user_factory(name="Aluno", registration="2026001", pin="4321")
+    user_factory(name="Sem matricula", registration="")
+    data = EasySetupEngine().collect_db_data()
+
+    digest = store_snapshot(data)
+
+    assert store_snapshot(data) == digest
+    assert load_snapshot(digest) == data
+    assert [u["name"] for u in data["users"]] == ["Aluno"]
+    assert data["pins"][0]["value"] == "4321"
+    assert data["_user_push_warnings"][0]["reason"] == "missing_registration"
+    assert load_snapshot(None) is None
+    assert load_snapshot("0" * 64) is None
+
+    artifact = next(tmp_path.glob("*.json.gz"))
+    artifact.write_bytes(b"corrompido")
+    assert load_snapshot(digest) is None
+
+
+def test_easy_setup_task_collects_db_once_for_all_devices(
+    mocker, settings, tmp_path, device_factory, user_factory
+):
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from src.core.control_id_config.infra.control_id_config_django_app.easy_setup_snapshot import (
+        load_snapshot,
+    )
+    from src.core.control_id_config.infra.control_id_config_django_app.tasks import (
+        run_easy_setup_task,
+    )
+
+    settings.EASY_SETUP_SNAPSHOT_DIR = str(tmp_path)
+    Device.objects.all().delete()
+    devices = [device_factory() for _ in range(3)]
+    user_factory(name="Aluno", registration="2026001")
+    collect = mocker.spy(EasySetupEngine, "collect_db_data")
+    seen = []
+
+    def fake_setup(engine, snapshot_digest=None):
+        seen.append((engine.device.pk, load_snapshot(snapshot_digest)))
+        return {"device": engine.device.name, "steps": {"login": {"ok": True}}}
+
+    mocker.patch.object(
+        EasySetupEngine, "run_full_setup", autospec=True, side_effect=fake_setup
+    )
+    mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app.tasks."
+        "_notify_device_setup_result",
+        return_value={"ok": True},
+    )
+
+    result = run_easy_setup_task.apply(
+        kwargs={"device_ids": [d.id for d in devices], "task_id": "t-1"}
+    ).get()
+
+    assert collect.call_count == 1
+    assert result["snapshot_digest"]
+    assert sorted(pk for pk, _ in seen) == sorted(d.pk for d in devices)
+    assert all(data["users"][0]["name"] == "Aluno" for _, data in seen)
+
+
+def test_factory_reset_uses_readiness_probes_instead_of_fixed_sleeps(
+    mocker, make_response, device_factory
+):
+    import requests
+
+    engine = _engine_for_device(
+        device_factory(name="Catraca Teste", username="portaria", password="segredo")
+    )
+    mocker.patch.object(engine, "login", return_value="sess")
+    sleep = mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app."
+        "easy_setup_engine._time.sleep"
+    )
+    mocker.patch(
+        "requests.post",
+        side_effect=[
+            make_response(json_data={}),  # reset_to_factory_default
+            requests.ConnectionError("reiniciando"),  # sonda: API caiu
+            requests.ConnectionError("reiniciando"),  # ainda fora (credencial do device)
+            make_response(json_data={"session": "nova"}),  # voltou com admin/admin
+        ],
+    )
+
+    result = engine.factory_reset()
+
+    assert result["ok"] is True
+    assert result["reboot_started"] is True
+    assert result["reboot_attempts"] == 1
+    assert result["used_default_credentials"] is True
+    assert engine.session == "nova"
+    assert sleep.call_count == 0
+
+
+def test_easy_setup_task_caps_parallel_lanes_and_stores_stage_timings(
+    mocker, settings, tmp_path, device_factory
+):
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from src.core.control_id_config.infra.control_id_config_django_app.models import (
+        EasySetupLog,
+    )
+    from src.core.control_id_config.infra.control_id_config_django_app.tasks import (
+        _split_into_lanes,
+        run_easy_setup_task,
+    )
+
+    assert _split_into_lanes([1, 2, 3, 4, 5], 2) == [[1, 3, 5], [2, 4]]
+    assert _split_into_lanes([1], 8) == [[1]]
+    assert _split_into_lanes([], 8) == []
+
+    settings.EASY_SETUP_SNAPSHOT_DIR = str(tmp_path)
+    settings.EASY_SETUP_MAX_PARALLEL_DEVICES = 2
+    Device.objects.all().delete()
+    devices = [device_factory() for _ in range(5)]
+
+    def fake_setup(engine, snapshot_digest=None):
+        return {
+            "device": engine.device.name,
+            "steps": {"login": {"ok": True}},
+            "timings": {"login": 0.1, "push": 2.5},
+        }
+
+    mocker.patch.object(
+        EasySetupEngine, "run_full_setup", autospec=True, side_effect=fake_setup
+    )
+    mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app.tasks."
+        "_notify_device_setup_result",
+        return_value={"ok": True},
+    )
+
+    result = run_easy_setup_task.apply(
+        kwargs={"device_ids": [d.id for d in devices], "task_id": "t-2"}
+    ).get()
+
+    assert result["parallel_lanes"] == 2
+    logs = EasySetupLog.objects.filter(task_id="t-2")
+    assert logs.count() == 5
+    assert all(log.stage_timings == {"login": 0.1, "push": 2.5} for log in logs)
+
+
+def test_easy_setup_task_keeps_stage_timings_when_setup_crashes(
+    mocker, settings, tmp_path, device_factory
+):
+    # Testa que os tempos das etapas ja concluidas sao salvos mesmo com excecao.
+    from src.core.control_id_config.infra.control_id_config_django_app.models import (
+        EasySetupLog,
+    )
+    from src.core.control_id_config.infra.control_id_config_django_app.tasks import (
+        _run_easy_setup_for_device,
+    )
+
+    settings.EASY_SETUP_SNAPSHOT_DIR = str(tmp_path)
+    device = device_factory()
+
+    def crashing_setup(engine, snapshot_digest=None):
+        engine.stage_timings = {"login": 0.2, "preflight": 1.4}
+        raise RuntimeError("catraca caiu no push")
+
+    mocker.patch.object(
+        EasySetupEngine, "run_full_setup", autospec=True, side_effect=crashing_setup
+    )
+    mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app.tasks."
+        "_notify_device_setup_result",
+        return_value={"ok": False},
+    )
+
+    result = _run_easy_setup_for_device(device.id, "t-crash")
+
+    assert result["success"] is False
+    log = EasySetupLog.objects.get(task_id="t-crash", device=device)
+    assert log.status == EasySetupLog.Status.FAILED
+    assert log.stage_timings == {"login": 0.2, "preflight": 1.4}
+
+
+def test_push_data_sends_only_the_delta_against_device_rows(
+    mocker, make_response, device_factory, settings
+):
+    settings.EASY_SETUP_DIFF_PUSH = True
+    engine = _engine_for_device(device_factory(name="Catraca Teste"))
+    mocker.patch.object(engine, "login", return_value="session")
+    mocker.patch.object(engine, "_fix_default_access_rules", return_value=0)
+
+    on_device = {
+        "users": [
+            {"id": 1, "name": "Aluno 1"},
+            {"id": 2, "name": "Nome antigo"},
+        ],
+        "user_groups": [{"user_id": "1", "group_id": "1"}],
+    }
+    writes = []
+
+    def fake_post(url, json, timeout):
+        if "load_objects.fcgi" in url:
+            if json["object"] == "groups":
+                return make_response(500, text="erro")
+            rows = on_device.get(json["object"], [])
+            return make_response(200, json_data={json["object"]: rows})
+        writes.append((url.split("?")[0].rsplit("/", 1)[-1], json))
+        return make_response(200, text="{}")
+
+    mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine.requests.post",
+        side_effect=fake_post,
+    )
+
+    results = engine.push_data(
+        {
+            "users": [
+                {"id": 1, "name": "Aluno 1"},
+                {"id": 2, "name": "Aluno 2"},
+                {"id": 3, "name": "Aluno 3"},
+            ],
+            "user_groups": [
+                {"user_id": 1, "group_id": 1},
+                {"user_id": 2, "group_id": 1},
+            ],
+            "groups": [{"id": 1, "name": "Turma"}],
+            "templates": [{"user_id": 1, "template": "abc"}],
+        }
+    )
+
+    users = results["users"]
+    assert users["diff"] == {
+        "on_device": 2,
+        "to_create": 1,
+        "to_modify": 1,
+        "unchanged": 1,
+        "device_only": 0,
+    }
+    assert users["rows_skipped"] == 1
+    assert users["applied"] == 2
+    assert users["count"] == 3
+    assert results["user_groups"]["created"] == 1
+    assert results["user_groups"]["requests_saved"] == 0
+    assert engine._count_push_result_records(results["users"]) == 3
+
+    sent = {(endpoint, payload["object"]): payload["values"] for endpoint, payload in writes}
+    assert sent[("create_or_modify_objects.fcgi", "users")] == [
+        {"id": 2, "name": "Aluno 2"},
+        {"id": 3, "name": "Aluno 3"},
+    ]
+    assert sent[("create_objects.fcgi", "user_groups")] == [{"user_id": 2, "group_id": 1}]
+    # Leitura falhou (groups) ou tabela fora do diff (templates): push completo.
+    assert "diff" not in results["groups"]
+    assert ("create_or_modify_objects.fcgi", "groups") in sent
+    assert ("create_objects.fcgi", "templates") in sent
+    assert users["bytes_sent"] == len(
+        '{"object":"users","values":[{"id":2,"name":"Aluno 2"},{"id":3,"name":"Aluno 3"}]}'
+    )
+
+
+def test_push_table_skips_writes_when_device_already_matches(
+    mocker, make_response, device_factory
+):
+    engine = _engine_for_device(device_factory(name="Catraca Teste"))
+    mocker.patch.object(engine, "login", return_value="session")
+    rows = [{"user_id": 1, "access_rule_id": 1}, {"user_id": 2, "access_rule_id": 1}]
+    post = mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app.easy_setup_engine.requests.post",
+        return_value=make_response(200, json_data={"user_access_rules": rows}),
+    )
+
+    report = engine._push_table("user_access_rules", rows)
+
+    assert post.call_count == 1
+    assert report["ok"] is True
+    assert report["strategy"] == "diff"
+    assert report["rows_skipped"] == 2
+    assert report["bytes_sent"] == 0
+    assert report["requests_saved"] == 2
+
+
+def test_easy_setup_lane_continues_and_logs_when_a_device_step_raises(
+    mocker, settings, tmp_path, device_factory
+):
+    # Testa que uma subtask que levanta nao interrompe a faixa e deixa o log FAILED.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from src.core.control_id_config.infra.control_id_config_django_app.models import (
+        EasySetupLog,
+    )
+    from src.core.control_id_config.infra.control_id_config_django_app.tasks import (
+        run_easy_setup_task,
+    )
+
+    settings.EASY_SETUP_SNAPSHOT_DIR = str(tmp_path)
+    settings.EASY_SETUP_MAX_PARALLEL_DEVICES = 1
+    Device.objects.all().delete()
+    broken, healthy = device_factory(), device_factory()
+    original_set_device = EasySetupEngine.set_device
+
+    def set_device(engine, device):
+        if device.pk == broken.pk:
+            raise RuntimeError("sessao indisponivel")
+        return original_set_device(engine, device)
+
+    mocker.patch.object(
+        EasySetupEngine, "set_device", autospec=True, side_effect=set_device
+    )
+    mocker.patch.object(
+        EasySetupEngine,
+        "run_full_setup",
+        autospec=True,
+        return_value={
+            "steps": {
+                step: {"ok": True}
+                for step in ("login", "factory_reset", "device_settings")
+            }
+        },
+    )
+    mocker.patch(
+        "src.core.control_id_config.infra.control_id_config_django_app.tasks."
+        "_notify_device_setup_result",
+        return_value={"ok": True},
+    )
+
+    run_easy_setup_task.apply(
+        kwargs={"device_ids": [broken.id, healthy.id], "task_id": "t-lane"}
+    ).get()
+
+    logs = {log.device_id: log for log in EasySetupLog.objects.filter(task_id="t-lane")}
+    assert logs[broken.id].status == EasySetupLog.Status.FAILED
+    assert logs[broken.id].report["error"] == "sessao indisponivel"
+    assert logs[healthy.id].status == EasySetupLog.Status.SUCCESS
@@ -314,3 +314,124 @@ def test_sync_mixin_returns_500_when_transport_raises(mocker, device_factory):
 
     assert response.status_code == 500
     assert "offline" in response.data["error"]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_config_sync_reads_each_device_once_and_skips_unchanged_rows(
+    simulated_devices, hardware_config_factory
+):
+    # Testa o sync de configurações: um get_configuration por catraca e nada regravado sem mudança.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from ..models import CatraConfig, HardwareConfig, PushServerConfig, SystemConfig
+    from ..tasks import run_config_sync
+
+    Device.objects.all().delete()
+    (first, first_sim), (second, second_sim) = simulated_devices(2)
+    first_sim.configuration["catra"]["anti_passback"] = "1"
+    hardware_config_factory(
+        device=second, beep_enabled=False, network_interlock_enabled=True
+    )
+
+    result = run_config_sync()
+
+    stats = result["stats"]
+    assert result["success"] is True and stats["errors"] == []
+    assert stats["system_synced"] == stats["push_server_synced"] == 2
+    assert stats["monitor_synced"] == 2
+    assert stats["configs_created"] == 11 and stats["configs_updated"] == 1
+    for simulator in (first_sim, second_sim):
+        assert simulator.endpoint_counts()["get_configuration.fcgi"] == 1
+    assert CatraConfig.objects.get(device=first).anti_passback is True
+    assert CatraConfig.objects.get(device=second).anti_passback is False
+    assert SystemConfig.objects.get(device=first).language == "pt_BR"
+    hardware = HardwareConfig.objects.get(device=second)
+    assert hardware.beep_enabled is True and hardware.network_interlock_enabled is True
+
+    second_sim.configuration["push_server"]["push_request_period"] = "30"
+    stats = run_config_sync()["stats"]
+
+    assert stats["configs_updated"] == 1 and stats["configs_unchanged"] == 11
+    assert PushServerConfig.objects.get(device=second).push_request_period == 30
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_config_sync_falls_back_to_per_section_reads_on_any_400(
+    simulated_devices,
+):
+    # Testa o 400 no request combinado (sem monitor ou campo desconhecido): lê seção por seção; catraca fora do ar vira erro.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from ..models import CatraConfig, PushServerConfig, SystemConfig
+    from ..sync_config import CONFIG_SECTIONS, sync_all_configs
+
+    Device.objects.all().delete()
+    (legacy, legacy_sim), (partial, partial_sim), (broken, broken_sim) = (
+        simulated_devices(3)
+    )
+    legacy_sim.inject_error(
+        "get_configuration.fcgi",
+        status_code=400,
+        error="Node or attribute not found",
+        times=None,
+        when=lambda body: "monitor" in body,
+    )
+    partial_sim.inject_error(
+        "get_configuration.fcgi",
+        status_code=400,
+        error="Invalid parameter",
+        times=None,
+        when=lambda body: "push_server" in body,
+    )
+    broken_sim.inject_error("get_configuration.fcgi", drop_connection=True)
+
+    stats = sync_all_configs()["stats"]
+
+    for simulator in (legacy_sim, partial_sim):
+        assert simulator.endpoint_counts()["get_configuration.fcgi"] == 1 + len(
+            CONFIG_SECTIONS
+        )
+    assert stats["system_synced"] == 2 and stats["monitor_synced"] == 1
+    assert SystemConfig.objects.filter(device=legacy).exists()
+    assert PushServerConfig.objects.filter(device=legacy).exists()
+    assert CatraConfig.objects.filter(device=partial).exists()
+    assert not SystemConfig.objects.filter(device=broken).exists()
+    assert len(stats["errors"]) == 1 and stats["errors"][0].startswith(broken.name)
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_config_sync_and_per_section_mixins_write_the_same_values(simulated_devices):
+    # Testa que o sync em lote e os sync_*_from_catraca dos mixins usam o mesmo mapeamento.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from ..mixins import (
+        CatraConfigSyncMixin,
+        HardwareConfigSyncMixin,
+        PushServerConfigSyncMixin,
+        SecurityConfigSyncMixin,
+        SystemConfigSyncMixin,
+        UIConfigSyncMixin,
+    )
+    from ..sync_config import sync_all_configs
+
+    Device.objects.all().delete()
+    ((device, simulator),) = simulated_devices(1)
+    simulator.configuration["general"].update(language="pt", exception_mode="x")
+    simulator.configuration["catra"]["anti_passback"] = "1"
+
+    for mixin, method in (
+        (SystemConfigSyncMixin, "sync_system_config_from_catraca"),
+        (HardwareConfigSyncMixin, "sync_hardware_config_from_catraca"),
+        (SecurityConfigSyncMixin, "sync_security_config_from_catraca"),
+        (UIConfigSyncMixin, "sync_ui_config_from_catraca"),
+        (CatraConfigSyncMixin, "sync_catra_config_from_catraca"),
+        (PushServerConfigSyncMixin, "sync_push_server_config_from_catraca"),
+    ):
+        worker = mixin()
+        worker.set_device(device)
+        assert getattr(worker, method)().data["success"] is True
+
+    stats = sync_all_configs()["stats"]
+
+    assert stats["errors"] == []
+    assert stats["configs_unchanged"] == 6
@@ -17,6 +17,7 @@ from .views import (
 )
 from .views.catra_config import CatraConfigViewSet
 from .views.push_server_config import PushServerConfigViewSet
+from .views.drift import drift_report
 from .views.sync import sync_all_configs, sync_config_status, sync_device_config
 
 router = DefaultRouter()
@@ -58,6 +59,7 @@ def config_root(request, format=None):
             "sync_config_status": reverse(
                 "sync-config-status", request=request, format=format
             ),
+            "drift_report": reverse("drift-report", request=request, format=format),
             "monitor_configs": "Moved to /api/control_id_monitor/monitor-configs/",
         }
     )
@@ -73,6 +75,7 @@ urlpatterns = [
     path("debug-setup/", debug_setup, name="debug-setup"),
     path("sync/", sync_all_configs, name="sync-all-configs"),
     path("sync/status/", sync_config_status, name="sync-config-status"),
+    path("drift/", drift_report, name="drift-report"),
     path(
         "device-config/<int:device_id>/", sync_device_config, name="sync-device-config"
     ),
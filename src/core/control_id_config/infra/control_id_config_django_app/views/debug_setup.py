@@ -62,7 +62,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from src.core.control_id.infra.control_id_django_app.models import Device
-from .easy_setup import _EasySetupEngine, PUSH_ORDER
+from .easy_setup import EasySetupEngine, PUSH_ORDER
 
 logger = logging.getLogger(__name__)
 
@@ -130,11 +130,11 @@ AVAILABLE_STEPS = {
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
-#  Engine de Debug — extende _EasySetupEngine
+#  Engine de Debug — extende EasySetupEngine
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-class _DebugSetupEngine(_EasySetupEngine):
+class _DebugSetupEngine(EasySetupEngine):
     """
     Extende o engine do Easy Setup com métodos individuais para debug.
     """
@@ -0,0 +1,59 @@
+"""
+Drift — relatório de divergência entre o banco e as catracas.
+
+GET  /api/control_id_config/drift/             → Relatório de todas as catracas ativas
+GET  /api/control_id_config/drift/?device_id=1 → Relatório de uma catraca
+POST /api/control_id_config/drift/             → Relatório + reenvio das linhas divergentes
+     Body: {"device_ids": [1, 2], "repair": true}  (todos se device_ids omitido)
+
+O relatório é aberto a qualquer usuário autenticado; o ``repair`` escreve nas
+catracas e exige o papel de administrador, como as demais ações de escrita.
+"""
+
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from src.core.control_id.infra.control_id_django_app.models import Device
+from src.core.user.infra.user_django_app.permissions import IsAdminRole
+
+from ..drift_detection import detect_drift
+
+
+@extend_schema(tags=["Config Sync"])
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def drift_report(request):
+    """Compara banco e catracas por hashes e, no POST com ``repair``, corrige o delta."""
+    if request.method == "GET":
+        device_id = request.query_params.get("device_id")
+        device_ids = [device_id] if device_id else None
+        repair = False
+    else:
+        device_ids = request.data.get("device_ids")
+        repair = bool(request.data.get("repair", False))
+        if repair and not IsAdminRole().has_permission(request, None):
+            raise PermissionDenied("Somente administradores podem corrigir o drift.")
+        if device_ids is not None and not isinstance(device_ids, list):
+            return Response(
+                {"error": "device_ids deve ser uma lista de IDs ou omitido"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    devices = Device.objects.filter(is_active=True)
+    if device_ids is not None:
+        try:
+            devices = devices.filter(id__in=[int(value) for value in device_ids])
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "device_ids deve conter apenas IDs numéricos"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    result = detect_drift(list(devices), repair=repair)
+    if not result.get("success"):
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
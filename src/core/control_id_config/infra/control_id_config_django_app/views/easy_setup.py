@@ -21,7 +21,7 @@ from src.core.control_id_monitor.infra.control_id_monitor_django_app.models impo
 from src.core.user.infra.user_django_app.models import User
 
 # Re-export para manter compatibilidade com imports existentes
-from .easy_setup_engine import PUSH_ORDER, _EasySetupEngine  # noqa: F401
+from ..easy_setup_engine import PUSH_ORDER, EasySetupEngine  # noqa: F401
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -177,6 +177,7 @@ def easy_setup_status(request, task_id):
             "status": log.status,
             "started_at": log.started_at,
             "finished_at": log.finished_at,
+            "stage_timings": log.stage_timings,
         }
         # Só inclui report completo se já finalizou
         if log.status not in (
@@ -11,7 +11,7 @@ os models Django e o ORM.
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from django.utils import timezone
 import logging
 import requests
@@ -203,6 +203,16 @@ class AccessVerdict:
         return self.precise_reason
 
 
+@dataclass
+class AccessAnalysis:
+    """Resultado de ``AccessVerificationService.verify_access``."""
+
+    diagnosis: str
+    precise_reason: str
+    is_granted: bool
+    cross_checked: bool = False
+
+
 class AccessVerificationService:
     """
     Analisa um log de acesso recebido da catraca e determina
@@ -234,6 +244,35 @@ class AccessVerificationService:
         Returns:
             str: Diagnóstico completo do acesso
         """
+        return self.verify_access(
+            user_id=user_id,
+            portal_id=portal_id,
+            event_type=event_type,
+            access_rule_id=access_rule_id,
+            device_name=device_name,
+            access_time=access_time,
+            device=device,
+        ).diagnosis
+
+    def verify_access(
+        self,
+        user_id: Optional[int],
+        portal_id: Optional[int],
+        event_type: int,
+        access_rule_id: Optional[int] = None,
+        device_name: str = "",
+        access_time: Optional[datetime] = None,
+        device=None,
+        cross_check_gate: Optional[Callable[[], bool]] = None,
+    ) -> AccessAnalysis:
+        """
+        Mesma análise de ``analyze_access``, devolvendo o resultado estruturado.
+
+        Args:
+            cross_check_gate: Chamado só quando há INCONSISTÊNCIA, antes de
+                    consultar a catraca. Se retornar False, a verificação
+                    cruzada é pulada (janela de coalescência já consumida).
+        """
         from src.core.user.infra.user_django_app.models import User
         from src.core.control_id.infra.control_id_django_app.models import (
             Portal,
@@ -242,6 +281,9 @@ class AccessVerificationService:
 
         if access_time is None:
             access_time = timezone.now()
+        if timezone.is_aware(access_time):
+            # Logs lidos do banco voltam em UTC; regras e cabeçalho usam hora local.
+            access_time = timezone.localtime(access_time)
 
         event_desc = EVENT_DESCRIPTIONS.get(
             event_type, f"Evento desconhecido ({event_type})"
@@ -290,7 +332,7 @@ class AccessVerificationService:
             lines.append("=" * 70)
             diagnosis = "\n".join(lines)
             self._log_diagnosis(diagnosis, is_granted)
-            return diagnosis
+            return AccessAnalysis(diagnosis, verdict.precise_reason, is_granted)
 
         # ── 3. Informações do portal ──
         portal = None
@@ -340,7 +382,15 @@ class AccessVerificationService:
         lines.append(f"   🔍 MOTIVO: {verdict.precise_reason}")
 
         # ── 7. Se INCONSISTÊNCIA, consultar catraca para descobrir o que está diferente ──
-        if "INCONSISTÊNCIA" in verdict.precise_reason and device and user:
+        cross_checked = False
+        inconsistent = "INCONSISTÊNCIA" in verdict.precise_reason and device and user
+        if inconsistent and cross_check_gate is not None and not cross_check_gate():
+            lines.append("")
+            lines.append(
+                "   🔎 Verificação cruzada já feita nesta janela de coalescência — pulada"
+            )
+        elif inconsistent:
+            cross_checked = True
             lines.append("")
             lines.append("   🔎 VERIFICAÇÃO CRUZADA COM A CATRACA:")
             lines.append("   " + "-" * 50)
@@ -362,7 +412,9 @@ class AccessVerificationService:
 
         diagnosis = "\n".join(lines)
         self._log_diagnosis(diagnosis, is_granted)
-        return diagnosis
+        return AccessAnalysis(
+            diagnosis, verdict.precise_reason, is_granted, cross_checked
+        )
 
     def _analyze_rules_with_verdict(
         self,
@@ -375,17 +427,10 @@ class AccessVerificationService:
         Analisa todas as regras de acesso e preenche o AccessVerdict
         com dados estruturados para diagnóstico preciso.
         """
-        from src.core.control_id.infra.control_id_django_app.models.portal_access_rule import (
-            PortalAccessRule,
-        )
-        from src.core.control_id.infra.control_id_django_app.models.user_access_rule import (
-            UserAccessRule,
-        )
-        from src.core.control_id.infra.control_id_django_app.models.group_access_rules import (
-            GroupAccessRule,
-        )
-        from src.core.control_id.infra.control_id_django_app.models.user_groups import (
-            UserGroup,
+        from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+            DAY_NAMES,
+            get_access_policy_index,
+            local_clock,
         )
 
         lines: List[str] = []
@@ -396,34 +441,19 @@ class AccessVerificationService:
             lines.append("⚠️  Sem portal — não é possível verificar regras")
             return lines
 
-        # Regras vinculadas ao portal
-        portal_rules = PortalAccessRule.objects.filter(portal=portal).select_related(
-            "access_rule"
-        )
+        # Regras vinculadas ao portal (índice em memória, sem queries)
+        index = get_access_policy_index()
+        portal_rules = index.rules_for_portal(portal.id)
 
-        if not portal_rules.exists():
+        if not portal_rules:
             verdict.portal_has_rules = False
             lines.append("⚠️  Portal sem regras de acesso vinculadas")
             return lines
 
         verdict.portal_has_rules = True
 
-        # Regras do usuário (diretas)
-        user_rule_ids = set(
-            UserAccessRule.objects.filter(user=user).values_list(
-                "access_rule_id", flat=True
-            )
-        )
-
-        # Regras do usuário (via grupos)
-        user_group_ids = list(
-            UserGroup.objects.filter(user=user).values_list("group_id", flat=True)
-        )
-        group_rule_ids = set(
-            GroupAccessRule.objects.filter(group_id__in=user_group_ids).values_list(
-                "access_rule_id", flat=True
-            )
-        )
+        # Regras do usuário (diretas e via grupos)
+        user_rule_ids, group_rule_ids = index.user_rule_ids(user.id)
 
         all_user_rule_ids = user_rule_ids | group_rule_ids
         verdict.user_has_any_rule = len(all_user_rule_ids) > 0
@@ -433,22 +463,17 @@ class AccessVerificationService:
         lines.append("")
 
         # Calcular segundos do dia e dia da semana
-        segundos_dia = (
-            access_time.hour * 3600 + access_time.minute * 60 + access_time.second
-        )
-        dia_semana = access_time.weekday()  # 0=segunda
-        dias_nome = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
-        dia_atual_nome = dias_nome[dia_semana]
+        dia_semana, segundos_dia = local_clock(access_time)  # 0=segunda
+        dia_atual_nome = DAY_NAMES[dia_semana]
 
         # Verificar cada regra do portal
-        for pr in portal_rules:
-            rule = pr.access_rule
+        for rule in portal_rules:
             rule_type_str = "LIBERAÇÃO" if rule.type == 1 else "BLOQUEIO"
             icon = "🟢" if rule.type == 1 else "🔴"
 
             # Verifica se o usuário tem essa regra
-            user_has_rule = rule.id in all_user_rule_ids  # type: ignore[attr-defined]
-            via_group = rule.id in group_rule_ids and rule.id not in user_rule_ids  # type: ignore[attr-defined]
+            user_has_rule = rule.id in all_user_rule_ids
+            via_group = rule.id in group_rule_ids and rule.id not in user_rule_ids
 
             if user_has_rule:
                 verdict.user_has_any_matching_rule = True
@@ -525,54 +550,35 @@ class AccessVerificationService:
         """
         Verifica se o horário atual está dentro das TimeZones da regra.
 
+        Args:
+            access_rule: ``CompiledRule`` do índice de políticas de acesso.
+
         Returns:
             (dentro_horario, lista_de_detalhes, resumo_horario)
         """
-        from src.core.control_id.infra.control_id_django_app.models.access_rule_timezone import (
-            AccessRuleTimeZone,
-        )
-        from src.core.control_id.infra.control_id_django_app.models.timespan import (
-            TimeSpan,
+        from src.core.control_id.infra.control_id_django_app.access_policy_index import (
+            DAY_NAMES,
         )
 
         details: List[str] = []
         summary_parts: List[str] = []
 
-        artz_qs = AccessRuleTimeZone.objects.filter(
-            access_rule=access_rule
-        ).select_related("time_zone")
-
-        if not artz_qs.exists():
+        if access_rule.unrestricted:
             details.append("⏰ Sem restrição de horário (acesso livre)")
             return True, details, "sem restrição (livre)"
 
-        dias_nome = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
-        dia_atual_nome = dias_nome[dia_semana]
+        dia_atual_nome = DAY_NAMES[dia_semana]
 
-        for artz in artz_qs:
-            tz = artz.time_zone
+        for tz in access_rule.time_zones:
             details.append(f"⏰ Zona horária: {tz.name}")
 
-            spans = TimeSpan.objects.filter(time_zone=tz)
-
-            if not spans.exists():
+            if not tz.spans:
                 details.append("   (sem intervalos configurados)")
                 summary_parts.append(f"{tz.name}: sem intervalos")
                 continue
 
-            for span in spans:
-                dias_flags = [
-                    span.mon,
-                    span.tue,
-                    span.wed,
-                    span.thu,
-                    span.fri,
-                    span.sat,
-                    span.sun,
-                ]
-                dias_ativos = [
-                    dias_nome[i] for i, flag in enumerate(dias_flags) if flag
-                ]
+            for span in tz.spans:
+                dias_ativos = span.day_names
 
                 start_h = span.start // 3600
                 start_m = (span.start % 3600) // 60
@@ -585,15 +591,14 @@ class AccessVerificationService:
                 span_summary = f"{horario_str} [{dias_str}]"
                 summary_parts.append(span_summary)
 
-                dia_ok = dias_flags[dia_semana]
-                horario_ok = span.start <= segundos_dia <= span.end
+                dia_ok = bool(span.day_mask >> dia_semana & 1)
 
-                if dia_ok and horario_ok:
+                if span.covers(dia_semana, segundos_dia):
                     details.append(
                         f"   ✔ {horario_str} [{dias_str}] ← DENTRO deste intervalo ({dia_atual_nome})"
                     )
                     return True, details, span_summary
-                elif dia_ok and not horario_ok:
+                elif dia_ok:
                     details.append(
                         f"   ✖ {horario_str} [{dias_str}] ← Dia correto ({dia_atual_nome}) mas FORA do horário"
                     )
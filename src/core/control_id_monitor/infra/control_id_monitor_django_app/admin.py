@@ -3,7 +3,14 @@ from django.utils.html import format_html
 from django.utils import timezone
 from datetime import timezone as dt_timezone
 
-from .models import MonitorAlert, MonitorAlertRead, MonitorConfig
+from .models import (
+    AccessVerification,
+    FirmwareDeviceMapping,
+    MonitorAlert,
+    MonitorAlertRead,
+    MonitorConfig,
+    WebhookInbox,
+)
 
 
 def format_datetime_utc(value):
@@ -112,3 +119,41 @@ class MonitorAlertReadAdmin(admin.ModelAdmin):
     list_display = ("alert", "user", "read_at_utc")
     search_fields = ("alert__title", "user__name", "user__email")
     readonly_fields = ("read_at_utc",)
+
+
+@admin.register(AccessVerification)
+class AccessVerificationAdmin(admin.ModelAdmin):
+    @admin.display(description="Verified at (UTC)")
+    def verified_at_utc(self, obj):
+        return format_datetime_utc(obj.verified_at)
+
+    list_display = ("access_log", "status", "is_granted", "cross_checked", "verified_at_utc")
+    list_filter = ("status", "is_granted", "cross_checked")
+    search_fields = ("access_log__identifier_id", "access_log__device__name", "precise_reason")
+    readonly_fields = ("created_at", "verified_at_utc")
+    raw_id_fields = ("access_log",)
+
+
+@admin.register(WebhookInbox)
+class WebhookInboxAdmin(admin.ModelAdmin):
+    @admin.display(description="Received at (UTC)")
+    def received_at_utc(self, obj):
+        return format_datetime_utc(obj.received_at)
+
+    list_display = ("id", "kind", "status", "device", "attempts", "received_at_utc")
+    list_filter = ("kind", "status")
+    search_fields = ("device__name", "last_error")
+    readonly_fields = ("received_at_utc",)
+    raw_id_fields = ("device",)
+
+
+@admin.register(FirmwareDeviceMapping)
+class FirmwareDeviceMappingAdmin(admin.ModelAdmin):
+    @admin.display(description="Created at (UTC)")
+    def created_at_utc(self, obj):
+        return format_datetime_utc(obj.created_at)
+
+    list_display = ("firmware_device_id", "device", "created_at_utc")
+    search_fields = ("firmware_device_id", "device__name")
+    readonly_fields = ("created_at_utc",)
+    raw_id_fields = ("device",)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MonitorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = "src.core.control_id_monitor.infra.control_id_monitor_django_app"
+
+    def ready(self):
+        from .reference_cache import connect_signals
+
+        connect_signals()
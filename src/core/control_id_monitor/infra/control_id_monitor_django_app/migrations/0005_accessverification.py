@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_django_app", "0045_accesslogs_unique_device_identifier_time"),
+        ("control_id_monitor_django_app", "0004_monitorconfig_auto_disabled_due_to_offline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccessVerification",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("status", models.CharField(choices=[("pending", "Pendente"), ("done", "Concluida"), ("failed", "Falhou")], db_index=True, default="pending", max_length=16)),
+                ("precise_reason", models.TextField(blank=True, default="")),
+                ("diagnosis", models.TextField(blank=True, default="")),
+                ("is_granted", models.BooleanField(blank=True, null=True)),
+                ("cross_checked", models.BooleanField(default=False, help_text="Indica se a catraca foi consultada (verificacao cruzada) nesta analise")),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("verified_at", models.DateTimeField(blank=True, null=True)),
+                ("access_log", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="verification", to="control_id_django_app.accesslogs")),
+            ],
+            options={
+                "verbose_name": "Verificação de Acesso",
+                "verbose_name_plural": "Verificações de Acesso",
+                "db_table": "control_id_monitor_access_verification",
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_django_app", "0045_accesslogs_unique_device_identifier_time"),
+        ("control_id_monitor_django_app", "0005_accessverification"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookInbox",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("dao", "Notificação DAO"), ("catra_event", "Evento de giro")], max_length=16)),
+                ("status", models.CharField(choices=[("pending", "Pendente"), ("failed", "Falhou")], default="pending", max_length=16)),
+                ("payload", models.JSONField()),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("received_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("device", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="webhook_inbox", to="control_id_django_app.device")),
+            ],
+            options={
+                "verbose_name": "Webhook pendente",
+                "verbose_name_plural": "Webhooks pendentes",
+                "db_table": "control_id_monitor_webhook_inbox",
+                "indexes": [models.Index(fields=["status", "id"], name="control_id__status_411660_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("control_id_django_app", "0045_accesslogs_unique_device_identifier_time"),
+        ("control_id_monitor_django_app", "0006_webhookinbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FirmwareDeviceMapping",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("firmware_device_id", models.CharField(max_length=64, unique=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("device", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="firmware_mappings", to="control_id_django_app.device")),
+            ],
+            options={
+                "verbose_name": "Mapeamento de device do firmware",
+                "verbose_name_plural": "Mapeamentos de device do firmware",
+                "db_table": "control_id_monitor_firmware_device_mapping",
+            },
+        ),
+    ]
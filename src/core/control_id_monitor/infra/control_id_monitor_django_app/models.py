@@ -186,3 +186,101 @@ class MonitorAlertRead(models.Model):
 
     def __str__(self):
         return f"{self.user_id}:{self.alert_id}"
+
+
+class AccessVerification(models.Model):
+    """Diagnóstico de um log de acesso, calculado fora do push da catraca."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pendente"
+        DONE = "done", "Concluida"
+        FAILED = "failed", "Falhou"
+
+    access_log = models.OneToOneField(
+        "control_id_django_app.AccessLogs",
+        on_delete=models.CASCADE,
+        related_name="verification",
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    precise_reason = models.TextField(blank=True, default="")
+    diagnosis = models.TextField(blank=True, default="")
+    is_granted = models.BooleanField(null=True, blank=True)
+    cross_checked = models.BooleanField(
+        default=False,
+        help_text="Indica se a catraca foi consultada (verificacao cruzada) nesta analise",
+    )
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Verificação de Acesso"
+        verbose_name_plural = "Verificações de Acesso"
+        db_table = "control_id_monitor_access_verification"
+
+    def __str__(self):
+        return f"{self.access_log_id}: {self.status}"
+
+
+class WebhookInbox(models.Model):
+    """Webhook da catraca recebido e ainda não processado (fila de ingestão)."""
+
+    class Kind(models.TextChoices):
+        DAO = "dao", "Notificação DAO"
+        CATRA_EVENT = "catra_event", "Evento de giro"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pendente"
+        FAILED = "failed", "Falhou"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    device = models.ForeignKey(
+        Device,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="webhook_inbox",
+    )
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    received_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Webhook pendente"
+        verbose_name_plural = "Webhooks pendentes"
+        db_table = "control_id_monitor_webhook_inbox"
+        indexes = [models.Index(fields=["status", "id"])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}: {self.status}"
+
+
+class FirmwareDeviceMapping(models.Model):
+    """
+    Vínculo entre o ``device_id`` interno do firmware e o ``Device`` do Django.
+
+    O ``device_id`` dos webhooks é o ID da catraca (ex: 478435), não o id do
+    model. Quando ele não bate com nenhum ``Device`` é este vínculo, cadastrado
+    no admin, que diz qual é a catraca; sem ele a ingestão usa heurísticas
+    (MonitorConfig, device padrão) sem gravar nada.
+    """
+
+    firmware_device_id = models.CharField(max_length=64, unique=True)
+    device = models.ForeignKey(
+        Device, on_delete=models.CASCADE, related_name="firmware_mappings"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Mapeamento de device do firmware"
+        verbose_name_plural = "Mapeamentos de device do firmware"
+        db_table = "control_id_monitor_firmware_device_mapping"
+
+    def __str__(self):
+        return f"{self.firmware_device_id} → {self.device_id}"
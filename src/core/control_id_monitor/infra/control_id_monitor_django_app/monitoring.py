@@ -1,46 +1,87 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 from django.utils.timezone import localtime
 
-from src.core.control_id.infra.control_id_django_app.models import Device
-
 from .models import MonitorAlert, MonitorConfig
+from .reference_cache import resolve_device
 
 
 def resolve_monitor_device(device_identifier):
-    device = None
-    if device_identifier not in (None, ""):
-        try:
-            device = Device.objects.filter(id=int(device_identifier)).first()
-        except (TypeError, ValueError):
-            device = None
-
-    if device:
-        return device
+    return resolve_device(device_identifier)
 
-    monitor_cfg = (
-        MonitorConfig.objects.select_related("device")
-        .filter(device__is_active=True)
-        .exclude(hostname="")
-        .first()
-    )
-    if monitor_cfg:
-        return monitor_cfg.device
 
-    return (
-        Device.objects.filter(is_default=True).first()
-        or Device.objects.filter(is_active=True).first()
+_HEARTBEAT_KEY = "monitor_heartbeat:last:{device_id}"
+_HEARTBEAT_FLUSH_KEY = "monitor_heartbeat:flush:{device_id}"
+# O último sinal fica no cache bem além de qualquer heartbeat_timeout_seconds;
+# se sumir, a checagem simplesmente volta a usar o banco.
+_HEARTBEAT_TTL_SECONDS = 24 * 3600
+
+
+def _heartbeat_flush_interval():
+    value = getattr(settings, "MONITOR_HEARTBEAT_FLUSH_SECONDS", 15)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 15
+
+
+def _remember_heartbeat(device_id, at, source):
+    cache.set(
+        _HEARTBEAT_KEY.format(device_id=device_id),
+        {"at": at.timestamp(), "source": source},
+        timeout=_HEARTBEAT_TTL_SECONDS,
     )
 
 
-@transaction.atomic
+def latest_heartbeats(device_ids):
+    """Último sinal de cada catraca no cache: ``{device_id: datetime}``."""
+    keys = {_HEARTBEAT_KEY.format(device_id=device_id): device_id for device_id in device_ids}
+    found = cache.get_many(list(keys))
+    return {
+        keys[key]: datetime.fromtimestamp(value["at"], tz=dt_timezone.utc)
+        for key, value in found.items()
+        if isinstance(value, dict) and value.get("at") is not None
+    }
+
+
 def touch_device_heartbeat(device_identifier, source="monitor"):
+    """
+    Registra um sinal de vida da catraca e retorna o ``Device`` resolvido.
+
+    O sinal vai sempre para o cache; o ``MonitorConfig`` só é gravado no
+    máximo uma vez a cada ``MONITOR_HEARTBEAT_FLUSH_SECONDS`` por catraca.
+    Ao marcar uma catraca offline a trava de flush é apagada, então o
+    primeiro sinal depois disso sempre grava no banco e resolve o alerta
+    na hora.
+
+    A trava e o último sinal só valem entre processos com o cache
+    compartilhado (``REDIS_CACHE_URL``); sem ele cada processo grava no
+    banco no seu próprio ritmo e a checagem do beat se apoia no banco, que
+    fica no máximo ``MONITOR_HEARTBEAT_FLUSH_SECONDS`` atrasado.
+    """
     device = resolve_monitor_device(device_identifier)
     if not device:
         return None
 
     now = timezone.now()
+    _remember_heartbeat(device.id, now, source)
+
+    interval = _heartbeat_flush_interval()
+    if interval and not cache.add(
+        _HEARTBEAT_FLUSH_KEY.format(device_id=device.id), 1, timeout=interval
+    ):
+        return device
+
+    _flush_device_heartbeat(device, now, source)
+    return device
+
+
+@transaction.atomic
+def _flush_device_heartbeat(device, now, source):
     config, _ = MonitorConfig.objects.select_for_update().get_or_create(device=device)
     was_offline = config.is_offline
     should_reactivate_device = config.auto_disabled_due_to_offline
@@ -88,6 +129,9 @@ def mark_monitor_config_offline(config, detected_at=None):
     if config.is_offline:
         return None
 
+    # O próximo sinal desta catraca precisa ir ao banco para voltar a online.
+    cache.delete(_HEARTBEAT_FLUSH_KEY.format(device_id=config.device_id))
+
     auto_disabled_due_to_offline = False
     if config.device.is_active:
         config.device.is_active = False
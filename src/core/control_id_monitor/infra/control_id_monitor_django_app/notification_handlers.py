@@ -10,19 +10,54 @@ O Monitor é um sistema PUSH onde a catraca envia automaticamente:
 Quando há inserção, alteração ou deleção dessas entidades.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from copy import deepcopy
 from datetime import datetime, timezone as dt_timezone
 from zoneinfo import ZoneInfo
 
 from django.db import transaction
+from django.db.models import Q
 import logging
 
-from .access_verification import access_verifier
+from .reference_cache import (
+    get_access_rule,
+    get_access_rules,
+    get_portal,
+    get_portals,
+    resolve_device,
+)
 
 logger = logging.getLogger(__name__)
 DEVICE_LOCAL_TIMEZONE = ZoneInfo("America/Sao_Paulo")
 
+CATRA_EVENT_NAMES = {
+    7: "TURN_LEFT",
+    8: "TURN_RIGHT",
+    9: "GIVE_UP",
+}
+
+# Mudanças de access_logs que viram upsert; "deleted" segue pelo caminho unitário.
+_BATCHABLE_ACCESS_LOG_CHANGES = frozenset({"inserted", "updated"})
+
+# Campos sobrescritos quando o log (device, identifier_id, time) já existe.
+_ACCESS_LOG_UPSERT_FIELDS = [
+    "event_type",
+    "user",
+    "portal",
+    "access_rule",
+    "card_value",
+    "qr_code",
+    "uhf_value",
+    "pin_value",
+    "confidence",
+    "mask",
+    "sentido",
+    "raw_payload",
+    "updated_at",
+    "deleted_at",
+    "deleted_by_cascade",
+]
+
 
 class MonitorNotificationHandler:
     """
@@ -97,14 +132,22 @@ class MonitorNotificationHandler:
             errors = []
 
             with transaction.atomic():
-                for change in object_changes:
+                batched_results = self._process_access_log_batch(
+                    device_id=device_id,
+                    object_changes=object_changes,
+                    raw_notification=payload,
+                    sentido=sentido,
+                )
+                for index, change in enumerate(object_changes):
                     try:
-                        result = self._process_single_change(
-                            device_id=device_id,
-                            change=change,
-                            raw_notification=payload,
-                            sentido=sentido,
-                        )
+                        result = batched_results.get(index)
+                        if result is None:
+                            result = self._process_single_change(
+                                device_id=device_id,
+                                change=change,
+                                raw_notification=payload,
+                                sentido=sentido,
+                            )
                         results.append(result)
                         if result.get("success"):
                             processed += 1
@@ -134,6 +177,115 @@ class MonitorNotificationHandler:
             )
             return {"success": False, "error": str(e), "processed": 0}
 
+    def process_catra_event(self, payload: Dict[str, Any], device: Any) -> Dict[str, Any]:
+        """
+        Salva um evento de giro (catra_event) como AccessLog.
+
+        Idempotente por (device, identifier_id, time): reenvios do mesmo
+        evento só atualizam o registro existente.
+        """
+        from django.utils import timezone
+        from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+
+        event_data = payload.get("event") or {}
+        event_time = payload.get("time")
+        event_type = event_data.get("type", 0)
+        event_name = event_data.get(
+            "name", CATRA_EVENT_NAMES.get(event_type, "UNKNOWN")
+        )
+        event_uuid = event_data.get("uuid", "")
+        access_event_id = payload.get("access_event_id")
+
+        # ── Timestamp ──
+        # TODO: revisar esta conversao de timezone; hoje o timestamp do
+        # catra_event esta sendo persistido explicitamente em UTC.
+        timestamp = (
+            timezone.make_aware(
+                datetime.fromtimestamp(
+                    int(event_time),
+                    tz=dt_timezone.utc,
+                ).replace(tzinfo=None),
+                DEVICE_LOCAL_TIMEZONE,
+            )
+            if event_time
+            else timezone.now()
+        )
+
+        # ── Resolve portal ──
+        raw_portal_id = (
+            payload.get("portal_id")
+            or payload.get("door_id")
+            or event_data.get("portal_id")
+            or event_data.get("door_id")
+        )
+        portal = None
+        if raw_portal_id is not None:
+            try:
+                portal_id = int(raw_portal_id)
+                if portal_id > 0:
+                    portal = get_portal(portal_id)
+                    if not portal:
+                        logger.warning(
+                            f"⚠️ [CATRA_EVENT] Portal id={portal_id} não existe no banco"
+                        )
+            except (TypeError, ValueError):
+                logger.warning(
+                    f"⚠️ [CATRA_EVENT] portal_id inválido recebido: {raw_portal_id}"
+                )
+
+        # ── Mapeia event_type da catraca para EventType do model ──
+        # 7 = TURN_LEFT / 8 = TURN_RIGHT → registra como ACESSO_CONCEDIDO (7)
+        # 9 = GIVE_UP → registra como DESISTENCIA_DE_ENTRADA (13)
+        if event_type == 9:
+            model_event_type = 13  # DESISTENCIA_DE_ENTRADA
+        else:
+            model_event_type = 7  # ACESSO_CONCEDIDO
+
+        # ── Identifier único: uuid do evento ou access_event_id ──
+        identifier = event_uuid or str(access_event_id or event_time or "")
+
+        log, created = AccessLogs.objects.update_or_create(
+            device=device,
+            identifier_id=identifier,
+            time=timestamp,
+            defaults={
+                "event_type": model_event_type,
+                "user": None,
+                "portal": portal,
+                "access_rule": None,
+                "card_value": "",
+                "qr_code": "",
+                "uhf_value": "",
+                "pin_value": "",
+                "confidence": 0,
+                "mask": "",
+                "sentido": event_data.get("name", ""),
+                "raw_payload": {
+                    "source": "catra_event",
+                    "notification": payload,
+                },
+            },
+        )
+
+        action = "created" if created else "already_exists"
+        logger.info(
+            f"✅ [CATRA_EVENT] {action} — {event_name} (type={event_type}) "
+            f"device={device.name} portal={portal.name if portal else raw_portal_id} "
+            f"uuid={event_uuid} access_event_id={access_event_id}"
+        )
+
+        return {
+            "success": True,
+            "action": action,
+            "event_name": event_name,
+            "event_type": event_type,
+            "model_event_type": model_event_type,
+            "device": str(device),
+            "portal": portal.name if portal else None,
+            "time": str(timestamp),
+            "sentido": event_data.get("name", ""),
+        }
+
     def _process_single_change(
         self,
         device_id: int,
@@ -198,6 +350,329 @@ class MonitorNotificationHandler:
         ).replace(tzinfo=None)
         return timezone.make_aware(naive_local, DEVICE_LOCAL_TIMEZONE)
 
+    @staticmethod
+    def _resolve_access_log_device(device_id: Any):
+        """
+        Resolve o Device do Django a partir do device_id enviado pela catraca.
+
+        O device_id do payload é o ID interno da catraca (ex: 478435),
+        que NÃO necessariamente é o id do Model Device no Django. A ordem
+        (mapeamento do firmware, id direto, fallback) fica em
+        ``reference_cache.resolve_device``, sem query no caminho quente.
+        """
+        return resolve_device(device_id)
+
+    @staticmethod
+    def _positive_int(value: Any) -> int | None:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return None
+        return number if number > 0 else None
+
+    def _process_access_log_batch(
+        self,
+        device_id: Any,
+        object_changes: List[Any],
+        raw_notification: Dict[str, Any],
+        sentido: str | None = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Processa em lote os access_logs inseridos/atualizados da notificação.
+
+        Quando a catraca volta de uma queda ela empurra centenas de logs numa
+        única notificação; aqui eles viram poucas queries ``IN`` e um único
+        upsert, em vez de várias queries por log.
+
+        Returns:
+            dict: ``{índice em object_changes: resultado}``. Mudanças fora do
+            lote (ou todas, se o lote falhar) ficam de fora e seguem pelo
+            caminho unitário de :meth:`_process_single_change`.
+        """
+        indexed = [
+            (index, change)
+            for index, change in enumerate(object_changes)
+            if isinstance(change, dict)
+            and change.get("object") == "access_logs"
+            and change.get("type") in _BATCHABLE_ACCESS_LOG_CHANGES
+            and isinstance(change.get("values") or {}, dict)
+        ]
+        if not indexed:
+            return {}
+
+        try:
+            with transaction.atomic():
+                return self._upsert_access_logs(
+                    device_id, indexed, raw_notification, sentido
+                )
+        except Exception as e:
+            logger.warning(
+                f"⚠️ [ACCESS_LOG] Lote de {len(indexed)} logs falhou ({e}); "
+                "processando um a um",
+                exc_info=True,
+            )
+            return {}
+
+    def _upsert_access_logs(
+        self,
+        device_id: Any,
+        indexed: List[Tuple[int, Dict[str, Any]]],
+        raw_notification: Dict[str, Any],
+        sentido: str | None,
+    ) -> Dict[int, Dict[str, Any]]:
+        from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+        from src.core.user.infra.user_django_app.models import User
+
+        device = self._resolve_access_log_device(device_id)
+        if not device:
+            logger.error(
+                f"❌ [ACCESS_LOG] Nenhum device encontrado para device_id={device_id}"
+            )
+            return {
+                index: {
+                    "success": False,
+                    "object": "access_logs",
+                    "error": f"Device {device_id} não encontrado e sem fallback disponível",
+                }
+                for index, _ in indexed
+            }
+
+        # ── Resolve portais, usuários e regras de todo o lote de uma vez ──
+        refs = []
+        for index, change in indexed:
+            values = change.get("values") or {}
+            refs.append(
+                (
+                    index,
+                    change,
+                    values,
+                    self._positive_int(values.get("portal_id") or values.get("door_id")),
+                    self._positive_int(values.get("user_id")),
+                    self._positive_int(
+                        values.get("access_rule_id")
+                        or values.get("identification_rule_id")
+                        or values.get("access_rule")
+                    ),
+                )
+            )
+
+        portal_ids = {ref[3] for ref in refs if ref[3]}
+        user_ids = {ref[4] for ref in refs if ref[4]}
+        rule_ids = {ref[5] for ref in refs if ref[5]}
+        portals = get_portals(portal_ids)
+        users = User.objects.in_bulk(user_ids) if user_ids else {}
+        rules = get_access_rules(rule_ids)
+
+        missing_portals = portal_ids - set(portals)
+        if missing_portals:
+            logger.warning(
+                f"⚠️ [ACCESS_LOG] Portais não existem no banco: {sorted(missing_portals)}"
+            )
+
+        # Uma cópia da notificação compartilhada por todos os logs do lote.
+        notification_copy = deepcopy(raw_notification or {})
+
+        results: Dict[int, Dict[str, Any]] = {}
+        entries: List[Tuple[int, Dict[str, Any], Tuple[str, datetime]]] = []
+        logs_by_key: Dict[Tuple[str, datetime], Any] = {}
+
+        for index, change, values, portal_id, user_id, rule_id in refs:
+            change_type = change.get("type")
+            log_id = values.get("id")
+            event = values.get("event")
+            try:
+                timestamp = self._parse_device_unix_timestamp(values.get("time"))
+                log = AccessLogs(
+                    device=device,
+                    identifier_id=str(log_id),
+                    time=timestamp,
+                    event_type=int(event) if event else 10,
+                    user=users.get(user_id) if user_id else None,
+                    portal=portals.get(portal_id) if portal_id else None,
+                    access_rule=rules.get(rule_id) if rule_id else None,
+                    card_value=values.get("card_value", ""),
+                    qr_code=values.get("qr_code") or values.get("qrcode_value", ""),
+                    uhf_value=values.get("uhf_value") or values.get("uhf_tag", ""),
+                    pin_value=values.get("pin_value", ""),
+                    confidence=values.get("confidence", 0),
+                    mask=values.get("mask", ""),
+                    sentido=sentido or "",
+                    raw_payload={
+                        "source": "dao_notification",
+                        "device_id": device_id,
+                        "change_type": change_type,
+                        "change": deepcopy(change),
+                        "notification": notification_copy,
+                    },
+                    deleted_at=None,
+                    deleted_by_cascade=False,
+                )
+            except Exception as e:
+                logger.error(
+                    f"❌ [ACCESS_LOG] Log {log_id} inválido: {e}", exc_info=True
+                )
+                results[index] = {
+                    "success": False,
+                    "object": "access_logs",
+                    "error": str(e),
+                }
+                continue
+
+            key = (log.identifier_id, timestamp)
+            # Repetições do mesmo log no lote: vale a última versão.
+            logs_by_key[key] = log
+            entries.append((index, change, key))
+
+        if not logs_by_key:
+            return results
+
+        # A chave natural é única também entre logs removidos (soft delete):
+        # o upsert traz de volta o log apagado que a catraca reenviou, e ele
+        # é reportado como "revived", não como novo.
+        existing = {}
+        for identifier_id, time, deleted_at in AccessLogs.all_objects.filter(
+            device=device,
+            identifier_id__in={key[0] for key in logs_by_key},
+            time__in={key[1] for key in logs_by_key},
+        ).values_list("identifier_id", "time", "deleted_at"):
+            existing[(identifier_id, time)] = deleted_at is not None
+
+        AccessLogs.all_objects.bulk_create(
+            list(logs_by_key.values()),
+            update_conflicts=True,
+            unique_fields=["device", "identifier_id", "time"],
+            update_fields=_ACCESS_LOG_UPSERT_FIELDS,
+            batch_size=500,
+        )
+
+        created_keys = set()
+        revived_keys = {key for key, was_deleted in existing.items() if was_deleted}
+        last_passage: Dict[int, datetime] = {}
+        for index, change, key in entries:
+            created = key not in existing and key not in created_keys
+            if created:
+                created_keys.add(key)
+                log = logs_by_key[key]
+                if change.get("type") == "inserted" and log.user_id:
+                    previous = last_passage.get(log.user_id)
+                    if previous is None or key[1] > previous:
+                        last_passage[log.user_id] = key[1]
+
+            log_id = (change.get("values") or {}).get("id")
+            if key in revived_keys:
+                results[index] = {
+                    "success": True,
+                    "object": "access_logs",
+                    "action": "revived",
+                    "log_id": log_id,
+                    "device": device.name,
+                }
+            elif change.get("type") == "inserted":
+                results[index] = {
+                    "success": True,
+                    "object": "access_logs",
+                    "action": "created" if created else "already_exists",
+                    "log_id": log_id,
+                    "device": device.name,
+                }
+            else:
+                results[index] = {
+                    "success": True,
+                    "object": "access_logs",
+                    "action": "created (via updated)" if created else "updated",
+                    "log_id": log_id,
+                }
+
+        # ── Atualiza ultima passagem: uma vez por usuário, com o log mais recente ──
+        for user_id, timestamp in last_passage.items():
+            User.objects.filter(id=user_id).filter(
+                Q(last_passage_at__isnull=True) | Q(last_passage_at__lt=timestamp)
+            ).update(last_passage_at=timestamp)
+
+        # ── Verificação de acesso: fora do push, depois do commit ──
+        self._schedule_access_verification(
+            [logs_by_key[key] for key in created_keys]
+        )
+
+        logger.info(
+            f"✅ [ACCESS_LOG] Lote do device {device.name}: {len(entries)} logs, "
+            f"{len(created_keys)} novos, {len(revived_keys)} restaurados, "
+            f"{len(logs_by_key) - len(created_keys) - len(revived_keys)} já existiam"
+        )
+        return results
+
+    @staticmethod
+    def _schedule_access_verification(logs: List[Any]) -> None:
+        """
+        Registra a verificação pendente dos logs novos e enfileira a análise
+        para depois do commit.
+
+        A análise pode consultar a catraca (verificação cruzada); rodá-la aqui
+        seguraria a resposta do push que a própria catraca está esperando.
+        """
+        from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+
+        from .models import AccessVerification
+
+        if not logs:
+            return
+
+        log_ids = [log.pk for log in logs if log.pk is not None]
+        if len(log_ids) < len(logs):
+            # Bancos sem RETURNING no upsert: resolve os ids pela chave natural,
+            # tupla a tupla (``__in`` por coluna casaria combinações cruzadas).
+            natural_keys = Q()
+            for log in logs:
+                natural_keys |= Q(
+                    device_id=log.device_id,
+                    identifier_id=log.identifier_id,
+                    time=log.time,
+                )
+            log_ids = list(
+                AccessLogs.all_objects.filter(natural_keys).values_list(
+                    "id", flat=True
+                )
+            )
+
+        AccessVerification.objects.bulk_create(
+            [AccessVerification(access_log_id=log_id) for log_id in log_ids],
+            ignore_conflicts=True,
+        )
+
+        def enqueue():
+            from .tasks import verify_access_logs
+
+            try:
+                verify_access_logs.delay(log_ids)
+            except Exception as e:
+                # Ficam "pending"; retry_pending_access_verifications reprocessa.
+                logger.warning(
+                    f"⚠️ [ACCESS_VERIFY] Não foi possível enfileirar a verificação "
+                    f"de {len(log_ids)} logs: {e}",
+                    exc_info=True,
+                )
+
+        transaction.on_commit(enqueue)
+
+    @staticmethod
+    def _upsert_access_log(
+        lookup: Dict[str, Any], defaults: Dict[str, Any]
+    ) -> Tuple[Any, bool, bool]:
+        """
+        ``update_or_create`` de um log pela chave natural, incluindo removidos.
+
+        Um log apagado (soft delete) que a catraca reenvia é restaurado em vez
+        de estourar a constraint única. Retorna ``(log, created, revived)``.
+        """
+        from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+
+        revived = AccessLogs.deleted_objects.filter(**lookup).exists()
+        log, created = AccessLogs.all_objects.update_or_create(
+            **lookup,
+            defaults={**defaults, "deleted_at": None, "deleted_by_cascade": False},
+        )
+        return log, created, revived
+
     def _handle_access_log(
         self,
         device_id: int,
@@ -219,43 +694,11 @@ class MonitorNotificationHandler:
         - portal_id: ID do portal (lado da catraca)
         - card_value: Valor do cartão RFID
         """
-        from src.core.control_id.infra.control_id_django_app.models import (
-            AccessLogs,
-            Device,
-            Portal,
-            AccessRule,
-        )
+        from src.core.control_id.infra.control_id_django_app.models import AccessLogs
         from src.core.user.infra.user_django_app.models import User
 
         try:
-            # ── Resolve o device ──
-            # O device_id do payload é o ID interno da catraca (ex: 478435),
-            # que NÃO necessariamente é o id do Model Device no Django.
-            # Tentamos: 1) por id direto  2) via MonitorConfig  3) device padrão
-            device = Device.objects.filter(id=device_id).first()
-
-            if not device:
-                # Tenta encontrar via MonitorConfig (a catraca pode ter um device_id diferente)
-                from .models import MonitorConfig
-
-                monitor_cfg = MonitorConfig.objects.select_related("device").first()
-                if monitor_cfg:
-                    device = monitor_cfg.device
-                    logger.info(
-                        f"🔄 [ACCESS_LOG] device_id={device_id} não encontrado direto, "
-                        f"usando device do MonitorConfig: {device.name} (id={device.id})"  # type: ignore[attr-defined]
-                    )
-
-            if not device:
-                # Fallback: usa o device padrão ou o primeiro ativo
-                device = Device.objects.filter(is_default=True).first()
-                if not device:
-                    device = Device.objects.filter(is_active=True).first()
-                if device:
-                    logger.info(
-                        f"🔄 [ACCESS_LOG] device_id={device_id} não encontrado, "
-                        f"usando fallback: {device.name} (id={device.id})"  # type: ignore[attr-defined]
-                    )
+            device = self._resolve_access_log_device(device_id)
 
             if not device:
                 logger.error(
@@ -279,7 +722,7 @@ class MonitorNotificationHandler:
                 try:
                     portal_id_int = int(portal_id)
                     if portal_id_int > 0:
-                        portal = Portal.objects.filter(id=portal_id_int).first()
+                        portal = get_portal(portal_id_int)
                         if not portal:
                             logger.warning(
                                 f"⚠️ [ACCESS_LOG] Portal id={portal_id_int} não existe no banco"
@@ -309,7 +752,7 @@ class MonitorNotificationHandler:
                 try:
                     rule_id_int = int(rule_id)
                     if rule_id_int > 0:
-                        access_rule = AccessRule.objects.filter(id=rule_id_int).first()
+                        access_rule = get_access_rule(rule_id_int)
                 except (ValueError, TypeError):
                     pass
 
@@ -333,11 +776,13 @@ class MonitorNotificationHandler:
                 # Lookup: device + identifier_id + time
                 # O time no lookup evita colisão quando a catraca
                 # limpa seus logs internos e reinicia a contagem de IDs
-                log, created = AccessLogs.objects.update_or_create(
-                    device=device,
-                    identifier_id=str(log_id),
-                    time=timestamp,
-                    defaults={
+                log, created, revived = self._upsert_access_log(
+                    {
+                        "device": device,
+                        "identifier_id": str(log_id),
+                        "time": timestamp,
+                    },
+                    {
                         "event_type": int(event) if event else 10,
                         "user": user,
                         "portal": portal,
@@ -361,36 +806,25 @@ class MonitorNotificationHandler:
                     },
                 )
 
+                action = (
+                    "revived" if revived else "created" if created else "already_exists"
+                )
                 logger.info(
-                    f"✅ [ACCESS_LOG] {'Criado' if created else 'Já existia'} log {log_id} do device {device.name}"
+                    f"✅ [ACCESS_LOG] {action} log {log_id} do device {device.name}"
                 )
 
                 # ── Atualiza ultima passagem do usuario ──
                 if created and user:
                     User.objects.filter(id=user.id).update(last_passage_at=timestamp)  # type: ignore[attr-defined]
 
-                # ── Verificação de acesso: loga o MOTIVO no console ──
+                # ── Verificação de acesso: fora do push, depois do commit ──
                 if created:
-                    try:
-                        access_verifier.analyze_access(
-                            user_id=user.id if user else None,  # type: ignore[attr-defined]
-                            portal_id=portal.id if portal else None,  # type: ignore[attr-defined]
-                            event_type=int(event) if event else 0,
-                            access_rule_id=access_rule.id if access_rule else None,  # type: ignore[attr-defined]
-                            device_name=device.name,
-                            access_time=timestamp,
-                            device=device,
-                        )
-                    except Exception as verify_err:
-                        logger.warning(
-                            f"⚠️ [ACCESS_VERIFY] Erro na verificação de acesso: {verify_err}",
-                            exc_info=True,
-                        )
+                    self._schedule_access_verification([log])
 
                 return {
                     "success": True,
                     "object": "access_logs",
-                    "action": "created" if created else "already_exists",
+                    "action": action,
                     "log_id": log_id,
                     "device": device.name,
                 }
@@ -406,11 +840,13 @@ class MonitorNotificationHandler:
                 # Lookup: device + identifier_id + time
                 # O time no lookup evita colisão quando a catraca
                 # limpa seus logs internos e reinicia a contagem de IDs
-                log, created = AccessLogs.objects.update_or_create(
-                    device=device,
-                    identifier_id=str(log_id),
-                    time=timestamp,
-                    defaults={
+                log, created, revived = self._upsert_access_log(
+                    {
+                        "device": device,
+                        "identifier_id": str(log_id),
+                        "time": timestamp,
+                    },
+                    {
                         "event_type": int(event) if event else 10,
                         "user": user,
                         "portal": portal,
@@ -434,28 +870,17 @@ class MonitorNotificationHandler:
                     },
                 )
 
-                action_label = "created (via updated)" if created else "updated"
+                if revived:
+                    action_label = "revived"
+                else:
+                    action_label = "created (via updated)" if created else "updated"
                 logger.info(
                     f"✅ [ACCESS_LOG] {action_label} log {log_id} do device {device.name}"
                 )
 
-                # Se foi criado agora, roda a verificação de acesso
+                # Se foi criado agora, agenda a verificação de acesso
                 if created:
-                    try:
-                        access_verifier.analyze_access(
-                            user_id=user.pk if user else None,
-                            portal_id=portal.pk if portal else None,
-                            event_type=int(event) if event else 0,
-                            access_rule_id=access_rule.pk if access_rule else None,
-                            device_name=device.name,
-                            access_time=timestamp,
-                            device=device,
-                        )
-                    except Exception as verify_err:
-                        logger.warning(
-                            f"⚠️ [ACCESS_VERIFY] Erro na verificação de acesso: {verify_err}",
-                            exc_info=True,
-                        )
+                    self._schedule_access_verification([log])
 
                 return {
                     "success": True,
@@ -0,0 +1,284 @@
+"""
+Cache em memória dos dados de referência usados na ingestão.
+
+Cada webhook/log precisa do ``Device`` (a partir do ``device_id`` do firmware),
+do ``Portal`` e da ``AccessRule``. São tabelas pequenas que quase não mudam,
+então o processo guarda uma fotografia delas e resolve tudo em memória:
+
+- devices por pk, ``FirmwareDeviceMapping`` e o device de fallback;
+- portais e regras de acesso por id. Um id que não está na fotografia é
+  buscado no banco antes de ser dado como inexistente.
+
+A fotografia expira após ``MONITOR_REFERENCE_CACHE_TTL_SECONDS`` e é
+descartada por signals quando qualquer uma dessas tabelas muda; com o cache
+compartilhado (``REDIS_CACHE_URL``) a versão guardada nele avisa também os
+demais processos.
+
+As instâncias entregues são cópias rasas: quem chamar ``save()`` nelas não
+altera a fotografia.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_VERSION_CACHE_KEY = "monitor_reference_cache:version"
+
+
+def _cache_ttl() -> float:
+    value = getattr(settings, "MONITOR_REFERENCE_CACHE_TTL_SECONDS", 300)
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 300.0
+
+
+def _firmware_key(device_identifier: Any) -> str:
+    return "" if device_identifier is None else str(device_identifier).strip()
+
+
+@dataclass
+class _ReferenceSnapshot:
+    devices: Dict[int, Any] = field(default_factory=dict)
+    mappings: Dict[str, int] = field(default_factory=dict)
+    fallback_device_id: Optional[int] = None
+    portals: Dict[int, Any] = field(default_factory=dict)
+    access_rules: Dict[int, Any] = field(default_factory=dict)
+    # Ids já procurados no banco sem sucesso (válido até a próxima fotografia).
+    missing_portals: Set[int] = field(default_factory=set)
+    missing_access_rules: Set[int] = field(default_factory=set)
+
+    @classmethod
+    def build(cls) -> "_ReferenceSnapshot":
+        from src.core.control_id.infra.control_id_django_app.models import (
+            AccessRule,
+            Device,
+            Portal,
+        )
+
+        from .models import FirmwareDeviceMapping, MonitorConfig
+
+        devices = Device.objects.in_bulk()
+        return cls(
+            devices=devices,
+            mappings=dict(
+                FirmwareDeviceMapping.objects.values_list(
+                    "firmware_device_id", "device_id"
+                )
+            ),
+            fallback_device_id=cls._pick_fallback(
+                devices,
+                list(
+                    MonitorConfig.objects.order_by("pk").values_list(
+                        "device_id", "hostname"
+                    )
+                ),
+            ),
+            portals=Portal.objects.in_bulk(),
+            access_rules=AccessRule.objects.in_bulk(),
+        )
+
+    @staticmethod
+    def _pick_fallback(devices, monitor_configs) -> Optional[int]:
+        """
+        Device usado quando o ``device_id`` do firmware não é conhecido:
+        catraca ativa com monitor configurado, depois qualquer MonitorConfig,
+        depois o device padrão e por fim o primeiro ativo.
+        """
+        for device_id, hostname in monitor_configs:
+            device = devices.get(device_id)
+            if device is not None and device.is_active and hostname:
+                return device_id
+        for device_id, _ in monitor_configs:
+            if device_id in devices:
+                return device_id
+        ordered = [devices[pk] for pk in sorted(devices)]
+        for device in ordered:
+            if device.is_default:
+                return device.pk
+        for device in ordered:
+            if device.is_active:
+                return device.pk
+        return None
+
+
+class _ReferenceCacheHolder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_ReferenceSnapshot] = None
+        self._version: Optional[str] = None
+        self._built_at = 0.0
+
+    def _is_fresh(self, version: Optional[str]) -> bool:
+        return (
+            self._snapshot is not None
+            and self._version == version
+            and time.monotonic() - self._built_at < _cache_ttl()
+        )
+
+    def get(self) -> _ReferenceSnapshot:
+        version = cache.get(_VERSION_CACHE_KEY)
+        if self._is_fresh(version):
+            return self._snapshot  # type: ignore[return-value]
+        with self._lock:
+            if not self._is_fresh(version):
+                self._snapshot = _ReferenceSnapshot.build()
+                self._version = version
+                self._built_at = time.monotonic()
+            return self._snapshot  # type: ignore[return-value]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._version = None
+
+    def invalidate(self) -> None:
+        self.reset()
+        transaction.on_commit(
+            lambda: cache.set(_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        )
+
+
+_holder = _ReferenceCacheHolder()
+
+
+def resolve_device(device_identifier: Any):
+    """
+    Resolve o ``Device`` de um ``device_id`` vindo do firmware.
+
+    Ordem: pk do Device → ``FirmwareDeviceMapping`` cadastrado no admin →
+    fallback. O fallback é só um palpite e não é gravado: assim que a
+    catraca for cadastrada (ou mapeada) o id passa a resolver para ela.
+    """
+    snapshot = _holder.get()
+    key = _firmware_key(device_identifier)
+
+    if key:
+        try:
+            direct = snapshot.devices.get(int(key))
+        except ValueError:
+            direct = None
+        if direct is not None:
+            return copy.copy(direct)
+        mapped = snapshot.devices.get(snapshot.mappings.get(key))
+        if mapped is not None:
+            return copy.copy(mapped)
+
+    fallback = snapshot.devices.get(snapshot.fallback_device_id)
+    if fallback is None:
+        return None
+
+    if key:
+        logger.info(
+            f"🔄 [DEVICE_RESOLVE] device_id={key} sem vínculo; usando "
+            f"{fallback.name} (id={fallback.pk})"
+        )
+    return copy.copy(fallback)
+
+
+def _lookup(
+    rows: Dict[int, Any], missing: Set[int], model, ids: Iterable[int]
+) -> Dict[int, Any]:
+    """
+    Busca em *rows* e, para os ids que faltam, uma query no banco.
+
+    Cobre linhas criadas por outro processo depois da fotografia; só o que
+    também não existe no banco é lembrado como inexistente.
+    """
+    ids = {pk for pk in ids if pk}
+    unknown = {pk for pk in ids if pk not in rows and pk not in missing}
+    if unknown:
+        found = model.objects.in_bulk(unknown)
+        rows.update(found)
+        missing.update(unknown - set(found))
+    return {pk: copy.copy(rows[pk]) for pk in ids if pk in rows}
+
+
+def get_portal(portal_id: Optional[int]):
+    return get_portals([portal_id]).get(portal_id) if portal_id else None
+
+
+def get_access_rule(rule_id: Optional[int]):
+    return get_access_rules([rule_id]).get(rule_id) if rule_id else None
+
+
+def get_portals(portal_ids: Iterable[int]) -> Dict[int, Any]:
+    """Equivalente a ``Portal.objects.in_bulk(portal_ids)``, sem query se já conhecidos."""
+    from src.core.control_id.infra.control_id_django_app.models import Portal
+
+    snapshot = _holder.get()
+    return _lookup(snapshot.portals, snapshot.missing_portals, Portal, portal_ids)
+
+
+def get_access_rules(rule_ids: Iterable[int]) -> Dict[int, Any]:
+    """Equivalente a ``AccessRule.objects.in_bulk(rule_ids)``, sem query se já conhecidas."""
+    from src.core.control_id.infra.control_id_django_app.models import AccessRule
+
+    snapshot = _holder.get()
+    return _lookup(
+        snapshot.access_rules, snapshot.missing_access_rules, AccessRule, rule_ids
+    )
+
+
+def invalidate_reference_cache(*args, **kwargs) -> None:
+    """Descarta a fotografia; usado como receiver dos signals."""
+    _holder.invalidate()
+
+
+# Campos do MonitorConfig que entram na fotografia; o flush de heartbeat
+# grava outros campos o tempo todo e não deve invalidar nada.
+_MONITOR_CONFIG_FIELDS = frozenset({"device", "device_id", "hostname"})
+
+
+def _invalidate_on_monitor_config_save(sender, update_fields=None, **kwargs) -> None:
+    if update_fields is not None and not _MONITOR_CONFIG_FIELDS & set(update_fields):
+        return
+    _holder.invalidate()
+
+
+def reset_reference_cache() -> None:
+    """Descarta só a fotografia deste processo, sem trocar a versão compartilhada."""
+    _holder.reset()
+
+
+def connect_signals() -> None:
+    """Liga a invalidação aos signals das tabelas de referência (chamado no ``ready``)."""
+    from django.db.models.signals import post_delete, post_save
+    from safedelete.signals import post_softdelete, post_undelete
+
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        Device,
+        Portal,
+    )
+
+    from .models import FirmwareDeviceMapping, MonitorConfig
+
+    signals = {
+        "post_save": post_save,
+        "post_delete": post_delete,
+        "post_softdelete": post_softdelete,
+        "post_undelete": post_undelete,
+    }
+    for model in (AccessRule, Device, FirmwareDeviceMapping, MonitorConfig, Portal):
+        for name, signal in signals.items():
+            receiver = invalidate_reference_cache
+            if model is MonitorConfig and name == "post_save":
+                receiver = _invalidate_on_monitor_config_save
+            signal.connect(
+                receiver,
+                sender=model,
+                dispatch_uid=f"monitor_reference_cache:{name}:{model.__name__}",
+            )
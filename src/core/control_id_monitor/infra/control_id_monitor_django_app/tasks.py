@@ -2,10 +2,13 @@ from datetime import timedelta
 import logging
 
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
-from .models import MonitorConfig
-from .monitoring import mark_monitor_config_offline
+from .access_verification import access_verifier
+from .models import AccessVerification, MonitorConfig
+from .monitoring import latest_heartbeats, mark_monitor_config_offline
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +25,11 @@ def check_monitor_heartbeats(self):
         .exclude(hostname="")
     )
 
-    for config in queryset:
+    configs = list(queryset)
+    # O sinal mais recente pode estar só no cache (flush do banco é espaçado).
+    cached_signals = latest_heartbeats([config.device_id for config in configs])
+
+    for config in configs:
         if (
             config.offline_detection_paused_until
             and config.offline_detection_paused_until > now
@@ -31,6 +38,9 @@ def check_monitor_heartbeats(self):
 
         checked += 1
         reference_time = config.last_seen_at or config.updated_at
+        cached_signal = cached_signals.get(config.device_id)
+        if cached_signal and cached_signal > reference_time:
+            reference_time = cached_signal
         timeout_seconds = max(int(config.heartbeat_timeout_seconds or 300), 30)
 
         if now - reference_time > timedelta(seconds=timeout_seconds):
@@ -46,3 +56,150 @@ def check_monitor_heartbeats(self):
         "offline_marked": offline_marked,
         "timestamp": now.isoformat(),
     }
+
+
+def _cross_check_window() -> int:
+    value = getattr(settings, "ACCESS_VERIFY_COALESCE_SECONDS", 60)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 60
+
+
+def _cross_check_gate(user_id, portal_id):
+    """
+    Libera só uma verificação cruzada com a catraca por usuário/portal dentro
+    da janela ``ACCESS_VERIFY_COALESCE_SECONDS``. Rajadas de negações do mesmo
+    usuário no mesmo portal geram um único login + load_objects na catraca
+    (por processo; entre workers só com o cache de ``REDIS_CACHE_URL``).
+    """
+    window = _cross_check_window()
+
+    def gate() -> bool:
+        if window <= 0:
+            return True
+        return cache.add(
+            f"access_verify:cross_check:{user_id}:{portal_id}", 1, timeout=window
+        )
+
+    return gate
+
+
+@shared_task(bind=True, ignore_result=True)
+def verify_access_logs(self, log_ids):
+    """
+    Roda a verificação de acesso dos logs informados e persiste o diagnóstico.
+
+    Enfileirada pelo ``MonitorNotificationHandler`` após o commit do push, para
+    que a catraca não espere a análise (nem a verificação cruzada) para ter
+    resposta.
+    """
+    verifications = (
+        AccessVerification.objects.select_related("access_log__device")
+        .filter(access_log_id__in=log_ids)
+        .exclude(status=AccessVerification.Status.DONE)
+        .order_by("access_log__time", "access_log_id")
+    )
+    done = 0
+    failed = 0
+
+    for verification in verifications:
+        log = verification.access_log
+        try:
+            analysis = access_verifier.verify_access(
+                user_id=log.user_id,
+                portal_id=log.portal_id,
+                event_type=log.event_type,
+                access_rule_id=log.access_rule_id,
+                device_name=log.device.name,
+                access_time=log.time,
+                device=log.device,
+                cross_check_gate=_cross_check_gate(log.user_id, log.portal_id),
+            )
+        except Exception as exc:
+            failed += 1
+            logger.warning(
+                "[ACCESS_VERIFY] Erro na verificação do log %s: %s",
+                log.id,
+                exc,
+                exc_info=True,
+            )
+            verification.status = AccessVerification.Status.FAILED
+            verification.error = str(exc)
+            verification.verified_at = timezone.now()
+            verification.save(update_fields=["status", "error", "verified_at"])
+            continue
+
+        done += 1
+        verification.status = AccessVerification.Status.DONE
+        verification.precise_reason = analysis.precise_reason
+        verification.diagnosis = analysis.diagnosis
+        verification.is_granted = analysis.is_granted
+        verification.cross_checked = analysis.cross_checked
+        verification.error = ""
+        verification.verified_at = timezone.now()
+        verification.save(
+            update_fields=[
+                "status",
+                "precise_reason",
+                "diagnosis",
+                "is_granted",
+                "cross_checked",
+                "error",
+                "verified_at",
+            ]
+        )
+
+    return {"verified": done, "failed": failed}
+
+
+_PENDING_VERIFICATION_BATCH = 500
+
+
+def _pending_retry_after() -> int:
+    value = getattr(settings, "ACCESS_VERIFY_RETRY_AFTER_SECONDS", 300)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 300
+
+
+@shared_task(bind=True, ignore_result=True)
+def retry_pending_access_verifications(self):
+    """
+    Safety net do ``verify_access_logs``: reprocessa verificações que ficaram
+    ``pending`` (o enfileiramento falhou ou o worker caiu no meio do lote).
+
+    Só pega as pendentes há mais de ``ACCESS_VERIFY_RETRY_AFTER_SECONDS``,
+    para não disputar com a task recém-enfileirada. ``failed`` é final: o
+    erro fica registrado na verificação e ela não volta para a fila.
+    """
+    cutoff = timezone.now() - timedelta(seconds=_pending_retry_after())
+    log_ids = list(
+        AccessVerification.objects.filter(
+            status=AccessVerification.Status.PENDING, created_at__lt=cutoff
+        )
+        .order_by("created_at")
+        .values_list("access_log_id", flat=True)[:_PENDING_VERIFICATION_BATCH]
+    )
+    if not log_ids:
+        return {"verified": 0, "failed": 0}
+
+    logger.info("[ACCESS_VERIFY] Reprocessando %s verificações pendentes", len(log_ids))
+    return verify_access_logs.run(log_ids)
+
+
+@shared_task(bind=True, ignore_result=True)
+def drain_webhook_inbox(self):
+    """Consome a fila de webhooks (``WebhookInbox``) em lotes."""
+    from .webhook_ingestion import drain_inbox
+
+    totals = drain_inbox()
+    if totals["batches"]:
+        logger.info(
+            "[WEBHOOK_INBOX] %s webhooks processados em %s lotes (%s falhas)",
+            totals["processed"],
+            totals["batches"],
+            totals["failed"],
+        )
+    return totals
@@ -28,7 +28,7 @@ def monitor_config_factory(db, device_factory):
 @pytest.mark.django_db
 class TestMonitorConfigSync:
 
-    @patch('src.core.__seedwork__.infra.catraca_sync.requests')
+    @patch('requests.Session.request')
     def test_sync_cleared_fields(self, mock_requests, device_factory):
         """
         Verifica se campos vazios (hostname, port, path) são enviados como strings vazias
@@ -50,8 +50,8 @@ class TestMonitorConfigSync:
         mock_response.status_code = 200
         mock_response.json.return_value = {"success": True}
         
-        # O método _make_request usa requests.request
-        mock_requests.request.return_value = mock_response
+        # O método _make_request usa o requests.Session do pool de conexões
+        mock_requests.return_value = mock_response
         
         # Instancia o mixin
         mixin = MockMonitorSync(device)
@@ -60,8 +60,8 @@ class TestMonitorConfigSync:
         with patch.object(mixin, 'login', return_value='session_123'):
              mixin.update_monitor_config_in_catraca(config)
              
-        # Verifica argumentos da chamada requests.request
-        args, kwargs = mock_requests.request.call_args
+        # Verifica argumentos da chamada requests.Session.request
+        args, kwargs = mock_requests.call_args
         
         # args[0] é o method (POST), args[1] é url (se passado como arg) ou kwargs['url']
         assert kwargs['method'] == "POST"
@@ -76,7 +76,7 @@ class TestMonitorConfigSync:
         assert monitor_payload['path'] == ""
         assert monitor_payload['request_timeout'] == "1000"
 
-    @patch('src.core.__seedwork__.infra.catraca_sync.requests')
+    @patch('requests.Session.request')
     def test_sync_filled_fields(self, mock_requests, device_factory):
         """
         Verifica se campos preenchidos são enviados corretamente.
@@ -94,7 +94,7 @@ class TestMonitorConfigSync:
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"success": True}
-        mock_requests.request.return_value = mock_response
+        mock_requests.return_value = mock_response
         
         mixin = MockMonitorSync(device)
         
@@ -102,7 +102,7 @@ class TestMonitorConfigSync:
              mixin.update_monitor_config_in_catraca(config)
              
         # Verifica payload
-        args, kwargs = mock_requests.request.call_args
+        args, kwargs = mock_requests.call_args
         payload = kwargs['json']
         monitor_payload = payload.get('monitor')
         
@@ -0,0 +1,102 @@
+import pytest
+
+
+@pytest.fixture
+def monitored_device(device_factory):
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        MonitorConfig,
+    )
+
+    device = device_factory(is_active=True)
+    config = MonitorConfig.objects.create(
+        device=device,
+        hostname="127.0.0.1",
+        port="8000",
+        path="api/notifications",
+        heartbeat_timeout_seconds=300,
+    )
+    return device, config
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_heartbeats_are_coalesced_and_checker_reads_cached_signal(
+    settings, monitored_device, django_assert_num_queries
+):
+    # Testa que rajadas de sinais gravam o banco uma vez e o checker usa o cache.
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        MonitorConfig,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.monitoring import (
+        latest_heartbeats,
+        touch_device_heartbeat,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.tasks import (
+        check_monitor_heartbeats,
+    )
+
+    settings.MONITOR_HEARTBEAT_FLUSH_SECONDS = 60
+    device, config = monitored_device
+
+    assert touch_device_heartbeat(device.id, source="dao") == device
+    config.refresh_from_db()
+    flushed_at = config.last_seen_at
+    assert config.last_signal_source == "dao"
+
+    # Dentro da janela: device resolvido em memoria, sem lock nem UPDATE.
+    with django_assert_num_queries(0):
+        for _ in range(5):
+            touch_device_heartbeat(device.id, source="catra_event")
+
+    config.refresh_from_db()
+    assert config.last_seen_at == flushed_at
+    assert config.last_signal_source == "dao"
+    assert latest_heartbeats([device.id])[device.id] >= flushed_at
+
+    # Banco "velho", cache recente: o checker nao derruba a catraca.
+    MonitorConfig.objects.filter(pk=config.pk).update(
+        last_seen_at=timezone.now() - timedelta(hours=1)
+    )
+    result = check_monitor_heartbeats.run()
+
+    assert result["checked"] == 1
+    assert result["offline_marked"] == 0
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_first_heartbeat_after_offline_resolves_alert_inside_flush_window(
+    settings, monitored_device
+):
+    # Testa que a volta offline -> online e gravada na hora, mesmo com flush espacado.
+    from django.utils import timezone
+
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        MonitorAlert,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.monitoring import (
+        mark_monitor_config_offline,
+        touch_device_heartbeat,
+    )
+
+    settings.MONITOR_HEARTBEAT_FLUSH_SECONDS = 600
+    device, config = monitored_device
+    touch_device_heartbeat(device.id, source="alive")
+
+    alert = mark_monitor_config_offline(config, detected_at=timezone.now())
+    assert alert.is_active is True
+
+    touch_device_heartbeat(device.id, source="alive")
+
+    alert.refresh_from_db()
+    config.refresh_from_db()
+    device.refresh_from_db()
+    assert alert.is_active is False
+    assert alert.resolved_at is not None
+    assert config.is_offline is False
+    assert device.is_active is True
+    assert MonitorAlert.objects.filter(device=device, is_active=True).count() == 0
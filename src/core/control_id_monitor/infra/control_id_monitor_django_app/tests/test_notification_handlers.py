@@ -0,0 +1,441 @@
+import pytest
+
+
+def _access_log_change(log_id, time, user_id=None, portal_id=None, rule_id=None, **extra):
+    values = {"id": str(log_id), "time": str(time), "event": "7"}
+    if user_id is not None:
+        values["user_id"] = str(user_id)
+    if portal_id is not None:
+        values["portal_id"] = str(portal_id)
+    if rule_id is not None:
+        values["access_rule_id"] = str(rule_id)
+    values.update(extra)
+    return {"object": "access_logs", "type": "inserted", "values": values}
+
+
+@pytest.fixture
+def access_refs(db):
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        Area,
+        Portal,
+    )
+
+    area_from = Area.objects.create(name="Fora")
+    area_to = Area.objects.create(name="Dentro")
+    portal = Portal.objects.create(name="Entrada", area_from=area_from, area_to=area_to)
+    rule = AccessRule.objects.create(name="Livre", type=1, priority=0)
+    return portal, rule
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_backlog_notification_is_upserted_in_a_bounded_number_of_queries(
+    mocker, device_factory, user_factory, access_refs, django_assert_max_num_queries
+):
+    # Testa o caminho em lote: queries constantes para centenas de logs.
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    portal, rule = access_refs
+    device = device_factory()
+    users = [user_factory() for _ in range(3)]
+    changes = [
+        _access_log_change(
+            log_id=i,
+            time=1_700_000_000 + i,
+            user_id=users[i % 3].id,
+            portal_id=portal.id,
+            rule_id=rule.id,
+        )
+        for i in range(200)
+    ]
+    payload = {"device_id": device.id, "object_changes": changes}
+
+    # SQLite quebra o INSERT em poucos lotes pelo limite de parametros; no
+    # Postgres e um unico INSERT. O que importa: nao cresce com o numero de logs.
+    with django_assert_max_num_queries(20):
+        result = MonitorNotificationHandler().process_notification(payload)
+
+    assert result["success"] is True
+    assert result["processed"] == 200
+    assert [r["action"] for r in result["results"]] == ["created"] * 200
+    assert result["results"][5]["log_id"] == "5"
+    assert AccessLogs.objects.filter(device=device).count() == 200
+    assert (
+        AccessVerification.objects.filter(
+            access_log__device=device, status=AccessVerification.Status.PENDING
+        ).count()
+        == 200
+    )
+
+    log = AccessLogs.objects.get(device=device, identifier_id="4")
+    assert log.user_id == users[1].id
+    assert log.portal_id == portal.id
+    assert log.access_rule_id == rule.id
+    assert log.raw_payload["change"]["values"]["id"] == "4"
+
+    latest = MonitorNotificationHandler._parse_device_unix_timestamp(1_700_000_198)
+    users[0].refresh_from_db()
+    assert users[0].last_passage_at == latest
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_replayed_notification_reports_existing_logs_without_duplicates(
+    device_factory, user_factory
+):
+    # Testa idempotencia por (device, identifier_id, time) e o relatorio por mudanca.
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    device = device_factory()
+    user = user_factory()
+    handler = MonitorNotificationHandler()
+    first = _access_log_change(1, 1_700_000_000, user_id=user.id)
+    payload = {"device_id": device.id, "object_changes": [first]}
+    handler.process_notification(payload)
+
+    updated = dict(first, type="updated")
+    fresh_update = dict(_access_log_change(2, 1_700_000_100), type="updated")
+    replay = {
+        "device_id": device.id,
+        "object_changes": [
+            first,
+            updated,
+            fresh_update,
+            _access_log_change(3, 1_700_000_200, event="abc"),
+        ],
+    }
+    result = handler.process_notification(replay)
+
+    assert [r.get("action") for r in result["results"]] == [
+        "already_exists",
+        "updated",
+        "created (via updated)",
+        None,
+    ]
+    assert result["results"][3]["success"] is False
+    assert result["processed"] == 3
+    assert AccessLogs.objects.filter(device=device).count() == 2
+    # Uma verificação por log criado: o primeiro envio e o "created (via updated)".
+    assert AccessVerification.objects.filter(access_log__device=device).count() == 2
+
+    user.refresh_from_db()
+    assert user.last_passage_at == MonitorNotificationHandler._parse_device_unix_timestamp(
+        1_700_000_000
+    )
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_soft_deleted_log_resent_by_device_is_revived_not_created(
+    mocker, device_factory
+):
+    # Testa que um log removido (soft delete) e restaurado no lote e no caminho unitario.
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    device = device_factory()
+    handler = MonitorNotificationHandler()
+    change = _access_log_change(5, 1_700_000_000)
+    payload = {"device_id": device.id, "object_changes": [change]}
+    handler.process_notification(payload)
+    AccessLogs.objects.get(device=device, identifier_id="5").delete()
+
+    result = handler.process_notification(payload)
+
+    assert result["results"][0]["action"] == "revived"
+    assert AccessLogs.objects.filter(device=device, identifier_id="5").count() == 1
+    assert AccessLogs.all_objects.filter(device=device).count() == 1
+    assert AccessVerification.objects.filter(access_log__device=device).count() == 1
+
+    # Sem o lote (fallback), o update_or_create não pode estourar a constraint.
+    AccessLogs.objects.get(device=device, identifier_id="5").delete()
+    mocker.patch.object(
+        AccessLogs.all_objects, "bulk_create", side_effect=RuntimeError("sem upsert")
+    )
+    updated = dict(change, type="updated")
+
+    result = handler.process_notification(
+        {"device_id": device.id, "object_changes": [updated]}
+    )
+
+    assert result["results"][0]["success"] is True
+    assert result["results"][0]["action"] == "revived"
+    assert AccessLogs.objects.filter(device=device, identifier_id="5").count() == 1
+    assert AccessLogs.all_objects.filter(device=device).count() == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_non_batchable_changes_keep_single_change_path(device_factory):
+    # Testa que deleted e objetos nao suportados continuam no caminho unitario.
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    device = device_factory()
+    handler = MonitorNotificationHandler()
+    handler.process_notification(
+        {"device_id": device.id, "object_changes": [_access_log_change(9, 1_700_000_000)]}
+    )
+
+    result = handler.process_notification(
+        {
+            "device_id": device.id,
+            "object_changes": [
+                {"object": "access_logs", "type": "deleted", "values": {"id": "9"}},
+                {"object": "desconhecido", "type": "inserted", "values": {}},
+            ],
+        }
+    )
+
+    assert result["results"][0]["action"] == "deleted"
+    assert result["results"][1]["success"] is False
+    assert not AccessLogs.objects.filter(device=device, identifier_id="9").exists()
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_batch_failure_falls_back_to_single_change_path(mocker, device_factory):
+    # Testa o fallback quando o upsert em lote falha no banco.
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    mocker.patch.object(
+        AccessLogs.all_objects, "bulk_create", side_effect=RuntimeError("sem upsert")
+    )
+    device = device_factory()
+
+    result = MonitorNotificationHandler().process_notification(
+        {"device_id": device.id, "object_changes": [_access_log_change(1, 1_700_000_000)]}
+    )
+
+    assert result["results"][0]["action"] == "created"
+    assert AccessLogs.objects.filter(device=device).count() == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_verification_runs_after_commit_and_coalesces_cross_checks(
+    mocker, device_factory, user_factory, access_refs, django_capture_on_commit_callbacks
+):
+    # Testa a verificacao fora do push: so roda no commit, persiste e coalesce.
+    from django.core.cache import cache
+
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.access_verification import (
+        AccessVerdict,
+        AccessVerificationService,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    cache.clear()
+
+    def inconsistent(verdict, event_type):
+        verdict.precise_reason = "INCONSISTÊNCIA: regra ativa mas catraca negou"
+        return verdict.precise_reason
+
+    mocker.patch.object(
+        AccessVerdict, "compute_precise_reason", autospec=True, side_effect=inconsistent
+    )
+    cross_check = mocker.patch.object(
+        AccessVerificationService,
+        "_cross_check_with_catraca",
+        return_value=["regra divergente"],
+    )
+    portal, _ = access_refs
+    device = device_factory()
+    user = user_factory()
+    denials = [
+        _access_log_change(i, 1_700_000_000 + i, user_id=user.id, portal_id=portal.id, event="6")
+        for i in range(3)
+    ]
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        MonitorNotificationHandler().process_notification(
+            {"device_id": device.id, "object_changes": denials}
+        )
+        assert cross_check.call_count == 0
+
+    assert len(callbacks) == 1
+    assert cross_check.call_count == 1
+    verifications = list(
+        AccessVerification.objects.filter(access_log__device=device).order_by(
+            "access_log__time"
+        )
+    )
+    assert [v.status for v in verifications] == ["done"] * 3
+    assert [v.cross_checked for v in verifications] == [True, False, False]
+    assert verifications[0].is_granted is False
+    assert "regra divergente" in verifications[0].diagnosis
+    assert verifications[1].precise_reason.startswith("INCONSISTÊNCIA")
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_verification_task_records_failures_and_skips_done(
+    mocker, device_factory
+):
+    # Testa que falhas ficam registradas e verificacoes concluidas nao reprocessam.
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.tasks import (
+        verify_access_logs,
+    )
+
+    device = device_factory()
+    failing = AccessLogs.objects.create(
+        device=device, identifier_id="1", event_type=6, time=timezone.now(), confidence=0
+    )
+    finished = AccessLogs.objects.create(
+        device=device, identifier_id="2", event_type=7, time=timezone.now(), confidence=0
+    )
+    AccessVerification.objects.create(access_log=failing)
+    AccessVerification.objects.create(
+        access_log=finished, status=AccessVerification.Status.DONE
+    )
+    verify = mocker.patch(
+        "src.core.control_id_monitor.infra.control_id_monitor_django_app."
+        "tasks.access_verifier.verify_access",
+        side_effect=RuntimeError("banco indisponivel"),
+    )
+
+    result = verify_access_logs.run([failing.id, finished.id])
+
+    assert result == {"verified": 0, "failed": 1}
+    assert verify.call_count == 1
+    failing.verification.refresh_from_db()
+    assert failing.verification.status == AccessVerification.Status.FAILED
+    assert failing.verification.error == "banco indisponivel"
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_pending_verifications_are_swept_after_the_grace_period(
+    mocker, device_factory, settings
+):
+    # Testa que verificacoes pendentes antigas sao reprocessadas e as recentes/falhas nao.
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.tasks import (
+        retry_pending_access_verifications,
+    )
+
+    settings.ACCESS_VERIFY_RETRY_AFTER_SECONDS = 60
+    device = device_factory()
+    logs = [
+        AccessLogs.objects.create(
+            device=device,
+            identifier_id=str(index),
+            event_type=7,
+            time=timezone.now(),
+            confidence=0,
+        )
+        for index in range(3)
+    ]
+    stale = AccessVerification.objects.create(access_log=logs[0])
+    AccessVerification.objects.create(access_log=logs[1])
+    AccessVerification.objects.create(
+        access_log=logs[2], status=AccessVerification.Status.FAILED
+    )
+    AccessVerification.objects.filter(access_log__in=[logs[0], logs[2]]).update(
+        created_at=timezone.now() - timedelta(minutes=10)
+    )
+    verify = mocker.patch(
+        "src.core.control_id_monitor.infra.control_id_monitor_django_app."
+        "tasks.access_verifier.verify_access",
+        return_value=mocker.Mock(
+            precise_reason="ok", diagnosis="", is_granted=True, cross_checked=False
+        ),
+    )
+
+    result = retry_pending_access_verifications.run()
+
+    assert result == {"verified": 1, "failed": 0}
+    assert verify.call_count == 1
+    stale.refresh_from_db()
+    assert stale.status == AccessVerification.Status.DONE
+    assert logs[1].verification.status == AccessVerification.Status.PENDING
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_access_verification_without_returning_matches_exact_natural_keys(
+    mocker, device_factory, django_capture_on_commit_callbacks
+):
+    # Testa que, sem ids do upsert, so os logs da tupla (identificador, horario, device) sao marcados.
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        AccessVerification,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.notification_handlers import (
+        MonitorNotificationHandler,
+    )
+
+    mocker.patch(
+        "src.core.control_id_monitor.infra.control_id_monitor_django_app."
+        "tasks.verify_access_logs.delay"
+    )
+    device = device_factory()
+    first, second = timezone.now(), timezone.now() + timedelta(minutes=1)
+
+    def log(identifier_id, time):
+        return AccessLogs.objects.create(
+            device=device,
+            identifier_id=identifier_id,
+            event_type=7,
+            time=time,
+            confidence=0,
+        )
+
+    wanted = [log("1", first), log("2", second)]
+    crossed = [log("1", second), log("2", first)]
+    unsaved = [
+        AccessLogs(device=device, identifier_id=entry.identifier_id, time=entry.time)
+        for entry in wanted
+    ]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        MonitorNotificationHandler._schedule_access_verification(unsaved)
+
+    verified = set(AccessVerification.objects.values_list("access_log_id", flat=True))
+    assert verified == {entry.pk for entry in wanted}
+    assert not verified & {entry.pk for entry in crossed}
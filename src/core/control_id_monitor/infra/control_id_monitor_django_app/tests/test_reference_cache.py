@@ -0,0 +1,90 @@
+import pytest
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_unknown_firmware_id_uses_fallback_from_memory_without_persisting(
+    device_factory, django_assert_num_queries
+):
+    # Testa que o palpite do fallback nao e gravado e as resolucoes seguintes nao fazem query.
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        FirmwareDeviceMapping,
+        MonitorConfig,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.reference_cache import (
+        resolve_device,
+    )
+
+    device_factory(is_active=True, is_default=True)
+    monitored = device_factory(is_active=True)
+    MonitorConfig.objects.create(device=monitored, hostname="10.0.0.5", port="8000")
+
+    assert resolve_device("478435").pk == monitored.pk
+    assert not FirmwareDeviceMapping.objects.exists()
+
+    with django_assert_num_queries(0):
+        assert resolve_device(478435).pk == monitored.pk
+        assert resolve_device(str(monitored.pk)).pk == monitored.pk
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_pk_beats_mappings_and_manual_mapping_beats_fallback(
+    device_factory, django_capture_on_commit_callbacks
+):
+    # Testa a ordem pk -> vinculo manual -> fallback.
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        FirmwareDeviceMapping,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.reference_cache import (
+        resolve_device,
+    )
+
+    first = device_factory(is_active=True, is_default=True)
+    second = device_factory(is_active=True)
+    third = device_factory(is_active=True)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        FirmwareDeviceMapping.objects.create(firmware_device_id=str(second.pk), device=third)
+        FirmwareDeviceMapping.objects.create(firmware_device_id="478435", device=second)
+
+    assert resolve_device(second.pk).pk == second.pk
+    assert resolve_device("478435").pk == second.pk
+    assert resolve_device("555").pk == first.pk
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_portal_and_rule_misses_check_the_database_before_giving_up(
+    django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    # Testa que ids fora da fotografia sao buscados no banco e a invalidacao por signal.
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        Area,
+        Portal,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.reference_cache import (
+        get_access_rule,
+        get_portal,
+        get_portals,
+    )
+
+    area = Area.objects.create(name="Hall")
+    assert get_portal(999) is None
+    with django_assert_num_queries(0):
+        assert get_portal(999) is None
+
+    # Escrita sem signal (bulk/outro processo): a fotografia nao sabe da linha.
+    Portal.objects.bulk_create([Portal(name="Catraca", area_from=area, area_to=area)])
+    AccessRule.objects.bulk_create([AccessRule(name="Livre", type=1, priority=0)])
+    portal = Portal.objects.get(name="Catraca")
+    rule = AccessRule.objects.get(name="Livre")
+    assert get_portal(portal.pk).name == "Catraca"
+    assert get_access_rule(rule.pk).name == "Livre"
+    with django_assert_num_queries(0):
+        assert get_portals([portal.pk, 999]) == {portal.pk: get_portal(portal.pk)}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Portal.objects.filter(pk=portal.pk).first().delete()
+    assert get_portals([portal.pk]) == {}
@@ -0,0 +1,128 @@
+import pytest
+
+DAO_URL = "/api/control_id_monitor/notifications/dao"
+CATRA_EVENT_URL = "/api/control_id_monitor/notifications/catra_event"
+
+
+def _dao_payload(device_id, *log_ids):
+    return {
+        "device_id": device_id,
+        "object_changes": [
+            {
+                "object": "access_logs",
+                "type": "inserted",
+                "values": {"id": str(log_id), "time": str(1_700_000_000 + log_id), "event": "7"},
+            }
+            for log_id in log_ids
+        ],
+    }
+
+
+def _catra_event_payload(device_id, uuid="0e039178"):
+    return {
+        "device_id": device_id,
+        "time": 1_700_000_500,
+        "event": {"type": 7, "name": "TURN LEFT", "uuid": uuid},
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_async_webhooks_ack_immediately_and_drain_in_one_batch(
+    settings, api_client, device_factory, django_capture_on_commit_callbacks
+):
+    # Testa o modo fila: ack sem processar, um unico drain e upsert idempotente.
+    from src.core.control_id.infra.control_id_django_app.models import AccessLogs
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        WebhookInbox,
+    )
+
+    settings.MONITOR_WEBHOOK_ASYNC_INGESTION = True
+    device = device_factory()
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        first = api_client.post(DAO_URL, _dao_payload(device.id, 1, 2), format="json")
+        replay = api_client.post(DAO_URL, _dao_payload(device.id, 2, 3), format="json")
+        turn = api_client.post(
+            CATRA_EVENT_URL, _catra_event_payload(device.id), format="json"
+        )
+
+        assert [r.status_code for r in (first, replay, turn)] == [200, 200, 200]
+        assert all(r.data["queued"] for r in (first, replay, turn))
+        assert AccessLogs.objects.filter(device=device).count() == 0
+        assert WebhookInbox.objects.count() == 3
+
+    # Um unico drain para a rajada (o outro callback e a verificacao de acesso).
+    assert [cb.__qualname__ for cb in callbacks].count(
+        "_schedule_drain.<locals>.enqueue"
+    ) == 1
+    assert WebhookInbox.objects.count() == 0
+    assert sorted(
+        AccessLogs.objects.filter(device=device).values_list("identifier_id", flat=True)
+    ) == ["0e039178", "1", "2", "3"]
+    # Cada log guarda a notificacao da propria linha da fila, nao a rajada inteira.
+    notified_ids = {
+        log.identifier_id: [
+            change["values"]["id"]
+            for change in log.raw_payload["notification"]["object_changes"]
+        ]
+        for log in AccessLogs.objects.filter(device=device, identifier_id__in=["1", "3"])
+    }
+    assert notified_ids == {"1": ["1", "2"], "3": ["2", "3"]}
+
+    metrics = api_client.get("/api/control_id_monitor/notifications/ingestion")
+    assert metrics.status_code == 200
+    assert metrics.data["depth"] == 0
+    assert metrics.data["last_drain"]["processed"] == 3
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_drain_retries_failures_until_max_attempts(settings, device_factory):
+    # Testa retentativas: a linha com falha volta para a fila e depois vira failed.
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.models import (
+        WebhookInbox,
+    )
+    from src.core.control_id_monitor.infra.control_id_monitor_django_app.webhook_ingestion import (
+        drain_inbox,
+        webhook_ingestion_metrics,
+    )
+
+    settings.MONITOR_WEBHOOK_MAX_ATTEMPTS = 2
+    device = device_factory()
+    orphan = WebhookInbox.objects.create(
+        kind=WebhookInbox.Kind.CATRA_EVENT, payload=_catra_event_payload(device.id)
+    )
+    WebhookInbox.objects.create(
+        kind=WebhookInbox.Kind.DAO, payload=_dao_payload(device.id, 7), device=device
+    )
+
+    first = drain_inbox(batch_size=1)
+    assert first["processed"] == 1
+    assert first["failed"] == 1
+    assert webhook_ingestion_metrics()["depth"] == 1
+
+    drain_inbox()
+    orphan.refresh_from_db()
+    assert orphan.status == WebhookInbox.Status.FAILED
+    assert orphan.attempts == 2
+    assert "device" in orphan.last_error
+
+    metrics = webhook_ingestion_metrics()
+    assert metrics["depth"] == 0
+    assert metrics["failed"] == 1
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_sync_catra_event_is_idempotent(api_client, device_factory):
+    # Testa o caminho sincrono (padrao) do catra_event depois da extracao para o handler.
+    device = device_factory()
+    payload = _catra_event_payload(device.id, uuid="abc")
+
+    created = api_client.post(CATRA_EVENT_URL, payload, format="json")
+    replayed = api_client.post(CATRA_EVENT_URL, payload, format="json")
+
+    assert created.data["action"] == "created"
+    assert replayed.data["action"] == "already_exists"
+    assert created.data["model_event_type"] == 7
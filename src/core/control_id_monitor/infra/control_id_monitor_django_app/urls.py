@@ -11,6 +11,7 @@ from .views import (
     receive_auxiliary_notification,
     receive_catra_event,
     receive_dao_notification,
+    webhook_ingestion_status,
 )
 
 # Router para as views do Monitor
@@ -33,6 +34,9 @@ def monitor_root(request, format=None):
             "dao_webhook": reverse(
                 "monitor-dao-notification", request=request, format=format
             ),
+            "webhook_ingestion": reverse(
+                "monitor-webhook-ingestion", request=request, format=format
+            ),
         }
     )
 
@@ -61,6 +65,12 @@ urlpatterns = [
         receive_catra_event,
         name="monitor-catra-event",
     ),
+    # Métricas da fila de ingestão (profundidade/atraso)
+    path(
+        "notifications/ingestion",
+        webhook_ingestion_status,
+        name="monitor-webhook-ingestion",
+    ),
     # Rotas do ViewSet (CRUD de MonitorConfig)
     path("", include(router.urls)),
 ]
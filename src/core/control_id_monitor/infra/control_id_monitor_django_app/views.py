@@ -11,12 +11,17 @@ from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
-from .models import MonitorAlert, MonitorAlertRead, MonitorConfig
+from .models import MonitorAlert, MonitorAlertRead, MonitorConfig, WebhookInbox
 from src.core.control_id.infra.control_id_django_app.models import Device
-from .monitoring import resolve_monitor_device, touch_device_heartbeat
+from .monitoring import touch_device_heartbeat
 from .serializers import MonitorAlertSerializer, MonitorConfigSerializer
 from .mixins import MonitorConfigSyncMixin
 from .notification_handlers import monitor_handler
+from .webhook_ingestion import (
+    async_ingestion_enabled,
+    enqueue_webhook,
+    webhook_ingestion_metrics,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -567,7 +572,7 @@ def receive_dao_notification(request):
     """
     try:
         logger.info("📥 [MONITOR] Recebendo notificação da catraca")
-        logger.info(f"📥 [MONITOR] Payload completo: {request.data}")
+        logger.debug(f"📥 [MONITOR] Payload completo: {request.data}")
 
         # Valida payload básico
         if not isinstance(request.data, dict):
@@ -596,6 +601,14 @@ def receive_dao_notification(request):
 
         touch_device_heartbeat(device_id, source="dao")
 
+        # Modo fila: grava o payload cru e responde sem processar.
+        if async_ingestion_enabled():
+            row = enqueue_webhook(WebhookInbox.Kind.DAO, request.data)
+            return Response(
+                {"success": True, "queued": True, "inbox_id": row.id},
+                status=status.HTTP_200_OK,
+            )
+
         # Processa notificação
         result = monitor_handler.process_notification(request.data)
 
@@ -629,7 +642,7 @@ def receive_auxiliary_notification(request):
     modo de operação. Apenas loga e retorna 200 para o device não ficar
     re-tentando.
     """
-    logger.info(
+    logger.debug(
         f"📥 [MONITOR] Notificação auxiliar recebida: {request.path} — {request.data}"
     )
     device_id = (
@@ -646,13 +659,6 @@ def receive_auxiliary_notification(request):
 # ============================================================================
 
 
-_CATRA_EVENT_NAMES = {
-    7: "TURN_LEFT",
-    8: "TURN_RIGHT",
-    9: "GIVE_UP",
-}
-
-
 @extend_schema(
     tags=["Monitor (Push Logs) - Webhook"],
     summary="Recebe eventos de giro da catraca iDBlock (catra_event)",
@@ -703,18 +709,9 @@ def receive_catra_event(request):
 
     Salva cada evento como um AccessLog para monitoramento de fluxo.
     """
-    from datetime import datetime, timezone as dt_timezone
-    from django.utils import timezone
-    from .notification_handlers import DEVICE_LOCAL_TIMEZONE
-    from src.core.control_id.infra.control_id_django_app.models import (
-        AccessLogs,
-        Device,
-        Portal,
-    )
-
     try:
         payload = request.data
-        logger.info(f"📥 [CATRA_EVENT] Payload recebido: {payload}")
+        logger.debug(f"📥 [CATRA_EVENT] Payload recebido: {payload}")
 
         if not isinstance(payload, dict):
             return Response(
@@ -724,7 +721,6 @@ def receive_catra_event(request):
 
         event_data = payload.get("event")
         device_id = payload.get("device_id")
-        event_time = payload.get("time")
 
         if not event_data or not device_id:
             return Response(
@@ -732,17 +728,7 @@ def receive_catra_event(request):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        event_type = event_data.get("type", 0)
-        event_name = event_data.get(
-            "name", _CATRA_EVENT_NAMES.get(event_type, "UNKNOWN")
-        )
-        event_uuid = event_data.get("uuid", "")
-        access_event_id = payload.get("access_event_id")
-
-        monitor_cfg = touch_device_heartbeat(device_id, source="catra_event")
-        device = (
-            monitor_cfg.device if monitor_cfg else resolve_monitor_device(device_id)
-        )
+        device = touch_device_heartbeat(device_id, source="catra_event")
         if not device:
             logger.error(f"❌ [CATRA_EVENT] Nenhum device para device_id={device_id}")
             return Response(
@@ -750,99 +736,16 @@ def receive_catra_event(request):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ── Timestamp ──
-        # TODO: revisar esta conversao de timezone; hoje o timestamp do
-        # catra_event esta sendo persistido explicitamente em UTC.
-        timestamp = (
-            timezone.make_aware(
-                datetime.fromtimestamp(
-                    int(event_time),
-                    tz=dt_timezone.utc,
-                ).replace(tzinfo=None),
-                DEVICE_LOCAL_TIMEZONE,
+        # Modo fila: grava o payload cru e responde sem processar.
+        if async_ingestion_enabled():
+            row = enqueue_webhook(WebhookInbox.Kind.CATRA_EVENT, payload, device=device)
+            return Response(
+                {"success": True, "queued": True, "inbox_id": row.id},
+                status=status.HTTP_200_OK,
             )
-            if event_time
-            else timezone.now()
-        )
-
-        # ── Resolve portal ──
-        raw_portal_id = (
-            payload.get("portal_id")
-            or payload.get("door_id")
-            or event_data.get("portal_id")
-            or event_data.get("door_id")
-        )
-        portal = None
-        if raw_portal_id is not None:
-            try:
-                portal_id = int(raw_portal_id)
-                if portal_id > 0:
-                    portal = Portal.objects.filter(id=portal_id).first()
-                    if not portal:
-                        logger.warning(
-                            f"⚠️ [CATRA_EVENT] Portal id={portal_id} não existe no banco"
-                        )
-            except (TypeError, ValueError):
-                logger.warning(
-                    f"⚠️ [CATRA_EVENT] portal_id inválido recebido: {raw_portal_id}"
-                )
-
-        # ── Mapeia event_type da catraca para EventType do model ──
-        # 7 = TURN_LEFT / 8 = TURN_RIGHT → registra como ACESSO_CONCEDIDO (7)
-        # 9 = GIVE_UP → registra como DESISTENCIA_DE_ENTRADA (13)
-        if event_type == 9:
-            model_event_type = 13  # DESISTENCIA_DE_ENTRADA
-        else:
-            model_event_type = 7  # ACESSO_CONCEDIDO
-
-        # ── Identifier único: uuid do evento ou access_event_id ──
-        identifier = event_uuid or str(access_event_id or event_time or "")
-
-        log, created = AccessLogs.objects.update_or_create(
-            device=device,
-            identifier_id=identifier,
-            time=timestamp,
-            defaults={
-                "event_type": model_event_type,
-                "user": None,
-                "portal": portal,
-                "access_rule": None,
-                "card_value": "",
-                "qr_code": "",
-                "uhf_value": "",
-                "pin_value": "",
-                "confidence": 0,
-                "mask": "",
-                "sentido": event_data.get("name", ""),
-                "raw_payload": {
-                    "source": "catra_event",
-                    "notification": payload,
-                },
-            },
-        )
-
-        action = "created" if created else "already_exists"
-        logger.info(
-            f"✅ [CATRA_EVENT] {action} — {event_name} (type={event_type}) "
-            f"device={device.name} portal={portal.name if portal else raw_portal_id} "
-            f"uuid={event_uuid} access_event_id={access_event_id}"
-            f"{payload}"
-        )
 
-        return Response(
-            {
-                "success": True,
-                "action": action,
-                "event_name": event_name,
-                "event_type": event_type,
-                "model_event_type": model_event_type,
-                "device": str(device),
-                "portal": portal.name if portal else None,
-                "time": str(timestamp),
-                "sentido": event_data.get("name", ""),
-            },
-            status=status.HTTP_200_OK,
-        )
+        result = monitor_handler.process_catra_event(payload, device)
+        return Response(result, status=status.HTTP_200_OK)
 
     except Exception as e:
         logger.error(f"❌ [CATRA_EVENT] Erro: {e}", exc_info=True)
@@ -850,3 +753,26 @@ def receive_catra_event(request):
             {"success": False, "error": f"Erro interno: {str(e)}"},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+@extend_schema(
+    tags=["Monitor (Push Logs) - Webhook"],
+    summary="Métricas da fila de ingestão dos webhooks",
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "async_enabled": {"type": "boolean"},
+                "depth": {"type": "integer"},
+                "failed": {"type": "integer"},
+                "oldest_pending_at": {"type": "string", "nullable": True},
+                "lag_seconds": {"type": "number"},
+                "last_drain": {"type": "object", "nullable": True},
+            },
+        }
+    },
+)
+@api_view(["GET"])
+def webhook_ingestion_status(request):
+    """Profundidade, atraso e último drain da fila de webhooks."""
+    return Response(webhook_ingestion_metrics())
@@ -0,0 +1,197 @@
+"""
+Fila de ingestão dos webhooks da catraca.
+
+Com ``MONITOR_WEBHOOK_ASYNC_INGESTION`` ligado, ``receive_dao_notification`` e
+``receive_catra_event`` só validam o envelope, registram o heartbeat, gravam o
+payload cru em ``WebhookInbox`` e respondem na hora. O processamento (parsing,
+upsert de AccessLogs, agendamento da verificação) fica com a task
+``drain_webhook_inbox``, que consome a fila em lotes:
+
+- cada notificação DAO passa pelo ``process_notification`` com o próprio
+  payload (que vai para o ``raw_payload`` dos logs); os logs dela viram um
+  upsert em lote, idempotente por ``(device, identifier_id, time)``;
+- catra_events usam o mesmo ``update_or_create`` do caminho síncrono;
+- linhas processadas saem da fila; falhas voltam para a fila até
+  ``MONITOR_WEBHOOK_MAX_ATTEMPTS`` e depois ficam como ``failed``.
+
+Configuração:
+- ``MONITOR_WEBHOOK_ASYNC_INGESTION``: liga o modo fila (padrão: desligado)
+- ``MONITOR_WEBHOOK_DRAIN_BATCH_SIZE``: linhas por lote (padrão: 500)
+- ``MONITOR_WEBHOOK_MAX_ATTEMPTS``: tentativas antes de ``failed`` (padrão: 5)
+- ``MONITOR_WEBHOOK_LAG_WARNING_SECONDS``: atraso que gera warning (padrão: 60)
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import WebhookInbox
+from .notification_handlers import monitor_handler
+
+logger = logging.getLogger(__name__)
+
+_DRAIN_SCHEDULED_KEY = "monitor_webhook:drain_scheduled"
+_LAST_DRAIN_KEY = "monitor_webhook:last_drain"
+# Se o drain agendado se perder (worker caiu), outro webhook reagenda depois
+# deste prazo; a task periódica do beat cobre o resto.
+_DRAIN_SCHEDULE_TTL_SECONDS = 30
+
+
+def _int_setting(name: str, default: int, minimum: int = 1) -> int:
+    value = getattr(settings, name, default)
+    try:
+        return max(minimum, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def async_ingestion_enabled() -> bool:
+    return bool(getattr(settings, "MONITOR_WEBHOOK_ASYNC_INGESTION", False))
+
+
+def enqueue_webhook(kind: str, payload: dict[str, Any], device=None) -> WebhookInbox:
+    """Grava o payload cru na fila e agenda o drain após o commit."""
+    row = WebhookInbox.objects.create(kind=kind, payload=payload, device=device)
+    _schedule_drain()
+    return row
+
+
+def _schedule_drain() -> None:
+    # Uma rajada de webhooks agenda um único drain.
+    if not cache.add(_DRAIN_SCHEDULED_KEY, 1, timeout=_DRAIN_SCHEDULE_TTL_SECONDS):
+        return
+
+    def enqueue():
+        from .tasks import drain_webhook_inbox
+
+        try:
+            drain_webhook_inbox.delay()
+        except Exception as exc:
+            cache.delete(_DRAIN_SCHEDULED_KEY)
+            logger.warning(
+                "[WEBHOOK_INBOX] Não foi possível agendar o drain: %s", exc
+            )
+
+    transaction.on_commit(enqueue)
+
+
+def drain_inbox(batch_size: int | None = None, max_batches: int | None = None) -> dict:
+    """Processa a fila em lotes até esvaziá-la (ou até ``max_batches``)."""
+    # Webhooks que chegarem a partir daqui agendam um novo drain.
+    cache.delete(_DRAIN_SCHEDULED_KEY)
+    batch_size = batch_size or _int_setting("MONITOR_WEBHOOK_DRAIN_BATCH_SIZE", 500)
+    started = time.monotonic()
+    metrics = webhook_ingestion_metrics()
+    if metrics["lag_seconds"] > _int_setting("MONITOR_WEBHOOK_LAG_WARNING_SECONDS", 60):
+        logger.warning(
+            "[WEBHOOK_INBOX] Ingestão atrasada: %s pendentes, %.0fs de atraso",
+            metrics["depth"],
+            metrics["lag_seconds"],
+        )
+
+    totals = {"batches": 0, "processed": 0, "failed": 0}
+    # Falhas desta execução ficam para o próximo drain, não para o próximo lote.
+    retry_later: set[int] = set()
+    while max_batches is None or totals["batches"] < max_batches:
+        with transaction.atomic():
+            rows = list(
+                WebhookInbox.objects.select_for_update(skip_locked=True)
+                .filter(status=WebhookInbox.Status.PENDING)
+                .exclude(id__in=retry_later)
+                .order_by("id")[:batch_size]
+            )
+            if not rows:
+                break
+            done_ids, failures = _process_rows(rows)
+            WebhookInbox.objects.filter(id__in=done_ids).delete()
+            _record_failures(failures)
+
+        totals["batches"] += 1
+        totals["processed"] += len(done_ids)
+        totals["failed"] += len(failures)
+        retry_later.update(failures)
+
+    totals["duration_seconds"] = round(time.monotonic() - started, 3)
+    totals["finished_at"] = timezone.now().isoformat()
+    cache.set(_LAST_DRAIN_KEY, totals, timeout=None)
+    return totals
+
+
+def _process_rows(rows: list[WebhookInbox]) -> tuple[list[int], dict[int, str]]:
+    done_ids: list[int] = []
+    failures: dict[int, str] = {}
+
+    for row in rows:
+        if row.kind == WebhookInbox.Kind.DAO:
+            _process_dao_row(row, done_ids, failures)
+            continue
+
+        if row.device_id is None:
+            failures[row.id] = "catra_event sem device resolvido"
+            continue
+        try:
+            with transaction.atomic():
+                monitor_handler.process_catra_event(row.payload, row.device)
+            done_ids.append(row.id)
+        except Exception as exc:
+            logger.error("[WEBHOOK_INBOX] catra_event #%s falhou: %s", row.id, exc)
+            failures[row.id] = str(exc)
+
+    return done_ids, failures
+
+
+def _process_dao_row(
+    row: WebhookInbox, done_ids: list[int], failures: dict[int, str]
+) -> None:
+    try:
+        with transaction.atomic():
+            result = monitor_handler.process_notification(row.payload)
+    except Exception as exc:
+        logger.error("[WEBHOOK_INBOX] notificação #%s falhou: %s", row.id, exc)
+        failures[row.id] = str(exc)
+        return
+    # Com "results" o lote foi aplicado; erros por mudança são de dado e
+    # não mudam reprocessando. Sem ele a transação inteira voltou.
+    if "results" in result or result.get("success"):
+        done_ids.append(row.id)
+    else:
+        failures[row.id] = str(result.get("error") or "erro desconhecido")
+
+
+def _record_failures(failures: dict[int, str]) -> None:
+    max_attempts = _int_setting("MONITOR_WEBHOOK_MAX_ATTEMPTS", 5)
+    for row_id, error in failures.items():
+        WebhookInbox.objects.filter(id=row_id).update(
+            attempts=F("attempts") + 1, last_error=error[:2000]
+        )
+    WebhookInbox.objects.filter(
+        id__in=list(failures), attempts__gte=max_attempts
+    ).update(status=WebhookInbox.Status.FAILED)
+
+
+def webhook_ingestion_metrics() -> dict:
+    """Profundidade e atraso da fila, para acompanhar picos de entrada."""
+    pending = WebhookInbox.objects.filter(
+        status=WebhookInbox.Status.PENDING
+    ).aggregate(depth=Count("id"), oldest=Min("received_at"))
+    oldest = pending["oldest"]
+    return {
+        "async_enabled": async_ingestion_enabled(),
+        "depth": pending["depth"],
+        "failed": WebhookInbox.objects.filter(
+            status=WebhookInbox.Status.FAILED
+        ).count(),
+        "oldest_pending_at": oldest.isoformat() if oldest else None,
+        "lag_seconds": (
+            round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0.0
+        ),
+        "last_drain": cache.get(_LAST_DRAIN_KEY),
+    }
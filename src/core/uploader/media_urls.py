@@ -0,0 +1,120 @@
+"""
+URLs de mídia (fotos de usuário) com cache.
+
+Com ``MINIO_STORAGE_MEDIA_USE_PRESIGNED`` cada ``arquivo.url`` assina uma URL
+nova (HMAC + montagem da query). A listagem de usuários e a tela da guarita
+atualizam o tempo todo, então a URL assinada fica no cache do Django por um
+pouco menos que a validade dela e é reaproveitada pelos requests seguintes
+(entre processos só com o cache compartilhado de ``REDIS_CACHE_URL``).
+
+- ``archive_url(archive)``: uma URL;
+- ``archive_urls(archives)``: várias de uma vez (um ``get_many`` e um
+  ``set_many``), usado para a página inteira da listagem;
+- ``MEDIA_PUBLIC_BASE_URL``: se definido (bucket com leitura pública), monta a
+  URL estável ``<base>/<nome>`` sem assinar nada.
+
+A chave é o nome do objeto no storage: trocar a foto gera outro nome e,
+portanto, outra entrada.
+
+Configuração:
+- ``MEDIA_URL_MAX_AGE_SECONDS``: validade da URL assinada (padrão: 1h)
+- ``MEDIA_URL_CACHE_MARGIN_SECONDS``: folga antes de expirar (padrão: 5min)
+- ``MEDIA_PUBLIC_BASE_URL``: base pública do bucket (padrão: vazio)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Iterable
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_CACHE_KEY = "media_url:{digest}"
+# URLs que não expiram (storage local, bucket público) ficam um dia no cache.
+_STABLE_URL_TTL_SECONDS = 24 * 3600
+
+
+def _int_setting(name: str, default: int) -> int:
+    value = getattr(settings, name, default)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _public_base_url() -> str:
+    return (getattr(settings, "MEDIA_PUBLIC_BASE_URL", "") or "").rstrip("/")
+
+
+def _is_presigned(storage) -> bool:
+    try:
+        from minio_storage.storage import MinioStorage
+    except ImportError:
+        return False
+    return isinstance(storage, MinioStorage) and bool(storage.presign_urls)
+
+
+def _cache_key(name: str) -> str:
+    return _CACHE_KEY.format(digest=hashlib.sha1(name.encode("utf-8")).hexdigest())
+
+
+def _build_url(field_file) -> tuple[str | None, int]:
+    """Gera a URL e retorna junto o tempo que ela pode ficar no cache."""
+    name = field_file.name
+    public_base = _public_base_url()
+    if public_base:
+        return f"{public_base}/{quote(name.lstrip('/'))}", _STABLE_URL_TTL_SECONDS
+
+    storage = field_file.storage
+    if not _is_presigned(storage):
+        return storage.url(name), _STABLE_URL_TTL_SECONDS
+
+    max_age = _int_setting("MEDIA_URL_MAX_AGE_SECONDS", 3600)
+    margin = _int_setting("MEDIA_URL_CACHE_MARGIN_SECONDS", 300)
+    url = storage.url(name, max_age=timedelta(seconds=max_age))
+    return url, max(0, max_age - margin)
+
+
+def archive_urls(archives: Iterable) -> dict[int, str | None]:
+    """URLs de vários ``Archive`` (chave: pk), assinando só as que faltam no cache."""
+    files = {
+        archive.pk: archive.arquivo
+        for archive in archives
+        if archive is not None and archive.arquivo
+    }
+    keys = {pk: _cache_key(field_file.name) for pk, field_file in files.items()}
+    cached = cache.get_many(keys.values()) if keys else {}
+
+    urls: dict[int, str | None] = {}
+    fresh: dict[int, dict[str, str]] = {}
+    for pk, field_file in files.items():
+        key = keys[pk]
+        if key in cached:
+            urls[pk] = cached[key]
+            continue
+        try:
+            url, ttl = _build_url(field_file)
+        except (OSError, ValueError) as exc:
+            logger.warning("Falha ao gerar URL do arquivo %s: %s", pk, exc)
+            urls[pk] = None
+            continue
+        urls[pk] = url
+        if url and ttl:
+            fresh.setdefault(ttl, {})[key] = url
+
+    for ttl, entries in fresh.items():
+        cache.set_many(entries, timeout=ttl)
+    return urls
+
+
+def archive_url(archive) -> str | None:
+    """URL de um ``Archive`` (``None`` se não houver arquivo)."""
+    if archive is None or not archive.arquivo:
+        return None
+    return archive_urls([archive]).get(archive.pk)
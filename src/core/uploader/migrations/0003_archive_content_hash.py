@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploader', '0002_alter_archive_options_remove_archive_criado_em_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archive',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
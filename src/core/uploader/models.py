@@ -14,6 +14,8 @@ def archive_storage():
 class Archive(BaseModel):
     titulo = models.CharField(max_length=200)
     arquivo = models.FileField(storage=archive_storage)
+    # sha256 do arquivo de origem; permite pular fotos iguais ao reimportar.
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
     # criado_em removido, use created_at do BaseModel
 
     class Meta(BaseModel.Meta):
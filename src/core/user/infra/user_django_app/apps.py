@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class UserDjangoProjectConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src.core.user.infra.user_django_app'
+
+    def ready(self):
+        from .pin_allocator import connect_signals
+
+        connect_signals()
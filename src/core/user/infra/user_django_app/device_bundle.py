@@ -0,0 +1,200 @@
+"""
+Pacote de replicação de um usuário para uma catraca.
+
+Quando um usuário passa a ter acesso a uma catraca, ela precisa de tudo o que
+o identifica e libera ali: o próprio usuário, PIN, papel de administrador,
+grupos e vínculos, regras de acesso diretas, cartões e biometrias.
+``build_user_bundle`` junta isso com uma query por tabela e
+``UserDeviceBundle.send`` manda cada tabela num único
+``create_or_modify_objects.fcgi``, na ordem das chaves estrangeiras — o
+device fica completo na hora, sem esperar sync manual ou Easy Setup.
+``pins`` e ``user_roles`` não têm ``id``: vão por ``modify_objects`` com
+``where user_id`` e só são criados se não existirem, para reenvios não
+duplicarem a linha.
+
+Regras com ``portal_group`` só vão para os devices daquele grupo de portais,
+como em ``UserAccessRuleViewSet``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator
+
+from django.utils import timezone
+
+from src.core.__seedwork__.infra.catraca_sync import (
+    MODIFY_BY_KEY_OBJECTS,
+    ControlIDSyncMixin,
+)
+from src.core.control_id.infra.control_id_django_app.models import (
+    Card,
+    Device,
+    PortalGroup,
+    Template,
+    UserAccessRule,
+    UserGroup,
+)
+from src.core.control_id.infra.control_id_django_app.replication_outbox import (
+    enqueue_upsert,
+)
+
+from .models import User
+
+# Ordem de envio: cada tabela só referencia as anteriores.
+BUNDLE_TABLES = (
+    "users",
+    "pins",
+    "user_roles",
+    "groups",
+    "user_groups",
+    "user_access_rules",
+    "cards",
+    "templates",
+)
+
+
+def datetime_to_device_timestamp(value) -> int:
+    if not value:
+        return 0
+
+    aware_value = value
+    if timezone.is_naive(aware_value):
+        aware_value = timezone.make_aware(
+            aware_value,
+            timezone.get_current_timezone(),
+        )
+    return int(aware_value.timestamp())
+
+
+def user_payload(user: User) -> dict[str, Any]:
+    return {
+        "id": user.id,
+        "name": user.name,
+        "registration": user.registration or "",
+        "begin_time": datetime_to_device_timestamp(user.start_date),
+        "end_time": datetime_to_device_timestamp(user.end_date),
+    }
+
+
+def _card_value(value):
+    return int(value) if str(value).isdigit() else value
+
+
+class UserDeviceBundle:
+    """Linhas de cada tabela da catraca para um usuário."""
+
+    def __init__(self) -> None:
+        # (tabela, payload, portal_group_id que restringe os devices)
+        self._entries: list[tuple[str, dict[str, Any], int | None]] = []
+        self._device_portal_groups: dict[int, set[int]] = {}
+
+    def add(
+        self, table: str, payload: dict[str, Any], portal_group_id: int | None = None
+    ) -> None:
+        self._entries.append((table, payload, portal_group_id))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def tables_for(self, device: Device) -> Iterator[tuple[str, list[dict[str, Any]]]]:
+        """``(tabela, valores)`` que *device* deve receber, em ordem de FK."""
+        portal_groups = self._device_portal_groups.get(device.id, set())
+        by_table: dict[str, list[dict[str, Any]]] = {}
+        for table, payload, portal_group_id in self._entries:
+            if portal_group_id is None or portal_group_id in portal_groups:
+                by_table.setdefault(table, []).append(payload)
+        for table in BUNDLE_TABLES:
+            if by_table.get(table):
+                yield table, by_table[table]
+
+    def send(self, client: ControlIDSyncMixin, device: Device) -> int:
+        """
+        Envia o pacote a *device*; devolve o número de requests.
+
+        Raises:
+            CatracaSyncError: Na primeira tabela recusada pela catraca.
+        """
+        client.set_device(device)
+        calls = 0
+        for table, values in self.tables_for(device):
+            if table in MODIFY_BY_KEY_OBJECTS:
+                client.modify_or_create_objects_in_all_devices(table, values)
+            else:
+                client.create_or_update_objects_in_all_devices(table, values)
+            calls += 1
+        return calls
+
+    def enqueue(self, devices: Iterable[Device]) -> list:
+        """Mesmo pacote pela outbox de replicação (uma linha por objeto)."""
+        rows = []
+        for device in devices:
+            for table, values in self.tables_for(device):
+                rows += enqueue_upsert([device], table, values)
+        return rows
+
+
+def build_user_bundle(user: User, devices: Iterable[Device] = ()) -> UserDeviceBundle:
+    """
+    Monta o pacote de *user*.
+
+    *devices* só é usado para resolver as regras restritas a grupos de
+    portais; sem regras assim, nenhuma query extra é feita.
+    """
+    bundle = UserDeviceBundle()
+    bundle.add("users", user_payload(user))
+    if user.pin:
+        bundle.add("pins", {"user_id": user.id, "value": user.pin})
+    if user.is_staff or user.is_superuser:
+        bundle.add("user_roles", {"user_id": user.id, "role": 1})
+
+    memberships = UserGroup.objects.filter(user=user).values_list(
+        "group_id", "group__name"
+    )
+    for group_id, group_name in memberships:
+        bundle.add("groups", {"id": group_id, "name": group_name})
+        bundle.add("user_groups", {"user_id": user.id, "group_id": group_id})
+
+    scoped = False
+    rules = UserAccessRule.objects.filter(
+        user=user, access_rule__deleted_at__isnull=True
+    ).values_list("access_rule_id", "portal_group_id")
+    for access_rule_id, portal_group_id in rules:
+        scoped = scoped or portal_group_id is not None
+        bundle.add(
+            "user_access_rules",
+            {"user_id": user.id, "access_rule_id": access_rule_id},
+            portal_group_id,
+        )
+
+    for card_id, value in Card.objects.filter(user=user).values_list("id", "value"):
+        bundle.add(
+            "cards", {"id": card_id, "user_id": user.id, "value": _card_value(value)}
+        )
+
+    templates = Template.objects.filter(user=user).values_list(
+        "id", "template", "finger_type", "finger_position"
+    )
+    for template_id, template, finger_type, finger_position in templates:
+        bundle.add(
+            "templates",
+            {
+                "id": template_id,
+                "user_id": user.id,
+                "template": template,
+                "finger_type": finger_type,
+                "finger_position": finger_position,
+            },
+        )
+
+    device_ids = [device.id for device in devices]
+    if scoped and device_ids:
+        links = PortalGroup.devices.through.objects.filter(
+            device_id__in=device_ids,
+            portalgroup__is_active=True,
+            portalgroup__deleted_at__isnull=True,
+        ).values_list("device_id", "portalgroup_id")
+        for device_id, portal_group_id in links:
+            bundle._device_portal_groups.setdefault(device_id, set()).add(
+                portal_group_id
+            )
+    return bundle
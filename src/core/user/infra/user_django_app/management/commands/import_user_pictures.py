@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import csv
+import hashlib
+import io
 import re
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
 from django.conf import settings
-from django.core.files import File
+from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
 
 from src.core.control_id.infra.control_id_django_app.models import (
     CustomGroup,
@@ -21,6 +26,9 @@ from src.core.user.infra.user_django_app.models import User
 
 SUPPORTED_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
 ARCHIVE_UPLOAD_PREFIX = "user_pictures"
+# Lado maior da foto normalizada; a catraca e a listagem exibem bem menos que isso.
+DEFAULT_MAX_IMAGE_SIZE = 640
+DEFAULT_JPEG_QUALITY = 85
 REPORT_FIELDS = [
     "group_name",
     "file_path",
@@ -29,6 +37,10 @@ REPORT_FIELDS = [
     "user_name",
     "archive_id",
     "detail",
+    "content_hash",
+    "original_bytes",
+    "stored_bytes",
+    "elapsed_ms",
 ]
 
 
@@ -41,6 +53,10 @@ class PictureImportRow:
     user_name: str = ""
     archive_id: int | None = None
     detail: str = ""
+    content_hash: str = ""
+    original_bytes: int | None = None
+    stored_bytes: int | None = None
+    elapsed_ms: int | None = None
 
     def as_dict(self) -> dict[str, str]:
         return {
@@ -51,9 +67,41 @@ class PictureImportRow:
             "user_name": self.user_name,
             "archive_id": "" if self.archive_id is None else str(self.archive_id),
             "detail": self.detail,
+            "content_hash": self.content_hash,
+            "original_bytes": _optional_int(self.original_bytes),
+            "stored_bytes": _optional_int(self.stored_bytes),
+            "elapsed_ms": _optional_int(self.elapsed_ms),
         }
 
 
+@dataclass(frozen=True)
+class PendingPicture:
+    """Foto que casou com um usuario e vai para o storage."""
+
+    group_name: str
+    image_file: Path
+    user: User
+    current_hash: str = ""
+
+
+@dataclass(frozen=True)
+class UploadedPicture:
+    """Resultado do trabalho feito fora da thread principal (leitura, hash, upload)."""
+
+    pending: PendingPicture
+    content_hash: str
+    original_bytes: int
+    elapsed_ms: int
+    archive: Archive | None = None
+    stored_bytes: int | None = None
+    error_status: str = ""
+    error: str = ""
+
+
+def _optional_int(value: int | None) -> str:
+    return "" if value is None else str(value)
+
+
 def normalize_match_key(value: str | None) -> str:
     if not value:
         return ""
@@ -68,13 +116,30 @@ def normalize_match_key(value: str | None) -> str:
     return re.sub(r"\s+", " ", normalized).strip()
 
 
-def safe_storage_name(group_name: str, user: User, source_file: Path) -> str:
+def safe_storage_name(
+    group_name: str, user: User, source_file: Path, suffix: str | None = None
+) -> str:
     group_slug = normalize_match_key(group_name).replace(" ", "_") or "sem_grupo"
     user_slug = normalize_match_key(user.name).replace(" ", "_") or f"user_{user.pk}"
-    suffix = source_file.suffix.lower()
+    suffix = suffix or source_file.suffix.lower()
     return f"{ARCHIVE_UPLOAD_PREFIX}/{group_slug}/{user.pk}_{user_slug}{suffix}"
 
 
+def normalize_image(content: bytes, max_size: int, quality: int) -> bytes:
+    """
+    Corrige a orientacao EXIF, reduz para caber em ``max_size`` e regrava
+    como JPEG.
+    """
+    with Image.open(io.BytesIO(content)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail((max_size, max_size))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
 class Command(BaseCommand):
     help = (
         "Importa fotos de usuarios a partir de pastas de turmas. "
@@ -123,6 +188,34 @@ class Command(BaseCommand):
             action="store_true",
             help="Mostra uma linha para cada arquivo processado.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Quantidade de fotos lidas/enviadas ao storage em paralelo. "
+                "Padrao: 1 (serial)."
+            ),
+        )
+        parser.add_argument(
+            "--normalize",
+            action="store_true",
+            help=(
+                "Redimensiona e regrava as fotos como JPEG antes do envio."
+            ),
+        )
+        parser.add_argument(
+            "--max-size",
+            type=int,
+            default=DEFAULT_MAX_IMAGE_SIZE,
+            help=f"Lado maior da foto normalizada, em pixels. Padrao: {DEFAULT_MAX_IMAGE_SIZE}",
+        )
+        parser.add_argument(
+            "--quality",
+            type=int,
+            default=DEFAULT_JPEG_QUALITY,
+            help=f"Qualidade JPEG da foto normalizada. Padrao: {DEFAULT_JPEG_QUALITY}",
+        )
 
     def handle(self, *args, **options):
         root_dir = Path(options["root_dir"]).expanduser().resolve()
@@ -132,13 +225,18 @@ class Command(BaseCommand):
         verbose = bool(options["verbose"])
         extensions = self._normalize_extensions(options["extensions"])
         report_path = Path(options["report"]).expanduser().resolve()
+        workers = max(1, int(options["workers"] or 1))
+        self.normalize = bool(options["normalize"])
+        self.max_size = max(1, int(options["max_size"]))
+        self.quality = min(95, max(1, int(options["quality"])))
 
         if not root_dir.exists() or not root_dir.is_dir():
             raise CommandError(f"Pasta raiz nao encontrada: {root_dir}")
 
         self._guard_shared_storage(commit, allow_shared_minio)
 
-        rows = list(
+        started = time.perf_counter()
+        items = list(
             self._process_root(
                 root_dir=root_dir,
                 commit=commit,
@@ -147,8 +245,10 @@ class Command(BaseCommand):
                 verbose=verbose,
             )
         )
+        rows = self._import_pending(items, workers=workers, verbose=verbose)
+        elapsed_s = time.perf_counter() - started
         self._write_report(report_path, rows)
-        self._print_summary(rows, commit, report_path)
+        self._print_summary(rows, commit, report_path, elapsed_s=elapsed_s)
 
     def _normalize_extensions(self, extensions: list[str]) -> tuple[str, ...]:
         normalized = []
@@ -182,7 +282,7 @@ class Command(BaseCommand):
         replace: bool,
         extensions: tuple[str, ...],
         verbose: bool,
-    ) -> Iterable[PictureImportRow]:
+    ) -> Iterable[PictureImportRow | PendingPicture]:
         group_dirs = sorted(path for path in root_dir.iterdir() if path.is_dir())
         if not group_dirs:
             yield PictureImportRow(
@@ -210,7 +310,7 @@ class Command(BaseCommand):
         replace: bool,
         extensions: tuple[str, ...],
         verbose: bool,
-    ) -> Iterable[PictureImportRow]:
+    ) -> Iterable[PictureImportRow | PendingPicture]:
         group_name = group_dir.name.strip()
         group = CustomGroup.objects.filter(name__iexact=group_name).first()
         image_files = sorted(
@@ -252,14 +352,15 @@ class Command(BaseCommand):
                 commit=commit,
                 replace=replace,
             )
-            self._write_verbose(row, verbose)
+            if isinstance(row, PictureImportRow):
+                self._write_verbose(row, verbose)
             yield row
 
     def _build_user_index(self, group: CustomGroup) -> dict[str, list[User]]:
         index: dict[str, list[User]] = {}
         relations = (
             UserGroup.objects.filter(group=group)
-            .select_related("user")
+            .select_related("user__picture")
             .order_by("user__name", "user_id")
         )
         for relation in relations:
@@ -278,7 +379,7 @@ class Command(BaseCommand):
         user_index: dict[str, list[User]],
         commit: bool,
         replace: bool,
-    ) -> PictureImportRow:
+    ) -> PictureImportRow | PendingPicture:
         match_key = normalize_match_key(image_file.stem)
         matches = user_index.get(match_key, [])
 
@@ -325,29 +426,158 @@ class Command(BaseCommand):
                 detail="Dry-run: foto seria importada e vinculada.",
             )
 
-        archive = self._create_archive_for_user(user, group.name, image_file)
-        return PictureImportRow(
+        return PendingPicture(
             group_name=group.name,
-            file_path=str(image_file),
-            status="imported",
+            image_file=image_file,
+            user=user,
+            current_hash=user.picture.content_hash if user.picture_id else "",
+        )
+
+    # ── Envio ao storage ──
+
+    def _import_pending(
+        self,
+        items: list[PictureImportRow | PendingPicture],
+        *,
+        workers: int,
+        verbose: bool,
+    ) -> list[PictureImportRow]:
+        """
+        Le, calcula o hash, normaliza e envia as fotos pendentes, ``workers``
+        por vez. O storage e feito nas threads; o banco fica na thread
+        principal, uma transacao curta por foto.
+        """
+        pending = [item for item in items if isinstance(item, PendingPicture)]
+        if not pending:
+            return list(items)
+
+        if workers == 1:
+            uploaded = map(self._upload_picture, pending)
+        else:
+            executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="import-pictures"
+            )
+            uploaded = executor.map(self._upload_picture_in_thread, pending)
+
+        try:
+            results = {}
+            for upload in uploaded:
+                row = self._link_picture(upload)
+                self._write_verbose(row, verbose)
+                results[id(upload.pending)] = row
+        finally:
+            if workers > 1:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return [
+            results[id(item)] if isinstance(item, PendingPicture) else item
+            for item in items
+        ]
+
+    def _upload_picture_in_thread(self, pending: PendingPicture) -> UploadedPicture:
+        try:
+            return self._upload_picture(pending)
+        finally:
+            close_old_connections()
+
+    def _upload_picture(self, pending: PendingPicture) -> UploadedPicture:
+        started = time.perf_counter()
+
+        def elapsed_ms() -> int:
+            return int((time.perf_counter() - started) * 1000)
+
+        try:
+            content = pending.image_file.read_bytes()
+        except OSError as exc:
+            return UploadedPicture(
+                pending=pending,
+                content_hash="",
+                original_bytes=0,
+                elapsed_ms=elapsed_ms(),
+                error_status="read_failed",
+                error=f"Falha ao ler arquivo: {exc}",
+            )
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        result = dict(
+            pending=pending,
+            content_hash=content_hash,
+            original_bytes=len(content),
+        )
+        if content_hash == pending.current_hash:
+            return UploadedPicture(**result, elapsed_ms=elapsed_ms())
+
+        suffix = None
+        if self.normalize:
+            try:
+                content = normalize_image(content, self.max_size, self.quality)
+            except Exception as exc:
+                return UploadedPicture(
+                    **result,
+                    elapsed_ms=elapsed_ms(),
+                    error_status="invalid_image",
+                    error=f"Imagem invalida: {exc}",
+                )
+            suffix = ".jpg"
+
+        user = pending.user
+        archive = Archive(
+            titulo=f"Foto usuario {user.pk} - {user.name}",
+            content_hash=content_hash,
+        )
+        storage_name = safe_storage_name(
+            pending.group_name, user, pending.image_file, suffix=suffix
+        )
+        try:
+            archive.arquivo.save(storage_name, ContentFile(content), save=False)
+        except Exception as exc:
+            return UploadedPicture(
+                **result,
+                elapsed_ms=elapsed_ms(),
+                error_status="upload_failed",
+                error=f"Falha ao enviar ao storage: {exc}",
+            )
+        return UploadedPicture(
+            **result,
+            elapsed_ms=elapsed_ms(),
+            archive=archive,
+            stored_bytes=len(content),
+        )
+
+    def _link_picture(self, upload: UploadedPicture) -> PictureImportRow:
+        pending = upload.pending
+        user = pending.user
+        row = dict(
+            group_name=pending.group_name,
+            file_path=str(pending.image_file),
             user_id=user.pk,
             user_name=user.name,
+            content_hash=upload.content_hash,
+            original_bytes=upload.original_bytes,
+            stored_bytes=upload.stored_bytes,
+            elapsed_ms=upload.elapsed_ms,
+        )
+        if upload.error:
+            return PictureImportRow(**row, status=upload.error_status, detail=upload.error)
+        if upload.archive is None:
+            return PictureImportRow(
+                **row,
+                status="unchanged",
+                archive_id=user.picture_id,
+                detail="Foto igual a atual (mesmo hash); nada enviado.",
+            )
+
+        archive = self._create_archive_for_user(user, upload.archive)
+        return PictureImportRow(
+            **row,
+            status="imported",
             archive_id=archive.pk,
             detail="Foto importada e vinculada.",
         )
 
-    def _create_archive_for_user(
-        self, user: User, group_name: str, image_file: Path
-    ) -> Archive:
-        title = f"Foto usuario {user.pk} - {user.name}"
-        storage_name = safe_storage_name(group_name, user, image_file)
-
+    def _create_archive_for_user(self, user: User, archive: Archive) -> Archive:
         with transaction.atomic():
-            archive = Archive(titulo=title)
-            with image_file.open("rb") as handle:
-                archive.arquivo.save(storage_name, File(handle), save=False)
-                archive.save()
-
+            archive.save()
             user.picture = archive
             user.save(update_fields=["picture"])
             return archive
@@ -361,7 +591,11 @@ class Command(BaseCommand):
                 writer.writerow(row.as_dict())
 
     def _print_summary(
-        self, rows: list[PictureImportRow], commit: bool, report_path: Path
+        self,
+        rows: list[PictureImportRow],
+        commit: bool,
+        report_path: Path,
+        elapsed_s: float = 0.0,
     ) -> None:
         counts: dict[str, int] = {}
         for row in rows:
@@ -371,6 +605,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Importacao de fotos finalizada ({mode})."))
         for status_name in sorted(counts):
             self.stdout.write(f"{status_name}: {counts[status_name]}")
+        imported = counts.get("imported", 0)
+        rate = f" ({imported / elapsed_s:.1f} foto(s)/s)" if imported and elapsed_s else ""
+        self.stdout.write(f"Tempo total: {elapsed_s:.1f}s{rate}")
         self.stdout.write(f"Relatorio: {report_path}")
 
         if not commit:
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_django_app', '0022_fix_duplicate_pins_and_unique_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pin', models.CharField(max_length=4, unique=True)),
+                ('token', models.CharField(db_index=True, max_length=32)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Reserva de PIN',
+                'verbose_name_plural': 'Reservas de PIN',
+            },
+        ),
+    ]
@@ -22,37 +22,28 @@ def _is_valid_pin(value: str | None) -> bool:
     return bool(value and len(value) == PIN_LENGTH and value.isdigit())
 
 
-def generate_unique_pin(
-    *,
-    exclude_user_id: int | None = None,
-    extra_used_pins: set[str] | None = None,
-) -> str:
+def generate_unique_pin(*, extra_used_pins: set[str] | None = None) -> str:
     """
     Gera um PIN de 4 digitos ainda livre entre usuarios ativos.
 
     Mantemos o espaco em 0000-9999 por compatibilidade com a catraca. Quando
     todos estiverem ocupados, falhamos explicitamente para evitar duplicidade.
     """
-    used_pins = set(extra_used_pins or set())
-    queryset = User.objects.exclude(pin__isnull=True).exclude(pin="")
-    if exclude_user_id is not None:
-        queryset = queryset.exclude(pk=exclude_user_id)
+    from .pin_allocator import PinAllocator
 
-    used_pins.update(str(pin).strip() for pin in queryset.values_list("pin", flat=True))
-    if len({pin for pin in used_pins if _is_valid_pin(pin)}) >= PIN_SPACE_SIZE:
-        raise ValueError("Nao ha PINs de 4 digitos disponiveis.")
+    return PinAllocator(extra_used_pins=extra_used_pins).allocate(1)[0]
 
-    for _ in range(PIN_SPACE_SIZE):
-        candidate = generate_pin()
-        if candidate not in used_pins:
-            return candidate
 
-    for number in range(PIN_SPACE_SIZE):
-        candidate = str(number).zfill(PIN_LENGTH)
-        if candidate not in used_pins:
-            return candidate
+def generate_unique_pins(count: int) -> list[str]:
+    """
+    Gera e reserva ``count`` PINs livres e distintos.
+
+    Usado pelas importações em lote, que gravam via ``bulk_create`` e por
+    isso não passam pelo ``save()`` que sorteia o PIN.
+    """
+    from .pin_allocator import PinAllocator
 
-    raise ValueError("Nao ha PINs de 4 digitos disponiveis.")
+    return PinAllocator().allocate(count)
 
 
 class User(SafeDeleteModel, AbstractUser):  # type: ignore
@@ -153,24 +144,39 @@ class User(SafeDeleteModel, AbstractUser):  # type: ignore
     objects = CustomUserManager()
 
     def save(self, *args, **kwargs):
+        from .pin_allocator import pin_reserved, release_pins
+
         normalized_pin = (self.pin or "").strip()
+        update_fields = kwargs.get("update_fields")
         pin_conflicts = False
-        if _is_valid_pin(normalized_pin):
+        if _is_valid_pin(normalized_pin) and (
+            update_fields is None or "pin" in update_fields
+        ):
             pin_conflicts = (
                 User.objects.filter(pin=normalized_pin)
                 .exclude(pk=self.pk)
                 .exists()
             )
-
-        if not _is_valid_pin(normalized_pin) or pin_conflicts:
-            self.pin = generate_unique_pin(exclude_user_id=self.pk)
-            update_fields = kwargs.get("update_fields")
+            # O PIN padrao (e o digitado num update) nao olha as reservas das
+            # importacoes; o PIN que o usuario ja tem no banco e dele.
+            if not pin_conflicts and pin_reserved(normalized_pin):
+                pin_conflicts = (
+                    self._state.adding
+                    or not User.objects.filter(pk=self.pk, pin=normalized_pin).exists()
+                )
+
+        allocated = not _is_valid_pin(normalized_pin) or pin_conflicts
+        if allocated:
+            self.pin = generate_unique_pin()
             if update_fields is not None:
                 kwargs["update_fields"] = set(update_fields) | {"pin"}
         else:
             self.pin = normalized_pin
 
         super().save(*args, **kwargs)
+        if allocated:
+            # O PIN sorteado ja esta gravado: a reserva nao precisa mais existir.
+            release_pins([self.pin])
 
     @property
     def effective_app_role(self):
@@ -224,6 +230,21 @@ class User(SafeDeleteModel, AbstractUser):  # type: ignore
         ]
 
 
+class PinReservation(models.Model):
+    """PIN entregue por ``PinAllocator`` e ainda não gravado num usuário."""
+
+    pin = models.CharField(max_length=PIN_LENGTH, unique=True)
+    token = models.CharField(max_length=32, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Reserva de PIN"
+        verbose_name_plural = "Reservas de PIN"
+
+    def __str__(self):
+        return f"{self.pin} ({self.token})"
+
+
 class Visitas(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="visitas")
     created_by = models.ForeignKey(
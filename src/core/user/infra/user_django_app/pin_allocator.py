@@ -0,0 +1,277 @@
+"""
+Alocação de PINs de 4 dígitos (0000-9999).
+
+O espaço inteiro cabe num bitmap de 1250 bytes. ``used_pins()`` monta o
+bitmap dos PINs de usuários ativos com uma query e o guarda no cache do
+Django; signals do ``User`` descartam o bitmap quando um PIN muda. Com ele:
+
+- ``PinBitmap.__contains__`` responde se um PIN está em uso em O(1);
+- ``PinAllocator.allocate(n)`` sorteia ``n`` PINs livres para um lote inteiro.
+
+Duas importações em paralelo não podem entregar o mesmo PIN: cada PIN
+sorteado é reservado em ``PinReservation`` (PIN único no banco) antes de ser
+devolvido, e os candidatos são conferidos na tabela de usuários, o que cobre
+um bitmap desatualizado. Quem grava os usuários libera as reservas na mesma
+transação (``release_pins``); se o lote morrer no meio, a reserva expira após
+``USER_PIN_RESERVATION_TTL_SECONDS``.
+
+Configuração:
+- ``USER_PIN_BITMAP_CACHE_TTL_SECONDS``: validade do bitmap no cache (padrão: 300)
+- ``USER_PIN_RESERVATION_TTL_SECONDS``: validade da reserva (padrão: 600)
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import uuid
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PIN_LENGTH, PIN_SPACE_SIZE, PinReservation, User
+
+logger = logging.getLogger(__name__)
+
+_BITMAP_CACHE_KEY = "user_pins:bitmap"
+
+
+def _int_setting(name: str, default: int) -> int:
+    value = getattr(settings, name, default)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def pin_to_index(value) -> int | None:
+    """Posição do PIN no bitmap, ou ``None`` se não for um PIN de 4 dígitos."""
+    pin = str(value or "").strip()
+    if len(pin) != PIN_LENGTH or not pin.isdigit():
+        return None
+    return int(pin)
+
+
+def index_to_pin(index: int) -> str:
+    return str(index).zfill(PIN_LENGTH)
+
+
+class PinBitmap:
+    """Um bit por PIN do espaço 0000-9999."""
+
+    __slots__ = ("_bits", "_count")
+
+    def __init__(self, data: bytes | None = None):
+        self._bits = bytearray(data or bytes((PIN_SPACE_SIZE + 7) // 8))
+        self._count = sum(bin(byte).count("1") for byte in self._bits)
+
+    @classmethod
+    def from_pins(cls, pins: Iterable) -> "PinBitmap":
+        bitmap = cls()
+        bitmap.update(pins)
+        return bitmap
+
+    def __contains__(self, pin) -> bool:
+        index = pin_to_index(pin)
+        return index is not None and bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, pin) -> None:
+        index = pin_to_index(pin)
+        if index is None:
+            return
+        mask = 1 << (index & 7)
+        if not self._bits[index >> 3] & mask:
+            self._bits[index >> 3] |= mask
+            self._count += 1
+
+    def update(self, pins: Iterable) -> None:
+        for pin in pins:
+            self.add(pin)
+
+    def discard(self, pin) -> None:
+        index = pin_to_index(pin)
+        if index is None:
+            return
+        mask = 1 << (index & 7)
+        if self._bits[index >> 3] & mask:
+            self._bits[index >> 3] &= ~mask
+            self._count -= 1
+
+    @property
+    def free_count(self) -> int:
+        return PIN_SPACE_SIZE - self._count
+
+    def free_pins(self) -> list[str]:
+        return [
+            index_to_pin(index)
+            for index in range(PIN_SPACE_SIZE)
+            if not self._bits[index >> 3] & (1 << (index & 7))
+        ]
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._bits)
+
+
+def used_pins() -> PinBitmap:
+    """Bitmap dos PINs de usuários ativos (cache do Django ou uma query)."""
+    cached = cache.get(_BITMAP_CACHE_KEY)
+    if cached is not None:
+        return PinBitmap(cached)
+
+    bitmap = PinBitmap.from_pins(
+        User.objects.exclude(pin__isnull=True)
+        .exclude(pin="")
+        .values_list("pin", flat=True)
+        .iterator()
+    )
+    cache.set(
+        _BITMAP_CACHE_KEY,
+        bitmap.to_bytes(),
+        timeout=_int_setting("USER_PIN_BITMAP_CACHE_TTL_SECONDS", 300),
+    )
+    return bitmap
+
+
+def pin_reserved(pin) -> bool:
+    """PIN reservado por um lote que ainda não gravou os usuários."""
+    return PinReservation.objects.filter(
+        pin=str(pin or "").strip(), expires_at__gt=timezone.now()
+    ).exists()
+
+
+def release_pins(pins: Iterable) -> None:
+    """Apaga as reservas de PINs que já foram gravados em usuários."""
+    pins = {str(pin).strip() for pin in pins if pin}
+    if pins:
+        PinReservation.objects.filter(pin__in=pins).delete()
+
+
+def invalidate_pin_bitmap(*args, **kwargs) -> None:
+    """Descarta o bitmap; usado como receiver dos signals do ``User``."""
+    cache.delete(_BITMAP_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(_BITMAP_CACHE_KEY))
+
+
+def _invalidate_on_user_save(sender, update_fields=None, **kwargs) -> None:
+    # last_passage_at e afins são gravados o tempo todo; só o PIN interessa.
+    if update_fields is not None and "pin" not in update_fields:
+        return
+    invalidate_pin_bitmap()
+
+
+def connect_signals() -> None:
+    """Liga a invalidação do bitmap aos signals do ``User`` (chamado no ``ready``)."""
+    from django.db.models.signals import post_delete, post_save
+    from safedelete.signals import post_softdelete, post_undelete
+
+    post_save.connect(
+        _invalidate_on_user_save, sender=User, dispatch_uid="user_pins:post_save"
+    )
+    for name, signal in (
+        ("post_delete", post_delete),
+        ("post_softdelete", post_softdelete),
+        ("post_undelete", post_undelete),
+    ):
+        signal.connect(
+            invalidate_pin_bitmap, sender=User, dispatch_uid=f"user_pins:{name}"
+        )
+
+
+class PinAllocator:
+    """
+    Sorteia e reserva PINs livres.
+
+    Uma instância por lote: o bitmap é lido uma vez e os PINs já entregues
+    continuam marcados nele para as próximas chamadas.
+    """
+
+    def __init__(self, extra_used_pins: Iterable[str] | None = None):
+        self.token = uuid.uuid4().hex
+        self._bitmap: PinBitmap | None = None
+        self._extra_used = list(extra_used_pins or [])
+
+    @property
+    def bitmap(self) -> PinBitmap:
+        if self._bitmap is None:
+            self._bitmap = used_pins()
+            self._bitmap.update(self._extra_used)
+        return self._bitmap
+
+    def is_available(self, pin) -> bool:
+        return pin_to_index(pin) is not None and pin not in self.bitmap
+
+    def allocate(self, count: int) -> list[str]:
+        """``count`` PINs distintos, livres e reservados para este alocador."""
+        if count <= 0:
+            return []
+
+        now = timezone.now()
+        PinReservation.objects.filter(expires_at__lte=now).delete()
+        bitmap = self.bitmap
+        # Reservas de outros lotes ainda não viraram usuário.
+        bitmap.update(
+            PinReservation.objects.exclude(token=self.token).values_list(
+                "pin", flat=True
+            )
+        )
+        expires_at = now + timedelta(
+            seconds=_int_setting("USER_PIN_RESERVATION_TTL_SECONDS", 600)
+        )
+
+        allocated: list[str] = []
+        while len(allocated) < count:
+            missing = count - len(allocated)
+            if bitmap.free_count < missing:
+                raise ValueError("Nao ha PINs de 4 digitos disponiveis.")
+            candidates = random.sample(bitmap.free_pins(), missing)
+            bitmap.update(candidates)
+
+            PinReservation.objects.bulk_create(
+                [
+                    PinReservation(pin=pin, token=self.token, expires_at=expires_at)
+                    for pin in candidates
+                ],
+                ignore_conflicts=True,
+            )
+            reserved = set(
+                PinReservation.objects.filter(
+                    token=self.token, pin__in=candidates
+                ).values_list("pin", flat=True)
+            )
+            # O bitmap pode estar atrasado em relação a outro processo.
+            taken = set(
+                User.objects.filter(pin__in=reserved).values_list("pin", flat=True)
+            )
+            if taken:
+                PinReservation.objects.filter(token=self.token, pin__in=taken).delete()
+                invalidate_pin_bitmap()
+                logger.info(
+                    "[PIN] %s PIN(s) ja usados fora do bitmap em cache; sorteando de novo",
+                    len(taken),
+                )
+            allocated.extend(
+                pin for pin in candidates if pin in reserved and pin not in taken
+            )
+
+        self._publish(allocated)
+        return allocated
+
+    def _publish(self, pins: list[str]) -> None:
+        """Marca os PINs entregues no bitmap compartilhado, se ele ainda existir."""
+        cached = cache.get(_BITMAP_CACHE_KEY)
+        if cached is None:
+            return
+        bitmap = PinBitmap(cached)
+        bitmap.update(pins)
+        cache.set(
+            _BITMAP_CACHE_KEY,
+            bitmap.to_bytes(),
+            timeout=_int_setting("USER_PIN_BITMAP_CACHE_TTL_SECONDS", 300),
+        )
@@ -1,13 +1,16 @@
 import logging
 
 from django.contrib.auth.models import Group
+from django.db.models import Manager
 from rest_framework import serializers
 
 from src.core.control_id.infra.control_id_django_app.models import Device
 from src.core.control_id.infra.control_id_django_app.models import UserGroup
+from src.core.uploader.media_urls import archive_url, archive_urls
 from src.core.uploader.models import Archive
 
 from ..models import User
+from ..pin_allocator import pin_reserved
 from ..role_labels import get_app_role_label, get_app_role_labels
 from ..validate import normalize_cpf, normalize_phone, validate_user_dates
 
@@ -20,6 +23,20 @@ class DeviceBasicSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "ip", "is_active", "is_default"]
 
 
+class UserListSerializer(serializers.ListSerializer):
+    """Gera as URLs de foto da página de uma vez (``archive_urls``)."""
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, Manager) else data)
+        self.child._picture_urls = archive_urls(
+            user.picture for user in users if user.picture_id
+        )
+        try:
+            return super().to_representation(users)
+        finally:
+            self.child._picture_urls = None
+
+
 class UserSerializer(serializers.ModelSerializer):
     user_groups = serializers.SerializerMethodField()
     device_admin = serializers.BooleanField(source="is_staff", required=False)
@@ -51,6 +68,7 @@ class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
+        list_serializer_class = UserListSerializer
         fields = [
             "id",
             "name",
@@ -92,13 +110,19 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def get_user_groups(self, obj):
-        group_ids = UserGroup.objects.filter(user=obj).values_list(
-            "group_id", flat=True
-        )
-        return [
-            {"id": group.pk, "name": group.name}
-            for group in Group.objects.filter(id__in=group_ids)
-        ]
+        # A listagem já traz usergroup_set + group via Prefetch
+        # (UserViewSet.queryset); fora dela, duas queries como antes.
+        if "usergroup_set" in getattr(obj, "_prefetched_objects_cache", {}):
+            groups = sorted(
+                (user_group.group for user_group in obj.usergroup_set.all()),
+                key=lambda group: group.pk,
+            )
+        else:
+            group_ids = UserGroup.objects.filter(user=obj).values_list(
+                "group_id", flat=True
+            )
+            groups = Group.objects.filter(id__in=group_ids).order_by("id")
+        return [{"id": group.pk, "name": group.name} for group in groups]
 
     def get_app_role_label(self, obj):
         return get_app_role_label(obj.app_role)
@@ -123,27 +147,14 @@ class UserSerializer(serializers.ModelSerializer):
         return super().to_internal_value(mutable_data)
 
     def get_picture_url(self, obj):
-        picture = getattr(obj, "picture", None)
-        if picture is None:
-            picture_id = getattr(obj, "picture_id", None)
-            if picture_id is not None:
-                try:
-                    from src.core.uploader.models import Archive
-
-                    picture = Archive.objects.get(pk=picture_id)
-                except Archive.DoesNotExist:
-                    picture = None
-        if picture is None or not picture.arquivo:
-            return None
-        try:
-            return picture.arquivo.url
-        except (OSError, ValueError):
-            logger.warning(
-                "Failed to resolve picture URL for user %s (archive %s)",
-                obj.id,
-                getattr(obj, "picture_id", None),
-            )
+        if not obj.picture_id:
             return None
+        # Na listagem as URLs da página inteira já vêm de UserListSerializer.
+        page_urls = getattr(self, "_picture_urls", None)
+        if page_urls is not None and obj.picture_id in page_urls:
+            return page_urls[obj.picture_id]
+        # Sem query extra quando o queryset usa select_related("picture").
+        return archive_url(obj.picture)
 
     def validate(self, attrs):
         attrs = super().validate(attrs)
@@ -277,7 +288,9 @@ class UserSerializer(serializers.ModelSerializer):
         queryset = User.objects.filter(pin=pin)
         if self.instance is not None:
             queryset = queryset.exclude(pk=self.instance.pk)
-        if queryset.exists():
+        # Manter o proprio PIN nao esbarra em reserva de importacao.
+        keeps_own_pin = self.instance is not None and self.instance.pin == pin
+        if queryset.exists() or (not keeps_own_pin and pin_reserved(pin)):
             raise serializers.ValidationError("Este PIN ja esta em uso.")
 
         return pin
@@ -0,0 +1,148 @@
+import pytest
+
+
+def _user_with_relations(user_factory, device_factory):
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessRule,
+        Card,
+        CustomGroup,
+        PortalGroup,
+        Template,
+        UserAccessRule,
+        UserGroup,
+    )
+
+    scoped_device, other_device = device_factory(), device_factory()
+    user = user_factory(name="Ana", is_staff=True)
+    group = CustomGroup.objects.create(name="1INFO1")
+    UserGroup.objects.create(user=user, group=group)
+    everywhere = AccessRule.objects.create(name="Livre", type=1, priority=0)
+    scoped = AccessRule.objects.create(name="Bloco B", type=1, priority=0)
+    portal_group = PortalGroup.objects.create(name="Bloco B")
+    portal_group.devices.add(scoped_device)
+    UserAccessRule.objects.create(user=user, access_rule=everywhere)
+    UserAccessRule.objects.create(
+        user=user, access_rule=scoped, portal_group=portal_group
+    )
+    card = Card.objects.create(user=user, value="123456")
+    template = Template.objects.create(user=user, template="QUJD")
+    return user, scoped_device, other_device, group, (everywhere, scoped), card, template
+
+
+@pytest.mark.django_db
+def test_bundle_gathers_user_tables_in_fk_order_with_few_queries(
+    user_factory, device_factory, django_assert_max_num_queries
+):
+    # Testa o pacote: tabelas em ordem de FK, regra de grupo de portais só no device do grupo.
+    from src.core.user.infra.user_django_app.device_bundle import build_user_bundle
+
+    user, scoped_device, other_device, group, rules, card, template = (
+        _user_with_relations(user_factory, device_factory)
+    )
+
+    with django_assert_max_num_queries(5):
+        bundle = build_user_bundle(user, [scoped_device, other_device])
+
+    tables = dict(bundle.tables_for(scoped_device))
+    assert list(tables) == [
+        "users",
+        "pins",
+        "user_roles",
+        "groups",
+        "user_groups",
+        "user_access_rules",
+        "cards",
+        "templates",
+    ]
+    assert tables["groups"] == [{"id": group.id, "name": "1INFO1"}]
+    assert tables["cards"] == [{"id": card.id, "user_id": user.id, "value": 123456}]
+    assert tables["templates"][0]["id"] == template.id
+    assert {row["access_rule_id"] for row in tables["user_access_rules"]} == {
+        rule.id for rule in rules
+    }
+    assert dict(bundle.tables_for(other_device))["user_access_rules"] == [
+        {"user_id": user.id, "access_rule_id": rules[0].id}
+    ]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_adding_a_device_to_a_user_sends_the_whole_bundle_once_per_table(
+    mocker, make_response, user_factory, device_factory, api_client_admin
+):
+    # Testa o update: a catraca nova recebe o pacote inteiro, uma chamada por tabela, sem sync posterior.
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+    from src.core.user.infra.user_django_app.models import User
+
+    user, scoped_device, other_device, *_ = _user_with_relations(
+        user_factory, device_factory
+    )
+    User.objects.filter(pk=user.pk).update(device_scope=User.DeviceScope.SELECTED)
+    user.selected_devices.set([scoped_device])
+
+    calls = []
+
+    def fake_request(self, endpoint, **kwargs):
+        calls.append((self.device.pk, endpoint, (kwargs.get("json_data") or {})))
+        return make_response(json_data={})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+    mocker.patch(
+        "src.core.user.infra.user_django_app.views.user.UserViewSet._update_user_in_device"
+    )
+
+    response = api_client_admin.patch(
+        f"/api/users/users/{user.id}/",
+        {"selected_device_ids": [scoped_device.id, other_device.id]},
+        format="json",
+    )
+
+    assert response.status_code == 200, response.data
+    sent = [(endpoint, payload["object"]) for pk, endpoint, payload in calls]
+    assert all(pk == other_device.pk for pk, _, _ in calls)
+    # pins e user_roles não têm id: modify por user_id e, sem linha na catraca, create.
+    assert sent == [
+        ("create_or_modify_objects.fcgi", "users"),
+        ("modify_objects.fcgi", "pins"),
+        ("create_objects.fcgi", "pins"),
+        ("modify_objects.fcgi", "user_roles"),
+        ("create_objects.fcgi", "user_roles"),
+    ] + [
+        ("create_or_modify_objects.fcgi", table)
+        for table in (
+            "groups",
+            "user_groups",
+            "user_access_rules",
+            "cards",
+            "templates",
+        )
+    ]
+    assert calls[1][2]["where"] == {"pins": {"user_id": user.id}}
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_resending_the_bundle_modifies_pin_and_role_without_creating_rows(
+    mocker, make_response, user_factory, device_factory
+):
+    # Testa o reenvio: com a linha já na catraca (changes > 0), PIN e papel não são recriados.
+    from src.core.__seedwork__.infra.catraca_sync import ControlIDSyncMixin
+    from src.core.user.infra.user_django_app.device_bundle import build_user_bundle
+
+    device = device_factory()
+    user = user_factory(is_staff=True)
+    calls = []
+
+    def fake_request(self, endpoint, **kwargs):
+        calls.append((endpoint, (kwargs.get("json_data") or {})["object"]))
+        return make_response(json_data={"changes": 1})
+
+    mocker.patch.object(ControlIDSyncMixin, "_make_request", fake_request)
+
+    build_user_bundle(user, [device]).send(ControlIDSyncMixin(), device)
+
+    assert calls == [
+        ("create_or_modify_objects.fcgi", "users"),
+        ("modify_objects.fcgi", "pins"),
+        ("modify_objects.fcgi", "user_roles"),
+    ]
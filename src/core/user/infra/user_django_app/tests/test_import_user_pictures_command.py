@@ -8,6 +8,7 @@ import pytest
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import override_settings
+from PIL import Image
 
 from src.core.control_id.infra.control_id_django_app.models import (
     CustomGroup,
@@ -122,3 +123,82 @@ def test_import_user_pictures_commit_blocks_shared_minio(
     user.refresh_from_db()
     assert user.picture_id is None
     assert Archive.objects.count() == 0
+
+
+@pytest.mark.django_db
+@override_settings(USE_MINIO_STORAGE=False)
+def test_import_user_pictures_parallel_skips_unchanged_on_rerun(
+    local_tmp_dir, user_factory, settings
+):
+    # Testa o modo paralelo: relatorio na ordem dos arquivos, tempos por foto e hash pulando fotos iguais.
+    settings.MEDIA_ROOT = local_tmp_dir / "media"
+    group = CustomGroup.objects.create(name="1INFO1")
+    group_dir = local_tmp_dir / "1INFO1"
+    group_dir.mkdir()
+    users = []
+    for index in range(6):
+        user = user_factory(name=f"Aluno {index}", registration=f"20261{index}")
+        UserGroup.objects.create(user=user, group=group)
+        (group_dir / f"Aluno {index}.jpg").write_bytes(f"foto {index}".encode())
+        users.append(user)
+    report_path = local_tmp_dir / "report.csv"
+    args = [str(local_tmp_dir), "--commit", "--workers", "4", "--report", str(report_path)]
+
+    call_command("import_user_pictures", *args)
+
+    rows = _read_report(report_path)
+    assert [row["status"] for row in rows] == ["imported"] * 6
+    assert [row["user_id"] for row in rows] == [str(user.pk) for user in users]
+    assert all(row["elapsed_ms"] != "" for row in rows)
+    assert rows[0]["original_bytes"] == rows[0]["stored_bytes"] == "6"
+    assert Archive.objects.count() == 6
+
+    (group_dir / "Aluno 5.jpg").write_bytes(b"foto nova")
+    out = StringIO()
+    call_command("import_user_pictures", *args, "--replace", stdout=out)
+
+    rows = _read_report(report_path)
+    assert [row["status"] for row in rows] == ["unchanged"] * 5 + ["imported"]
+    assert Archive.objects.count() == 7
+    users[5].refresh_from_db()
+    assert users[5].picture.arquivo.read() == b"foto nova"
+    assert "Tempo total:" in out.getvalue()
+
+
+@pytest.mark.django_db
+@override_settings(USE_MINIO_STORAGE=False)
+def test_import_user_pictures_normalize_resizes_to_jpeg(
+    local_tmp_dir, user_factory, settings
+):
+    # Testa a normalizacao: foto reduzida ao lado maximo e regravada como JPEG; arquivo invalido vai para o relatorio.
+    settings.MEDIA_ROOT = local_tmp_dir / "media"
+    group = CustomGroup.objects.create(name="1INFO1")
+    user = user_factory(name="Ana Maria", registration="2026001")
+    broken = user_factory(name="Bruno", registration="2026002")
+    UserGroup.objects.create(user=user, group=group)
+    UserGroup.objects.create(user=broken, group=group)
+    group_dir = local_tmp_dir / "1INFO1"
+    group_dir.mkdir()
+    Image.new("RGBA", (1200, 800), (255, 0, 0, 255)).save(group_dir / "Ana Maria.png")
+    _write_fake_image(group_dir / "Bruno.jpg")
+    report_path = local_tmp_dir / "report.csv"
+
+    call_command(
+        "import_user_pictures",
+        str(local_tmp_dir),
+        "--commit",
+        "--normalize",
+        "--max-size",
+        "300",
+        "--report",
+        str(report_path),
+    )
+
+    rows = {row["user_name"]: row for row in _read_report(report_path)}
+    assert rows["Ana Maria"]["status"] == "imported"
+    assert rows["Bruno"]["status"] == "invalid_image"
+    user.refresh_from_db()
+    assert user.picture.arquivo.name.endswith(".jpg")
+    with Image.open(user.picture.arquivo.path) as stored:
+        assert stored.format == "JPEG"
+        assert stored.size == (300, 200)
@@ -0,0 +1,71 @@
+import pytest
+
+
+@pytest.fixture
+def users_with_pictures(db):
+    from src.core.uploader.models import Archive
+    from src.core.user.infra.user_django_app.models import User
+
+    pictures = Archive.objects.bulk_create(
+        Archive(titulo=f"Foto {i}", arquivo=f"fotos/{i}.jpg") for i in range(3)
+    )
+    return [
+        User.objects.create(name=f"Aluno {i}", picture=pictures[i] if i < 3 else None)
+        for i in range(4)
+    ]
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_presigned_picture_urls_are_signed_once_per_archive(
+    mocker, settings, users_with_pictures
+):
+    # Testa a assinatura em lote da pagina e o reuso do cache ate perto de expirar.
+    from django.core.cache import cache
+    from django.core.files.storage import FileSystemStorage
+
+    from src.core.uploader import media_urls
+    from src.core.user.infra.user_django_app.models import User
+    from src.core.user.infra.user_django_app.serializers import UserSerializer
+
+    settings.MEDIA_URL_MAX_AGE_SECONDS = 900
+    settings.MEDIA_URL_CACHE_MARGIN_SECONDS = 60
+    mocker.patch.object(media_urls, "_is_presigned", return_value=True)
+    signed = mocker.patch.object(
+        FileSystemStorage,
+        "url",
+        side_effect=lambda name, max_age: f"https://s3/{name}?X-Sig={max_age.seconds}",
+    )
+    set_many = mocker.spy(cache, "set_many")
+
+    users = User.objects.select_related("picture").order_by("id")
+    first = UserSerializer(users, many=True).data
+    second = UserSerializer(users, many=True).data
+
+    assert [row["picture_url"] for row in first] == [
+        "https://s3/fotos/0.jpg?X-Sig=900",
+        "https://s3/fotos/1.jpg?X-Sig=900",
+        "https://s3/fotos/2.jpg?X-Sig=900",
+        None,
+    ]
+    assert second == first
+    assert signed.call_count == 3
+    assert set_many.call_count == 1
+    assert set_many.call_args.kwargs["timeout"] == 840
+
+    # Fora da listagem (detalhe/"me") usa o mesmo cache.
+    assert UserSerializer(users[0]).data["picture_url"] == first[0]["picture_url"]
+    assert signed.call_count == 3
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_public_base_url_skips_signing(settings, users_with_pictures):
+    # Testa a URL estavel quando o bucket e publico.
+    from src.core.uploader.media_urls import archive_url
+
+    settings.MEDIA_PUBLIC_BASE_URL = "https://cdn.escola.test/catraca/"
+    picture = users_with_pictures[1].picture
+
+    assert archive_url(picture) == "https://cdn.escola.test/catraca/fotos/1.jpg"
+    assert archive_url(None) is None
@@ -0,0 +1,136 @@
+import pytest
+
+
+def test_pin_bitmap_tracks_membership_and_free_slots():
+    # Testa o bitmap: pertinencia, contagem e valores fora do espaco ignorados.
+    from src.core.user.infra.user_django_app.pin_allocator import PinBitmap
+
+    bitmap = PinBitmap.from_pins(["0000", "9999", "0042", "0042", "12345", "", None])
+
+    assert "0042" in bitmap and "0000" in bitmap and "9999" in bitmap
+    assert "0041" not in bitmap and "12345" not in bitmap
+    assert len(bitmap) == 3
+    assert bitmap.free_count == 9997
+    bitmap.discard("0042")
+    assert "0042" not in bitmap
+    assert PinBitmap(bitmap.to_bytes()).free_pins()[:2] == ["0001", "0002"]
+
+
+@pytest.mark.django_db
+def test_allocate_returns_distinct_free_pins_and_reserves_them(
+    user_factory, django_assert_max_num_queries
+):
+    # Testa o lote: PINs distintos, fora dos usados, e um segundo alocador sem repetir os reservados.
+    from src.core.user.infra.user_django_app.models import PinReservation
+    from src.core.user.infra.user_django_app.pin_allocator import PinAllocator
+
+    used = {user_factory().pin for _ in range(5)}
+
+    first = PinAllocator()
+    # O SQLite divide o bulk_create das reservas em alguns INSERTs.
+    with django_assert_max_num_queries(10):
+        pins = first.allocate(500)
+    assert len(set(pins)) == 500
+    assert not used & set(pins)
+    assert PinReservation.objects.filter(token=first.token).count() == 500
+
+    second = PinAllocator().allocate(500)
+    assert not set(second) & set(pins)
+    assert all(first.is_available(pin) is False for pin in pins)
+
+
+@pytest.mark.django_db
+def test_allocate_rechecks_users_when_cached_bitmap_is_stale(user_factory, mocker):
+    # Testa que um PIN gravado sem signal (bulk_create) e o bitmap em cache desatualizado nao sao entregues.
+    from src.core.user.infra.user_django_app import pin_allocator
+    from src.core.user.infra.user_django_app.models import User
+
+    pin_allocator.used_pins()
+    User.objects.bulk_create([User(name="Sem signal", email="s@x.test", pin="0042")])
+    sample = mocker.patch.object(
+        pin_allocator.random, "sample", side_effect=[["0042"], ["0043"]]
+    )
+
+    assert pin_allocator.PinAllocator().allocate(1) == ["0043"]
+    assert sample.call_count == 2
+
+
+@pytest.mark.django_db
+def test_allocate_fails_when_space_is_exhausted():
+    # Testa o erro explicito quando nao sobra PIN livre.
+    from django.core.cache import cache
+
+    from src.core.user.infra.user_django_app import pin_allocator
+    from src.core.user.infra.user_django_app.models import generate_unique_pin
+
+    full = pin_allocator.PinBitmap.from_pins(
+        pin_allocator.index_to_pin(index) for index in range(pin_allocator.PIN_SPACE_SIZE)
+    )
+    cache.set(pin_allocator._BITMAP_CACHE_KEY, full.to_bytes())
+
+    with pytest.raises(ValueError, match="Nao ha PINs"):
+        generate_unique_pin()
+
+
+@pytest.mark.django_db
+def test_reserved_pin_is_not_taken_by_new_user_or_serializer():
+    # Testa que um PIN reservado por uma importacao em andamento fica fora do sorteio padrao e do cadastro manual.
+    from src.core.user.infra.user_django_app.models import User
+    from src.core.user.infra.user_django_app.pin_allocator import PinAllocator
+    from src.core.user.infra.user_django_app.serializers import UserSerializer
+
+    (reserved,) = PinAllocator().allocate(1)
+
+    user = User.objects.create(name="Novo", registration="P001", pin=reserved)
+    assert user.pin != reserved
+
+    serializer = UserSerializer(
+        data={"name": "Manual", "registration": "P002", "pin": reserved}
+    )
+    assert not serializer.is_valid()
+    assert "pin" in serializer.errors
+
+
+@pytest.mark.django_db
+def test_pin_reservations_respect_owner_and_are_released_once_written(user_factory):
+    # Testa que o dono mantem o proprio PIN, que um update nao toma PIN reservado, que a reserva some apos gravar e que o import atualiza o bitmap.
+    from src.core.control_id.infra.control_id_django_app.utils.excel_parser import (
+        ParsedRow,
+    )
+    from src.core.control_id.infra.control_id_django_app.utils.import_users_service import (
+        ImportUsersService,
+    )
+    from django.utils import timezone
+
+    from src.core.user.infra.user_django_app.models import PinReservation
+    from src.core.user.infra.user_django_app.pin_allocator import (
+        PinAllocator,
+        used_pins,
+    )
+    from src.core.user.infra.user_django_app.serializers import UserSerializer
+
+    owner = user_factory()
+    PinReservation.objects.create(
+        pin=owner.pin,
+        token="outro-lote",
+        expires_at=timezone.now() + timezone.timedelta(minutes=5),
+    )
+    serializer = UserSerializer(owner, data={"pin": owner.pin}, partial=True)
+    assert serializer.is_valid(), serializer.errors
+
+    (reserved,) = PinAllocator().allocate(1)
+    owner.pin = reserved
+    owner.save(update_fields=["pin"])
+    owner.refresh_from_db()
+    assert owner.pin != reserved
+    assert not PinReservation.objects.filter(pin=owner.pin).exists()
+
+    new_user = user_factory(pin="")
+    assert not PinReservation.objects.filter(pin=new_user.pin).exists()
+
+    used_pins()
+    users_new, _, _, _ = ImportUsersService().upsert_users(
+        [ParsedRow(name="Importado", registration="2028001")]
+    )
+    assert not PinReservation.objects.filter(pin=users_new[0].pin).exists()
+    assert users_new[0].pin in used_pins()
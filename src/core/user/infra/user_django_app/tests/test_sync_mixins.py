@@ -12,11 +12,11 @@ def test_user_sync_create_sends_valid_payload_to_selected_device(
     device = device_factory(ip="192.0.2.30")
     user = user_factory(name="Maria Sync", registration="SYNC001")
     login = mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.post",
+        "requests.Session.post",
         return_value=make_response(json_data={"session": "sess-1"}),
     )
     request = mocker.patch(
-        "src.core.__seedwork__.infra.catraca_sync.requests.request",
+        "requests.Session.request",
         return_value=make_response(json_data={"ids": [user.id]}),
     )
 
@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.fixture
+def many_users(db):
+    from django.contrib.auth.models import Group
+
+    from src.core.control_id.infra.control_id_django_app.models import UserGroup
+    from src.core.uploader.models import Archive
+    from src.core.user.infra.user_django_app.models import User, generate_unique_pins
+
+    groups = [Group.objects.create(name=f"Turma {i}") for i in range(3)]
+    pictures = Archive.objects.bulk_create(
+        Archive(titulo=f"Foto {i}", arquivo=f"fotos/{i}.jpg") for i in range(5)
+    )
+    # PINs livres: o admin do api_client_admin já pode ter sorteado um deles.
+    pins = generate_unique_pins(1000)
+    users = User.objects.bulk_create(
+        User(
+            name=f"Aluno {i:04d}",
+            email=f"aluno{i}@escola.test",
+            pin=pins[i],
+            picture=pictures[i % 5] if i % 2 else None,
+        )
+        for i in range(1000)
+    )
+    UserGroup.objects.bulk_create(
+        UserGroup(user=user, group_id=groups[i % 3].pk) for i, user in enumerate(users)
+    )
+    return users, groups
+
+
+@pytest.mark.integration
+@pytest.mark.django_db
+def test_user_list_query_count_does_not_grow_with_page_size(
+    api_client_admin, many_users
+):
+    # Testa que a listagem de usuarios nao volta a ter N+1 (grupos e foto).
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    _, groups = many_users
+    counts = {}
+    for page_size in (10, 100, 1000):
+        with CaptureQueriesContext(connection) as ctx:
+            response = api_client_admin.get(
+                "/api/users/users/", {"page_size": page_size}
+            )
+        assert response.status_code == 200
+        assert len(response.data["results"]) == page_size
+        counts[page_size] = len(ctx.captured_queries)
+
+    assert counts[10] == counts[100] == counts[1000], counts
+    assert counts[1000] <= 10, counts
+
+    by_name = {row["name"]: row for row in response.data["results"]}
+    assert by_name["Aluno 0004"]["user_groups"] == [
+        {"id": groups[1].pk, "name": "Turma 1"}
+    ]
+    assert by_name["Aluno 0004"]["picture_url"] is None
+    assert by_name["Aluno 0003"]["picture_url"].endswith("fotos/3.jpg")
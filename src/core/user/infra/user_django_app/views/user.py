@@ -4,6 +4,7 @@ from typing import cast
 
 import requests
 from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
 from rest_framework import status, viewsets
@@ -14,7 +15,15 @@ from rest_framework.response import Response
 from src.core.__seedwork__.infra import ControlIDSyncMixin
 from src.core.__seedwork__.infra.types.catraca_sync import RemoteEnrollCardResponse
 from src.core.control_id.infra.control_id_django_app.models.device import Device
+from src.core.control_id.infra.control_id_django_app.models.user_groups import UserGroup
+from src.core.control_id.infra.control_id_django_app.replication_outbox import (
+    enqueue_destroy,
+    enqueue_upsert,
+    outbox_enabled,
+    replication_response,
+)
 
+from ..device_bundle import build_user_bundle, user_payload
 from ..models import User, Visitas
 from ..permissions import (
     IsAdminRole,
@@ -32,7 +41,14 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
         User.objects.all()
         .filter(deleted_at__isnull=True)
         .order_by("id")
-        .prefetch_related("usergroup_set", "selected_devices")
+        .select_related("picture")
+        .prefetch_related(
+            Prefetch(
+                "usergroup_set",
+                queryset=UserGroup.objects.select_related("group"),
+            ),
+            "selected_devices",
+        )
     )
     serializer_class = UserSerializer
     filterset_fields = [
@@ -90,27 +106,8 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
             instance.user_type_id = None
             instance.save(update_fields=["user_type_id"])
 
-    def _datetime_to_device_timestamp(self, value) -> int:
-        if not value:
-            return 0
-
-        aware_value = value
-        if timezone.is_naive(aware_value):
-            aware_value = timezone.make_aware(
-                aware_value,
-                timezone.get_current_timezone(),
-            )
-        return int(aware_value.timestamp())
-
     def _build_user_payload(self, instance):
-        payload = {
-            "id": instance.id,
-            "name": instance.name,
-            "registration": instance.registration or "",
-            "begin_time": self._datetime_to_device_timestamp(instance.start_date),
-            "end_time": self._datetime_to_device_timestamp(instance.end_date),
-        }
-        return payload
+        return user_payload(instance)
 
     def _get_active_target_devices(self, user: User):
         return list(user.get_target_devices(include_inactive=False))
@@ -183,17 +180,6 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
     def _is_device_admin_user(user: User) -> bool:
         return bool(user.is_staff or user.is_superuser)
 
-    @staticmethod
-    def _is_duplicate_user_error(response) -> bool:
-        data = getattr(response, "data", None)
-        if isinstance(data, dict):
-            raw_text = " ".join(str(value) for value in data.values())
-        else:
-            raw_text = str(data)
-
-        normalized = raw_text.lower()
-        return "unique constraint failed" in normalized and "users.id" in normalized
-
     def _set_user_admin_on_device(self, device, user_id: int):
         self.set_device(device)
         sess = self.login()
@@ -223,48 +209,14 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
                 f"modify HTTP {r_mod.status_code} {r_mod.text[:300]!r}"
             )
 
-    def _create_user_in_device(self, device, instance):
-        self.set_device(device)
-        response = self.create_objects("users", [self._build_user_payload(instance)])
-        if response.status_code == status.HTTP_201_CREATED:
-            if instance.pin:
-                pin_resp = self.create_objects(
-                    "pins",
-                    [{"user_id": instance.id, "value": instance.pin}],
-                )
-                if pin_resp.status_code != status.HTTP_201_CREATED:
-                    logger.warning(
-                        "Falha ao criar PIN na catraca %s: %s",
-                        device.name,
-                        pin_resp.data,
-                    )
-
-            if self._is_device_admin_user(instance):
-                self._set_user_admin_on_device(device, instance.id)
+    def _push_user_bundle(self, devices, instance):
+        """Usuário completo (PIN, papel, grupos, regras, cartões, biometrias) nos devices."""
+        devices = list(devices)
+        if not devices:
             return
-
-        if self._is_duplicate_user_error(response):
-            self._update_user_in_device(
-                device,
-                instance,
-                previous_device_admin=self._is_device_admin_user(instance),
-            )
-            return
-
-        if response.status_code != status.HTTP_201_CREATED:
-            raise RuntimeError(
-                f"Erro ao criar usuario na catraca {device.name}: {response.data}"
-            )
-
-    def _upsert_user_in_device(self, device, instance, previous_device_admin=False):
-        try:
-            self._update_user_in_device(
-                device,
-                instance,
-                previous_device_admin=previous_device_admin,
-            )
-        except Exception:
-            self._create_user_in_device(device, instance)
+        bundle = build_user_bundle(instance, devices)
+        for device in devices:
+            bundle.send(self, device)
 
     def _update_user_in_device(self, device, instance, previous_device_admin=False):
         self.set_device(device)
@@ -313,6 +265,27 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
                 f"Erro ao deletar usuario da catraca {device.name}: {response.data}"
             )
 
+    def _enqueue_user_upsert(self, devices, instance, previous_device_admin=False):
+        rows = enqueue_upsert(devices, "users", self._build_user_payload(instance))
+        if instance.pin:
+            rows += enqueue_upsert(
+                devices, "pins", {"user_id": instance.id, "value": instance.pin}
+            )
+        if self._is_device_admin_user(instance):
+            rows += enqueue_upsert(
+                devices, "user_roles", {"user_id": instance.id, "role": 1}
+            )
+        elif previous_device_admin:
+            rows += enqueue_destroy(devices, "user_roles", {"user_id": instance.id})
+        return rows
+
+    def _enqueue_user_removal(self, devices, instance):
+        return (
+            enqueue_destroy(devices, "user_roles", {"user_id": instance.id})
+            + enqueue_destroy(devices, "pins", {"user_id": instance.id})
+            + enqueue_destroy(devices, "users", {"id": instance.id})
+        )
+
     def create(self, request, *args, **kwargs):
         if (
             not request.user.is_superuser
@@ -329,6 +302,7 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.id = serializer.validated_data.get("registration")
 
+        rows = []
         with transaction.atomic():
             reused_existing = False
             created_new_user = False
@@ -355,14 +329,14 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
 
             self._normalize_user_type(instance)
 
-            if not instance.panel_access_only:
+            if not instance.panel_access_only and outbox_enabled():
                 devices = self._get_active_target_devices(instance)
+                rows = build_user_bundle(instance, devices).enqueue(devices)
+            elif not instance.panel_access_only:
                 try:
-                    for device in devices:
-                        if created_new_user:
-                            self._create_user_in_device(device, instance)
-                        else:
-                            self._upsert_user_in_device(device, instance)
+                    self._push_user_bundle(
+                        self._get_active_target_devices(instance), instance
+                    )
                 except Exception as exc:
                     if created_new_user:
                         instance.delete()
@@ -372,14 +346,11 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
 
             if self._is_visitor(instance):
                 visit = self._create_visit_record(instance, request.user)
-                return Response(
-                    self._build_visitor_response(instance, visit, reused_existing),
-                    status=status.HTTP_201_CREATED,
-                )
+                payload = self._build_visitor_response(instance, visit, reused_existing)
+            else:
+                payload = self.get_serializer(instance).data
 
-        return Response(
-            self.get_serializer(instance).data, status=status.HTTP_201_CREATED
-        )
+        return replication_response(request, rows, payload, status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -394,6 +365,7 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
 
+        rows = []
         with transaction.atomic():
             instance = serializer.save()
             self._normalize_user_type(instance)
@@ -420,24 +392,41 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
                     added_ids = set()
                     common_ids = set()
 
-                for device_id in removed_ids:
-                    self._delete_user_from_device(
-                        previous_device_map[device_id], instance
+                if outbox_enabled():
+                    added_devices = [current_device_map[i] for i in added_ids]
+                    rows = (
+                        self._enqueue_user_removal(
+                            [previous_device_map[i] for i in removed_ids], instance
+                        )
+                        + build_user_bundle(instance, added_devices).enqueue(
+                            added_devices
+                        )
+                        + self._enqueue_user_upsert(
+                            [current_device_map[i] for i in common_ids],
+                            instance,
+                            previous_device_admin=previous_device_admin,
+                        )
                     )
+                else:
+                    for device_id in removed_ids:
+                        self._delete_user_from_device(
+                            previous_device_map[device_id], instance
+                        )
 
-                for device_id in added_ids:
-                    self._create_user_in_device(current_device_map[device_id], instance)
-
-                for device_id in common_ids:
-                    self._update_user_in_device(
-                        current_device_map[device_id],
-                        instance,
-                        previous_device_admin=previous_device_admin,
+                    self._push_user_bundle(
+                        [current_device_map[i] for i in added_ids], instance
                     )
+
+                    for device_id in common_ids:
+                        self._update_user_in_device(
+                            current_device_map[device_id],
+                            instance,
+                            previous_device_admin=previous_device_admin,
+                        )
             except Exception as exc:
                 return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(self.get_serializer(instance).data)
+        return replication_response(request, rows, self.get_serializer(instance).data)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -459,7 +448,12 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
 
             AccessLogs.objects.filter(user=instance).update(user=None)
 
-            if not instance.panel_access_only:
+            rows = []
+            if not instance.panel_access_only and outbox_enabled():
+                rows = self._enqueue_user_removal(
+                    self._get_active_target_devices(instance), instance
+                )
+            elif not instance.panel_access_only:
                 for device in self._get_active_target_devices(instance):
                     try:
                         self._delete_user_from_device(device, instance)
@@ -469,7 +463,9 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
                         )
 
             instance.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        return replication_response(
+            request, rows, status_code=status.HTTP_204_NO_CONTENT
+        )
 
     @action(detail=False, methods=["get"])
     def sync(self, request):
@@ -701,26 +697,11 @@ class UserViewSet(ControlIDSyncMixin, viewsets.ModelViewSet):
 
             # 4. Replica usuario para catracas alvo
             if not instance.panel_access_only:
-                devices = self._get_active_target_devices(instance)
                 try:
-                    for device in devices:
-                        if created_new_user:
-                            self._create_user_in_device(device, instance)
-                        else:
-                            self._upsert_user_in_device(device, instance)
-
-                        # Cria cartao na catraca
-                        self.set_device(device)
-                        self.create_objects(
-                            "cards",
-                            [
-                                {
-                                    "id": card.id,
-                                    "user_id": instance.id,
-                                    "value": int(captured_value),
-                                }
-                            ],
-                        )
+                    # O pacote já leva o cartão recém-criado.
+                    self._push_user_bundle(
+                        self._get_active_target_devices(instance), instance
+                    )
                 except Exception as exc:
                     if created_new_user:
                         instance.delete()
@@ -175,6 +175,23 @@ DATABASES = {
     )
 }
 
+# Tokens de sessão das catracas, índices, heartbeats etc. vivem no cache do
+# Django. Com REDIS_CACHE_URL o cache é compartilhado entre a API e os
+# workers Celery; sem ele cada processo tem o seu (LocMemCache), o que só
+# serve para desenvolvimento.
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL", "")
+if REDIS_CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -257,6 +274,62 @@ TEMPORARY_RELEASE_DELAY_ALERT_SECONDS = os.getenv(
 DEVICE_CONNECTION_TEST_TIMEOUT_SECONDS = float(
     os.getenv("DEVICE_CONNECTION_TEST_TIMEOUT_SECONDS", "2")
 )
+CATRACA_SYNC_MAX_WORKERS = int(os.getenv("CATRACA_SYNC_MAX_WORKERS", "8"))
+CATRACA_SYNC_DEVICE_DEADLINE_SECONDS = float(
+    os.getenv("CATRACA_SYNC_DEVICE_DEADLINE_SECONDS", "45")
+)
+CATRACA_SESSION_TTL_SECONDS = int(os.getenv("CATRACA_SESSION_TTL_SECONDS", "600"))
+CATRACA_REPLICATION_OUTBOX = os.getenv("CATRACA_REPLICATION_OUTBOX", "False") == "True"
+CATRACA_OUTBOX_BATCH_SIZE = int(os.getenv("CATRACA_OUTBOX_BATCH_SIZE", "200"))
+CATRACA_OUTBOX_MAX_ATTEMPTS = int(os.getenv("CATRACA_OUTBOX_MAX_ATTEMPTS", "8"))
+CATRACA_OUTBOX_RETRY_BASE_SECONDS = int(
+    os.getenv("CATRACA_OUTBOX_RETRY_BASE_SECONDS", "5")
+)
+CATRACA_OUTBOX_RETRY_MAX_SECONDS = int(
+    os.getenv("CATRACA_OUTBOX_RETRY_MAX_SECONDS", "300")
+)
+CATRACA_OUTBOX_WAIT_TIMEOUT_SECONDS = int(
+    os.getenv("CATRACA_OUTBOX_WAIT_TIMEOUT_SECONDS", "10")
+)
+CATRACA_OUTBOX_CLAIM_SECONDS = int(os.getenv("CATRACA_OUTBOX_CLAIM_SECONDS", "120"))
+ACCESS_VERIFY_COALESCE_SECONDS = int(os.getenv("ACCESS_VERIFY_COALESCE_SECONDS", "60"))
+ACCESS_VERIFY_RETRY_AFTER_SECONDS = int(
+    os.getenv("ACCESS_VERIFY_RETRY_AFTER_SECONDS", "300")
+)
+ACCESS_POLICY_INDEX_TTL_SECONDS = int(os.getenv("ACCESS_POLICY_INDEX_TTL_SECONDS", "60"))
+EASY_SETUP_SNAPSHOT_DIR = os.getenv("EASY_SETUP_SNAPSHOT_DIR", "")
+EASY_SETUP_SNAPSHOT_TTL_SECONDS = int(
+    os.getenv("EASY_SETUP_SNAPSHOT_TTL_SECONDS", str(6 * 3600))
+)
+EASY_SETUP_MAX_PARALLEL_DEVICES = int(os.getenv("EASY_SETUP_MAX_PARALLEL_DEVICES", "8"))
+EASY_SETUP_PROBE_INTERVAL_SECONDS = float(
+    os.getenv("EASY_SETUP_PROBE_INTERVAL_SECONDS", "2")
+)
+EASY_SETUP_FIRMWARE_SETTLE_SECONDS = float(
+    os.getenv("EASY_SETUP_FIRMWARE_SETTLE_SECONDS", "35")
+)
+CATRACA_DRIFT_BUCKET_SIZE = int(os.getenv("CATRACA_DRIFT_BUCKET_SIZE", "256"))
+CATRACA_DRIFT_AUTO_REPAIR = os.getenv("CATRACA_DRIFT_AUTO_REPAIR", "False") == "True"
+CATRACA_DRIFT_CHECK_INTERVAL_SECONDS = int(
+    os.getenv("CATRACA_DRIFT_CHECK_INTERVAL_SECONDS", "3600")
+)
+EASY_SETUP_DIFF_PUSH = os.getenv("EASY_SETUP_DIFF_PUSH", "True") == "True"
+USER_IMPORT_BACKGROUND = os.getenv("USER_IMPORT_BACKGROUND", "False") == "True"
+USER_IMPORT_STALE_AFTER_SECONDS = int(
+    os.getenv("USER_IMPORT_STALE_AFTER_SECONDS", "1800")
+)
+MONITOR_HEARTBEAT_FLUSH_SECONDS = int(os.getenv("MONITOR_HEARTBEAT_FLUSH_SECONDS", "15"))
+MONITOR_WEBHOOK_ASYNC_INGESTION = (
+    os.getenv("MONITOR_WEBHOOK_ASYNC_INGESTION", "False") == "True"
+)
+MONITOR_WEBHOOK_DRAIN_BATCH_SIZE = int(os.getenv("MONITOR_WEBHOOK_DRAIN_BATCH_SIZE", "500"))
+MONITOR_WEBHOOK_MAX_ATTEMPTS = int(os.getenv("MONITOR_WEBHOOK_MAX_ATTEMPTS", "5"))
+MONITOR_WEBHOOK_LAG_WARNING_SECONDS = int(
+    os.getenv("MONITOR_WEBHOOK_LAG_WARNING_SECONDS", "60")
+)
+MONITOR_REFERENCE_CACHE_TTL_SECONDS = int(
+    os.getenv("MONITOR_REFERENCE_CACHE_TTL_SECONDS", "300")
+)
 MONITOR_OFFLINE_CHECK_INTERVAL_SECONDS = os.getenv(
     "MONITOR_OFFLINE_CHECK_INTERVAL_SveECONDS",
     60,
@@ -290,6 +363,22 @@ CELERY_BEAT_SCHEDULE = {
         "task": "src.core.control_id_monitor.infra.control_id_monitor_django_app.tasks.check_monitor_heartbeats",
         "schedule": MONITOR_OFFLINE_CHECK_INTERVAL_SECONDS,
     },
+    "retry_pending_access_verifications": {
+        "task": "src.core.control_id_monitor.infra.control_id_monitor_django_app.tasks.retry_pending_access_verifications",
+        "schedule": 300,  # safety net: verificações que não chegaram a rodar
+    },
+    "drain_webhook_inbox": {
+        "task": "src.core.control_id_monitor.infra.control_id_monitor_django_app.tasks.drain_webhook_inbox",
+        "schedule": 30,  # safety net: retentativas e drains que se perderam
+    },
+    "drain_replication_outbox": {
+        "task": "src.core.control_id.infra.control_id_django_app.tasks.drain_replication_outbox",
+        "schedule": 30,  # safety net: retentativas e drains que se perderam
+    },
+    "check_device_drift": {
+        "task": "src.core.control_id_config.infra.control_id_config_django_app.tasks.run_drift_check",
+        "schedule": CATRACA_DRIFT_CHECK_INTERVAL_SECONDS,
+    },
 }
 
 LOGGING = {
@@ -346,6 +435,22 @@ STATICFILES_STORAGE = "minio_storage.storage.MinioStaticStorage"
 # Nome do bucket e criação automática
 MINIO_STORAGE_MEDIA_BUCKET_NAME = "catraca"
 MINIO_STORAGE_AUTO_CREATE_MEDIA_BUCKET = True
+MINIO_STORAGE_MEDIA_USE_PRESIGNED = (
+    os.getenv("MINIO_STORAGE_MEDIA_USE_PRESIGNED", "False") == "True"
+)
+
+# URLs de mídia (src/core/uploader/media_urls.py)
+MEDIA_URL_MAX_AGE_SECONDS = int(os.getenv("MEDIA_URL_MAX_AGE_SECONDS", "3600"))
+MEDIA_URL_CACHE_MARGIN_SECONDS = int(os.getenv("MEDIA_URL_CACHE_MARGIN_SECONDS", "300"))
+MEDIA_PUBLIC_BASE_URL = os.getenv("MEDIA_PUBLIC_BASE_URL", "")
+
+# Alocação de PINs (src/core/user/infra/user_django_app/pin_allocator.py)
+USER_PIN_BITMAP_CACHE_TTL_SECONDS = int(
+    os.getenv("USER_PIN_BITMAP_CACHE_TTL_SECONDS", "300")
+)
+USER_PIN_RESERVATION_TTL_SECONDS = int(
+    os.getenv("USER_PIN_RESERVATION_TTL_SECONDS", "600")
+)
 
 BIOMETRIC_DEVICE_API_KEY = os.getenv(
     "BIOMETRIC_DEVICE_API_KEY",
@@ -0,0 +1,331 @@
+"""
+Benchmarks de sincronização contra catracas simuladas (``tests/controlid_simulator.py``).
+
+Medem Easy Setup, sync global, importação de usuários, ingestão de webhooks e
+detecção/reparo de drift pelo caminho real (HTTP em localhost, pool de sessões, fan-out, Celery eager).
+Sem ``CATRACA_BENCHMARK=1`` rodam só numa escala mínima, como smoke test da
+suíte normal. Para medir antes/depois de uma mudança de desempenho::
+
+    CATRACA_BENCHMARK=1 CATRACA_BENCHMARK_LABEL=antes \\
+    CATRACA_BENCHMARK_OUTPUT=bench.jsonl \\
+        python -m pytest tests/benchmarks -n 0 --no-cov -s
+
+Variáveis:
+
+* ``CATRACA_BENCHMARK_USERS``: usuários por cenário (padrão ``1000,10000,50000``);
+* ``CATRACA_BENCHMARK_DEVICES``: catracas simuladas (padrão ``1,5,20``);
+* ``CATRACA_BENCHMARK_LATENCY_MS``: latência por request da catraca (padrão 5);
+* ``CATRACA_BENCHMARK_ROW_LATENCY_US``: custo por linha enviada (padrão 20);
+* ``CATRACA_BENCHMARK_OUTPUT``: arquivo JSONL que recebe uma linha por medição.
+
+A árvore não tem a task ``run_global_sync``; o cenário de sync global executa
+as leituras do ``GlobalSyncMixin`` em cada catraca.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+ENABLED = os.getenv("CATRACA_BENCHMARK", "").lower() in ("1", "true", "yes", "on")
+DAO_URL = "/api/control_id_monitor/notifications/dao"
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def _sizes(name: str, default: str) -> list[int]:
+    return [int(value) for value in os.getenv(name, default).split(",") if value.strip()]
+
+
+def _matrix() -> list:
+    if not ENABLED:
+        return [pytest.param(20, 2, id="smoke")]
+    return [
+        pytest.param(users, devices, id=f"{users}u-{devices}d")
+        for users in _sizes("CATRACA_BENCHMARK_USERS", "1000,10000,50000")
+        for devices in _sizes("CATRACA_BENCHMARK_DEVICES", "1,5,20")
+    ]
+
+
+def _simulator_options() -> dict:
+    if not ENABLED:
+        return {"record": False, "reboot_seconds": 0.05}
+    return {
+        "record": False,
+        "latency": int(os.getenv("CATRACA_BENCHMARK_LATENCY_MS", "5")) / 1000,
+        "row_latency": int(os.getenv("CATRACA_BENCHMARK_ROW_LATENCY_US", "20")) / 1e6,
+    }
+
+
+def _record(scenario: str, users: int, simulators: list, started: float, **extra) -> dict:
+    """Imprime a medição e, se configurado, grava no JSONL de resultados."""
+    result = {
+        "scenario": scenario,
+        "label": os.getenv("CATRACA_BENCHMARK_LABEL", ""),
+        "users": users,
+        "devices": len(simulators),
+        "seconds": round(time.perf_counter() - started, 3),
+        "device_requests": sum(sim.request_count for sim in simulators),
+        "device_bytes_in": sum(sim.bytes_received for sim in simulators),
+        "device_bytes_out": sum(sim.bytes_sent for sim in simulators),
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **extra,
+    }
+    print(f"[BENCHMARK] {json.dumps(result)}")
+    output = os.getenv("CATRACA_BENCHMARK_OUTPUT")
+    if output:
+        with open(output, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(result) + "\n")
+    return result
+
+
+def _seed_users(count: int, groups: int = 10) -> list[int]:
+    """Usuários com grupo e cartão, em bulk; só os 10 mil primeiros têm PIN."""
+    from src.core.control_id.infra.control_id_django_app.models import (
+        Card,
+        CustomGroup,
+        UserGroup,
+    )
+    from src.core.user.infra.user_django_app.models import User
+
+    User.objects.bulk_create(
+        [
+            User(
+                name=f"Usuario {index:06d}",
+                registration=f"B{index:07d}",
+                pin=f"{index:04d}" if index < 10_000 else "",
+            )
+            for index in range(count)
+        ],
+        batch_size=2000,
+    )
+    user_ids = list(
+        User.objects.filter(registration__startswith="B")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    group_ids = [
+        CustomGroup.objects.create(name=f"Turma {index:02d}").id
+        for index in range(groups)
+    ]
+    UserGroup.objects.bulk_create(
+        [
+            UserGroup(user_id=user_id, group_id=group_ids[index % groups])
+            for index, user_id in enumerate(user_ids)
+        ],
+        batch_size=2000,
+    )
+    Card.objects.bulk_create(
+        [
+            Card(user_id=user_id, value=str(1_000_000 + index))
+            for index, user_id in enumerate(user_ids)
+        ],
+        batch_size=2000,
+    )
+    return user_ids
+
+
+def _device_rows(count: int) -> dict[str, list[dict]]:
+    return {
+        "users": [
+            {"id": index, "name": f"Usuario {index:06d}", "registration": f"B{index:07d}"}
+            for index in range(1, count + 1)
+        ],
+        "cards": [
+            {"id": index, "user_id": index, "value": 1_000_000 + index}
+            for index in range(1, count + 1)
+        ],
+        "user_groups": [
+            {"user_id": index, "group_id": index % 10 + 1}
+            for index in range(1, count + 1)
+        ],
+        "groups": [{"id": index, "name": f"Turma {index:02d}"} for index in range(1, 11)],
+    }
+
+
+@pytest.mark.parametrize("users,devices", _matrix())
+def test_easy_setup_push(
+    users, devices, simulated_devices, monitor_config_factory, settings
+):
+    # Testa/mede o Easy Setup completo (reset, reboot, diff, push, configs) por catraca.
+    from src.core.control_id_config.infra.control_id_config_django_app.models import (
+        EasySetupLog,
+    )
+    from src.core.control_id_config.infra.control_id_config_django_app.tasks import (
+        run_easy_setup_task,
+    )
+    from src.core.control_id.infra.control_id_django_app.models import Device
+
+    settings.EASY_SETUP_PROBE_INTERVAL_SECONDS = 0.05
+    settings.EASY_SETUP_FIRMWARE_SETTLE_SECONDS = 0
+    Device.objects.all().delete()
+    _seed_users(users)
+    pairs = simulated_devices(devices, **_simulator_options())
+    for device, _ in pairs:
+        monitor_config_factory(device=device, hostname="127.0.0.1", port="8000")
+    simulators = [simulator for _, simulator in pairs]
+
+    started = time.perf_counter()
+    run_easy_setup_task(device_ids=[device.id for device, _ in pairs], task_id="bench")
+    logs = list(EasySetupLog.objects.filter(task_id="bench"))
+    result = _record(
+        "easy_setup",
+        users,
+        simulators,
+        started,
+        statuses=sorted(log.status for log in logs),
+        stage_seconds={
+            stage: round(sum(log.stage_timings.get(stage, 0) for log in logs), 3)
+            for stage in logs[0].stage_timings
+        },
+    )
+
+    assert result["statuses"] == [EasySetupLog.Status.SUCCESS] * devices
+    assert all(len(simulator.rows("users")) == users for simulator in simulators)
+    assert all(len(simulator.rows("cards")) == users for simulator in simulators)
+
+
+@pytest.mark.parametrize("users,devices", _matrix())
+def test_global_sync(users, devices, simulated_devices):
+    # Testa/mede as leituras do sync global (todas as tabelas) em cada catraca.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from src.core.control_id.infra.control_id_django_app.views.sync import (
+        GlobalSyncMixin,
+    )
+
+    Device.objects.all().delete()
+    pairs = simulated_devices(devices, **_simulator_options())
+    rows = _device_rows(users)
+    for _, simulator in pairs:
+        for table, values in rows.items():
+            simulator.seed_rows(table, values)
+    readers = [name for name in dir(GlobalSyncMixin) if name.startswith("sync_")]
+
+    started = time.perf_counter()
+    loaded = 0
+    mixin = GlobalSyncMixin()
+    for device, _ in pairs:
+        mixin.set_device(device)
+        for reader in readers:
+            loaded += len(getattr(mixin, reader)(device))
+    _record(
+        "global_sync",
+        users,
+        [simulator for _, simulator in pairs],
+        started,
+        tables=len(readers),
+        rows_loaded=loaded,
+    )
+
+    assert loaded == devices * (3 * users + 10)
+
+
+@pytest.mark.parametrize("users,devices", _matrix())
+def test_user_import(
+    users, devices, simulated_devices, api_client_admin, django_capture_on_commit_callbacks
+):
+    # Testa/mede a importação de planilha em segundo plano até as catracas.
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from src.core.control_id.infra.control_id_django_app.models import (
+        Device,
+        UserImportJob,
+    )
+
+    Device.objects.all().delete()
+    pairs = simulated_devices(devices, **_simulator_options())
+    simulators = [simulator for _, simulator in pairs]
+    lines = ["matricula;discente;data_nascimento"] + [
+        f"{2026_000_000 + index};Discente {index:06d};" for index in range(users)
+    ]
+    upload = SimpleUploadedFile(
+        "discentes.csv", "\n".join(lines).encode("utf-8"), content_type="text/csv"
+    )
+
+    started = time.perf_counter()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = api_client_admin.post(
+            "/api/control_id/import_users/",
+            {"file": upload, "import_profile": "graduacao", "background": "true"},
+            format="multipart",
+        )
+    job = UserImportJob.objects.get(pk=response.data["job_id"])
+    _record("user_import", users, simulators, started, status=job.status)
+
+    assert job.status == UserImportJob.Status.COMPLETED, job.errors
+    assert job.counters["users_synced"] == users
+    assert all(len(simulator.rows("users")) == users for simulator in simulators)
+
+
+@pytest.mark.parametrize("mode", ["sync", "queued"])
+@pytest.mark.parametrize("users,devices", _matrix())
+def test_webhook_ingestion(
+    users, devices, mode, simulated_devices, settings, django_capture_on_commit_callbacks
+):
+    # Testa/mede a ingestão dos webhooks DAO: um acesso por usuário, espalhado entre as catracas.
+    from rest_framework.test import APIClient
+
+    from src.core.control_id.infra.control_id_django_app.models import (
+        AccessLogs,
+        Device,
+    )
+
+    settings.MONITOR_WEBHOOK_ASYNC_INGESTION = mode == "queued"
+    Device.objects.all().delete()
+    user_ids = _seed_users(users)
+    pairs = simulated_devices(devices, **_simulator_options())
+    bodies = [
+        body
+        for index, (device, simulator) in enumerate(pairs)
+        for body in simulator.emit_access_logs(device.id, user_ids[index::devices])
+    ]
+    client = APIClient()
+
+    started = time.perf_counter()
+    with django_capture_on_commit_callbacks(execute=True):
+        statuses = {client.post(DAO_URL, body, format="json").status_code for body in bodies}
+    _record(
+        "webhook_ingestion",
+        users,
+        [simulator for _, simulator in pairs],
+        started,
+        mode=mode,
+        posts=len(bodies),
+    )
+
+    assert statuses == {200}
+    assert AccessLogs.objects.count() == users
+
+
+@pytest.mark.parametrize("users,devices", _matrix())
+def test_drift_check_and_repair(users, devices, simulated_devices):
+    # Testa/mede a detecção de drift e o reparo de poucas linhas divergentes.
+    from src.core.control_id.infra.control_id_django_app.models import Device
+    from src.core.control_id_config.infra.control_id_config_django_app.drift_detection import (
+        detect_drift,
+    )
+
+    Device.objects.all().delete()
+    user_ids = _seed_users(users)
+    pairs = simulated_devices(devices, **_simulator_options())
+    simulators = [simulator for _, simulator in pairs]
+    assert detect_drift(repair=True)["success"]
+    for simulator in simulators:
+        simulator.seed_rows("users", [{"id": user_ids[-1], "name": "Divergente"}])
+
+    started = time.perf_counter()
+    result = detect_drift(repair=True)
+    _record(
+        "drift_repair",
+        users,
+        simulators,
+        started,
+        differing_rows=sum(report["differing_rows"] for report in result["devices"]),
+    )
+
+    assert all(report["repair"]["users"]["sent"] == 1 for report in result["devices"])
+    assert detect_drift()["in_sync"] is True
@@ -0,0 +1,823 @@
+"""
+Simulador local da API ``.fcgi`` das catracas Control iD.
+
+Sobe um servidor HTTP em ``127.0.0.1`` por catraca simulada, com o estado
+(tabelas e configurações) em memória. O código de produção fala com ele pelo
+mesmo caminho usado com o hardware — ``requests``, pool de sessões, fan-out —,
+então serve tanto para testes de integração quanto para os benchmarks de
+``tests/benchmarks``.
+
+Comportamentos configuráveis:
+
+* latência por request (fixa ou por endpoint) e por linha enviada;
+* injeção de erros (status HTTP ou conexão derrubada), pontual ou aleatória;
+* violação de UNIQUE no ``create_objects``: rejeita o lote inteiro
+  (``"reject"``), grava as linhas anteriores à duplicada (``"partial"``) ou
+  ignora as duplicadas (``"ignore"``);
+* factory reset com reboot e init atrasada do firmware (regra ``type=0``).
+
+Uso avulso, para apontar Devices do ambiente de desenvolvimento::
+
+    python -m tests.controlid_simulator --count 3 --base-port 8100
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable, Iterator, Optional
+from urllib.parse import parse_qs, urlsplit
+
+JsonDict = dict[str, Any]
+
+FACTORY_LOGIN = "admin"
+FACTORY_PASSWORD = "admin"
+
+# Chave primária de cada tabela; as demais usam "id".
+KEY_FIELDS: dict[str, tuple[str, ...]] = {
+    "user_groups": ("user_id", "group_id"),
+    "user_access_rules": ("user_id", "access_rule_id"),
+    "group_access_rules": ("group_id", "access_rule_id"),
+    "portal_access_rules": ("portal_id", "access_rule_id"),
+    "area_access_rules": ("area_id", "access_rule_id"),
+    "access_rule_time_zones": ("access_rule_id", "time_zone_id"),
+    "scheduled_unlock_access_rules": ("scheduled_unlock_id", "access_rule_id"),
+    "user_roles": ("user_id",),
+    "pins": ("user_id",),
+}
+
+# Colunas UNIQUE além da chave primária.
+UNIQUE_FIELDS: dict[str, tuple[str, ...]] = {
+    "cards": ("value",),
+    "qrcodes": ("value",),
+    "uhf_tags": ("value",),
+}
+
+# O factory reset (keep_network_info) limpa o que é do usuário e preserva a
+# estrutura (grupos, regras, portais, áreas, horários e junções).
+FACTORY_RESET_TABLES = (
+    "users",
+    "pins",
+    "cards",
+    "templates",
+    "user_roles",
+    "user_groups",
+    "user_access_rules",
+    "qrcodes",
+    "uhf_tags",
+    "access_logs",
+)
+
+DEFAULT_CONFIGURATION: dict[str, dict[str, str]] = {
+    "general": {"online": "1", "local_identification": "1", "language": "pt"},
+    "identifier": {"pin_identification_enabled": "1", "card_identification_enabled": "1"},
+    "catra": {"anti_passback": "0", "daily_reset": "0", "gateway": "clockwise"},
+    "online_client": {"server_id": "0", "extract_template": "0"},
+    "monitor": {"request_timeout": "1000", "hostname": "", "port": "", "path": ""},
+    "push_server": {"push_request_timeout": "15000", "push_request_period": "60"},
+}
+
+# Endpoints de comando: aceitos sem efeito no estado simulado.
+COMMAND_ENDPOINTS = frozenset(
+    {
+        "set_system_time.fcgi",
+        "set_network_interlock.fcgi",
+        "message_to_screen.fcgi",
+        "buzzer_buzz.fcgi",
+        "execute_actions.fcgi",
+        "remote_enroll.fcgi",
+        "remote_user_authorization.fcgi",
+        "logo_change.fcgi",
+        "logo_destroy.fcgi",
+    }
+)
+
+_COMPARATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda a, b: _loose(a) == _loose(b),
+    "!=": lambda a, b: _loose(a) != _loose(b),
+    ">": lambda a, b: _number(a) > _number(b),
+    ">=": lambda a, b: _number(a) >= _number(b),
+    "<": lambda a, b: _number(a) < _number(b),
+    "<=": lambda a, b: _number(a) <= _number(b),
+}
+
+
+def _loose(value: Any) -> str:
+    # O firmware compara "7" e 7 como iguais.
+    return "" if value is None else str(value)
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def key_fields(table: str) -> tuple[str, ...]:
+    return KEY_FIELDS.get(table, ("id",))
+
+
+class _Table:
+    """Linhas de uma tabela indexadas pela chave, com índice das colunas UNIQUE."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.key_fields = key_fields(name)
+        self.rows: dict[tuple, JsonDict] = {}
+        self.unique: dict[str, dict[str, tuple]] = {
+            column: {} for column in UNIQUE_FIELDS.get(name, ())
+        }
+        self.max_id = 0
+
+    def key(self, row: JsonDict) -> tuple:
+        return tuple(_loose(row.get(name)) for name in self.key_fields)
+
+    def owner(self, column: str, value: Any) -> Optional[tuple]:
+        return self.unique[column].get(_loose(value))
+
+    def put(self, row: JsonDict) -> None:
+        key = self.key(row)
+        self.delete(key)
+        self.rows[key] = row
+        for column, index in self.unique.items():
+            index[_loose(row.get(column))] = key
+        if "id" in self.key_fields:
+            self.max_id = max(self.max_id, int(_number(row.get("id"))))
+
+    def delete(self, key: tuple) -> None:
+        old = self.rows.pop(key, None)
+        if old is not None:
+            for column, index in self.unique.items():
+                if index.get(_loose(old.get(column))) == key:
+                    del index[_loose(old.get(column))]
+
+
+class DeviceApiError(Exception):
+    """Resposta de erro da API simulada (status HTTP + corpo JSON)."""
+
+    def __init__(self, status_code: int, message: str, code: int = 1) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = {"error": message, "code": code}
+
+
+@dataclass
+class RecordedCall:
+    endpoint: str
+    payload: Any
+    status_code: int
+
+
+@dataclass
+class _ErrorRule:
+    endpoint: Optional[str]
+    status_code: int
+    error: str
+    remaining: Optional[int]
+    drop_connection: bool
+    when: Optional[Callable[[Any], bool]]
+
+    def matches(self, endpoint: str, payload: Any) -> bool:
+        if self.remaining is not None and self.remaining <= 0:
+            return False
+        if self.endpoint is not None and self.endpoint != endpoint:
+            return False
+        return self.when is None or bool(self.when(payload))
+
+
+class _DropConnection(Exception):
+    """Fecha o socket sem resposta (catraca fora do ar / rebootando)."""
+
+
+@dataclass
+class SimulatedDevice:
+    """
+    Estado e regras de uma catraca, sem HTTP.
+
+    ``handle`` recebe o endpoint e o corpo já decodificado e devolve
+    ``(status, corpo)``; o servidor só faz o transporte.
+    """
+
+    login: str = FACTORY_LOGIN
+    password: str = FACTORY_PASSWORD
+    latency: float | dict[str, float] = 0.0
+    row_latency: float = 0.0
+    unique_violation: str = "reject"
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+    serialize: bool = True
+    record: bool = True
+    reboot_seconds: float = 0.2
+    firmware_init_seconds: float = 0.0
+    configuration: dict[str, dict[str, str]] = field(
+        default_factory=lambda: {
+            section: dict(values) for section, values in DEFAULT_CONFIGURATION.items()
+        }
+    )
+
+    def __post_init__(self) -> None:
+        if self.unique_violation not in ("reject", "partial", "ignore"):
+            raise ValueError(f"unique_violation inválido: {self.unique_violation!r}")
+        self.tables: dict[str, _Table] = {}
+        self.calls: list[RecordedCall] = []
+        self.request_count = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.sessions: set[str] = set()
+        self._session_ids = itertools.count(1)
+        self._error_rules: list[_ErrorRule] = []
+        self._random = random.Random(self.seed)
+        self._state_lock = threading.RLock()
+        self._device_lock = threading.Lock()
+        self._down_until = 0.0
+        self._init_due_at: Optional[float] = None
+        self._endpoints: dict[str, Callable[[Any, dict[str, str]], JsonDict]] = {
+            "load_objects.fcgi": self._load_objects,
+            "create_objects.fcgi": self._create_objects,
+            "create_or_modify_objects.fcgi": self._create_or_modify_objects,
+            "modify_objects.fcgi": self._modify_objects,
+            "destroy_objects.fcgi": self._destroy_objects,
+            "get_configuration.fcgi": self._get_configuration,
+            "set_configuration.fcgi": self._set_configuration,
+            "template_extract.fcgi": self._template_extract,
+            "reset_to_factory_default.fcgi": self._reset_to_factory_default,
+            "reboot.fcgi": self._reboot,
+        }
+
+    # ------------------------------------------------------------------
+    # Controle pelo teste
+    # ------------------------------------------------------------------
+
+    def seed_rows(self, table: str, rows: Iterable[JsonDict]) -> None:
+        """Grava *rows* direto no estado, sem passar pela API."""
+        with self._state_lock:
+            stored = self._table(table)
+            for row in rows:
+                stored.put(dict(row))
+
+    def rows(self, table: str) -> list[JsonDict]:
+        with self._state_lock:
+            stored = self.tables.get(table)
+            return [dict(row) for row in stored.rows.values()] if stored else []
+
+    def inject_error(
+        self,
+        endpoint: Optional[str] = None,
+        *,
+        status_code: int = 500,
+        error: str = "Simulated failure",
+        times: Optional[int] = 1,
+        drop_connection: bool = False,
+        when: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        """
+        Faz os próximos *times* requests em *endpoint* falharem.
+
+        ``times=None`` mantém a falha até :meth:`clear_errors`; ``when``
+        filtra pelo corpo do request e ``drop_connection`` fecha o socket sem
+        responder (o cliente vê erro de rede).
+        """
+        with self._state_lock:
+            self._error_rules.append(
+                _ErrorRule(endpoint, status_code, error, times, drop_connection, when)
+            )
+
+    def clear_errors(self) -> None:
+        with self._state_lock:
+            self._error_rules.clear()
+
+    def expire_sessions(self) -> None:
+        """Invalida todas as sessões (próximo request recebe 401)."""
+        with self._state_lock:
+            self.sessions.clear()
+
+    def reboot(self, seconds: Optional[float] = None) -> None:
+        """Derruba a API por *seconds* e agenda a init atrasada do firmware."""
+        seconds = self.reboot_seconds if seconds is None else seconds
+        with self._state_lock:
+            self.sessions.clear()
+            self._down_until = time.monotonic() + seconds
+            self._init_due_at = self._down_until + self.firmware_init_seconds
+
+    def endpoint_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for call in self.calls:
+            counts[call.endpoint] = counts.get(call.endpoint, 0) + 1
+        return counts
+
+    # ------------------------------------------------------------------
+    # Despacho
+    # ------------------------------------------------------------------
+
+    def handle(
+        self, endpoint: str, query: dict[str, str], payload: Any, body_size: int = 0
+    ) -> tuple[int, JsonDict]:
+        """
+        Processa um request.
+
+        Raises:
+            _DropConnection: Se a catraca está fora do ar ou o erro injetado
+                pede conexão derrubada.
+        """
+        with self._state_lock:
+            self.request_count += 1
+            self.bytes_received += body_size
+            self._apply_pending_boot()
+            if time.monotonic() < self._down_until:
+                raise _DropConnection()
+
+        if self.serialize:
+            # O hardware atende um request por vez.
+            with self._device_lock:
+                status_code, body = self._handle(endpoint, query, payload)
+        else:
+            status_code, body = self._handle(endpoint, query, payload)
+
+        if self.record:
+            with self._state_lock:
+                self.calls.append(RecordedCall(endpoint, payload, status_code))
+        return status_code, body
+
+    def _handle(
+        self, endpoint: str, query: dict[str, str], payload: Any
+    ) -> tuple[int, JsonDict]:
+        self._sleep_for(endpoint, payload)
+        try:
+            self._raise_injected_error(endpoint, payload)
+            if endpoint == "login.fcgi":
+                return 200, self._login(payload or {})
+            if endpoint == "logout.fcgi":
+                self.sessions.discard(query.get("session", ""))
+                return 200, {}
+            if query.get("session") not in self.sessions:
+                raise DeviceApiError(401, "Session is not valid")
+            if endpoint in self._endpoints:
+                return 200, self._endpoints[endpoint](
+                    payload if payload is not None else {}, query
+                )
+            if endpoint in COMMAND_ENDPOINTS:
+                return 200, {}
+            raise DeviceApiError(404, f"Unknown endpoint {endpoint}")
+        except DeviceApiError as exc:
+            return exc.status_code, exc.body
+
+    def _sleep_for(self, endpoint: str, payload: Any) -> None:
+        if isinstance(self.latency, dict):
+            delay = self.latency.get(endpoint, self.latency.get("*", 0.0))
+        else:
+            delay = self.latency
+        if self.row_latency and isinstance(payload, dict):
+            values = payload.get("values")
+            if isinstance(values, list):
+                delay += self.row_latency * len(values)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _raise_injected_error(self, endpoint: str, payload: Any) -> None:
+        with self._state_lock:
+            for rule in self._error_rules:
+                if rule.matches(endpoint, payload):
+                    if rule.remaining is not None:
+                        rule.remaining -= 1
+                    if rule.drop_connection:
+                        raise _DropConnection()
+                    raise DeviceApiError(rule.status_code, rule.error)
+            if self.error_rate and self._random.random() < self.error_rate:
+                raise DeviceApiError(500, "Simulated random failure")
+
+    def _apply_pending_boot(self) -> None:
+        if self._init_due_at is None or time.monotonic() < self._init_due_at:
+            return
+        self._init_due_at = None
+        # Init atrasada do V5.18.3: a regra padrão volta com type=0.
+        rules = self._table("access_rules")
+        if not any(_loose(rule.get("type")) == "0" for rule in rules.rows.values()):
+            rule = rules.rows.get(("1",), {"id": 1, "name": "Acesso padrão", "priority": 0})
+            rules.put({**rule, "type": 0})
+
+    # ------------------------------------------------------------------
+    # Endpoints
+    # ------------------------------------------------------------------
+
+    def _login(self, payload: JsonDict) -> JsonDict:
+        if payload.get("login") != self.login or payload.get("password") != self.password:
+            raise DeviceApiError(401, "Invalid login or password")
+        with self._state_lock:
+            token = f"sim-{next(self._session_ids)}"
+            self.sessions.add(token)
+        return {"session": token}
+
+    def _load_objects(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        name = self._table_name(payload)
+        with self._state_lock:
+            stored = self.tables.get(name)
+            rows = [
+                row
+                for row in (stored.rows.values() if stored else ())
+                if self._matches(name, row, payload.get("where"))
+            ]
+        for column in reversed(payload.get("order_by") or []):
+            rows.sort(key=lambda row: (_number(row.get(column)), _loose(row.get(column))))
+        offset = int(payload.get("offset") or 0)
+        limit = payload.get("limit")
+        rows = rows[offset : offset + int(limit)] if limit else rows[offset:]
+        fields = payload.get("fields")
+        if fields:
+            rows = [{column: row[column] for column in fields if column in row} for row in rows]
+        else:
+            rows = [dict(row) for row in rows]
+        return {name: rows}
+
+    def _create_objects(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        name = self._table_name(payload)
+        values = self._values(payload)
+        with self._state_lock:
+            stored = self._table(name)
+            staged = _Table(name)
+            staged.max_id = stored.max_id
+            ids = []
+            for row in values:
+                row = self._with_id(staged, row)
+                conflict = self._conflict(stored, staged, row, insert=True)
+                if conflict:
+                    if self.unique_violation == "ignore":
+                        continue
+                    if self.unique_violation == "partial":
+                        self._commit(stored, staged)
+                    raise DeviceApiError(400, f"UNIQUE constraint failed: {name}.{conflict}")
+                staged.put(row)
+                if "id" in row:
+                    ids.append(row["id"])
+            self._commit(stored, staged)
+        return {"ids": ids}
+
+    def _create_or_modify_objects(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        name = self._table_name(payload)
+        values = self._values(payload)
+        with self._state_lock:
+            stored = self._table(name)
+            staged = _Table(name)
+            staged.max_id = stored.max_id
+            for row in values:
+                row = self._with_id(staged, row)
+                key = staged.key(row)
+                merged = {**stored.rows.get(key, {}), **staged.rows.get(key, {}), **row}
+                conflict = self._conflict(stored, staged, merged, insert=False)
+                if conflict:
+                    raise DeviceApiError(400, f"UNIQUE constraint failed: {name}.{conflict}")
+                staged.put(merged)
+            self._commit(stored, staged)
+        return {}
+
+    def _modify_objects(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        name = self._table_name(payload)
+        values = payload.get("values")
+        changes = 0
+        with self._state_lock:
+            stored = self._table(name)
+            if isinstance(values, dict):
+                # Forma da API: campos a alterar + where.
+                for row in list(stored.rows.values()):
+                    if self._matches(name, row, payload.get("where")):
+                        stored.put({**row, **values})
+                        changes += 1
+            else:
+                # Forma usada pelo sistema: linhas completas casadas pela chave.
+                for row in values or []:
+                    current = stored.rows.get(stored.key(row))
+                    if current is not None:
+                        stored.put({**current, **row})
+                        changes += 1
+        return {"changes": changes}
+
+    def _destroy_objects(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        name = self._table_name(payload)
+        with self._state_lock:
+            stored = self._table(name)
+            doomed = [
+                key
+                for key, row in stored.rows.items()
+                if self._matches(name, row, payload.get("where"))
+            ]
+            for key in doomed:
+                stored.delete(key)
+        return {"changes": len(doomed)}
+
+    def _get_configuration(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        result: JsonDict = {}
+        with self._state_lock:
+            for section, fields in payload.items():
+                current = self.configuration.get(section, {})
+                names = fields if isinstance(fields, list) else list(current)
+                result[section] = {name: current[name] for name in names if name in current}
+        return result
+
+    def _set_configuration(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        with self._state_lock:
+            for section, values in payload.items():
+                if not isinstance(values, dict):
+                    raise DeviceApiError(400, f"Invalid section {section}")
+                target = self.configuration.setdefault(section, {})
+                target.update({name: _loose(value) for name, value in values.items()})
+        return {}
+
+    def _template_extract(self, payload: Any, query: dict[str, str]) -> JsonDict:
+        raw = payload if isinstance(payload, (bytes, bytearray)) else b""
+        expected = _number(query.get("width")) * _number(query.get("height"))
+        if not raw or (expected and len(raw) != expected):
+            raise DeviceApiError(400, "Invalid image size")
+        digest = hashlib.sha256(raw).digest()
+        return {
+            "quality": 40 + digest[0] % 60,
+            "template": base64.b64encode(digest * 12).decode(),
+        }
+
+    def _reset_to_factory_default(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        with self._state_lock:
+            for table in FACTORY_RESET_TABLES:
+                self.tables.pop(table, None)
+            self.configuration = {
+                section: dict(values) for section, values in DEFAULT_CONFIGURATION.items()
+            }
+            self.login, self.password = FACTORY_LOGIN, FACTORY_PASSWORD
+        # A resposta sai antes do reboot começar.
+        threading.Timer(0.01, self.reboot).start()
+        return {}
+
+    def _reboot(self, payload: JsonDict, query: dict[str, str]) -> JsonDict:
+        threading.Timer(0.01, self.reboot).start()
+        return {}
+
+    # ------------------------------------------------------------------
+    # Regras de tabela
+    # ------------------------------------------------------------------
+
+    def _table(self, name: str) -> _Table:
+        if name not in self.tables:
+            self.tables[name] = _Table(name)
+        return self.tables[name]
+
+    @staticmethod
+    def _commit(stored: _Table, staged: _Table) -> None:
+        for row in staged.rows.values():
+            stored.put(row)
+
+    @staticmethod
+    def _table_name(payload: Any) -> str:
+        name = payload.get("object") if isinstance(payload, dict) else None
+        if not name:
+            raise DeviceApiError(400, "Missing object")
+        return name
+
+    @staticmethod
+    def _values(payload: JsonDict) -> list[JsonDict]:
+        values = payload.get("values")
+        if not isinstance(values, list) or not all(isinstance(v, dict) for v in values):
+            raise DeviceApiError(400, "values must be a list of objects")
+        return values
+
+    @staticmethod
+    def _with_id(staged: _Table, row: JsonDict) -> JsonDict:
+        if staged.key_fields != ("id",) or row.get("id") not in (None, ""):
+            return dict(row)
+        staged.max_id += 1
+        return {**row, "id": staged.max_id}
+
+    @staticmethod
+    def _conflict(
+        stored: _Table, staged: _Table, row: JsonDict, *, insert: bool
+    ) -> Optional[str]:
+        """Coluna violada por *row*, ou ``None``."""
+        key = stored.key(row)
+        if insert and (key in stored.rows or key in staged.rows):
+            return ",".join(stored.key_fields)
+        for column in stored.unique:
+            for table in (staged, stored):
+                owner = table.owner(column, row.get(column))
+                if owner is not None and owner != key:
+                    # Linha já regravada no lote não conta com o valor antigo.
+                    if table is stored and owner in staged.rows:
+                        continue
+                    return column
+        return None
+
+    @staticmethod
+    def _matches(name: str, row: JsonDict, where: Any) -> bool:
+        if not where:
+            return True
+        conditions = where.get(name, {}) if isinstance(where, dict) else {}
+        for column, condition in conditions.items():
+            value = row.get(column)
+            if isinstance(condition, list):
+                if _loose(value) not in {_loose(item) for item in condition}:
+                    return False
+            elif isinstance(condition, dict):
+                for operator, operand in condition.items():
+                    if operator.upper() == "IN":
+                        if _loose(value) not in {_loose(item) for item in operand}:
+                            return False
+                    elif not _COMPARATORS.get(operator, _COMPARATORS["="])(value, operand):
+                        return False
+            elif _loose(value) != _loose(condition):
+                return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Push para o servidor (webhook do monitor)
+    # ------------------------------------------------------------------
+
+    def emit_access_logs(
+        self,
+        device_id: int,
+        user_ids: Iterable[int],
+        *,
+        portal_id: int = 1,
+        event: int = 7,
+        batch_size: int = 50,
+        start_time: int = 1_700_000_000,
+    ) -> Iterator[JsonDict]:
+        """
+        Gera os corpos do webhook DAO que a catraca mandaria para *user_ids*.
+
+        Os logs também ficam na tabela ``access_logs`` do simulador, como no
+        equipamento.
+        """
+        with self._state_lock:
+            logs = self._table("access_logs")
+        batch: list[JsonDict] = []
+        for user_id in user_ids:
+            with self._state_lock:
+                log_id = logs.max_id + 1
+                values = {
+                    "id": str(log_id),
+                    "time": str(start_time + log_id),
+                    "event": str(event),
+                    "device_id": str(device_id),
+                    "user_id": str(user_id),
+                    "portal_id": str(portal_id),
+                    "identifier_id": "0",
+                }
+                logs.put(values)
+            batch.append({"object": "access_logs", "type": "inserted", "values": values})
+            if len(batch) >= batch_size:
+                yield {"device_id": device_id, "object_changes": batch}
+                batch = []
+        if batch:
+            yield {"device_id": device_id, "object_changes": batch}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em writes separados; com Nagle o keep-alive
+    # do pool esperaria o ACK atrasado (~40 ms) a cada request.
+    disable_nagle_algorithm = True
+    server: "_SimulatorHTTPServer"
+
+    def do_POST(self) -> None:  # noqa: N802 - nome exigido pelo http.server
+        self._dispatch()
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        url = urlsplit(self.path)
+        endpoint = url.path.lstrip("/")
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        size = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(size) if size else b""
+        payload: Any = None
+        if raw:
+            if "octet-stream" in (self.headers.get("Content-Type") or ""):
+                payload = raw
+            else:
+                try:
+                    payload = json.loads(raw)
+                except ValueError:
+                    self._respond(400, {"error": "Invalid JSON", "code": 1})
+                    return
+
+        try:
+            status_code, body = self.server.device.handle(endpoint, query, payload, size)
+        except _DropConnection:
+            self.close_connection = True
+            return
+        self._respond(status_code, body)
+
+    def _respond(self, status_code: int, body: Optional[JsonDict]) -> None:
+        data = json.dumps(body if body is not None else {}).encode()
+        with self.server.device._state_lock:
+            self.server.device.bytes_sent += len(data)
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _SimulatorHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    device: SimulatedDevice
+
+
+class ControlIDSimulator:
+    """
+    Catraca simulada escutando em localhost.
+
+    Aceita os mesmos argumentos de :class:`SimulatedDevice`. Use como context
+    manager ou chame :meth:`start`/:meth:`stop`; ``url`` vai no campo ``ip``
+    do Device.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **options: Any) -> None:
+        self.device = SimulatedDevice(**options)
+        self._server = _SimulatorHTTPServer((host, port), _Handler)
+        self._server.device = self.device
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ControlIDSimulator":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                kwargs={"poll_interval": 0.05},
+                name=f"controlid-sim-{self._server.server_address[1]}",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "ControlIDSimulator":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def __getattr__(self, name: str) -> Any:
+        # Controle do estado direto pelo simulador: sim.inject_error(...), sim.rows(...)
+        if name == "device":
+            raise AttributeError(name)
+        return getattr(self.device, name)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Catracas Control iD simuladas.")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--row-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--unique-violation", choices=("reject", "partial", "ignore"), default="reject"
+    )
+    args = parser.parse_args(argv)
+
+    simulators = [
+        ControlIDSimulator(
+            host=args.host,
+            port=args.base_port + index,
+            latency=args.latency,
+            row_latency=args.row_latency,
+            error_rate=args.error_rate,
+            unique_violation=args.unique_violation,
+        ).start()
+        for index in range(args.count)
+    ]
+    for simulator in simulators:
+        print(f"[SIMULATOR] {simulator.url} ({FACTORY_LOGIN}/{FACTORY_PASSWORD})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for simulator in simulators:
+            simulator.stop()
+
+
+if __name__ == "__main__":
+    main()